@@ -79,6 +79,19 @@ export async function listAccountLogs(
   );
 }
 
-export function buildAccountLogsWebSocketUrl(accountId: string) {
-  return buildWebSocketUrl(`/ws/logs/${accountId}`);
+export function buildAccountLogsWebSocketUrl(
+  accountId: string,
+  since?: number | null,
+) {
+  const path = `/ws/logs/${accountId}`;
+
+  if (since === undefined || since === null) {
+    return buildWebSocketUrl(path);
+  }
+
+  return buildWebSocketUrl(`${path}?since=${since}`);
+}
+
+export function buildLogsStreamWebSocketUrl() {
+  return buildWebSocketUrl('/ws/logs');
 }
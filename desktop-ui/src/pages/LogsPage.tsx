@@ -1,4 +1,4 @@
-import { buildAccountLogsWebSocketUrl, listAccountLogs } from '../api/accounts';
+import { buildLogsStreamWebSocketUrl, listAccountLogs } from '../api/accounts';
 import {
   AccountLogEntry,
   allLogAccountsValue,
@@ -18,11 +18,36 @@ import {
 } from '../app/shared';
 import { PageHeader } from '../components/PageHeader';
 import { Panel } from '../components/Panel';
-import type { AccountRow, ApiAccountLogEntryRead } from '../types';
+import type {
+  AccountRow,
+  ApiAccountLogEntryRead,
+  ApiLogStreamFrame,
+} from '../types';
 import { cardTitleClassName, cx, getButtonClassName } from '../ui';
 import { ChevronDown } from 'lucide-react';
 import { useEffect, useRef, useState } from 'react';
 
+interface LogSubscription {
+  accountIds: string[];
+  accountNames: Map<string, string>;
+  level?: string;
+}
+
+function sendLogSubscription(
+  socket: WebSocket,
+  subscription: LogSubscription,
+  since?: Record<string, number>,
+) {
+  socket.send(
+    JSON.stringify({
+      type: 'subscribe',
+      account_ids: subscription.accountIds,
+      min_level: subscription.level ?? null,
+      since: since ?? null,
+    }),
+  );
+}
+
 interface LogsPageProps {
   accounts: AccountRow[];
   accountsError: string;
@@ -52,6 +77,12 @@ function LogsPage({
   const [isLogsLoading, setIsLogsLoading] = useState(false);
   const [logsError, setLogsError] = useState('');
   const hasInitializedLogFilters = useRef(false);
+  const socketRef = useRef<WebSocket | null>(null);
+  const logSubscriptionRef = useRef<LogSubscription>({
+    accountIds: [],
+    accountNames: new Map(),
+  });
+  const lastLogSeqsRef = useRef<Record<string, number>>({});
   const accountSignature = accounts
     .map((account) => `${account.id}:${account.name}`)
     .join('|');
@@ -163,53 +194,118 @@ function LogsPage({
   ]);
 
   useEffect(() => {
-    if (isAccountsLoading || accounts.length === 0) {
-      return;
-    }
+    let isClosed = false;
+    let reconnectTimer: number | undefined;
+
+    const appendEntries = (payload: ApiAccountLogEntryRead[]) => {
+      const { accountNames, level } = logSubscriptionRef.current;
+      const nextEntries = payload
+        .filter((entry) => !level || entry.level === level)
+        .map((entry) =>
+          mapApiAccountLogEntryToEntry(
+            entry,
+            accountNames.get(entry.account_id) ?? entry.account_id,
+          ),
+        );
 
-    const activeAccounts =
-      selectedLogAccountId === allLogAccountsValue
-        ? accounts
-        : accounts.filter((account) => account.id === selectedLogAccountId);
-    const sockets = activeAccounts.map((account) => {
-      const socket = new WebSocket(buildAccountLogsWebSocketUrl(account.id));
+      if (nextEntries.length === 0) {
+        return;
+      }
+
+      setLogEntries((currentEntries) =>
+        mergeAndSortAccountLogEntries([...currentEntries, ...nextEntries]),
+      );
+    };
+
+    const connect = () => {
+      const socket = new WebSocket(buildLogsStreamWebSocketUrl());
+
+      socket.onopen = () => {
+        sendLogSubscription(socket, logSubscriptionRef.current, {
+          ...lastLogSeqsRef.current,
+        });
+      };
 
       socket.onmessage = (event) => {
-        let payload: ApiAccountLogEntryRead;
+        let frame: ApiLogStreamFrame;
 
         try {
-          payload = JSON.parse(event.data) as ApiAccountLogEntryRead;
+          frame = JSON.parse(event.data) as ApiLogStreamFrame;
         } catch {
           return;
         }
 
-        const nextEntry = mapApiAccountLogEntryToEntry(payload, account.name);
+        const previousSeqs = { ...lastLogSeqsRef.current };
 
-        if (
-          selectedLogLevel !== allLogLevelsValue &&
-          nextEntry.level !== selectedLogLevel
-        ) {
+        Object.assign(lastLogSeqsRef.current, frame.seqs);
+        appendEntries(frame.entries);
+
+        if (frame.dropped === 0) {
           return;
         }
 
-        setLogEntries((currentEntries) =>
-          mergeAndSortAccountLogEntries([...currentEntries, nextEntry]),
-        );
+        const { accountIds, level } = logSubscriptionRef.current;
+
+        accountIds.forEach((accountId) => {
+          const since = previousSeqs[accountId];
+
+          if (since === undefined) {
+            return;
+          }
+
+          void listAccountLogs(accountId, 200, {
+            level,
+            since: String(since),
+          })
+            .then(appendEntries)
+            .catch(() => undefined);
+        });
       };
 
-      return socket;
-    });
+      socket.onclose = () => {
+        if (socketRef.current === socket) {
+          socketRef.current = null;
+        }
 
-    return () => {
-      sockets.forEach((socket) => {
-        if (
-          socket.readyState === WebSocket.OPEN ||
-          socket.readyState === WebSocket.CONNECTING
-        ) {
-          socket.close();
+        if (!isClosed) {
+          reconnectTimer = window.setTimeout(connect, 1000);
         }
-      });
+      };
+
+      socketRef.current = socket;
     };
+
+    connect();
+
+    return () => {
+      isClosed = true;
+      window.clearTimeout(reconnectTimer);
+      socketRef.current?.close();
+      socketRef.current = null;
+    };
+  }, []);
+
+  useEffect(() => {
+    const activeAccounts = isAccountsLoading
+      ? []
+      : selectedLogAccountId === allLogAccountsValue
+        ? accounts
+        : accounts.filter((account) => account.id === selectedLogAccountId);
+
+    logSubscriptionRef.current = {
+      accountIds: activeAccounts.map((account) => account.id),
+      accountNames: new Map(
+        accounts.map((account) => [account.id, account.name]),
+      ),
+      level:
+        selectedLogLevel === allLogLevelsValue ? undefined : selectedLogLevel,
+    };
+
+    const socket = socketRef.current;
+
+    if (socket?.readyState === WebSocket.OPEN) {
+      sendLogSubscription(socket, logSubscriptionRef.current);
+    }
   }, [
     accountSignature,
     accounts,
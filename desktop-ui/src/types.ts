@@ -159,6 +159,20 @@ export interface ApiAccountLogEntryRead {
   message: string;
 }
 
+export interface ApiAccountLogStreamFrame {
+  type: 'logs';
+  seq: number | null;
+  dropped: number;
+  entries: ApiAccountLogEntryRead[];
+}
+
+export interface ApiLogStreamFrame {
+  type: 'logs';
+  seqs: Record<string, number>;
+  dropped: number;
+  entries: ApiAccountLogEntryRead[];
+}
+
 export interface ApiDashboardSeriesPoint {
   date: string;
   items: number;
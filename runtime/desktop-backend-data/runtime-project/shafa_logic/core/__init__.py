@@ -0,0 +1 @@
+"""GraphQL queries used by the scripts."""
@@ -0,0 +1,47 @@
+import json
+import os
+from typing import Optional
+
+try:
+    from playwright.sync_api import BrowserContext
+except ModuleNotFoundError:  # pragma: no cover - optional at import time for tests
+    BrowserContext = object
+
+from data.const import APP_PLATFORM, APP_VERSION, ORIGIN_URL, REFERER_URL
+
+
+def base_headers(csrftoken: str) -> dict:
+    return {
+        "Origin": ORIGIN_URL,
+        "Referer": REFERER_URL,
+        "X-CSRFToken": csrftoken,
+        "x-app-platform": APP_PLATFORM,
+        "x-app-version": APP_VERSION,
+    }
+
+
+def get_csrftoken_from_context(ctx: BrowserContext) -> Optional[str]:
+    cookies = ctx.cookies(ORIGIN_URL)
+    return next(
+        (
+            c["value"]
+            for c in cookies
+            if c.get("name") in {"csrftoken", "shafa_csrftoken"}
+        ),
+        None,
+    )
+
+
+def read_response_json(resp, preview: int = 2000) -> dict:
+    text = resp.text()
+    if _debug_http_enabled():
+        print(text[:preview])
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise RuntimeError("Response is not valid JSON") from exc
+
+
+def _debug_http_enabled() -> bool:
+    value = os.getenv("SHAFA_DEBUG_HTTP", "").strip().lower()
+    return value in {"1", "true", "yes", "on"}
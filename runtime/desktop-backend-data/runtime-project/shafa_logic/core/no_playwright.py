@@ -0,0 +1,1276 @@
+import gzip
+import json
+import os
+import re
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+from urllib import error, request
+
+try:
+    from shafa_logic.utils.proxy import (
+        load_runtime_proxy_config,
+        open_url,
+        record_proxy_request_result,
+    )
+    from shafa_logic.utils.proxy_scheduler import ProxySchedulerBusyError
+except ImportError:  # pragma: no cover - runtime script path fallback
+    from utils.proxy import (  # type: ignore[no-redef]
+        load_runtime_proxy_config,
+        open_url,
+        record_proxy_request_result,
+    )
+    from utils.proxy_scheduler import (  # type: ignore[no-redef]
+        ProxySchedulerBusyError,
+    )
+
+from controller.catalog_filter import SLUG_TO_WORDS
+from controller.data_controller import (
+    build_product_raw_data,
+    download_product_photos,
+    get_product_photo_message_ids,
+    get_next_product_for_upload,
+    mark_product_created,
+    rebuild_product_data_from_source,
+    should_run_first_fetch,
+)
+from core.product_failures import (
+    handle_retryable_product_failure,
+    summarize_exception,
+    summarize_graph_errors,
+)
+from core.cookie_jar import (
+    ShafaCookieJar,
+    build_cookie_header,
+    find_csrftoken,
+)
+from core.requests.get_brands import resolve_brand_catalog_slug
+from data.const import (
+    API_BATCH_URL,
+    API_URL,
+    API_V5_URL,
+    ACCOUNT_ID,
+    APP_PLATFORM,
+    APP_VERSION,
+    CREATE_PRODUCT_MUTATION,
+    DEFAULT_CLOTHES_MARKUP,
+    DEFAULT_MARKUP,
+    DEFAULT_MESSAGE_PARSE_LIMIT,
+    LOG_CREATE_PRODUCT_REQUEST,
+    MAX_UPLOAD_BYTES,
+    MEDIA_DIR_PATH,
+    ORIGIN_URL,
+    REFERER_URL,
+    STORAGE_STATE_PATH,
+    UPLOAD_PHOTO_MUTATION,
+    get_price_markup,
+)
+from data.db import (
+    claim_reference_data_refresh,
+    cookies_db_signature,
+    finish_reference_data_refresh,
+    init_db,
+    load_cookies,
+    reference_data_shared,
+    save_cookies,
+    save_brands,
+    save_size_mappings,
+    save_sizes,
+    save_uploaded_product,
+)
+from data.size_mapping import build_size_mappings, flatten_v5_size_groups
+from models.product import Product
+from utils.events import emit_event
+from utils.logging import log
+from utils.media import (
+    cleanup_prepared_media_uploads,
+    detect_media_mime_type,
+    list_media_files,
+    prepare_media_batch_for_upload,
+    reset_media_dir,
+    total_media_size_bytes,
+)
+from utils.pipeline_activity import enter_product_pipeline, exit_product_pipeline
+from utils.progress import (
+    ProgressBar,
+    verbose_photo_logs_enabled,
+    verbose_product_logs_enabled,
+)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+DEFAULT_CATALOG_SLUG = "obuv/krossovki"
+WOMEN_CATALOG_SLUG = "zhenskaya-obuv/krossovki"
+DEFAULT_CLOTES_CATEGORY = "verhnyaya-odezhda/palto"
+
+SIZE_CATALOG_SLUGS = (DEFAULT_CATALOG_SLUG, WOMEN_CATALOG_SLUG, DEFAULT_CLOTES_CATEGORY, "dlya-beremennyh/dzhinsy", "specodezhda/sfera-obsluzhivaniya", "nizhnee-bele-i-kupalniki/lifchiki")
+_AUTH_DEBUG_PRINTED_KEYS: set[tuple[str, str, str]] = set()
+_SHAFA_COOKIE_JARS: dict[tuple[Path, bool], ShafaCookieJar] = {}
+_REFERENCE_REFRESH_LEASE_SECONDS = 180.0
+_REFERENCE_REFRESH_POLL_SECONDS = 1.0
+
+
+def _debug_http_enabled() -> bool:
+    value = os.getenv("SHAFA_DEBUG_HTTP", "").strip().lower()
+    return value in {"1", "true", "yes", "on"}
+
+
+def _log_product_detail(message: str) -> None:
+    if verbose_product_logs_enabled():
+        log("DEBUG", message)
+
+
+def _http_retry_count() -> int:
+    raw = os.getenv("SHAFA_HTTP_RETRIES", "").strip()
+    if not raw:
+        return 2
+    try:
+        value = int(raw)
+    except ValueError:
+        return 2
+    return min(max(value, 0), 5)
+
+
+def _http_retry_delay() -> float:
+    raw = os.getenv("SHAFA_HTTP_RETRY_DELAY", "").strip()
+    if not raw:
+        return 2.0
+    try:
+        value = float(raw)
+    except ValueError:
+        return 2.0
+    return min(max(value, 0.1), 30.0)
+
+
+def _reference_refresh_concurrency() -> int:
+    raw = os.getenv("SHAFA_REFERENCE_REFRESH_CONCURRENCY", "").strip()
+    if not raw:
+        return 3
+    try:
+        value = int(raw)
+    except ValueError:
+        return 3
+    return min(max(value, 1), 8)
+
+
+def _reference_refresh_interval() -> float:
+    raw = os.getenv("SHAFA_REFERENCE_REFRESH_INTERVAL_SECONDS", "").strip()
+    if not raw:
+        return 900.0
+    try:
+        value = float(raw)
+    except ValueError:
+        return 900.0
+    return min(max(value, 0.0), 86400.0)
+
+
+def _current_storage_state_path() -> Path:
+    configured = os.getenv("SHAFA_STORAGE_STATE_PATH", "").strip()
+    return Path(configured).expanduser() if configured else Path(STORAGE_STATE_PATH)
+
+
+def _explicit_storage_state_path_configured() -> bool:
+    return bool(os.getenv("SHAFA_STORAGE_STATE_PATH", "").strip())
+
+
+def _shafa_cookie_jar() -> ShafaCookieJar:
+    storage_state_path = _current_storage_state_path()
+    allow_db_fallback = not _explicit_storage_state_path_configured()
+    key = (storage_state_path, allow_db_fallback)
+    jar = _SHAFA_COOKIE_JARS.get(key)
+    if jar is None:
+        jar = ShafaCookieJar(
+            storage_state_path,
+            base_domain=ORIGIN_URL,
+            load_fallback_cookies=(
+                (lambda: load_cookies(ORIGIN_URL)) if allow_db_fallback else None
+            ),
+            fallback_signature=cookies_db_signature if allow_db_fallback else None,
+            persist_cookies=lambda cookies: save_cookies(cookies),
+        )
+        _SHAFA_COOKIE_JARS[key] = jar
+    jar.refresh()
+    return jar
+
+
+def _cookie_jar_for(cookies: object) -> Optional[ShafaCookieJar]:
+    for jar in _SHAFA_COOKIE_JARS.values():
+        if jar.owns(cookies):
+            return jar
+    return None
+
+
+def _load_shafa_cookies() -> list[dict]:
+    return _shafa_cookie_jar().cookies
+
+
+def _cookie_debug_summary(cookies: list[dict]) -> str:
+    parts: list[str] = []
+    for cookie in cookies:
+        if not isinstance(cookie, dict):
+            continue
+        name = str(cookie.get("name") or "").strip()
+        domain = str(cookie.get("domain") or "").strip()
+        if not name:
+            continue
+        parts.append(f"{name}@{domain or '?'}")
+    return ", ".join(parts) if parts else "none"
+
+
+def _debug_request_auth(operation: str, cookies: list[dict]) -> None:
+    if os.getenv("SHAFA_DEBUG_AUTH", "").strip().lower() not in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }:
+        return
+    storage_state_path = _current_storage_state_path().resolve()
+    account_id = os.getenv("SHAFA_ACCOUNT_ID", "").strip()
+    debug_key = (operation, account_id, str(storage_state_path))
+    if debug_key in _AUTH_DEBUG_PRINTED_KEYS:
+        return
+    _AUTH_DEBUG_PRINTED_KEYS.add(debug_key)
+    print(
+        "[Shafa auth debug] "
+        f"operation={operation} | "
+        f"account_name={os.getenv('SHAFA_ACCOUNT_NAME', '').strip()} | "
+        f"account_id={account_id} | "
+        f"env_storage_state_path={os.getenv('SHAFA_STORAGE_STATE_PATH', '').strip()} | "
+        f"auth_path_used={storage_state_path} | "
+        f"auth_exists={storage_state_path.exists()} | "
+        f"cookies={_cookie_debug_summary(cookies)}"
+    )
+
+
+def _build_cookie_header(cookies: list[dict]) -> str:
+    jar = _cookie_jar_for(cookies)
+    if jar is not None:
+        return jar.cookie_header
+    return build_cookie_header(cookies)
+
+
+def _get_csrftoken_from_cookies(cookies: list[dict]) -> Optional[str]:
+    jar = _cookie_jar_for(cookies)
+    if jar is not None:
+        return jar.csrftoken
+    return find_csrftoken(cookies)
+
+
+def _absorb_response_cookies(cookies: list[dict], headers) -> None:
+    jar = _cookie_jar_for(cookies)
+    if jar is None or headers is None:
+        return
+    get_all = getattr(headers, "get_all", None)
+    set_cookie_headers = get_all("Set-Cookie") if callable(get_all) else None
+    if set_cookie_headers:
+        jar.absorb_set_cookie_headers(set_cookie_headers)
+
+
+def _base_headers(csrftoken: str) -> dict:
+    return {
+        "Origin": ORIGIN_URL,
+        "Referer": REFERER_URL,
+        "X-CSRFToken": csrftoken,
+        "x-app-platform": APP_PLATFORM,
+        "x-app-version": APP_VERSION,
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "identity",
+    }
+
+
+def _decode_body(body: bytes, encoding: str) -> bytes:
+    encoding = (encoding or "").lower()
+    if "gzip" in encoding:
+        return gzip.decompress(body)
+    if "deflate" in encoding:
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def _read_response_text(resp) -> str:
+    body = resp.read()
+    body = _decode_body(body, resp.headers.get("Content-Encoding", ""))
+    return body.decode("utf-8", errors="replace")
+
+
+def _response_preview(text: str, limit: int = 300) -> str:
+    compact = " ".join(str(text or "").split())
+    return compact[:limit] if compact else ""
+
+
+def _payload_operation_name(payload: bytes) -> str:
+    try:
+        parsed = json.loads(payload.decode("utf-8", errors="replace"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return "unknown"
+    if isinstance(parsed, list):
+        parsed = parsed[0] if parsed else {}
+    if isinstance(parsed, dict):
+        return str(parsed.get("operationName") or "unknown").strip() or "unknown"
+    return "unknown"
+
+
+def _request_json(
+    url: str,
+    payload: bytes,
+    headers: dict,
+    cookies: list[dict],
+    preview: int = 2000,
+    operation_name: Optional[str] = None,
+) -> dict:
+    cookie_header = _build_cookie_header(cookies)
+    merged_headers = dict(headers)
+    if cookie_header:
+        merged_headers["Cookie"] = cookie_header
+    retryable = {500, 502, 503, 504, 520, 521, 522, 524}
+    retries = _http_retry_count()
+    delay = _http_retry_delay()
+    last_error: Optional[Exception] = None
+    proxy_config = load_runtime_proxy_config()
+    operation_name = operation_name or _payload_operation_name(payload)
+
+    for attempt in range(retries + 1):
+        req = request.Request(url, data=payload, headers=merged_headers, method="POST")
+        try:
+            with open_url(req, config=proxy_config, timeout=60) as resp:
+                status_code = getattr(resp, "status", None) or getattr(resp, "code", None)
+                content_type = resp.headers.get("Content-Type", "")
+                text = _read_response_text(resp)
+                _absorb_response_cookies(cookies, resp.headers)
+            record_proxy_request_result(
+                proxy_config.proxy_id if proxy_config else None,
+                account_id=ACCOUNT_ID,
+                target=url,
+                success=True,
+            )
+        except error.HTTPError as exc:
+            text = _read_response_text(exc)
+            _absorb_response_cookies(cookies, exc.headers)
+            record_proxy_request_result(
+                proxy_config.proxy_id if proxy_config else None,
+                account_id=ACCOUNT_ID,
+                target=url,
+                success=False,
+                error_type=exc.__class__.__name__,
+                error_message=f"HTTP {exc.code}",
+            )
+            if _debug_http_enabled():
+                print(text[:preview])
+            if exc.code in retryable and attempt < retries:
+                time.sleep(delay * (attempt + 1))
+                last_error = exc
+                continue
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError as json_exc:
+                detail = (
+                    f"HTTP error {exc.code}; operation={operation_name}; "
+                    f"url={url}; content_type={exc.headers.get('Content-Type', '') or 'unknown'}"
+                )
+                if not text.strip():
+                    detail += " (empty response)"
+                else:
+                    detail += f"; response_preview={_response_preview(text)}"
+                raise RuntimeError(detail) from json_exc
+        except error.URLError as exc:
+            record_proxy_request_result(
+                proxy_config.proxy_id if proxy_config else None,
+                account_id=ACCOUNT_ID,
+                target=url,
+                success=False,
+                error_type=exc.__class__.__name__,
+                error_message=str(exc.reason),
+            )
+            if attempt < retries:
+                time.sleep(delay * (attempt + 1))
+                last_error = exc
+                continue
+            raise RuntimeError(f"Request failed: {exc.reason}") from exc
+        except ProxySchedulerBusyError:
+            # The request never left the process, so no proxy gets an outcome.
+            raise
+        except Exception as exc:
+            record_proxy_request_result(
+                proxy_config.proxy_id if proxy_config else None,
+                account_id=ACCOUNT_ID,
+                target=url,
+                success=False,
+                error_type=exc.__class__.__name__,
+                error_message=str(exc),
+            )
+            raise
+
+        if _debug_http_enabled():
+            print(text[:preview])
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as exc:
+            if attempt < retries:
+                time.sleep(delay * (attempt + 1))
+                last_error = exc
+                continue
+            detail = (
+                "Response is not valid JSON"
+                f"; operation={operation_name}; url={url}; "
+                f"http_status={status_code or 'unknown'}; "
+                f"content_type={content_type or 'unknown'}"
+            )
+            if not text.strip():
+                detail += "; empty response"
+            else:
+                detail += f"; response_preview={_response_preview(text)}"
+            raise RuntimeError(detail) from exc
+
+    if last_error:
+        raise RuntimeError(
+            f"Request failed after retries: {last_error}"
+        ) from last_error
+    raise RuntimeError("Request failed after retries")
+
+
+def _download_size_catalog(
+    csrftoken: str,
+    cookies: list[dict],
+    catalog_slug: str = DEFAULT_CATALOG_SLUG,
+) -> tuple[list[dict], list[dict], list[dict]]:
+    v5_query = (
+        "query WEB_ProductFormSizeGroup($catalogSlug: String!) {\n"
+        "  catalog(slug: $catalogSlug) {\n"
+        "    id\n"
+        "    sizeGroups {\n"
+        "      id\n"
+        "      name\n"
+        "      sizes {\n"
+        "        id\n"
+        "        name\n"
+        "        primarySizeName\n"
+        "        secondarySizeName\n"
+        "        __typename\n"
+        "      }\n"
+        "      __typename\n"
+        "    }\n"
+        "    __typename\n"
+        "  }\n"
+        "}"
+    )
+    v5_payload = {
+        "operationName": "WEB_ProductFormSizeGroup",
+        "variables": {"catalogSlug": catalog_slug},
+        "query": v5_query,
+    }
+    v5_headers = {
+        **_base_headers(csrftoken),
+        "Accept": "*/*",
+        "Content-Type": "application/json",
+    }
+    v5_data = _request_json(
+        API_V5_URL,
+        json.dumps(v5_payload).encode("utf-8"),
+        v5_headers,
+        cookies,
+    )
+    if v5_data.get("errors"):
+        raise RuntimeError(f"GraphQL errors: {v5_data['errors']}")
+    v5_size_groups = (v5_data.get("data", {}).get("catalog") or {}).get("sizeGroups") or []
+    sizes = flatten_v5_size_groups(v5_size_groups)
+
+    v3_query = (
+        "query WEB_ProductFormSizes($catalogSlug: String!) {\n"
+        "  filterSize(catalogSlug: $catalogSlug) {\n"
+        "    id\n"
+        "    primarySizeName\n"
+        "    secondarySizeName\n"
+        "    __typename\n"
+        "  }\n"
+        "}"
+    )
+    v3_payload = [
+        {
+            "operationName": "WEB_ProductFormSizes",
+            "variables": {"catalogSlug": catalog_slug},
+            "query": v3_query,
+        }
+    ]
+    v3_headers = {
+        **_base_headers(csrftoken),
+        "Accept": "*/*",
+        "Content-Type": "application/json",
+        "batch": "true",
+    }
+    v3_data = _request_json(
+        API_BATCH_URL,
+        json.dumps(v3_payload).encode("utf-8"),
+        v3_headers,
+        cookies,
+    )
+    if isinstance(v3_data, list):
+        v3_data = v3_data[0] if v3_data else {}
+    if v3_data.get("errors"):
+        raise RuntimeError(f"GraphQL errors: {v3_data['errors']}")
+    v3_sizes = v3_data.get("data", {}).get("filterSize") or []
+    return sizes, v3_sizes, v5_size_groups
+
+
+def _store_size_catalog(
+    catalog_slug: str,
+    sizes: list[dict],
+    v3_sizes: list[dict],
+    v5_size_groups: list[dict],
+) -> None:
+    mappings = build_size_mappings(v3_sizes, v5_size_groups)
+    save_sizes(sizes, catalog_slug=catalog_slug, replace_catalog=True)
+    save_size_mappings(mappings, catalog_slug=catalog_slug)
+    if os.getenv("SHAFA_DEBUG_SIZE_MAPPING", "").strip().lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }:
+        log(
+            "INFO",
+            "Нормализованы размеры: "
+            + json.dumps(
+                {
+                    "catalog": catalog_slug,
+                    "v5_size_count": len(sizes),
+                    "v3_size_count": len(v3_sizes),
+                    "mapping_count": len(mappings),
+                    "mapping_preview": mappings[:3],
+                },
+                ensure_ascii=False,
+            ),
+        )
+
+
+def _fetch_sizes(
+    csrftoken: str,
+    cookies: list[dict],
+    catalog_slug: str = DEFAULT_CATALOG_SLUG,
+) -> list[dict]:
+    sizes, v3_sizes, v5_size_groups = _download_size_catalog(
+        csrftoken, cookies, catalog_slug=catalog_slug
+    )
+    _store_size_catalog(catalog_slug, sizes, v3_sizes, v5_size_groups)
+    return sizes
+
+
+def _claim_reference_refresh(scope: str) -> tuple[str, Optional[str]]:
+    if not reference_data_shared():
+        return "acquired", None
+    return claim_reference_data_refresh(
+        scope,
+        _reference_refresh_interval(),
+        _REFERENCE_REFRESH_LEASE_SECONDS,
+    )
+
+
+def _finish_reference_refresh(
+    scope: str,
+    lease_token: Optional[str],
+    *,
+    success: bool,
+) -> None:
+    if lease_token:
+        finish_reference_data_refresh(scope, lease_token, success=success)
+
+
+def _refresh_sizes(
+    csrftoken: str,
+    cookies: list[dict],
+    catalog_slugs: tuple[str, ...] = SIZE_CATALOG_SLUGS,
+) -> int:
+    pending: list[str] = []
+    for catalog_slug in catalog_slugs:
+        slug = str(catalog_slug).strip()
+        if slug and slug not in pending:
+            pending.append(slug)
+    total = 0
+    first_error: Optional[Exception] = None
+    deadline = time.monotonic() + _REFERENCE_REFRESH_LEASE_SECONDS
+    while pending:
+        leases: dict[str, Optional[str]] = {}
+        waiting: list[str] = []
+        for slug in pending:
+            state, lease_token = _claim_reference_refresh(f"sizes:{slug}")
+            if state == "acquired":
+                leases[slug] = lease_token
+            elif state == "in_progress":
+                waiting.append(slug)
+            else:
+                _log_product_detail(f"Размеры для {slug} уже обновлены другим аккаунтом.")
+        if leases:
+            workers = min(_reference_refresh_concurrency(), len(leases))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    slug: executor.submit(
+                        _download_size_catalog, csrftoken, cookies, slug
+                    )
+                    for slug in leases
+                }
+            for slug, future in futures.items():
+                success = False
+                try:
+                    sizes, v3_sizes, v5_size_groups = future.result()
+                    _store_size_catalog(slug, sizes, v3_sizes, v5_size_groups)
+                    success = True
+                except Exception as exc:
+                    if first_error is None:
+                        first_error = exc
+                    continue
+                finally:
+                    _finish_reference_refresh(
+                        f"sizes:{slug}", leases[slug], success=success
+                    )
+                total += len(sizes)
+                _log_product_detail(f"Загружены размеры для {slug}: {len(sizes)}.")
+        pending = waiting
+        if pending:
+            if time.monotonic() >= deadline:
+                _log_product_detail(
+                    "Не дождался обновления размеров другим аккаунтом: "
+                    + ", ".join(pending)
+                )
+                break
+            time.sleep(_REFERENCE_REFRESH_POLL_SECONDS)
+    if first_error is not None:
+        raise first_error
+    return total
+
+
+def _fetch_brands(
+    csrftoken: str,
+    cookies: list[dict],
+    catalog_slug: str = DEFAULT_CATALOG_SLUG,
+) -> list[dict]:
+    resolved_catalog_slug = resolve_brand_catalog_slug(catalog_slug)
+    query = (
+        "query WEB_ProductFormTopBrands($catalogSlug: String) {\n"
+        "  filterTopBrands(catalogSlug: $catalogSlug) {\n"
+        "    topBrands {\n"
+        "      id\n"
+        "      name\n"
+        "      isUkrainian\n"
+        "      __typename\n"
+        "    }\n"
+        "    brands {\n"
+        "      id\n"
+        "      name\n"
+        "      isUkrainian\n"
+        "      __typename\n"
+        "    }\n"
+        "    __typename\n"
+        "  }\n"
+        "}"
+    )
+    payload = [
+        {
+            "operationName": "WEB_ProductFormTopBrands",
+            "variables": {"catalogSlug": resolved_catalog_slug},
+            "query": query,
+        }
+    ]
+    headers = {
+        **_base_headers(csrftoken),
+        "Accept": "*/*",
+        "Content-Type": "application/json",
+        "batch": "true",
+    }
+    data = _request_json(
+        API_BATCH_URL,
+        json.dumps(payload).encode("utf-8"),
+        headers,
+        cookies,
+    )
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    if data.get("errors"):
+        raise RuntimeError(f"GraphQL errors: {data['errors']}")
+    block = data.get("data", {}).get("filterTopBrands") or {}
+    merged: list[dict] = []
+    seen_ids: set[int] = set()
+    for key in ("topBrands", "brands"):
+        for brand in block.get(key) or []:
+            brand_id = brand.get("id")
+            if brand_id is None or brand_id in seen_ids:
+                continue
+            seen_ids.add(brand_id)
+            merged.append(brand)
+    save_brands(merged)
+    return merged
+
+
+def _refresh_brands(
+    csrftoken: str,
+    cookies: list[dict],
+    catalog_slug: str = DEFAULT_CATALOG_SLUG,
+) -> int:
+    resolved_catalog_slug = resolve_brand_catalog_slug(catalog_slug)
+    scope = f"brands:{resolved_catalog_slug or 'all'}"
+    state, lease_token = _claim_reference_refresh(scope)
+    if state != "acquired":
+        _log_product_detail(
+            f"Бренды для {resolved_catalog_slug} уже обновлены другим аккаунтом."
+        )
+        return 0
+    success = False
+    try:
+        brands = _fetch_brands(csrftoken, cookies, catalog_slug=catalog_slug)
+        success = True
+    finally:
+        _finish_reference_refresh(scope, lease_token, success=success)
+    _log_product_detail(f"Загружены бренды для {resolved_catalog_slug}: {len(brands)}.")
+    return len(brands)
+
+
+def _encode_multipart(
+    fields: dict[str, str],
+    files: dict[str, tuple[str, str, bytes]],
+) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body_parts: list[bytes] = []
+
+    def add_part(part: bytes) -> None:
+        body_parts.append(part)
+
+    for name, value in fields.items():
+        add_part(f"--{boundary}".encode())
+        add_part(f'Content-Disposition: form-data; name="{name}"'.encode())
+        add_part(b"")
+        add_part(str(value).encode("utf-8"))
+
+    for name, (filename, content_type, file_bytes) in files.items():
+        add_part(f"--{boundary}".encode())
+        add_part(
+            (
+                f'Content-Disposition: form-data; name="{name}"; filename="{filename}"'
+            ).encode()
+        )
+        add_part(f"Content-Type: {content_type}".encode())
+        add_part(b"")
+        add_part(file_bytes)
+
+    add_part(f"--{boundary}--".encode())
+    add_part(b"")
+
+    return b"\r\n".join(body_parts), boundary
+
+
+def _build_create_product_payload(
+    photo_ids: list[str],
+    product_raw_data: dict,
+    markup: int,
+) -> dict:
+    product = Product(**product_raw_data)
+    variables: dict = {
+        "nameUk": product.name,
+        "descriptionUk": product.description,
+        "isUkToRuTranslationEnabled": product.translation_enabled,
+        "catalog": product.category,
+        "condition": product.condition,
+        "brand": product.brand,
+        "colors": product.colors,
+        "size": product.size,
+        "additionalSizes": product.additional_sizes,
+        "characteristics": product.characteristics,
+        "count": (
+            product.amount
+            if product.amount >= len(product.additional_sizes) + 1
+            else len(product.additional_sizes) + 1
+        ),
+        "sellingCondition": product.selling_condition,
+        "price": product.price + markup,
+        "keyWords": product.keywords,
+        "photosStr": photo_ids,
+    }
+
+    return {
+        "operationName": "CreateProduct",
+        "variables": variables,
+        "query": CREATE_PRODUCT_MUTATION,
+    }
+
+
+def _extract_invalid_color_enums(errors: list[dict]) -> list[str]:
+    if not errors:
+        return []
+    patterns = [
+        re.compile(r"Value '([^']+)' does not exist in 'ColorEnum'"),
+        re.compile(r"got invalid value '([^']+)' at 'colors\\[\\d+\\]'"),
+    ]
+    invalid: list[str] = []
+    seen: set[str] = set()
+    for err in errors:
+        message = str(err.get("message") or "")
+        for pattern in patterns:
+            for match in pattern.findall(message):
+                if match not in seen:
+                    seen.add(match)
+                    invalid.append(match)
+    return invalid
+
+
+def _log_create_product_payload(payload: dict) -> None:
+    if not LOG_CREATE_PRODUCT_REQUEST:
+        return
+    payload_preview = {
+        "api_version": "v3",
+        "operationName": payload.get("operationName"),
+        "variables": payload.get("variables"),
+    }
+    log(
+        "INFO",
+        "Запрос создания товара: "
+        + json.dumps(payload_preview, ensure_ascii=False),
+    )
+
+
+def _log_create_product_response(data: dict) -> None:
+    if not LOG_CREATE_PRODUCT_REQUEST:
+        return
+    preview = {
+        "api_version": "v3",
+        "data": data.get("data"),
+        "errors": data.get("errors"),
+    }
+    log(
+        "INFO",
+        "Ответ создания товара: "
+        + json.dumps(preview, ensure_ascii=False),
+    )
+
+
+def _has_invalid_size_error(errors: list[dict]) -> bool:
+    for err in errors:
+        field = str(err.get("field") or "").strip().casefold()
+        if field == "size":
+            return True
+    return False
+
+
+def upload_photo(csrftoken: str, cookies: list[dict], file_path: Path) -> str:
+    file_tuple = (
+        file_path.name,
+        detect_media_mime_type(file_path),
+        file_path.read_bytes(),
+    )
+    legacy_fields = {
+        "operationName": "UploadPhoto",
+        "query": UPLOAD_PHOTO_MUTATION,
+        "variables": json.dumps({"file": "file"}),
+    }
+    legacy_files = {
+        "file": file_tuple,
+    }
+    spec_fields = {
+        "operations": json.dumps(
+            {
+                "operationName": "UploadPhoto",
+                "query": UPLOAD_PHOTO_MUTATION,
+                "variables": {"file": None},
+            }
+        ),
+        "map": json.dumps({"0": ["variables.file"]}),
+    }
+    spec_files = {"0": file_tuple}
+
+    def request_upload(fields: dict[str, str], files: dict[str, tuple[str, str, bytes]]) -> dict:
+        body, boundary = _encode_multipart(fields, files)
+        headers = {
+            **_base_headers(csrftoken),
+            "Accept": "application/json, text/plain, */*",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        }
+        return _request_json(
+            API_URL,
+            body,
+            headers,
+            cookies,
+            operation_name="UploadPhoto",
+        )
+
+    try:
+        data = request_upload(legacy_fields, legacy_files)
+    except RuntimeError as exc:
+        message = str(exc)
+        if "Response is not valid JSON" not in message and "HTTP error" not in message:
+            raise
+        _log_product_detail(
+            "Legacy UploadPhoto multipart was rejected; retrying GraphQL multipart spec."
+        )
+        data = request_upload(spec_fields, spec_files)
+    if data.get("errors"):
+        raise RuntimeError(f"GraphQL errors: {data['errors']}")
+
+    upload = data.get("data", {}).get("uploadPhoto") or {}
+    if upload.get("errors"):
+        raise RuntimeError(f"Upload errors: {upload['errors']}")
+
+    photo_id = upload.get("idStr")
+    if not photo_id:
+        raise RuntimeError("Upload response missing idStr")
+
+    return photo_id
+
+
+def create_product(
+    csrftoken: str,
+    cookies: list[dict],
+    photo_ids: list[str],
+    product_raw_data: dict,
+    markup: int,
+) -> dict:
+    payload = _build_create_product_payload(photo_ids, product_raw_data, markup)
+    headers = {
+        **_base_headers(csrftoken),
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+    }
+
+    def request(payload_data: dict) -> dict:
+        _log_create_product_payload(payload_data)
+        data = _request_json(
+            API_URL,
+            json.dumps(payload_data).encode("utf-8"),
+            headers,
+            cookies,
+        )
+        _log_create_product_response(data)
+        return data
+
+    data = request(payload)
+    errors = data.get("errors") or []
+    if errors:
+        invalid_colors = _extract_invalid_color_enums(errors)
+        if invalid_colors:
+            colors = list(product_raw_data.get("colors") or [])
+            cleaned = [color for color in colors if color not in invalid_colors]
+            if not cleaned:
+                cleaned = ["WHITE"]
+            if cleaned != colors:
+                retry_raw = dict(product_raw_data)
+                retry_raw["colors"] = cleaned
+                retry_payload = _build_create_product_payload(
+                    photo_ids, retry_raw, markup
+                )
+                data = request(retry_payload)
+                errors = data.get("errors") or []
+        if errors:
+            raise RuntimeError(f"GraphQL errors: {errors}")
+
+    return data.get("data", {}).get("createProduct") or {}
+
+
+def main() -> None:
+    enter_product_pipeline()
+    try:
+        _main_impl()
+    finally:
+        exit_product_pipeline()
+
+
+def _main_impl() -> None:
+    init_db()
+    _markup = 0
+
+    product_data = get_next_product_for_upload(
+        message_amount=DEFAULT_MESSAGE_PARSE_LIMIT,
+        first_fetch_check=should_run_first_fetch(),
+        scan_before_pick=False,
+    )
+    if not product_data:
+        _log_product_detail("Нет новых товаров для создания.")
+        return
+    channel_id = product_data.get("channel_id")
+    product_raw_data = product_data["product_raw_data"]
+    parsed_data = product_data.get("parsed_data") or {}
+    message_id = product_data["message_id"]
+    started_at = time.monotonic()
+    photo_message_ids = get_product_photo_message_ids(product_data)
+    product_name = product_raw_data.get("name") or parsed_data.get("name") or "—"
+    log("INFO", f"Готовлю товар: «{product_name}».")
+
+    cookies = _load_shafa_cookies()
+    if not cookies:
+        log("ERROR", "Нет сохранённых cookies. Сначала залогинься через main.py.")
+        return
+    csrftoken = _get_csrftoken_from_cookies(cookies)
+    if not csrftoken:
+        raise RuntimeError("Не нашёл csrftoken в cookies")
+
+    catalog_slug = str(product_raw_data.get("category") or "").strip()
+    if catalog_slug:
+        _log_product_detail(f"Каталог из данных товара: {catalog_slug}.")
+    if not catalog_slug:
+        catalog_slug = DEFAULT_CATALOG_SLUG
+    if product_raw_data.get("size") is None:
+        log("WARN", "Размер не определён. Обновляю список размеров...")
+        try:
+            _refresh_sizes(csrftoken, cookies)
+        except Exception as exc:
+            handle_retryable_product_failure(
+                message_id=message_id,
+                channel_id=channel_id,
+                failure_reason="SIZE_REFRESH_FAILED",
+                detail_message=f"Не удалось обновить размеры: {exc}",
+            )
+            return
+        if parsed_data or product_data.get("raw_message"):
+            parsed_data, product_raw_data = rebuild_product_data_from_source(product_data)
+        if product_raw_data.get("size") is None:
+            handle_retryable_product_failure(
+                message_id=message_id,
+                channel_id=channel_id,
+                failure_reason="SIZE_NOT_RESOLVED",
+                detail_message=(
+                    "Не удалось определить размер. Запусти Bootstrap sizes/brands."
+                ),
+            )
+            return
+    price_value = product_raw_data.get("price")
+    if price_value is None or price_value <= 0:
+        handle_retryable_product_failure(
+            message_id=message_id,
+            channel_id=channel_id,
+            failure_reason="INVALID_PRICE",
+            detail_message=(
+                f"Некорректная цена: {price_value}. \n"
+                + f"Parsed price: {parsed_data.get('price')!r}."
+            ),
+        )
+        return
+    if catalog_slug in SLUG_TO_WORDS:
+        _markup = get_price_markup(DEFAULT_CLOTHES_MARKUP)
+    else:
+        _markup = get_price_markup(DEFAULT_MARKUP)
+    markup = _markup + price_value
+    _log_product_detail(f"Цена товара (с наценкой {_markup}): {markup}.")
+
+    try:
+        media_dir = Path(MEDIA_DIR_PATH)
+        reset_media_dir(media_dir)
+        downloaded = download_product_photos(
+            message_id,
+            media_dir,
+            channel_id=channel_id,
+            message_ids=photo_message_ids,
+        )
+        if downloaded == 0:
+            log("WARN", f"Не нашёл фото для message_id={message_id} в Telegram.")
+            handle_retryable_product_failure(
+                message_id=message_id,
+                channel_id=channel_id,
+                failure_reason="NO_TELEGRAM_PHOTOS",
+                detail_message="Не удалось скачать ни одной фотографии из Telegram.",
+                detail_level="WARN",
+            )
+            return
+        else:
+            _log_product_detail(f"Скачано фото: {downloaded}.")
+
+        photo_ids: list[str] = []
+        photo_paths = list_media_files(media_dir)
+        if not photo_paths:
+            log("WARN", "Файлы для загрузки не найдены.")
+        max_mb = MAX_UPLOAD_BYTES / (1024 * 1024)
+        downloaded_total_mb = total_media_size_bytes(photo_paths) / (1024 * 1024)
+        if photo_paths:
+            _log_product_detail(
+                f"Общий размер фото после скачивания из Telegram: "
+                f"{downloaded_total_mb:.2f} MB.",
+            )
+        _log_product_detail("Начинаю подготовку фото для загрузки.")
+        prepared_batch = prepare_media_batch_for_upload(photo_paths, MAX_UPLOAD_BYTES)
+        _log_product_detail("Подготовка фото для загрузки завершена.")
+        upload_items = prepared_batch.items
+        total_mb = prepared_batch.total_size_bytes / (1024 * 1024)
+        for note in prepared_batch.notes:
+            _log_product_detail(note)
+    except Exception as exc:
+        handle_retryable_product_failure(
+            message_id=message_id,
+            channel_id=channel_id,
+            failure_reason=(
+                f"PRODUCT_PIPELINE_EXCEPTION: {summarize_exception(exc)}"
+            ),
+            detail_message=f"Не удалось обработать товар: {exc}",
+        )
+        return
+
+    if photo_paths and not upload_items:
+        log("WARN", "Нет фото для загрузки после фильтрации размера.")
+    elif upload_items:
+        _log_product_detail(
+            f"Общий размер подготовленных фото: {total_mb:.2f} MB / {max_mb:.2f} MB.",
+        )
+    if upload_items and not prepared_batch.within_budget:
+        log(
+            "WARN",
+            f"После подготовки фото занимают {total_mb:.2f} MB, "
+            + f"что больше лимита {max_mb:.2f} MB.",
+        )
+    if not upload_items:
+        handle_retryable_product_failure(
+            message_id=message_id,
+            channel_id=channel_id,
+            failure_reason="NO_UPLOADABLE_PHOTOS",
+            detail_message="Не удалось подготовить ни одной фотографии для загрузки.",
+            detail_level="WARN",
+        )
+        return
+    if not prepared_batch.within_budget:
+        handle_retryable_product_failure(
+            message_id=message_id,
+            channel_id=channel_id,
+            failure_reason="NO_UPLOADABLE_PHOTOS",
+            detail_message="Не удалось подготовить ни одной фотографии для загрузки.",
+            detail_level="WARN",
+        )
+        return
+    try:
+        verbose_photo_logs = verbose_photo_logs_enabled()
+        with ProgressBar(
+            total=len(upload_items),
+            label="Загрузка фото",
+            enabled=not verbose_photo_logs,
+        ) as progress:
+            for idx, upload_item in enumerate(upload_items, start=1):
+                upload_path = upload_item.upload_path
+                if upload_path is None:
+                    continue
+                if verbose_photo_logs:
+                    log(
+                        "INFO",
+                        f"Загрузка фото {idx}/{len(upload_items)}: "
+                        f"{upload_item.source_path.name}",
+                    )
+                photo_id = upload_photo(csrftoken, cookies, upload_path)
+                photo_ids.append(photo_id)
+                if verbose_photo_logs:
+                    log("OK", f"Фото загружено: id={photo_id}")
+                if not verbose_photo_logs:
+                    progress.advance()
+
+        if not photo_ids:
+            handle_retryable_product_failure(
+                message_id=message_id,
+                channel_id=channel_id,
+                failure_reason="NO_UPLOADED_PHOTOS",
+                detail_message=(
+                    "Фото не были загружены в Shafa; "
+                    "создание товара без фото отменено."
+                ),
+                detail_level="WARN",
+            )
+            return
+
+        _log_product_detail("Создаю товар...")
+        result = create_product(
+            csrftoken, cookies, photo_ids, product_raw_data, markup=_markup
+        )
+        errors = result.get("errors") or []
+        if errors and _has_invalid_size_error(errors) and parsed_data:
+            catalog_slug = str(product_raw_data.get("category") or "").strip()
+            if not catalog_slug:
+                catalog_slug = DEFAULT_CATALOG_SLUG
+            log(
+                "WARN",
+                "API отклонил размер. Обновляю размеры и повторяю создание товара...",
+            )
+            emit_event(
+                "product_retry",
+                message_id=message_id,
+                channel_id=channel_id,
+                reason="INVALID_SIZE",
+            )
+            try:
+                _refresh_sizes(csrftoken, cookies, catalog_slugs=(catalog_slug,))
+            except Exception as exc:
+                handle_retryable_product_failure(
+                    message_id=message_id,
+                    channel_id=channel_id,
+                    failure_reason="SIZE_REFRESH_FAILED",
+                    detail_message=f"Не удалось обновить размеры: {exc}",
+                )
+                return
+            product_raw_data = build_product_raw_data(parsed_data)
+            if product_raw_data.get("size") is None:
+                handle_retryable_product_failure(
+                    message_id=message_id,
+                    channel_id=channel_id,
+                    failure_reason="SIZE_NOT_RESOLVED",
+                    detail_message=(
+                        "Не удалось определить размер после обновления размеров."
+                    ),
+                )
+                return
+            result = create_product(
+                csrftoken, cookies, photo_ids, product_raw_data, markup=_markup
+            )
+            errors = result.get("errors") or []
+        if errors:
+            handle_retryable_product_failure(
+                message_id=message_id,
+                channel_id=channel_id,
+                failure_reason=(
+                    f"CREATE_PRODUCT_ERRORS: {summarize_graph_errors(errors)}"
+                ),
+                detail_message=f"Ошибки создания товара: {errors}",
+            )
+            return
+        created_product = result.get("createdProduct") or {}
+        save_uploaded_product(
+            product_id=created_product.get("id"),
+            product_raw_data=product_raw_data,
+            photo_ids=photo_ids,
+            channel_id=channel_id,
+            message_id=message_id,
+        )
+        mark_product_created(
+            message_id,
+            created_product.get("id"),
+            channel_id=channel_id,
+        )
+        product_id = created_product.get("id")
+        product_name = (
+            product_raw_data.get("name") or created_product.get("name") or "—"
+        )
+        log(
+            "OK",
+            "Товар создан успешно. "
+            f"Имя товара: {product_name}. ID: {product_id}. Фото: {len(photo_ids)}.",
+        )
+        emit_event(
+            "product_created",
+            message_id=message_id,
+            channel_id=channel_id,
+            product_id=product_id,
+            photos=len(photo_ids),
+            duration_ms=round((time.monotonic() - started_at) * 1000),
+        )
+        reset_media_dir(media_dir)
+        _log_product_detail("Фото удалены после создания товара.")
+    except Exception as exc:
+        handle_retryable_product_failure(
+            message_id=message_id,
+            channel_id=channel_id,
+            failure_reason=(
+                f"PRODUCT_PIPELINE_EXCEPTION: {summarize_exception(exc)}"
+            ),
+            detail_message=f"Не удалось обработать товар: {exc}",
+        )
+    finally:
+        cleanup_prepared_media_uploads(upload_items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+from typing import Optional
+
+from controller.data_controller import mark_product_created, register_product_failure
+from data.const import MAX_PRODUCT_CREATE_ATTEMPTS
+from utils.events import emit_event
+from utils.logging import log
+
+
+def summarize_graph_errors(errors: list[dict]) -> str:
+    parts: list[str] = []
+    for err in errors:
+        field = str(err.get("field") or "").strip() or "unknown"
+        top_level_message = str(err.get("message") or "").strip()
+        messages = err.get("messages") or []
+        codes = [
+            str(message.get("code") or "").strip()
+            for message in messages
+            if str(message.get("code") or "").strip()
+        ]
+        texts = [
+            str(message.get("message") or "").strip()
+            for message in messages
+            if str(message.get("message") or "").strip()
+        ]
+        details: list[str] = []
+        if codes:
+            details.append(",".join(dict.fromkeys(codes)))
+        if texts:
+            details.append(" | ".join(dict.fromkeys(texts)))
+        if details:
+            parts.append(f"{field}: {'; '.join(details)}")
+        elif top_level_message:
+            parts.append(top_level_message)
+        else:
+            parts.append(field)
+    summary = " / ".join(parts)
+    return summary[:500] if summary else "unknown"
+
+
+def summarize_exception(exc: Exception) -> str:
+    text = " ".join(str(exc).split())
+    if text:
+        return text[:500]
+    return exc.__class__.__name__
+
+
+def handle_retryable_product_failure(
+    *,
+    message_id: int,
+    channel_id: Optional[int],
+    failure_reason: str,
+    detail_message: str,
+    detail_level: str = "ERROR",
+) -> tuple[int, bool]:
+    log(detail_level, detail_message)
+    attempts, skipped = register_product_failure(
+        message_id,
+        failure_reason=failure_reason,
+        channel_id=channel_id,
+    )
+    emit_event(
+        "product_failed",
+        message_id=message_id,
+        channel_id=channel_id,
+        reason=failure_reason,
+        message=detail_message,
+        level=detail_level,
+        retryable=True,
+        attempts=attempts,
+        skipped=skipped,
+    )
+    if skipped:
+        log(
+            "WARN",
+            "Пропускаю товар после лимита попыток. "
+            f"message_id={message_id}. Попыток: {attempts}. Причина: {failure_reason}.",
+        )
+        return attempts, True
+    retries_left = max(0, MAX_PRODUCT_CREATE_ATTEMPTS - attempts)
+    emit_event(
+        "product_retry",
+        message_id=message_id,
+        channel_id=channel_id,
+        reason=failure_reason,
+        retries_left=retries_left,
+    )
+    log(
+        "WARN",
+        "Повторю этот товар позже. "
+        f"message_id={message_id}. Осталось ретраев: {retries_left}. "
+        f"Причина: {failure_reason}.",
+    )
+    return attempts, False
+
+
+def handle_non_retryable_product_failure(
+    *,
+    message_id: int,
+    channel_id: Optional[int],
+    failure_reason: str,
+    detail_message: str,
+    detail_level: str = "WARN",
+    created_product_id: Optional[str] = None,
+) -> None:
+    log(detail_level, detail_message)
+    emit_event(
+        "product_failed",
+        message_id=message_id,
+        channel_id=channel_id,
+        reason=failure_reason,
+        message=detail_message,
+        level=detail_level,
+        retryable=False,
+    )
+    mark_product_created(
+        message_id,
+        created_product_id=created_product_id or f"SKIPPED_{failure_reason}",
+        channel_id=channel_id,
+    )
+    log(
+        "WARN",
+        "Пропускаю товар без ретраев. "
+        f"message_id={message_id}. Причина: {failure_reason}.",
+    )
@@ -0,0 +1,2 @@
+def deactivate_product(product_id: str) -> None:
+    return None
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+try:
+    from playwright.sync_api import BrowserContext
+except ModuleNotFoundError:  # pragma: no cover - optional at import time for tests
+    BrowserContext = object
+
+from core.core import base_headers, read_response_json
+from data.const import API_URL, UPLOAD_PHOTO_MUTATION
+from utils.media import detect_media_mime_type
+
+
+def upload_photo(ctx: BrowserContext, csrftoken: str, file_path: Path) -> str:
+    file_bytes = file_path.read_bytes()
+    resp = ctx.request.post(
+        API_URL,
+        headers={
+            **base_headers(csrftoken),
+            "Accept": "application/json, text/plain, */*",
+        },
+        multipart={
+            "operationName": "UploadPhoto",
+            "query": UPLOAD_PHOTO_MUTATION,
+            "variables": json.dumps({"file": "file"}),
+            "file": {
+                "name": file_path.name,
+                "mimeType": detect_media_mime_type(file_path),
+                "buffer": file_bytes,
+            },
+        },
+    )
+
+    data = read_response_json(resp)
+    if data.get("errors"):
+        raise RuntimeError(f"GraphQL errors: {data['errors']}")
+
+    upload = data.get("data", {}).get("uploadPhoto") or {}
+    if upload.get("errors"):
+        raise RuntimeError(f"Upload errors: {upload['errors']}")
+
+    photo_id = upload.get("idStr")
+    if not photo_id:
+        raise RuntimeError("Upload response missing idStr")
+
+    return photo_id
@@ -0,0 +1,27 @@
+from telegram_subscription.telegram_channels import (
+    DEFAULT_CHANNEL_ALIAS,
+    TelegramIdBotClient,
+    TelegramLinkRuntimeConfig,
+    export_runtime_config,
+    extract_telegram_invite_hash,
+    load_runtime_config,
+    normalize_channel_link,
+    parse_id_bot_response,
+    resolve_channel_tuples,
+    resolve_runtime_config,
+    sanitize_channel_links,
+)
+
+__all__ = [
+    "DEFAULT_CHANNEL_ALIAS",
+    "TelegramIdBotClient",
+    "TelegramLinkRuntimeConfig",
+    "export_runtime_config",
+    "extract_telegram_invite_hash",
+    "load_runtime_config",
+    "normalize_channel_link",
+    "parse_id_bot_response",
+    "resolve_channel_tuples",
+    "resolve_runtime_config",
+    "sanitize_channel_links",
+]
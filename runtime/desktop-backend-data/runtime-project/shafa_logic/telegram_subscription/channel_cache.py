@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from .telegram_channels import extract_telegram_invite_hash, normalize_channel_link
+
+CHANNEL_CACHE_TTL_ENV = "SHAFA_TELEGRAM_CHANNEL_CACHE_TTL_SECONDS"
+CHANNEL_RESOLVE_CONCURRENCY_ENV = "SHAFA_TELEGRAM_CHANNEL_RESOLVE_CONCURRENCY"
+DEFAULT_CHANNEL_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_CHANNEL_RESOLVE_CONCURRENCY = 8
+# A FloodWait longer than this is not slept through; the link fails instead.
+MAX_FLOOD_WAIT_SECONDS = 60.0
+_SQLITE_TIMEOUT_SECONDS = 30.0
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CachedChannel:
+    link: str
+    channel_id: int
+    title: str
+    metadata: dict[str, object] = field(default_factory=dict)
+
+
+def channel_link_key(link: str) -> str:
+    try:
+        return normalize_channel_link(link).casefold()
+    except ValueError:
+        return str(link or "").strip().casefold()
+
+
+def channel_link_metadata(link: str, *, resolver: str) -> dict[str, object]:
+    """Describe how a link was resolved; never includes access hashes."""
+    return {"resolver": resolver, "invite": bool(extract_telegram_invite_hash(link))}
+
+
+def channel_cache_ttl_seconds() -> float:
+    raw = os.getenv(CHANNEL_CACHE_TTL_ENV, "").strip()
+    try:
+        return max(float(raw), 0.0) if raw else DEFAULT_CHANNEL_CACHE_TTL_SECONDS
+    except ValueError:
+        return DEFAULT_CHANNEL_CACHE_TTL_SECONDS
+
+
+def channel_resolve_concurrency() -> int:
+    raw = os.getenv(CHANNEL_RESOLVE_CONCURRENCY_ENV, "").strip()
+    try:
+        value = int(raw) if raw else DEFAULT_CHANNEL_RESOLVE_CONCURRENCY
+    except ValueError:
+        value = DEFAULT_CHANNEL_RESOLVE_CONCURRENCY
+    return min(max(value, 1), 32)
+
+
+class ChannelResolutionCache:
+    """Resolved channel links shared by the API and every account process.
+
+    Rows live in ``telegram_channel_resolutions`` keyed by the normalized
+    link. Entries older than the TTL are treated as misses. The cache is
+    best effort: SQLite errors read as misses and skip writes.
+    """
+
+    def __init__(self, db_path: Path, *, ttl_seconds: float | None = None) -> None:
+        self.db_path = Path(db_path)
+        self.ttl_seconds = (
+            channel_cache_ttl_seconds() if ttl_seconds is None else ttl_seconds
+        )
+        self._schema_ready = False
+
+    def get_many(self, links: Iterable[str]) -> dict[str, CachedChannel]:
+        """Return fresh entries keyed by the links they were requested with."""
+        links_by_key: dict[str, list[str]] = {}
+        for link in links:
+            links_by_key.setdefault(channel_link_key(link), []).append(link)
+        if not links_by_key or self.ttl_seconds <= 0:
+            return {}
+        keys = list(links_by_key)
+        cutoff = time.time() - self.ttl_seconds
+        rows: list[tuple] = []
+        try:
+            with self._connect() as conn:
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start : start + 500]
+                    rows.extend(
+                        conn.execute(
+                            f"""
+                            SELECT link_key, channel_id, title, metadata
+                            FROM telegram_channel_resolutions
+                            WHERE link_key IN ({", ".join("?" for _ in chunk)})
+                              AND resolved_at >= ?
+                            """,
+                            (*chunk, cutoff),
+                        ).fetchall()
+                    )
+        except sqlite3.Error:
+            return {}
+        result: dict[str, CachedChannel] = {}
+        for link_key, channel_id, title, metadata in rows:
+            for link in links_by_key.get(link_key, []):
+                result[link] = CachedChannel(
+                    link=link,
+                    channel_id=int(channel_id),
+                    title=str(title),
+                    metadata=_load_metadata(metadata),
+                )
+        return result
+
+    def put_many(self, channels: Iterable[CachedChannel]) -> None:
+        resolved_at = time.time()
+        rows = [
+            (
+                channel_link_key(channel.link),
+                channel.link,
+                int(channel.channel_id),
+                channel.title,
+                json.dumps(channel.metadata, ensure_ascii=False, default=str),
+                resolved_at,
+            )
+            for channel in channels
+        ]
+        if not rows:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO telegram_channel_resolutions
+                        (link_key, link, channel_id, title, metadata, resolved_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(link_key) DO UPDATE SET
+                        link = excluded.link,
+                        channel_id = excluded.channel_id,
+                        title = excluded.title,
+                        metadata = excluded.metadata,
+                        resolved_at = excluded.resolved_at
+                    """,
+                    rows,
+                )
+        except sqlite3.Error:
+            return
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=_SQLITE_TIMEOUT_SECONDS)
+        conn.execute(f"PRAGMA busy_timeout = {int(_SQLITE_TIMEOUT_SECONDS * 1000)}")
+        if not self._schema_ready:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS telegram_channel_resolutions (
+                    link_key TEXT PRIMARY KEY,
+                    link TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    metadata TEXT NOT NULL DEFAULT '{}',
+                    resolved_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+
+def _load_metadata(raw: object) -> dict[str, object]:
+    try:
+        value = json.loads(str(raw or "{}"))
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def flood_wait_seconds(exc: BaseException) -> float | None:
+    """Return the wait a Telegram FloodWait error asks for, else ``None``."""
+    if "FloodWait" not in exc.__class__.__name__:
+        return None
+    try:
+        return max(float(getattr(exc, "seconds", 0) or 0), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class FloodWaitLimiter:
+    """Bounded concurrency for Telegram calls that backs off on FloodWait.
+
+    When any call hits a FloodWait, every call started through the limiter
+    waits until it passes, and the call that hit it is retried once the
+    wait is over. Waits longer than ``max_wait_seconds`` are re-raised.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        *,
+        max_wait_seconds: float = MAX_FLOOD_WAIT_SECONDS,
+        max_retries: int = 2,
+    ) -> None:
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.max_wait_seconds = max_wait_seconds
+        self.max_retries = max(int(max_retries), 0)
+        self._semaphore: asyncio.Semaphore | None = None
+        self._resume_at = 0.0
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                delay = self._resume_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    return await func()
+                except Exception as exc:
+                    wait = flood_wait_seconds(exc)
+                    if (
+                        wait is None
+                        or wait > self.max_wait_seconds
+                        or attempt >= self.max_retries
+                    ):
+                        raise
+                    self._resume_at = max(self._resume_at, time.monotonic() + wait)
+            attempt += 1
+
+
+async def resolve_links_cached(
+    links: list[str],
+    resolve: Callable[[str], Awaitable[CachedChannel | None]],
+    *,
+    cache: ChannelResolutionCache | None = None,
+    limiter: FloodWaitLimiter | None = None,
+) -> list[CachedChannel | BaseException | None]:
+    """Resolve ``links`` in order, serving hits from ``cache``.
+
+    Misses are resolved concurrently through ``limiter`` and written back
+    to the cache. Each result is the resolved channel, ``None`` when
+    ``resolve`` found nothing, or the exception it raised.
+    """
+    hits = cache.get_many(links) if cache is not None else {}
+    misses = [link for link in links if link not in hits]
+    if limiter is None:
+        limiter = FloodWaitLimiter(channel_resolve_concurrency())
+    results = await asyncio.gather(
+        *(limiter.run(lambda link=link: resolve(link)) for link in misses),
+        return_exceptions=True,
+    )
+    fresh = [result for result in results if isinstance(result, CachedChannel)]
+    if cache is not None and fresh:
+        cache.put_many(fresh)
+    resolved: dict[str, CachedChannel | BaseException | None] = dict(hits)
+    resolved.update(zip(misses, results))
+    return [resolved[link] for link in links]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+from .events import emit_event
+
+_COLORS = {
+    "DEBUG": "\033[90m",
+    "INFO": "\033[34m",
+    "WARN": "\033[33m",
+    "ERROR": "\033[31m",
+    "OK": "\033[32m",
+}
+_RESET = "\033[0m"
+
+
+def supports_color() -> bool:
+    return sys.stdout.isatty() and os.getenv("NO_COLOR") is None
+
+
+def format_tag(level: str) -> str:
+    tag = f"[{level}]"
+    if supports_color() and level in _COLORS:
+        return f"{_COLORS[level]}{tag}{_RESET}"
+    return tag
+
+
+def log(level: str, message: str) -> None:
+    print(f"{format_tag(level)} {message}", flush=True)
+    if level == "ERROR":
+        emit_event("error", message=message)
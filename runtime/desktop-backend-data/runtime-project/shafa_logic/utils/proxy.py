@@ -0,0 +1,796 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Mapping
+from urllib import request as urllib_request
+from urllib.parse import quote
+
+PROXY_DB_ENV = "SHAFA_PROXY_DB_PATH"
+PROXY_CONFIG_ENV = "SHAFA_PROXY_CONFIG_PATH"
+PROXY_STATUS_UNKNOWN = "unknown"
+PROXY_STATUS_HEALTHY = "healthy"
+PROXY_STATUS_DEGRADED = "degraded"
+PROXY_STATUS_FAILING = "failing"
+PROXY_STATUS_DISABLED = "disabled"
+SUPPORTED_PROXY_SCHEMES = ("http", "https", "socks5")
+HTTP_PROXY_SCHEMES = ("http", "https")
+TELEGRAM_PROXY_SCHEMES = ("http", "socks5")
+DEFAULT_PROXY_MAX_ACCOUNTS = 3
+PROXY_EVENT_FLUSH_SIZE_ENV = "SHAFA_PROXY_EVENT_FLUSH_SIZE"
+PROXY_EVENT_FLUSH_SECONDS_ENV = "SHAFA_PROXY_EVENT_FLUSH_SECONDS"
+DEFAULT_PROXY_EVENT_FLUSH_SIZE = 50
+DEFAULT_PROXY_EVENT_FLUSH_SECONDS = 2.0
+_MAX_BUFFERED_PROXY_EVENTS = 10_000
+PROXY_EWMA_ALPHA = 0.2
+# Events with this target come from the health prober, not from account
+# traffic; they are counted apart from ``total_requests``.
+PROXY_PROBE_TARGET = "proxy_probe"
+_URLOPENER_CACHE: dict[str, urllib_request.OpenerDirector] = {}
+_URLOPENER_LOCK = threading.RLock()
+_PROXY_SCHEMA_READY_PATHS: set[Path] = set()
+_PROXY_SCHEMA_LOCK = threading.Lock()
+_PROXY_RECORDERS: dict[Path, "ProxyEventRecorder"] = {}
+_PROXY_RECORDERS_LOCK = threading.Lock()
+_PROXY_ROUTING_NOTES = threading.local()
+
+
+def _utc_now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def normalize_proxy_scheme(value: object) -> str:
+    normalized = str(value or "").strip().lower()
+    if normalized not in SUPPORTED_PROXY_SCHEMES:
+        raise ValueError(f"Unsupported proxy scheme: {value}")
+    return normalized
+
+
+def normalize_proxy_identifier(value: object) -> str | None:
+    normalized = str(value or "").strip()
+    return normalized or None
+
+
+@dataclass(frozen=True)
+class RuntimeProxyConfig:
+    proxy_id: str
+    name: str
+    scheme: str
+    host: str
+    port: int
+    username: str = ""
+    password: str = ""
+    enabled: bool = True
+    max_accounts: int = DEFAULT_PROXY_MAX_ACCOUNTS
+    pool: str = ""
+
+    @classmethod
+    def from_payload(cls, payload: Mapping[str, Any]) -> "RuntimeProxyConfig":
+        host = str(payload.get("host") or "").strip()
+        if not host:
+            raise ValueError("Proxy host is required")
+        port = int(payload.get("port") or 0)
+        if port <= 0 or port > 65535:
+            raise ValueError("Proxy port must be between 1 and 65535")
+        return cls(
+            proxy_id=str(payload.get("id") or payload.get("proxy_id") or "").strip(),
+            name=str(payload.get("name") or "").strip(),
+            scheme=normalize_proxy_scheme(payload.get("scheme")),
+            host=host,
+            port=port,
+            username=str(payload.get("username") or "").strip(),
+            password=str(payload.get("password") or ""),
+            enabled=bool(payload.get("enabled", True)),
+            max_accounts=max(
+                1,
+                int(payload.get("max_accounts") or DEFAULT_PROXY_MAX_ACCOUNTS),
+            ),
+            pool=str(payload.get("pool") or "").strip(),
+        )
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "id": self.proxy_id,
+            "name": self.name,
+            "scheme": self.scheme,
+            "host": self.host,
+            "port": self.port,
+            "username": self.username,
+            "password": self.password,
+            "enabled": self.enabled,
+            "max_accounts": self.max_accounts,
+            "pool": self.pool,
+        }
+
+    def cache_key(self) -> str:
+        return "|".join(
+            [
+                self.scheme,
+                self.host,
+                str(self.port),
+                self.username,
+                self.password,
+            ]
+        )
+
+    def proxy_server_url(self) -> str:
+        return f"{self.scheme}://{self.host}:{self.port}"
+
+    def proxy_url(self) -> str:
+        if not self.username:
+            return self.proxy_server_url()
+        username = quote(self.username, safe="")
+        password = quote(self.password, safe="")
+        return f"{self.scheme}://{username}:{password}@{self.host}:{self.port}"
+
+
+def proxy_db_path_from_env(default: Path | None = None) -> Path | None:
+    raw = os.getenv(PROXY_DB_ENV, "").strip()
+    if raw:
+        return Path(raw)
+    return default
+
+
+def proxy_config_path_from_env(default: Path | None = None) -> Path | None:
+    raw = os.getenv(PROXY_CONFIG_ENV, "").strip()
+    if raw:
+        return Path(raw)
+    return default
+
+
+def load_runtime_proxy_config(path: Path | None = None) -> RuntimeProxyConfig | None:
+    resolved_path = path or proxy_config_path_from_env()
+    if resolved_path is None or not resolved_path.exists():
+        return None
+    try:
+        payload = json.loads(resolved_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    try:
+        return RuntimeProxyConfig.from_payload(payload)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_runtime_proxy_config(path: Path, payload: Mapping[str, Any]) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(dict(payload), ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    return path
+
+
+def delete_runtime_proxy_config(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+def build_playwright_proxy_settings(
+    config: RuntimeProxyConfig | None,
+) -> dict[str, str] | None:
+    if config is None:
+        return None
+    if not config.enabled:
+        raise RuntimeError(f"Proxy '{config.name or config.proxy_id}' is disabled.")
+    settings = {"server": config.proxy_server_url()}
+    if config.username:
+        settings["username"] = config.username
+        settings["password"] = config.password
+    return settings
+
+
+def build_telethon_proxy_settings(
+    config: RuntimeProxyConfig | None,
+) -> dict[str, object] | None:
+    if config is None:
+        return None
+    if not config.enabled:
+        raise RuntimeError(f"Proxy '{config.name or config.proxy_id}' is disabled.")
+    if config.scheme not in TELEGRAM_PROXY_SCHEMES:
+        raise RuntimeError(
+            "Telegram connections support only HTTP or SOCKS5 proxies. "
+            f"Configured scheme: {config.scheme}.",
+        )
+    if config.scheme == "socks5":
+        try:
+            import socks  # type: ignore[import-not-found]  # noqa: F401
+        except ModuleNotFoundError as exc:
+            raise RuntimeError(
+                "SOCKS5 proxy support requires the 'PySocks' package. "
+                "Reinstall runtime dependencies and try again."
+            ) from exc
+    return {
+        "proxy_type": config.scheme,
+        "addr": config.host,
+        "port": config.port,
+        "username": config.username or None,
+        "password": config.password or None,
+    }
+
+
+def _build_urllib_proxy_map(config: RuntimeProxyConfig) -> dict[str, str]:
+    if config.scheme not in HTTP_PROXY_SCHEMES:
+        raise RuntimeError(
+            "HTTP requests support only HTTP or HTTPS proxies. "
+            f"Configured scheme: {config.scheme}.",
+        )
+    proxy_url = config.proxy_url()
+    return {
+        "http": proxy_url,
+        "https": proxy_url,
+    }
+
+
+def get_urllib_opener(
+    config: RuntimeProxyConfig | None,
+) -> urllib_request.OpenerDirector | None:
+    if config is None:
+        return None
+    if not config.enabled:
+        raise RuntimeError(f"Proxy '{config.name or config.proxy_id}' is disabled.")
+    cache_key = config.cache_key()
+    with _URLOPENER_LOCK:
+        opener = _URLOPENER_CACHE.get(cache_key)
+        if opener is not None:
+            return opener
+        opener = urllib_request.build_opener(
+            urllib_request.ProxyHandler(_build_urllib_proxy_map(config))
+        )
+        _URLOPENER_CACHE[cache_key] = opener
+        return opener
+
+
+def _open_url_direct(
+    http_request: urllib_request.Request,
+    *,
+    config: RuntimeProxyConfig | None,
+    timeout: float,
+):
+    opener = get_urllib_opener(config)
+    if opener is None:
+        return urllib_request.urlopen(http_request, timeout=timeout)
+    return opener.open(http_request, timeout=timeout)
+
+
+def open_url(
+    http_request: urllib_request.Request,
+    *,
+    config: RuntimeProxyConfig | None,
+    timeout: float,
+):
+    if config is not None:
+        from .proxy_scheduler import get_proxy_scheduler
+
+        scheduler = get_proxy_scheduler()
+        if scheduler is not None:
+            return scheduler.open_url(
+                http_request,
+                config=config,
+                timeout=timeout,
+                opener=_open_url_direct,
+            )
+    return _open_url_direct(http_request, config=config, timeout=timeout)
+
+
+def ensure_proxy_database_schema(db_path: Path) -> None:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS proxies (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                scheme TEXT NOT NULL,
+                host TEXT NOT NULL,
+                port INTEGER NOT NULL,
+                username TEXT,
+                password TEXT,
+                max_accounts INTEGER NOT NULL DEFAULT 3,
+                enabled INTEGER NOT NULL DEFAULT 1,
+                notes TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'unknown',
+                last_used_at TEXT,
+                last_success_at TEXT,
+                last_failure_at TEXT,
+                consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                total_requests INTEGER NOT NULL DEFAULT 0,
+                total_failures INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS proxy_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                proxy_id TEXT NOT NULL,
+                account_id TEXT,
+                target TEXT,
+                success INTEGER NOT NULL DEFAULT 0,
+                error_type TEXT,
+                error_message TEXT,
+                occurred_at TEXT NOT NULL,
+                FOREIGN KEY(proxy_id) REFERENCES proxies(id) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_proxy_events_proxy_time
+                ON proxy_events(proxy_id, occurred_at DESC);
+            CREATE TABLE IF NOT EXISTS proxy_event_rollups (
+                proxy_id TEXT NOT NULL,
+                target TEXT NOT NULL DEFAULT '',
+                bucket_size TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (proxy_id, target, bucket_size, bucket_start)
+            );
+            CREATE INDEX IF NOT EXISTS idx_proxy_event_rollups_window
+                ON proxy_event_rollups(bucket_size, bucket_start, proxy_id);
+            CREATE TABLE IF NOT EXISTS proxy_event_rollup_errors (
+                proxy_id TEXT NOT NULL,
+                target TEXT NOT NULL DEFAULT '',
+                bucket_size TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                error_type TEXT NOT NULL,
+                failures INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (proxy_id, target, bucket_size, bucket_start, error_type)
+            );
+            CREATE INDEX IF NOT EXISTS idx_proxy_event_rollup_errors_window
+                ON proxy_event_rollup_errors(bucket_size, bucket_start, proxy_id);
+            CREATE TABLE IF NOT EXISTS proxy_rollup_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_event_id INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT
+            );
+            """
+        )
+        _add_column_if_missing(conn, "proxies", "pool", "TEXT NOT NULL DEFAULT ''")
+        _add_column_if_missing(conn, "proxies", "ewma_latency_ms", "REAL")
+        _add_column_if_missing(conn, "proxies", "ewma_failure_rate", "REAL")
+        _add_column_if_missing(conn, "proxy_events", "latency_ms", "REAL")
+        _add_column_if_missing(
+            conn, "proxies", "probe_requests", "INTEGER NOT NULL DEFAULT 0"
+        )
+        _add_column_if_missing(
+            conn, "proxies", "probe_failures", "INTEGER NOT NULL DEFAULT 0"
+        )
+        _add_column_if_missing(conn, "proxies", "last_probe_at", "TEXT")
+
+
+def _add_column_if_missing(
+    conn: sqlite3.Connection,
+    table_name: str,
+    column_name: str,
+    definition: str,
+) -> None:
+    columns = {
+        str(row[1]) for row in conn.execute(f"PRAGMA table_info({table_name})")
+    }
+    if column_name in columns:
+        return
+    try:
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}")
+    except sqlite3.OperationalError as exc:
+        if "duplicate column name" not in str(exc).casefold():
+            raise
+
+
+def compute_proxy_status(enabled: bool, consecutive_failures: int, total_requests: int) -> str:
+    if not enabled:
+        return PROXY_STATUS_DISABLED
+    if total_requests <= 0:
+        return PROXY_STATUS_UNKNOWN
+    if consecutive_failures >= 3:
+        return PROXY_STATUS_FAILING
+    if consecutive_failures > 0:
+        return PROXY_STATUS_DEGRADED
+    return PROXY_STATUS_HEALTHY
+
+
+@dataclass(frozen=True)
+class ProxyEvent:
+    proxy_id: str
+    account_id: str | None
+    target: str | None
+    success: bool
+    error_type: str | None
+    error_message: str | None
+    occurred_at: str
+    latency_ms: float | None = None
+
+
+def _env_number(name: str, default: float, minimum: float, maximum: float) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        return default
+    return min(max(value, minimum), maximum)
+
+
+def proxy_event_flush_size() -> int:
+    return int(
+        _env_number(
+            PROXY_EVENT_FLUSH_SIZE_ENV,
+            DEFAULT_PROXY_EVENT_FLUSH_SIZE,
+            1,
+            10_000,
+        )
+    )
+
+
+def proxy_event_flush_seconds() -> float:
+    return _env_number(
+        PROXY_EVENT_FLUSH_SECONDS_ENV,
+        DEFAULT_PROXY_EVENT_FLUSH_SECONDS,
+        0.05,
+        300,
+    )
+
+
+def _ensure_proxy_schema_once(db_path: Path) -> None:
+    with _PROXY_SCHEMA_LOCK:
+        if db_path in _PROXY_SCHEMA_READY_PATHS:
+            return
+        ensure_proxy_database_schema(db_path)
+        _PROXY_SCHEMA_READY_PATHS.add(db_path)
+
+
+def _fold_ewma(
+    latency_ms: float | None,
+    failure_rate: float | None,
+    events: list[ProxyEvent],
+) -> tuple[float | None, float | None]:
+    alpha = PROXY_EWMA_ALPHA
+    for event in events:
+        outcome = 0.0 if event.success else 1.0
+        failure_rate = (
+            outcome
+            if failure_rate is None
+            else alpha * outcome + (1 - alpha) * float(failure_rate)
+        )
+        if event.latency_ms is not None:
+            latency_ms = (
+                float(event.latency_ms)
+                if latency_ms is None
+                else alpha * float(event.latency_ms) + (1 - alpha) * float(latency_ms)
+            )
+    return latency_ms, failure_rate
+
+
+def write_proxy_events(db_path: Path, events: list[ProxyEvent]) -> None:
+    """Persist a batch of events and fold it into the ``proxies`` counters.
+
+    Events are applied in order, so ``consecutive_failures`` ends up as the run
+    of failures after the last success in the batch, or grows by the batch size
+    when the batch holds only failures. Probe events move the status and the
+    EWMAs like any other, but are counted in ``probe_requests`` and
+    ``probe_failures`` instead of the traffic totals.
+    """
+    if not events:
+        return
+    _ensure_proxy_schema_once(db_path)
+    totals: dict[str, dict[str, Any]] = {}
+    for event in events:
+        item = totals.setdefault(
+            event.proxy_id,
+            {
+                "requests": 0,
+                "failures": 0,
+                "probe_requests": 0,
+                "probe_failures": 0,
+                "trailing_failures": 0,
+                "had_success": False,
+                "last_used_at": None,
+                "last_probe_at": None,
+                "last_success_at": None,
+                "last_failure_at": None,
+                "events": [],
+            },
+        )
+        item["events"].append(event)
+        is_probe = event.target == PROXY_PROBE_TARGET
+        if is_probe:
+            item["probe_requests"] += 1
+            item["last_probe_at"] = event.occurred_at
+        else:
+            item["requests"] += 1
+            item["last_used_at"] = event.occurred_at
+        if event.success:
+            item["had_success"] = True
+            item["trailing_failures"] = 0
+            item["last_success_at"] = event.occurred_at
+        else:
+            item["failures" if not is_probe else "probe_failures"] += 1
+            item["trailing_failures"] += 1
+            item["last_failure_at"] = event.occurred_at
+
+    with sqlite3.connect(db_path, timeout=5) as conn:
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            """
+            INSERT INTO proxy_events (
+                proxy_id,
+                account_id,
+                target,
+                success,
+                error_type,
+                error_message,
+                occurred_at,
+                latency_ms
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    event.proxy_id,
+                    event.account_id,
+                    event.target,
+                    1 if event.success else 0,
+                    event.error_type,
+                    event.error_message,
+                    event.occurred_at,
+                    event.latency_ms,
+                )
+                for event in events
+            ],
+        )
+        placeholders = ", ".join("?" for _ in totals)
+        current = {
+            str(row[0]): row
+            for row in conn.execute(
+                f"""
+                SELECT
+                    id,
+                    enabled,
+                    consecutive_failures,
+                    total_requests,
+                    ewma_latency_ms,
+                    ewma_failure_rate,
+                    probe_requests
+                FROM proxies
+                WHERE id IN ({placeholders})
+                """,
+                tuple(totals),
+            ).fetchall()
+        }
+        updates = []
+        for proxy_id, item in totals.items():
+            row = current.get(proxy_id)
+            if row is None:
+                continue
+            consecutive_failures = item["trailing_failures"]
+            if not item["had_success"]:
+                consecutive_failures += int(row[2] or 0)
+            observed_requests = (
+                int(row[3] or 0)
+                + int(row[6] or 0)
+                + item["requests"]
+                + item["probe_requests"]
+            )
+            ewma_latency_ms, ewma_failure_rate = _fold_ewma(
+                row[4], row[5], item["events"]
+            )
+            updates.append(
+                (
+                    item["requests"],
+                    item["failures"],
+                    item["probe_requests"],
+                    item["probe_failures"],
+                    consecutive_failures,
+                    ewma_latency_ms,
+                    ewma_failure_rate,
+                    compute_proxy_status(
+                        bool(row[1]), consecutive_failures, observed_requests
+                    ),
+                    item["last_used_at"],
+                    item["last_probe_at"],
+                    item["last_success_at"],
+                    item["last_failure_at"],
+                    item["last_used_at"] or item["last_probe_at"],
+                    proxy_id,
+                )
+            )
+        conn.executemany(
+            """
+            UPDATE proxies
+            SET total_requests = COALESCE(total_requests, 0) + ?,
+                total_failures = COALESCE(total_failures, 0) + ?,
+                probe_requests = COALESCE(probe_requests, 0) + ?,
+                probe_failures = COALESCE(probe_failures, 0) + ?,
+                consecutive_failures = ?,
+                ewma_latency_ms = ?,
+                ewma_failure_rate = ?,
+                status = ?,
+                last_used_at = COALESCE(?, last_used_at),
+                last_probe_at = COALESCE(?, last_probe_at),
+                last_success_at = COALESCE(?, last_success_at),
+                last_failure_at = COALESCE(?, last_failure_at),
+                updated_at = ?
+            WHERE id = ?
+            """,
+            updates,
+        )
+
+
+class ProxyEventRecorder:
+    """Buffers proxy events and writes them in batches.
+
+    A batch is flushed once ``flush_size`` events are queued or
+    ``flush_interval_seconds`` after the first queued event, whichever comes
+    first, and on interpreter exit via ``flush_proxy_events``. Writes happen
+    on a background thread, never on the thread that recorded the event.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        flush_size: int | None = None,
+        flush_interval_seconds: float | None = None,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.flush_size = max(
+            1, int(flush_size if flush_size is not None else proxy_event_flush_size())
+        )
+        self.flush_interval_seconds = max(
+            0.01,
+            float(
+                flush_interval_seconds
+                if flush_interval_seconds is not None
+                else proxy_event_flush_seconds()
+            ),
+        )
+        self._buffer: list[ProxyEvent] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._batch_full = threading.Event()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self.flush_count = 0
+
+    def record(self, event: ProxyEvent) -> None:
+        with self._buffer_lock:
+            self._buffer.append(event)
+            if len(self._buffer) > _MAX_BUFFERED_PROXY_EVENTS:
+                del self._buffer[0]
+            pending = len(self._buffer)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="proxy-event-recorder",
+                    daemon=True,
+                )
+                self._thread.start()
+        if pending >= self.flush_size:
+            self._batch_full.set()
+        self._wakeup.set()
+
+    def pending_count(self) -> int:
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._buffer_lock:
+                events = self._buffer
+                self._buffer = []
+            if not events:
+                return 0
+            try:
+                write_proxy_events(self.db_path, events)
+            except BaseException:
+                with self._buffer_lock:
+                    # Keep the newest events for the next attempt, bounded.
+                    retained = events + self._buffer
+                    self._buffer = retained[-_MAX_BUFFERED_PROXY_EVENTS:]
+                raise
+            self.flush_count += 1
+            return len(events)
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        self._batch_full.set()
+        self._flush_quietly()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            # The events stay buffered for the next attempt.
+            return
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait()
+            if self._closed:
+                return
+            # Wait out the interval unless a full batch is already queued.
+            self._batch_full.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            self._batch_full.clear()
+            self._flush_quietly()
+
+
+def get_proxy_event_recorder(db_path: Path) -> ProxyEventRecorder:
+    resolved_db_path = Path(db_path)
+    with _PROXY_RECORDERS_LOCK:
+        recorder = _PROXY_RECORDERS.get(resolved_db_path)
+        if recorder is None:
+            recorder = ProxyEventRecorder(resolved_db_path)
+            _PROXY_RECORDERS[resolved_db_path] = recorder
+        return recorder
+
+
+def flush_proxy_events(db_path: Path | None = None) -> int:
+    with _PROXY_RECORDERS_LOCK:
+        recorders = list(_PROXY_RECORDERS.values())
+    flushed = 0
+    for recorder in recorders:
+        if db_path is not None and recorder.db_path != Path(db_path):
+            continue
+        try:
+            flushed += recorder.flush()
+        except Exception:
+            continue
+    return flushed
+
+
+atexit.register(flush_proxy_events)
+
+
+def record_proxy_request_result(
+    proxy_id: str | None,
+    *,
+    account_id: str | None = None,
+    target: str | None = None,
+    success: bool,
+    db_path: Path | None = None,
+    error_type: str | None = None,
+    error_message: str | None = None,
+) -> None:
+    normalized_proxy_id = normalize_proxy_identifier(proxy_id)
+    resolved_db_path = db_path or proxy_db_path_from_env()
+    if normalized_proxy_id is None or resolved_db_path is None:
+        return
+    # A scheduled open_url may have served this request through a failover
+    # proxy; attribute the result to the proxy that actually carried it.
+    routed_proxy_id, latency_ms = take_proxy_routing_note(normalized_proxy_id)
+    get_proxy_event_recorder(resolved_db_path).record(
+        ProxyEvent(
+            proxy_id=routed_proxy_id,
+            account_id=normalize_proxy_identifier(account_id),
+            target=str(target or "").strip() or None,
+            success=bool(success),
+            error_type=str(error_type or "").strip() or None,
+            error_message=str(error_message or "").strip() or None,
+            occurred_at=_utc_now(),
+            latency_ms=latency_ms,
+        )
+    )
+
+
+def note_proxy_routing(
+    requested_proxy_id: str,
+    routed_proxy_id: str,
+    latency_ms: float | None,
+) -> None:
+    _PROXY_ROUTING_NOTES.note = (requested_proxy_id, routed_proxy_id, latency_ms)
+
+
+def take_proxy_routing_note(proxy_id: str) -> tuple[str, float | None]:
+    note = getattr(_PROXY_ROUTING_NOTES, "note", None)
+    _PROXY_ROUTING_NOTES.note = None
+    if note is None or note[0] != proxy_id:
+        return proxy_id, None
+    return note[1], note[2]
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib import error as urllib_error
+from urllib import request as urllib_request
+
+from .proxy import (
+    HTTP_PROXY_SCHEMES,
+    PROXY_PROBE_TARGET,
+    ProxyEvent,
+    RuntimeProxyConfig,
+    _ensure_proxy_schema_once,
+    _env_number,
+    _utc_now,
+    get_urllib_opener,
+    write_proxy_events,
+)
+
+PROXY_PROBE_URL_ENV = "SHAFA_PROXY_PROBE_URL"
+PROXY_PROBE_INTERVAL_SECONDS_ENV = "SHAFA_PROXY_PROBE_INTERVAL_SECONDS"
+PROXY_PROBE_CONCURRENCY_ENV = "SHAFA_PROXY_PROBE_CONCURRENCY"
+PROXY_PROBE_TIMEOUT_SECONDS_ENV = "SHAFA_PROXY_PROBE_TIMEOUT_SECONDS"
+DEFAULT_PROXY_PROBE_URL = "https://shafa.ua/robots.txt"
+DEFAULT_PROXY_PROBE_INTERVAL_SECONDS = 120.0
+DEFAULT_PROXY_PROBE_CONCURRENCY = 4
+DEFAULT_PROXY_PROBE_TIMEOUT_SECONDS = 10.0
+
+
+def proxy_probe_url() -> str:
+    return os.getenv(PROXY_PROBE_URL_ENV, "").strip() or DEFAULT_PROXY_PROBE_URL
+
+
+def proxy_probe_interval_seconds() -> float:
+    """Seconds between probe rounds; ``0`` turns the prober off."""
+    return _env_number(
+        PROXY_PROBE_INTERVAL_SECONDS_ENV,
+        DEFAULT_PROXY_PROBE_INTERVAL_SECONDS,
+        0.0,
+        24 * 3600.0,
+    )
+
+
+def proxy_probe_concurrency() -> int:
+    return int(
+        _env_number(
+            PROXY_PROBE_CONCURRENCY_ENV, DEFAULT_PROXY_PROBE_CONCURRENCY, 1, 64
+        )
+    )
+
+
+def proxy_probe_timeout_seconds() -> float:
+    return _env_number(
+        PROXY_PROBE_TIMEOUT_SECONDS_ENV, DEFAULT_PROXY_PROBE_TIMEOUT_SECONDS, 0.5, 120.0
+    )
+
+
+def _probe_http_proxy(config: RuntimeProxyConfig, url: str, timeout: float) -> None:
+    opener = get_urllib_opener(config)
+    http_request = urllib_request.Request(
+        url,
+        method="HEAD",
+        headers={"User-Agent": "shafa-proxy-probe"},
+    )
+    try:
+        with opener.open(http_request, timeout=timeout):
+            return
+    except urllib_error.HTTPError as exc:
+        # Any upstream answer proves the proxy forwarded the request, except
+        # the proxy's own refusals.
+        if exc.code in {407, 502, 503, 504}:
+            raise
+
+
+def _probe_socks5_proxy(config: RuntimeProxyConfig, timeout: float) -> None:
+    method = b"\x02" if config.username else b"\x00"
+    with socket.create_connection((config.host, config.port), timeout=timeout) as sock:
+        sock.settimeout(timeout)
+        sock.sendall(b"\x05\x01" + method)
+        reply = sock.recv(2)
+    if len(reply) != 2 or reply[0] != 0x05 or reply[1:] != method:
+        raise ConnectionError(f"Unexpected SOCKS5 greeting reply: {reply!r}")
+
+
+def probe_proxy(
+    config: RuntimeProxyConfig,
+    *,
+    url: str | None = None,
+    timeout: float | None = None,
+) -> ProxyEvent:
+    """Run one lightweight connection check through ``config``.
+
+    HTTP(S) proxies fetch ``url`` with a HEAD request; SOCKS5 proxies only
+    complete the method negotiation, which is enough to tell a live proxy from
+    a dead port without opening an upstream connection. Any error, expected
+    or not, comes back as a failed event so one bad proxy cannot abort a
+    round.
+    """
+    resolved_timeout = timeout if timeout is not None else proxy_probe_timeout_seconds()
+    started = time.perf_counter()
+    error: BaseException | None = None
+    try:
+        if config.scheme in HTTP_PROXY_SCHEMES:
+            _probe_http_proxy(config, url or proxy_probe_url(), resolved_timeout)
+        else:
+            _probe_socks5_proxy(config, resolved_timeout)
+    except Exception as exc:
+        error = exc
+    latency_ms = (time.perf_counter() - started) * 1000.0
+    return ProxyEvent(
+        proxy_id=config.proxy_id,
+        account_id=None,
+        target=PROXY_PROBE_TARGET,
+        success=error is None,
+        error_type=type(error).__name__ if error is not None else None,
+        error_message=str(error)[:500] if error is not None else None,
+        occurred_at=_utc_now(),
+        latency_ms=latency_ms if error is None else None,
+    )
+
+
+def _load_enabled_proxies(db_path: Path) -> list[RuntimeProxyConfig]:
+    _ensure_proxy_schema_once(db_path)
+    with sqlite3.connect(db_path, timeout=30.0) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            """
+            SELECT id, name, scheme, host, port, username, password, max_accounts,
+                   pool
+            FROM proxies
+            WHERE enabled = 1
+            ORDER BY id
+            """
+        ).fetchall()
+    configs = []
+    for row in rows:
+        try:
+            configs.append(RuntimeProxyConfig.from_payload(dict(row)))
+        except ValueError:
+            continue
+    return configs
+
+
+def probe_proxies(
+    db_path: Path,
+    *,
+    url: str | None = None,
+    timeout: float | None = None,
+    concurrency: int | None = None,
+) -> list[ProxyEvent]:
+    """Probe every enabled proxy and fold the results into ``proxies``.
+
+    Results are written straight through ``write_proxy_events`` so a dead
+    proxy is marked ``failing`` as soon as the round ends. They are counted
+    as probe traffic, apart from the account request totals.
+    """
+    configs = _load_enabled_proxies(Path(db_path))
+    if not configs:
+        return []
+    workers = min(concurrency or proxy_probe_concurrency(), len(configs))
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="proxy-probe"
+    ) as executor:
+        events = list(
+            executor.map(
+                lambda config: probe_proxy(config, url=url, timeout=timeout),
+                configs,
+            )
+        )
+    write_proxy_events(Path(db_path), events)
+    return events
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable
+from urllib import error as urllib_error
+
+from .file_lock import open_lock_file, release_file_lock, try_acquire_file_lock
+from .proxy import (
+    HTTP_PROXY_SCHEMES,
+    RuntimeProxyConfig,
+    _ensure_proxy_schema_once,
+    note_proxy_routing,
+    proxy_db_path_from_env,
+)
+
+PROXY_SCHEDULER_ENV = "SHAFA_PROXY_SCHEDULER"
+PROXY_MAX_IN_FLIGHT_ENV = "SHAFA_PROXY_MAX_IN_FLIGHT"
+PROXY_LOCK_DIR_ENV = "SHAFA_PROXY_LOCK_DIR"
+DEFAULT_PROXY_MAX_IN_FLIGHT = 8
+DEFAULT_SLOT_WAIT_SECONDS = 30.0
+# Slots freed in this process wake waiters at once; slots freed by another
+# account process are noticed at the next recheck.
+SLOT_RECHECK_SECONDS = 0.25
+SNAPSHOT_TTL_SECONDS = 5.0
+UNHEALTHY_CONSECUTIVE_FAILURES = 3
+UNHEALTHY_FAILURE_RATE = 0.5
+# An unhealthy proxy gets one request through again after this cooldown, so a
+# recovered proxy is noticed without a separate prober.
+UNHEALTHY_RETRY_SECONDS = 60.0
+_SCHEDULERS: dict[tuple[Path, Path, int], "ProxyScheduler"] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+class ProxySchedulerBusyError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ProxyHealthSnapshot:
+    config: RuntimeProxyConfig
+    consecutive_failures: int = 0
+    ewma_latency_ms: float | None = None
+    ewma_failure_rate: float | None = None
+    last_failure_at: datetime | None = None
+
+    def is_healthy(self, now: datetime) -> bool:
+        failing = (
+            self.consecutive_failures >= UNHEALTHY_CONSECUTIVE_FAILURES
+            or (self.ewma_failure_rate or 0.0) >= UNHEALTHY_FAILURE_RATE
+        )
+        if not failing:
+            return True
+        if self.last_failure_at is None:
+            return False
+        elapsed = (now - self.last_failure_at).total_seconds()
+        return elapsed >= UNHEALTHY_RETRY_SECONDS
+
+    def sort_key(self) -> tuple[float, float]:
+        latency = self.ewma_latency_ms
+        return (
+            self.ewma_failure_rate or 0.0,
+            latency if latency is not None else float("inf"),
+        )
+
+
+def _parse_timestamp(value: object) -> datetime | None:
+    try:
+        parsed = datetime.fromisoformat(str(value or ""))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=UTC)
+    return parsed
+
+
+class ProxySlot:
+    """One of the ``max_in_flight`` lock files held for a proxy."""
+
+    def __init__(
+        self, handle: Any, on_release: Callable[[], None] | None = None
+    ) -> None:
+        self._handle = handle
+        self._on_release = on_release
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            handle, self._handle = self._handle, None
+        if handle is None:
+            return
+        try:
+            release_file_lock(handle)
+        finally:
+            handle.close()
+            if self._on_release is not None:
+                self._on_release()
+
+
+class _SlotResponse:
+    """Response proxy that returns its proxy slot once the body is closed."""
+
+    def __init__(self, response: Any, slot: ProxySlot) -> None:
+        self._response = response
+        self._slot = slot
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    def __enter__(self) -> "_SlotResponse":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        try:
+            self._response.close()
+        finally:
+            self._slot.release()
+
+    def __del__(self) -> None:
+        self._slot.release()
+
+
+class ProxyScheduler:
+    """Route proxy traffic by health and cap concurrent requests per proxy.
+
+    Health comes from the EWMA columns maintained by ``write_proxy_events``.
+    Concurrency is limited with per-slot lock files, so the cap holds across
+    every account process sharing the proxy database.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        lock_dir: Path,
+        max_in_flight: int = DEFAULT_PROXY_MAX_IN_FLIGHT,
+        slot_wait_seconds: float = DEFAULT_SLOT_WAIT_SECONDS,
+        snapshot_ttl_seconds: float = SNAPSHOT_TTL_SECONDS,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.lock_dir = Path(lock_dir)
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.slot_wait_seconds = max(float(slot_wait_seconds), 0.0)
+        self.snapshot_ttl_seconds = max(float(snapshot_ttl_seconds), 0.0)
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: dict[str, ProxyHealthSnapshot] = {}
+        self._snapshot_loaded_at: float | None = None
+        self._slot_released = threading.Condition()
+        self._release_generation = 0
+
+    def invalidate(self) -> None:
+        with self._snapshot_lock:
+            self._snapshot_loaded_at = None
+
+    def _load_snapshot(self) -> dict[str, ProxyHealthSnapshot]:
+        with self._snapshot_lock:
+            loaded_at = self._snapshot_loaded_at
+            if (
+                loaded_at is not None
+                and time.monotonic() - loaded_at < self.snapshot_ttl_seconds
+            ):
+                return self._snapshot
+            _ensure_proxy_schema_once(self.db_path)
+            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+                conn.row_factory = sqlite3.Row
+                rows = conn.execute(
+                    """
+                    SELECT id, name, scheme, host, port, username, password,
+                           enabled, max_accounts, pool, consecutive_failures,
+                           ewma_latency_ms, ewma_failure_rate, last_failure_at
+                    FROM proxies
+                    WHERE enabled = 1
+                    """
+                ).fetchall()
+            snapshot: dict[str, ProxyHealthSnapshot] = {}
+            for row in rows:
+                try:
+                    config = RuntimeProxyConfig.from_payload(dict(row))
+                except ValueError:
+                    continue
+                snapshot[config.proxy_id] = ProxyHealthSnapshot(
+                    config=config,
+                    consecutive_failures=int(row["consecutive_failures"] or 0),
+                    ewma_latency_ms=row["ewma_latency_ms"],
+                    ewma_failure_rate=row["ewma_failure_rate"],
+                    last_failure_at=_parse_timestamp(row["last_failure_at"]),
+                )
+            self._snapshot = snapshot
+            self._snapshot_loaded_at = time.monotonic()
+            return snapshot
+
+    def candidates(
+        self,
+        config: RuntimeProxyConfig,
+        *,
+        schemes: tuple[str, ...] = HTTP_PROXY_SCHEMES,
+    ) -> list[RuntimeProxyConfig]:
+        """Return proxies to try for ``config``, best first.
+
+        The assigned proxy leads while it is healthy. Otherwise healthy proxies
+        from the same pool are ordered by failure rate and latency, and the
+        assigned proxy is kept last so a request is never left without a route.
+        """
+        snapshot = self._load_snapshot()
+        now = datetime.now(UTC)
+        assigned = snapshot.get(config.proxy_id)
+        if assigned is None or assigned.is_healthy(now):
+            preferred = [config]
+        else:
+            preferred = []
+        if not config.pool:
+            return preferred or [config]
+        alternatives = sorted(
+            (
+                item
+                for item in snapshot.values()
+                if item.config.proxy_id != config.proxy_id
+                and item.config.pool == config.pool
+                and item.config.scheme in schemes
+                and item.is_healthy(now)
+            ),
+            key=ProxyHealthSnapshot.sort_key,
+        )
+        ordered = preferred + [item.config for item in alternatives]
+        if not preferred:
+            ordered.append(config)
+        return ordered
+
+    def select_config(
+        self,
+        config: RuntimeProxyConfig,
+        *,
+        schemes: tuple[str, ...] = HTTP_PROXY_SCHEMES,
+    ) -> RuntimeProxyConfig:
+        return self.candidates(config, schemes=schemes)[0]
+
+    def try_acquire_slot(self, proxy_id: str) -> ProxySlot | None:
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        for index in range(self.max_in_flight):
+            handle = open_lock_file(self.lock_dir / f"{proxy_id}.{index}.lock")
+            try:
+                try_acquire_file_lock(handle)
+            except BlockingIOError:
+                handle.close()
+                continue
+            except BaseException:
+                handle.close()
+                raise
+            return ProxySlot(handle, on_release=self._notify_slot_released)
+        return None
+
+    def _notify_slot_released(self) -> None:
+        with self._slot_released:
+            self._release_generation += 1
+            self._slot_released.notify_all()
+
+    def acquire(
+        self,
+        config: RuntimeProxyConfig,
+        *,
+        schemes: tuple[str, ...] = HTTP_PROXY_SCHEMES,
+    ) -> tuple[RuntimeProxyConfig, ProxySlot]:
+        deadline = time.monotonic() + self.slot_wait_seconds
+        while True:
+            with self._slot_released:
+                generation = self._release_generation
+            for candidate in self.candidates(config, schemes=schemes):
+                slot = self.try_acquire_slot(candidate.proxy_id)
+                if slot is not None:
+                    return candidate, slot
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ProxySchedulerBusyError(
+                    f"No free proxy slot for {config.proxy_id} "
+                    f"within {self.slot_wait_seconds:g}s"
+                )
+            with self._slot_released:
+                # A slot released since ``generation`` was read is retried
+                # straight away instead of waiting out the recheck.
+                if self._release_generation == generation:
+                    self._slot_released.wait(min(remaining, SLOT_RECHECK_SECONDS))
+
+    def open_url(
+        self,
+        http_request: Any,
+        *,
+        config: RuntimeProxyConfig,
+        timeout: float,
+        opener: Callable[..., Any],
+    ) -> Any:
+        routed, slot = self.acquire(config)
+        started = time.perf_counter()
+        try:
+            response = opener(http_request, config=routed, timeout=timeout)
+        except urllib_error.HTTPError:
+            # The proxy delivered an upstream answer, so its latency counts.
+            latency_ms = (time.perf_counter() - started) * 1000.0
+            note_proxy_routing(config.proxy_id, routed.proxy_id, latency_ms)
+            slot.release()
+            raise
+        except BaseException:
+            note_proxy_routing(config.proxy_id, routed.proxy_id, None)
+            slot.release()
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        note_proxy_routing(config.proxy_id, routed.proxy_id, latency_ms)
+        return _SlotResponse(response, slot)
+
+
+def proxy_scheduler_enabled() -> bool:
+    raw = os.getenv(PROXY_SCHEDULER_ENV, "").strip().casefold()
+    return raw in {"1", "true", "yes", "on"}
+
+
+def proxy_max_in_flight() -> int:
+    raw = os.getenv(PROXY_MAX_IN_FLIGHT_ENV, "").strip()
+    try:
+        value = int(raw) if raw else DEFAULT_PROXY_MAX_IN_FLIGHT
+    except ValueError:
+        value = DEFAULT_PROXY_MAX_IN_FLIGHT
+    return min(max(value, 1), 256)
+
+
+def _proxy_lock_dir(db_path: Path) -> Path:
+    raw = os.getenv(PROXY_LOCK_DIR_ENV, "").strip()
+    if raw:
+        return Path(raw)
+    return db_path.parent / "proxy_locks"
+
+
+def get_proxy_scheduler(db_path: Path | None = None) -> ProxyScheduler | None:
+    """Return the shared scheduler, or ``None`` when scheduling is disabled."""
+    if not proxy_scheduler_enabled():
+        return None
+    resolved_db_path = db_path or proxy_db_path_from_env()
+    if resolved_db_path is None:
+        return None
+    resolved_db_path = Path(resolved_db_path)
+    lock_dir = _proxy_lock_dir(resolved_db_path)
+    max_in_flight = proxy_max_in_flight()
+    key = (resolved_db_path, lock_dir, max_in_flight)
+    with _SCHEDULERS_LOCK:
+        scheduler = _SCHEDULERS.get(key)
+        if scheduler is None:
+            scheduler = ProxyScheduler(
+                resolved_db_path,
+                lock_dir=lock_dir,
+                max_in_flight=max_in_flight,
+            )
+            _SCHEDULERS[key] = scheduler
+        return scheduler
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import signal
+import threading
+
+
+def _exit_on_sigterm(signum: int, _frame: object) -> None:
+    # A second SIGTERM must not cut short the exit handlers the first one
+    # started; the API falls back to SIGKILL if they take too long.
+    signal.signal(signum, signal.SIG_IGN)
+    raise SystemExit(128 + signum)
+
+
+def install_sigterm_exit() -> None:
+    """Turn SIGTERM into ``SystemExit`` in the main thread.
+
+    The API stops an account run with SIGTERM to its process group, which by
+    default ends the process without running ``atexit`` handlers such as the
+    proxy event flush and the creation claim release. Raising ``SystemExit``
+    unwinds ``main`` instead, so they run on the way out.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
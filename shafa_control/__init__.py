@@ -17,14 +17,24 @@ from .models import Account
 from .shafa_auth import ShafaAuthService, ShafaLoginContext
 from .session_store import AccountSessionStore
 from .telegram_auth import CommandRunner, TelegramAuthRuntime, TelegramAuthService, TelegramAuthStatus
+from .worker_host import (
+    AccountCommandPool,
+    AccountWorkerHost,
+    WorkerHostError,
+    WorkerHostProcess,
+    project_worker_host_path,
+    worker_host_supported,
+)
 
 __all__ = [
     "APP_MODES",
+    "AccountCommandPool",
     "AppConfig",
     "AppConfigStore",
     "Account",
     "AccountRuntimeService",
     "AccountSessionStore",
+    "AccountWorkerHost",
     "ChannelTemplate",
     "ChannelTemplateStore",
     "CommandRunner",
@@ -37,6 +47,7 @@ __all__ = [
     "preferred_project_dir",
     "project_root_dir",
     "project_main_path",
+    "project_worker_host_path",
     "python_candidates",
     "resolve_project_dir",
     "ShafaAuthService",
@@ -45,4 +56,7 @@ __all__ = [
     "TelegramAuthService",
     "TelegramAuthStatus",
     "validate_mode",
+    "worker_host_supported",
+    "WorkerHostError",
+    "WorkerHostProcess",
 ]
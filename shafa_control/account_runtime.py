@@ -11,6 +11,7 @@ from telegram_channels import export_runtime_config
 
 from .models import Account
 from .session_store import AccountSessionStore
+from .worker_host import AccountCommandPool, WorkerHostError, worker_host_supported
 
 
 def project_main_path(project_dir: Path) -> Path:
@@ -140,9 +141,11 @@ class AccountRuntimeService:
         store: AccountSessionStore,
         *,
         proxy_db_path: Path | None = None,
+        command_pool: AccountCommandPool | None = None,
     ) -> None:
         self.store = store
         self.proxy_db_path = proxy_db_path
+        self.command_pool = command_pool
 
     @staticmethod
     def root_env_path() -> Path:
@@ -173,6 +176,7 @@ class AccountRuntimeService:
         env["SHAFA_DB_PATH"] = str(self.store.db_file(account))
         env["SHAFA_SHARED_TELEGRAM_DB_PATH"] = str(self.store.shared_telegram_db_file())
         env["SHAFA_CREATION_PRODUCTS_DB_PATH"] = str(self.store.creation_products_db_file())
+        env["SHAFA_REFERENCE_DATA_DB_PATH"] = str(self.store.reference_data_db_file())
         env["SHAFA_MEDIA_DIR_PATH"] = str(self.store.media_dir(account))
         env["SHAFA_TELEGRAM_SESSION_PATH"] = str(self.store.telegram_session_file(account))
         env["SHAFA_TELEGRAM_LOGIN_STATE_PATH"] = str(self.store.telegram_login_state_file(account))
@@ -238,14 +242,29 @@ class AccountRuntimeService:
                 stdout="",
                 stderr=f"main.py не найден по пути {project_path}",
             )
+        python = self.account_python(account)
+        env = self.account_env(account, app_mode=app_mode, base_env=base_env)
+        if self.command_pool is not None and worker_host_supported(project_path):
+            try:
+                return self.command_pool.run(python, project_path, args, env=env)
+            except WorkerHostError:
+                pass
         return subprocess.run(
-            [self.account_python(account), *args],
+            [python, *args],
             cwd=str(project_path),
             capture_output=True,
             text=True,
             encoding="utf-8",
             errors="replace",
-            env=self.account_env(account, app_mode=app_mode, base_env=base_env),
+            env=env,
+        )
+
+    def warm_command_pool(self, account: Account) -> None:
+        if self.command_pool is None:
+            return
+        self.command_pool.warm(
+            self.account_python(account),
+            resolve_project_dir(Path(account.path).expanduser()),
         )
 
     def export_channel_runtime_config(self, account: Account) -> Path:
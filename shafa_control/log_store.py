@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import atexit
+import itertools
 import os
+import threading
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, TextIO
 
 DEFAULT_MAX_LOG_BYTES = 10 * 1024 * 1024
 DEFAULT_LOG_BACKUP_COUNT = 5
+DEFAULT_MAX_RECORDS_PER_ACCOUNT = 1000
+DEFAULT_MAX_PENDING_LOG_LINES = 50_000
+DEFAULT_MAX_OPEN_LOG_FILES = 64
 
 
 @dataclass
@@ -24,12 +31,193 @@ class LogRecord:
         return f"[{prefix}] [{self.level}]{account} {self.message}"
 
 
+class _LogFileWriter:
+    """Single background thread that appends queued lines to log files.
+
+    Lines are batched per file, handles stay open between batches, and file
+    sizes are tracked in memory so rotation needs one ``stat()`` per open.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_log_bytes: int,
+        backup_count: int,
+        max_pending_lines: int = DEFAULT_MAX_PENDING_LOG_LINES,
+        max_open_files: int = DEFAULT_MAX_OPEN_LOG_FILES,
+    ) -> None:
+        self.max_log_bytes = max_log_bytes
+        self.backup_count = backup_count
+        self.max_pending_lines = max(int(max_pending_lines), 1)
+        self.max_open_files = max(int(max_open_files), 1)
+        self.dropped_lines = 0
+        self._pending: deque[tuple[Path, str]] = deque()
+        self._condition = threading.Condition()
+        self._handles: OrderedDict[Path, tuple[TextIO, int]] = OrderedDict()
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+        self._release_requested = False
+        self._thread: threading.Thread | None = None
+
+    def submit(self, path: Path, line: str) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            if len(self._pending) >= self.max_pending_lines:
+                # The disk is not keeping up; drop the oldest line rather than
+                # growing without bound or blocking the stdout reader.
+                self._pending.popleft()
+                self._written += 1
+                self.dropped_lines += 1
+            self._pending.append((path, line))
+            self._queued += 1
+            self._ensure_thread()
+            self._condition.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        with self._condition:
+            target = self._queued
+            return self._condition.wait_for(
+                lambda: self._written >= target or self._thread is None,
+                timeout=timeout,
+            )
+
+    def release_files(self, timeout: float | None = 5.0) -> None:
+        """Flush and close open handles so the files can be moved or deleted."""
+        with self._condition:
+            if self._thread is None:
+                self._close_handles()
+                return
+            self._release_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(
+                lambda: not self._release_requested, timeout=timeout
+            )
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        with self._condition:
+            self._closed = True
+            thread = self._thread
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="log-store-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending or self._closed or self._release_requested
+                )
+                batch = list(self._pending)
+                self._pending.clear()
+                release = self._release_requested
+                closed = self._closed
+            if batch:
+                self._write_batch(batch)
+            with self._condition:
+                self._written += len(batch)
+                if release or closed:
+                    self._close_handles()
+                    self._release_requested = False
+                if closed and not self._pending:
+                    self._thread = None
+                self._condition.notify_all()
+                if self._thread is None:
+                    return
+
+    def _write_batch(self, batch: list[tuple[Path, str]]) -> None:
+        lines_by_path: dict[Path, list[str]] = {}
+        for path, line in batch:
+            lines_by_path.setdefault(path, []).append(f"{line}\n")
+        for path, lines in lines_by_path.items():
+            try:
+                self._write_lines(path, lines)
+            except (OSError, ValueError):
+                self._close_handle(path)
+
+    def _write_lines(self, path: Path, lines: list[str]) -> None:
+        handle, size = self._open(path)
+        chunk: list[str] = []
+        chunk_bytes = 0
+        for line in lines:
+            line_bytes = len(line.encode("utf-8", "replace"))
+            if self._needs_rotation(size + chunk_bytes, line_bytes):
+                handle.write("".join(chunk))
+                chunk, chunk_bytes = [], 0
+                self._close_handle(path)
+                self._rotate(path)
+                handle, size = self._open(path)
+            chunk.append(line)
+            chunk_bytes += line_bytes
+        handle.write("".join(chunk))
+        handle.flush()
+        self._handles[path] = (handle, size + chunk_bytes)
+
+    def _needs_rotation(self, current_size: int, incoming_bytes: int) -> bool:
+        if self.max_log_bytes <= 0 or self.backup_count <= 0 or current_size <= 0:
+            return False
+        return current_size + incoming_bytes > self.max_log_bytes
+
+    def _open(self, path: Path) -> tuple[TextIO, int]:
+        cached = self._handles.get(path)
+        if cached is not None:
+            self._handles.move_to_end(path)
+            return cached
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = path.open("a", encoding="utf-8", errors="replace")
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = 0
+        self._handles[path] = (handle, size)
+        while len(self._handles) > self.max_open_files:
+            oldest = next(iter(self._handles))
+            self._close_handle(oldest)
+        return handle, size
+
+    def _close_handle(self, path: Path) -> None:
+        cached = self._handles.pop(path, None)
+        if cached is None:
+            return
+        try:
+            cached[0].close()
+        except OSError:
+            return
+
+    def _close_handles(self) -> None:
+        for path in list(self._handles):
+            self._close_handle(path)
+
+    def _rotate(self, path: Path) -> None:
+        oldest = path.with_name(f"{path.name}.{self.backup_count}")
+        try:
+            if oldest.exists():
+                oldest.unlink()
+            for index in range(self.backup_count - 1, 0, -1):
+                source = path.with_name(f"{path.name}.{index}")
+                if source.exists():
+                    source.rename(path.with_name(f"{path.name}.{index + 1}"))
+            path.rename(path.with_name(f"{path.name}.1"))
+        except OSError:
+            return
+
+
 class LogStore:
     def __init__(self, root_dir: Path) -> None:
         self.root_dir = root_dir
         self.root_dir.mkdir(parents=True, exist_ok=True)
         self.all_logs_file = self.root_dir / "all.log"
-        self.records: list[LogRecord] = []
         self.max_log_bytes = self._env_int(
             "SHAFA_MAX_LOG_FILE_BYTES",
             DEFAULT_MAX_LOG_BYTES,
@@ -41,13 +229,50 @@ class LogStore:
             min_value=1,
             max_value=20,
         )
+        self.max_records_per_account = self._env_int(
+            "SHAFA_LOG_STORE_MAX_RECORDS",
+            DEFAULT_MAX_RECORDS_PER_ACCOUNT,
+            min_value=1,
+            max_value=100_000,
+        )
+        self._records_lock = threading.Lock()
+        self._records: dict[str | None, deque[tuple[int, LogRecord]]] = {}
+        self._sequence = itertools.count()
+        self._writer = _LogFileWriter(
+            max_log_bytes=self.max_log_bytes,
+            backup_count=self.backup_count,
+        )
+        atexit.register(self._writer.close)
+
+    @property
+    def records(self) -> list[LogRecord]:
+        return self.filtered()
 
     def append(self, record: LogRecord, account_log_file: Path | None = None) -> None:
         line = record.render()
-        self._append_line(self.all_logs_file, line)
+        self._writer.submit(self.all_logs_file, line)
         if account_log_file is not None:
-            self._append_line(account_log_file, line)
-        self.records.append(record)
+            self._writer.submit(account_log_file, line)
+        with self._records_lock:
+            ring = self._records.get(record.account_id)
+            if ring is None:
+                ring = deque(maxlen=self.max_records_per_account)
+                self._records[record.account_id] = ring
+            ring.append((next(self._sequence), record))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every appended line has reached its log file."""
+        return self._writer.flush(timeout=timeout)
+
+    def release_files(self) -> None:
+        self._writer.release_files()
+
+    def close(self) -> None:
+        self._writer.close()
+
+    @property
+    def dropped_lines(self) -> int:
+        return self._writer.dropped_lines
 
     def filtered(
         self,
@@ -55,43 +280,27 @@ class LogStore:
         level: str | None = None,
     ) -> list[LogRecord]:
         target_level = (level or "").upper()
-        result = self.records
-        if account_id:
-            result = [record for record in result if record.account_id == account_id]
+        with self._records_lock:
+            if account_id:
+                entries = list(self._records.get(account_id, ()))
+            else:
+                entries = sorted(
+                    itertools.chain.from_iterable(self._records.values()),
+                    key=lambda entry: entry[0],
+                )
+        result = [record for _sequence, record in entries]
         if target_level and target_level != "ALL":
             result = [record for record in result if record.level == target_level]
         return result
 
     def replace(self, records: Iterable[LogRecord]) -> None:
-        self.records = list(records)
-
-    def _append_line(self, path: Path, line: str) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        self._rotate_if_needed(path, incoming_bytes=len(line.encode("utf-8")) + 1)
-        with path.open("a", encoding="utf-8") as handle:
-            handle.write(f"{line}\n")
-
-    def _rotate_if_needed(self, path: Path, *, incoming_bytes: int) -> None:
-        if self.max_log_bytes <= 0 or self.backup_count <= 0:
-            return
-        try:
-            current_size = path.stat().st_size
-        except OSError:
-            return
-        if current_size + max(int(incoming_bytes), 0) <= self.max_log_bytes:
-            return
-
-        oldest = path.with_name(f"{path.name}.{self.backup_count}")
-        try:
-            if oldest.exists():
-                oldest.unlink()
-            for index in range(self.backup_count - 1, 0, -1):
-                source = path.with_name(f"{path.name}.{index}")
-                if source.exists():
-                    source.rename(path.with_name(f"{path.name}.{index + 1}"))
-            path.rename(path.with_name(f"{path.name}.1"))
-        except OSError:
-            return
+        with self._records_lock:
+            self._records = {}
+            for record in records:
+                ring = self._records.setdefault(
+                    record.account_id, deque(maxlen=self.max_records_per_account)
+                )
+                ring.append((next(self._sequence), record))
 
     @staticmethod
     def _env_int(
@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, Mapping, Sequence
+
+WORKER_HOST_SCRIPT = "worker_host.py"
+_HOST_READY_TIMEOUT_SECONDS = 60.0
+_SPAWN_TIMEOUT_SECONDS = 10.0
+DEFAULT_COMMAND_HOST_MAX_USES = 50
+
+
+class WorkerHostError(RuntimeError):
+    pass
+
+
+def project_worker_host_path(project_dir: Path) -> Path:
+    return project_dir / WORKER_HOST_SCRIPT
+
+
+def worker_host_supported(project_dir: Path) -> bool:
+    return os.name != "nt" and project_worker_host_path(project_dir).is_file()
+
+
+class _HostedOutput:
+    """Line iterator over a hosted process's output, fed by a reader thread."""
+
+    def __init__(self) -> None:
+        self._lines: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+        self._closed = False
+
+    def put(self, line: str | None) -> None:
+        self._lines.put(line)
+
+    def __iter__(self) -> Iterator[str]:
+        while not self._closed:
+            line = self._lines.get()
+            if line is None:
+                self._closed = True
+                return
+            yield line
+
+    def read(self) -> str:
+        return "".join(self)
+
+
+class WorkerHostProcess:
+    """``subprocess.Popen``-like handle for an account run forked by a host.
+
+    The run is a child of the host, not of this process, so the exit code
+    arrives as the trailer line the host writes after reaping it.
+    """
+
+    def __init__(self, conn: socket.socket, pid: int, token: str, reader) -> None:
+        self.pid = pid
+        self.returncode: int | None = None
+        self.stdout = _HostedOutput()
+        self._conn = conn
+        self._token = token
+        self._exited = threading.Event()
+        self._thread = threading.Thread(
+            target=self._pump,
+            args=(reader,),
+            daemon=True,
+            name=f"worker-host-output-{pid}",
+        )
+        self._thread.start()
+
+    def _pump(self, reader) -> None:
+        returncode = 1
+        # The trailer starts with a newline of its own, so a blank line right
+        # before it is not output; other blank lines are held until the next
+        # line shows they are.
+        blank_lines = 0
+        try:
+            for line in reader:
+                prefix, _, code = line.strip().partition(" ")
+                if prefix == self._token:
+                    try:
+                        returncode = int(code)
+                    except ValueError:
+                        pass
+                    blank_lines = max(blank_lines - 1, 0)
+                    break
+                if line == "\n":
+                    blank_lines += 1
+                    continue
+                for _index in range(blank_lines):
+                    self.stdout.put("\n")
+                blank_lines = 0
+                self.stdout.put(line)
+            for _index in range(blank_lines):
+                self.stdout.put("\n")
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self.returncode = returncode
+            self._exited.set()
+            self.stdout.put(None)
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:
+        if not self._exited.wait(timeout):
+            raise subprocess.TimeoutExpired(f"worker host pid {self.pid}", timeout)
+        return int(self.returncode)
+
+    def send_signal(self, signum: int) -> None:
+        if self.returncode is not None:
+            return
+        try:
+            os.kill(self.pid, signum)
+        except ProcessLookupError:
+            return
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+class AccountWorkerHost:
+    """A pre-warmed ``worker_host.py`` that forks account runs on request.
+
+    One host serves one project directory and Python executable. Account
+    runs forked from it share the modules it imported at start-up instead
+    of importing the whole stack in a fresh interpreter each.
+    """
+
+    def __init__(
+        self,
+        python: str,
+        project_dir: Path,
+        *,
+        base_env: Mapping[str, str] | None = None,
+    ) -> None:
+        self.python = python
+        self.project_dir = Path(project_dir)
+        self.base_env = dict(base_env) if base_env is not None else None
+        self._lock = threading.Lock()
+        self._process: subprocess.Popen[str] | None = None
+        self._socket_dir: str | None = None
+        self._retired = False
+        self.shared_modules: list[str] = []
+
+    @property
+    def socket_path(self) -> str:
+        if self._socket_dir is None:
+            raise WorkerHostError("worker host is not running")
+        return str(Path(self._socket_dir) / "host.sock")
+
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._retired:
+                raise WorkerHostError("worker host was retired")
+            if self.running():
+                return
+            self._close_locked()
+            self._socket_dir = tempfile.mkdtemp(prefix="shafa-host-")
+            env = dict(os.environ if self.base_env is None else self.base_env)
+            env.setdefault("PYTHONUNBUFFERED", "1")
+            env.setdefault("PYTHONUTF8", "1")
+            env.setdefault("PYTHONIOENCODING", "utf-8")
+            try:
+                process = subprocess.Popen(
+                    [
+                        self.python,
+                        WORKER_HOST_SCRIPT,
+                        "--socket",
+                        self.socket_path,
+                    ],
+                    cwd=str(self.project_dir),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    encoding="utf-8",
+                    errors="replace",
+                    env=env,
+                    start_new_session=True,
+                )
+            except OSError as exc:
+                self._close_locked()
+                raise WorkerHostError(f"failed to start worker host: {exc}") from exc
+            self._process = process
+            ready = self._read_ready_line(process)
+            if not ready.get("ready"):
+                self._close_locked()
+                raise WorkerHostError("worker host did not become ready")
+            self.shared_modules = [str(name) for name in ready.get("modules") or []]
+
+    def spawn(
+        self,
+        argv: Sequence[str],
+        *,
+        cwd: str,
+        env: Mapping[str, str],
+        events_fd: int | None = None,
+        stderr_fd: int | None = None,
+    ) -> WorkerHostProcess:
+        """Fork one run of ``argv`` in the host.
+
+        ``events_fd`` becomes the run's ``SHAFA_EVENTS_FD``; without
+        ``stderr_fd`` stderr is merged into the returned output.
+        """
+        self.start()
+        fds = {"events": events_fd, "stderr": stderr_fd}
+        roles = [role for role, fd in fds.items() if fd is not None]
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.settimeout(_SPAWN_TIMEOUT_SECONDS)
+            conn.connect(self.socket_path)
+            payload = json.dumps(
+                {"argv": list(argv), "cwd": str(cwd), "env": dict(env), "fds": roles},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            if roles:
+                socket.send_fds(conn, [payload[:1]], [fds[role] for role in roles])
+                payload = payload[1:]
+            conn.sendall(payload + b"\n")
+            reader = conn.makefile("r", encoding="utf-8", errors="replace")
+            header = json.loads(reader.readline() or "{}")
+            conn.settimeout(None)
+            pid = int(header["pid"])
+            token = str(header["token"])
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            conn.close()
+            raise WorkerHostError(f"worker host spawn failed: {exc}") from exc
+        return WorkerHostProcess(conn, pid, token, reader)
+
+    def retire(self) -> None:
+        """Stop accepting runs; the host exits after its running children."""
+        with self._lock:
+            self._retired = True
+            process, self._process = self._process, None
+            socket_dir, self._socket_dir = self._socket_dir, None
+        if process is not None and process.stdin is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+        if socket_dir is not None:
+            # Connections already accepted do not need the socket file.
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                if process.stdin is not None:
+                    process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+        if self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+
+    @staticmethod
+    def _read_ready_line(process: subprocess.Popen[str]) -> dict:
+        result: dict = {}
+
+        def read() -> None:
+            try:
+                line = process.stdout.readline() if process.stdout else ""
+                result.update(json.loads(line or "{}"))
+            except (OSError, ValueError):
+                return
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        reader.join(_HOST_READY_TIMEOUT_SECONDS)
+        return result
+
+
+class AccountCommandPool:
+    """Pre-warmed hosts for short ``main.py`` commands such as Telegram auth.
+
+    Every command is forked from the host for its project and exits when it
+    is done, so a session one account opens never outlives its command; the
+    host itself imports no account configuration. A host is retired after
+    ``max_uses`` commands, when a command dies from a signal or when it
+    fails, and a replacement is warmed in the background.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_uses: int = DEFAULT_COMMAND_HOST_MAX_USES,
+        base_env: Mapping[str, str] | None = None,
+    ) -> None:
+        self.max_uses = max(int(max_uses), 1)
+        self.base_env = dict(base_env) if base_env is not None else None
+        self._lock = threading.Lock()
+        self._hosts: dict[tuple[str, str], tuple[AccountWorkerHost, int]] = {}
+        self.retired = 0
+
+    def warm(self, python: str, project_dir: Path) -> None:
+        """Start the host for ``project_dir`` in the background."""
+        if not worker_host_supported(Path(project_dir)):
+            return
+        host = self._host(python, Path(project_dir))
+        threading.Thread(
+            target=self._start_quietly,
+            args=(host,),
+            daemon=True,
+            name="account-command-host-warm",
+        ).start()
+
+    def run(
+        self,
+        python: str,
+        project_dir: Path,
+        args: Sequence[str],
+        *,
+        env: Mapping[str, str],
+        timeout: float | None = None,
+    ) -> subprocess.CompletedProcess:
+        """Run ``args`` like ``subprocess.run(..., capture_output=True)``."""
+        key = (python, str(project_dir))
+        host = self._host(python, Path(project_dir), count_use=True)
+        try:
+            with tempfile.TemporaryFile() as stderr_file:
+                process = host.spawn(
+                    args,
+                    cwd=str(project_dir),
+                    env=env,
+                    stderr_fd=stderr_file.fileno(),
+                )
+                stdout = process.stdout.read()
+                returncode = process.wait(timeout)
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", errors="replace")
+        except (OSError, WorkerHostError, subprocess.TimeoutExpired) as exc:
+            self._retire(key, host)
+            if isinstance(exc, WorkerHostError):
+                raise
+            raise WorkerHostError(f"command host failed: {exc}") from exc
+        if returncode < 0 or self._uses(key, host) >= self.max_uses:
+            self._retire(key, host)
+            self.warm(python, Path(project_dir))
+        return subprocess.CompletedProcess(
+            [python, *args], returncode, stdout=stdout, stderr=stderr
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            hosts = [host for host, _uses in self._hosts.values()]
+            self._hosts.clear()
+        for host in hosts:
+            host.close()
+
+    def _host(
+        self,
+        python: str,
+        project_dir: Path,
+        *,
+        count_use: bool = False,
+    ) -> AccountWorkerHost:
+        key = (python, str(project_dir))
+        with self._lock:
+            host, uses = self._hosts.get(key) or (None, 0)
+            if host is None:
+                host = AccountWorkerHost(python, project_dir, base_env=self.base_env)
+            self._hosts[key] = (host, uses + 1 if count_use else uses)
+        return host
+
+    def _uses(self, key: tuple[str, str], host: AccountWorkerHost) -> int:
+        with self._lock:
+            current, uses = self._hosts.get(key) or (None, 0)
+        return uses if current is host else 0
+
+    def _retire(self, key: tuple[str, str], host: AccountWorkerHost) -> None:
+        with self._lock:
+            current, _uses = self._hosts.get(key) or (None, 0)
+            if current is host:
+                self._hosts.pop(key, None)
+                self.retired += 1
+        host.retire()
+
+    @staticmethod
+    def _start_quietly(host: AccountWorkerHost) -> None:
+        try:
+            host.start()
+        except WorkerHostError:
+            return
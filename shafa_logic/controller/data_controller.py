@@ -1,4 +1,5 @@
 import asyncio
+import atexit
 import json
 import os
 import random
@@ -6,6 +7,7 @@ import re
 import sqlite3
 import time
 import unicodedata
+from collections import deque
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Optional
@@ -52,7 +54,7 @@ from data.const import (
 from data.db import (
     backfill_telegram_product_message_dates_from_existing_db,
     claim_telegram_product_deactivation,
-    claim_creation_product_for_creation,
+    claim_creation_products_for_creation,
     claim_shared_deactivation_task_for_account,
     claim_telegram_fetch,
     complete_shared_deactivation_task_for_account,
@@ -77,6 +79,7 @@ from data.db import (
     list_uploaded_products_for_age_check,
     load_telegram_channels,
     mark_uploaded_product_inactive,
+    release_unused_claims,
     mark_telegram_product_deactivated_on_shafa,
     mark_telegram_product_deactivation_check,
     mark_telegram_product_not_found_on_shafa,
@@ -144,10 +147,13 @@ DEFAULT_SHARED_DEACTIVATION_COOLDOWN_MAX_SECONDS = 30.0
 DEFAULT_SHARED_DEACTIVATION_LEASE_SECONDS = 900.0
 DEFAULT_SHARED_DEACTIVATION_RETRY_DELAY_SECONDS = 300.0
 DEFAULT_CREATION_PRODUCT_LEASE_SECONDS = 900
+DEFAULT_CREATION_CLAIM_BATCH_SIZE = 1
+MIN_CREATION_CLAIM_REMAINING_LEASE_SECONDS = 60
 DEFAULT_AUTO_DEACTIVATE_TELEGRAM_MATCH_SCORE = 0.85
 MIN_PRODUCT_PRICE_DIGITS = 3
 MAX_PRODUCT_PRICE_DIGITS = 4
 _OLD_PRODUCT_AGE_CHECK_CURSOR: dict[tuple[str, str], int] = {}
+_PREFETCHED_CREATION_CLAIMS: deque[dict] = deque()
 
 api_id = TELEGRAM_API_ID
 api_hash = TELEGRAM_API_HASH
@@ -5389,14 +5395,64 @@ def rebuild_product_data_from_source(product_data: dict) -> tuple[dict, dict]:
     return parsed_data, _build_product_raw_data(parsed_data)
 
 
+def _creation_claim_batch_size() -> int:
+    raw = os.getenv("SHAFA_CREATION_CLAIM_BATCH_SIZE", "").strip()
+    if not raw:
+        return DEFAULT_CREATION_CLAIM_BATCH_SIZE
+    try:
+        value = int(raw)
+    except ValueError:
+        return DEFAULT_CREATION_CLAIM_BATCH_SIZE
+    return min(max(value, 1), 50)
+
+
+def _next_creation_claim() -> Optional[dict]:
+    min_expires_at = time.time() + MIN_CREATION_CLAIM_REMAINING_LEASE_SECONDS
+    stale: list[dict] = []
+    row = None
+    while _PREFETCHED_CREATION_CLAIMS:
+        candidate = _PREFETCHED_CREATION_CLAIMS.popleft()
+        expires_at = candidate.get("processing_expires_at")
+        if expires_at is not None and expires_at < min_expires_at:
+            stale.append(candidate)
+            continue
+        row = candidate
+        break
+    if stale:
+        release_unused_claims(stale)
+    if row is not None:
+        return row
+    claimed = claim_creation_products_for_creation(
+        limit=_creation_claim_batch_size(),
+        lease_seconds=DEFAULT_CREATION_PRODUCT_LEASE_SECONDS,
+    )
+    if not claimed:
+        return None
+    _PREFETCHED_CREATION_CLAIMS.extend(claimed[1:])
+    return claimed[0]
+
+
+def release_prefetched_creation_claims() -> int:
+    if not _PREFETCHED_CREATION_CLAIMS:
+        return 0
+    claims = list(_PREFETCHED_CREATION_CLAIMS)
+    _PREFETCHED_CREATION_CLAIMS.clear()
+    try:
+        return release_unused_claims(claims)
+    except Exception as exc:
+        log("WARN", f"Не удалось вернуть зарезервированные товары в очередь: {exc}")
+        return 0
+
+
+atexit.register(release_prefetched_creation_claims)
+
+
 def _pick_next_product_for_upload() -> Optional[dict]:
     if creation_products_enabled():
         _log_creation_db_path_once()
         _log_creation_db_bypass_once()
         while True:
-            row = claim_creation_product_for_creation(
-                lease_seconds=DEFAULT_CREATION_PRODUCT_LEASE_SECONDS
-            )
+            row = _next_creation_claim()
             if row is None:
                 return None
             _log_product_detail(
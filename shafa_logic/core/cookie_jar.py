@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlparse
+
+CSRF_COOKIE_NAMES = ("csrftoken", "shafa_csrftoken")
+
+
+def _normalize_domain(domain: str) -> str:
+    domain = str(domain or "").strip()
+    if "://" in domain:
+        parsed = urlparse(domain)
+        if parsed.hostname:
+            domain = parsed.hostname
+    return domain.lstrip(".").lower()
+
+
+def _is_allowed_cookie_domain(domain: str, base_domain: str) -> bool:
+    normalized = _normalize_domain(domain)
+    base = _normalize_domain(base_domain)
+    return normalized == base or normalized.endswith(f".{base}")
+
+
+def _file_signature(path: Optional[Path]) -> Optional[tuple[int, int]]:
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_cookie_header(cookies: Iterable[dict]) -> str:
+    parts: list[str] = []
+    for cookie in cookies:
+        name = cookie.get("name")
+        value = cookie.get("value")
+        if not name or value is None:
+            continue
+        parts.append(f"{name}={value}")
+    return "; ".join(parts)
+
+
+def find_csrftoken(cookies: Iterable[dict]) -> Optional[str]:
+    for cookie in cookies:
+        if cookie.get("name") in CSRF_COOKIE_NAMES:
+            return cookie.get("value")
+    return None
+
+
+def parse_set_cookie_header(header: str, default_domain: str) -> Optional[dict]:
+    parts = [part.strip() for part in str(header or "").split(";")]
+    if not parts or "=" not in parts[0]:
+        return None
+    name, value = parts[0].split("=", 1)
+    name = name.strip()
+    if not name:
+        return None
+    cookie: dict = {
+        "name": name,
+        "value": value.strip().strip('"'),
+        "domain": default_domain,
+        "path": "/",
+        "httpOnly": False,
+        "secure": False,
+    }
+    expired = False
+    for attribute in parts[1:]:
+        key, _, raw_value = attribute.partition("=")
+        key = key.strip().lower()
+        raw_value = raw_value.strip()
+        if key == "domain" and raw_value:
+            cookie["domain"] = raw_value
+        elif key == "path" and raw_value:
+            cookie["path"] = raw_value
+        elif key == "httponly":
+            cookie["httpOnly"] = True
+        elif key == "secure":
+            cookie["secure"] = True
+        elif key == "samesite" and raw_value:
+            cookie["sameSite"] = raw_value.capitalize()
+        elif key == "max-age":
+            try:
+                max_age = int(raw_value)
+            except ValueError:
+                continue
+            if max_age <= 0:
+                expired = True
+            else:
+                cookie["expires"] = time.time() + max_age
+        elif key == "expires" and "expires" not in cookie:
+            try:
+                expires_at = parsedate_to_datetime(raw_value).timestamp()
+            except (TypeError, ValueError, IndexError):
+                continue
+            if expires_at <= time.time():
+                expired = True
+            else:
+                cookie["expires"] = expires_at
+    cookie["_expired"] = expired
+    return cookie
+
+
+class ShafaCookieJar:
+    """Per-process Shafa cookies, rebuilt only when their source changes.
+
+    Cookies come from the Playwright storage state file and, when that file has
+    no Shafa cookies and fallback is allowed, from the account ``cookies`` table.
+    Both sources are tracked by file signature, so an unchanged session costs a
+    single ``stat()`` per lookup instead of a JSON parse and a DB round-trip.
+    """
+
+    def __init__(
+        self,
+        storage_state_path: Path,
+        *,
+        base_domain: str,
+        load_fallback_cookies: Optional[Callable[[], list[dict]]] = None,
+        fallback_signature: Optional[Callable[[], object]] = None,
+        persist_cookies: Optional[Callable[[list[dict]], None]] = None,
+    ) -> None:
+        self.storage_state_path = Path(storage_state_path)
+        self.base_domain = base_domain
+        self._load_fallback_cookies = load_fallback_cookies
+        self._fallback_signature = fallback_signature
+        self._persist_cookies = persist_cookies
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self._used_fallback = False
+        self.cookies: list[dict] = []
+        self.cookie_header = ""
+        self.csrftoken: Optional[str] = None
+        self.rebuild_count = 0
+
+    def _current_signature(self, used_fallback: bool) -> tuple:
+        storage_signature = _file_signature(self.storage_state_path)
+        if not used_fallback or self._fallback_signature is None:
+            return (storage_signature, None)
+        return (storage_signature, self._fallback_signature())
+
+    def _read_storage_state_cookies(self) -> list[dict]:
+        if not self.storage_state_path.exists():
+            return []
+        data = json.loads(self.storage_state_path.read_text(encoding="utf-8"))
+        cookies = data.get("cookies") or []
+        return cookies if isinstance(cookies, list) else []
+
+    def _filter(self, cookies: Iterable[object]) -> list[dict]:
+        return [
+            dict(cookie)
+            for cookie in cookies
+            if isinstance(cookie, dict)
+            and _is_allowed_cookie_domain(cookie.get("domain", ""), self.base_domain)
+        ]
+
+    def _reindex(self) -> None:
+        self.cookie_header = build_cookie_header(self.cookies)
+        self.csrftoken = find_csrftoken(self.cookies)
+
+    def refresh(self) -> bool:
+        with self._lock:
+            if self._signature is not None and (
+                self._current_signature(self._used_fallback) == self._signature
+            ):
+                return False
+            storage_signature = _file_signature(self.storage_state_path)
+            cookies = self._filter(self._read_storage_state_cookies())
+            used_fallback = False
+            if not cookies and self._load_fallback_cookies is not None:
+                cookies = self._filter(self._load_fallback_cookies())
+                used_fallback = True
+            elif cookies and self._persist_cookies is not None:
+                self._persist_cookies(cookies)
+            fallback_signature = (
+                self._fallback_signature()
+                if used_fallback and self._fallback_signature is not None
+                else None
+            )
+            self._signature = (storage_signature, fallback_signature)
+            self._used_fallback = used_fallback
+            # Mutate in place so callers holding the list see the rebuild too.
+            self.cookies[:] = cookies
+            self._reindex()
+            self.rebuild_count += 1
+            return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._signature = None
+
+    def owns(self, cookies: object) -> bool:
+        return cookies is self.cookies
+
+    def absorb_set_cookie_headers(self, headers: Iterable[str]) -> int:
+        default_domain = f".{_normalize_domain(self.base_domain)}"
+        updates = [
+            parsed
+            for parsed in (
+                parse_set_cookie_header(header, default_domain) for header in headers
+            )
+            if parsed is not None
+            and _is_allowed_cookie_domain(parsed["domain"], self.base_domain)
+        ]
+        if not updates:
+            return 0
+        with self._lock:
+            for update in updates:
+                expired = update.pop("_expired", False)
+                key = (update["name"], update.get("path") or "/")
+                kept = [
+                    cookie
+                    for cookie in self.cookies
+                    if (cookie.get("name"), cookie.get("path") or "/") != key
+                ]
+                if not expired:
+                    kept.append(update)
+                self.cookies[:] = kept
+            self._reindex()
+        return len(updates)
@@ -5,10 +5,10 @@ import re
 import time
 import uuid
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 from urllib import error, request
-from urllib.parse import urlparse
 
 try:
     from shafa_logic.utils.proxy import (
@@ -16,12 +16,16 @@ try:
         open_url,
         record_proxy_request_result,
     )
+    from shafa_logic.utils.proxy_scheduler import ProxySchedulerBusyError
 except ImportError:  # pragma: no cover - runtime script path fallback
     from utils.proxy import (  # type: ignore[no-redef]
         load_runtime_proxy_config,
         open_url,
         record_proxy_request_result,
     )
+    from utils.proxy_scheduler import (  # type: ignore[no-redef]
+        ProxySchedulerBusyError,
+    )
 
 from controller.catalog_filter import SLUG_TO_WORDS
 from controller.data_controller import (
@@ -38,6 +42,11 @@ from core.product_failures import (
     summarize_exception,
     summarize_graph_errors,
 )
+from core.cookie_jar import (
+    ShafaCookieJar,
+    build_cookie_header,
+    find_csrftoken,
+)
 from core.requests.get_brands import resolve_brand_catalog_slug
 from data.const import (
     API_BATCH_URL,
@@ -60,8 +69,12 @@ from data.const import (
     get_price_markup,
 )
 from data.db import (
+    claim_reference_data_refresh,
+    cookies_db_signature,
+    finish_reference_data_refresh,
     init_db,
     load_cookies,
+    reference_data_shared,
     save_cookies,
     save_brands,
     save_size_mappings,
@@ -70,6 +83,7 @@ from data.db import (
 )
 from data.size_mapping import build_size_mappings, flatten_v5_size_groups
 from models.product import Product
+from utils.events import emit_event
 from utils.logging import log
 from utils.media import (
     cleanup_prepared_media_uploads,
@@ -97,6 +111,9 @@ DEFAULT_CLOTES_CATEGORY = "verhnyaya-odezhda/palto"
 
 SIZE_CATALOG_SLUGS = (DEFAULT_CATALOG_SLUG, WOMEN_CATALOG_SLUG, DEFAULT_CLOTES_CATEGORY, "dlya-beremennyh/dzhinsy", "specodezhda/sfera-obsluzhivaniya", "nizhnee-bele-i-kupalniki/lifchiki")
 _AUTH_DEBUG_PRINTED_KEYS: set[tuple[str, str, str]] = set()
+_SHAFA_COOKIE_JARS: dict[tuple[Path, bool], ShafaCookieJar] = {}
+_REFERENCE_REFRESH_LEASE_SECONDS = 180.0
+_REFERENCE_REFRESH_POLL_SECONDS = 1.0
 
 
 def _debug_http_enabled() -> bool:
@@ -131,27 +148,26 @@ def _http_retry_delay() -> float:
     return min(max(value, 0.1), 30.0)
 
 
-def _normalize_domain(domain: str) -> str:
-    domain = domain.strip()
-    if "://" in domain:
-        parsed = urlparse(domain)
-        if parsed.hostname:
-            domain = parsed.hostname
-    return domain.lstrip(".").lower()
-
-
-def _is_allowed_cookie_domain(domain: str, base_domain: str) -> bool:
-    normalized = _normalize_domain(domain)
-    base = _normalize_domain(base_domain)
-    return normalized == base or normalized.endswith(f".{base}")
+def _reference_refresh_concurrency() -> int:
+    raw = os.getenv("SHAFA_REFERENCE_REFRESH_CONCURRENCY", "").strip()
+    if not raw:
+        return 3
+    try:
+        value = int(raw)
+    except ValueError:
+        return 3
+    return min(max(value, 1), 8)
 
 
-def _load_storage_state_cookies(path: Path) -> list[dict]:
-    if not path.exists():
-        return []
-    data = json.loads(path.read_text(encoding="utf-8"))
-    cookies = data.get("cookies") or []
-    return cookies if isinstance(cookies, list) else []
+def _reference_refresh_interval() -> float:
+    raw = os.getenv("SHAFA_REFERENCE_REFRESH_INTERVAL_SECONDS", "").strip()
+    if not raw:
+        return 900.0
+    try:
+        value = float(raw)
+    except ValueError:
+        return 900.0
+    return min(max(value, 0.0), 86400.0)
 
 
 def _current_storage_state_path() -> Path:
@@ -163,24 +179,35 @@ def _explicit_storage_state_path_configured() -> bool:
     return bool(os.getenv("SHAFA_STORAGE_STATE_PATH", "").strip())
 
 
-def _load_shafa_cookies() -> list[dict]:
+def _shafa_cookie_jar() -> ShafaCookieJar:
     storage_state_path = _current_storage_state_path()
-    cookies = _load_storage_state_cookies(storage_state_path)
-    filtered = [
-        cookie
-        for cookie in cookies
-        if _is_allowed_cookie_domain(cookie.get("domain", ""), ORIGIN_URL)
-    ]
-    if not filtered and not _explicit_storage_state_path_configured():
-        cookies = load_cookies(ORIGIN_URL)
-        filtered = [
-            cookie
-            for cookie in cookies
-            if _is_allowed_cookie_domain(cookie.get("domain", ""), ORIGIN_URL)
-        ]
-    if filtered:
-        save_cookies(filtered)
-    return filtered
+    allow_db_fallback = not _explicit_storage_state_path_configured()
+    key = (storage_state_path, allow_db_fallback)
+    jar = _SHAFA_COOKIE_JARS.get(key)
+    if jar is None:
+        jar = ShafaCookieJar(
+            storage_state_path,
+            base_domain=ORIGIN_URL,
+            load_fallback_cookies=(
+                (lambda: load_cookies(ORIGIN_URL)) if allow_db_fallback else None
+            ),
+            fallback_signature=cookies_db_signature if allow_db_fallback else None,
+            persist_cookies=lambda cookies: save_cookies(cookies),
+        )
+        _SHAFA_COOKIE_JARS[key] = jar
+    jar.refresh()
+    return jar
+
+
+def _cookie_jar_for(cookies: object) -> Optional[ShafaCookieJar]:
+    for jar in _SHAFA_COOKIE_JARS.values():
+        if jar.owns(cookies):
+            return jar
+    return None
+
+
+def _load_shafa_cookies() -> list[dict]:
+    return _shafa_cookie_jar().cookies
 
 
 def _cookie_debug_summary(cookies: list[dict]) -> str:
@@ -223,21 +250,27 @@ def _debug_request_auth(operation: str, cookies: list[dict]) -> None:
 
 
 def _build_cookie_header(cookies: list[dict]) -> str:
-    parts: list[str] = []
-    for cookie in cookies:
-        name = cookie.get("name")
-        value = cookie.get("value")
-        if not name or value is None:
-            continue
-        parts.append(f"{name}={value}")
-    return "; ".join(parts)
+    jar = _cookie_jar_for(cookies)
+    if jar is not None:
+        return jar.cookie_header
+    return build_cookie_header(cookies)
 
 
 def _get_csrftoken_from_cookies(cookies: list[dict]) -> Optional[str]:
-    for cookie in cookies:
-        if cookie.get("name") in {"csrftoken", "shafa_csrftoken"}:
-            return cookie.get("value")
-    return None
+    jar = _cookie_jar_for(cookies)
+    if jar is not None:
+        return jar.csrftoken
+    return find_csrftoken(cookies)
+
+
+def _absorb_response_cookies(cookies: list[dict], headers) -> None:
+    jar = _cookie_jar_for(cookies)
+    if jar is None or headers is None:
+        return
+    get_all = getattr(headers, "get_all", None)
+    set_cookie_headers = get_all("Set-Cookie") if callable(get_all) else None
+    if set_cookie_headers:
+        jar.absorb_set_cookie_headers(set_cookie_headers)
 
 
 def _base_headers(csrftoken: str) -> dict:
@@ -313,6 +346,7 @@ def _request_json(
                 status_code = getattr(resp, "status", None) or getattr(resp, "code", None)
                 content_type = resp.headers.get("Content-Type", "")
                 text = _read_response_text(resp)
+                _absorb_response_cookies(cookies, resp.headers)
             record_proxy_request_result(
                 proxy_config.proxy_id if proxy_config else None,
                 account_id=ACCOUNT_ID,
@@ -321,6 +355,7 @@ def _request_json(
             )
         except error.HTTPError as exc:
             text = _read_response_text(exc)
+            _absorb_response_cookies(cookies, exc.headers)
             record_proxy_request_result(
                 proxy_config.proxy_id if proxy_config else None,
                 account_id=ACCOUNT_ID,
@@ -361,6 +396,9 @@ def _request_json(
                 last_error = exc
                 continue
             raise RuntimeError(f"Request failed: {exc.reason}") from exc
+        except ProxySchedulerBusyError:
+            # The request never left the process, so no proxy gets an outcome.
+            raise
         except Exception as exc:
             record_proxy_request_result(
                 proxy_config.proxy_id if proxy_config else None,
@@ -400,11 +438,11 @@ def _request_json(
     raise RuntimeError("Request failed after retries")
 
 
-def _fetch_sizes(
+def _download_size_catalog(
     csrftoken: str,
     cookies: list[dict],
     catalog_slug: str = DEFAULT_CATALOG_SLUG,
-) -> list[dict]:
+) -> tuple[list[dict], list[dict], list[dict]]:
     v5_query = (
         "query WEB_ProductFormSizeGroup($catalogSlug: String!) {\n"
         "  catalog(slug: $catalogSlug) {\n"
@@ -480,6 +518,15 @@ def _fetch_sizes(
     if v3_data.get("errors"):
         raise RuntimeError(f"GraphQL errors: {v3_data['errors']}")
     v3_sizes = v3_data.get("data", {}).get("filterSize") or []
+    return sizes, v3_sizes, v5_size_groups
+
+
+def _store_size_catalog(
+    catalog_slug: str,
+    sizes: list[dict],
+    v3_sizes: list[dict],
+    v5_size_groups: list[dict],
+) -> None:
     mappings = build_size_mappings(v3_sizes, v5_size_groups)
     save_sizes(sizes, catalog_slug=catalog_slug, replace_catalog=True)
     save_size_mappings(mappings, catalog_slug=catalog_slug)
@@ -503,24 +550,100 @@ def _fetch_sizes(
                 ensure_ascii=False,
             ),
         )
+
+
+def _fetch_sizes(
+    csrftoken: str,
+    cookies: list[dict],
+    catalog_slug: str = DEFAULT_CATALOG_SLUG,
+) -> list[dict]:
+    sizes, v3_sizes, v5_size_groups = _download_size_catalog(
+        csrftoken, cookies, catalog_slug=catalog_slug
+    )
+    _store_size_catalog(catalog_slug, sizes, v3_sizes, v5_size_groups)
     return sizes
 
 
+def _claim_reference_refresh(scope: str) -> tuple[str, Optional[str]]:
+    if not reference_data_shared():
+        return "acquired", None
+    return claim_reference_data_refresh(
+        scope,
+        _reference_refresh_interval(),
+        _REFERENCE_REFRESH_LEASE_SECONDS,
+    )
+
+
+def _finish_reference_refresh(
+    scope: str,
+    lease_token: Optional[str],
+    *,
+    success: bool,
+) -> None:
+    if lease_token:
+        finish_reference_data_refresh(scope, lease_token, success=success)
+
+
 def _refresh_sizes(
     csrftoken: str,
     cookies: list[dict],
     catalog_slugs: tuple[str, ...] = SIZE_CATALOG_SLUGS,
 ) -> int:
-    total = 0
-    seen: set[str] = set()
+    pending: list[str] = []
     for catalog_slug in catalog_slugs:
         slug = str(catalog_slug).strip()
-        if not slug or slug in seen:
-            continue
-        seen.add(slug)
-        sizes = _fetch_sizes(csrftoken, cookies, catalog_slug=slug)
-        total += len(sizes)
-        _log_product_detail(f"Загружены размеры для {slug}: {len(sizes)}.")
+        if slug and slug not in pending:
+            pending.append(slug)
+    total = 0
+    first_error: Optional[Exception] = None
+    deadline = time.monotonic() + _REFERENCE_REFRESH_LEASE_SECONDS
+    while pending:
+        leases: dict[str, Optional[str]] = {}
+        waiting: list[str] = []
+        for slug in pending:
+            state, lease_token = _claim_reference_refresh(f"sizes:{slug}")
+            if state == "acquired":
+                leases[slug] = lease_token
+            elif state == "in_progress":
+                waiting.append(slug)
+            else:
+                _log_product_detail(f"Размеры для {slug} уже обновлены другим аккаунтом.")
+        if leases:
+            workers = min(_reference_refresh_concurrency(), len(leases))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    slug: executor.submit(
+                        _download_size_catalog, csrftoken, cookies, slug
+                    )
+                    for slug in leases
+                }
+            for slug, future in futures.items():
+                success = False
+                try:
+                    sizes, v3_sizes, v5_size_groups = future.result()
+                    _store_size_catalog(slug, sizes, v3_sizes, v5_size_groups)
+                    success = True
+                except Exception as exc:
+                    if first_error is None:
+                        first_error = exc
+                    continue
+                finally:
+                    _finish_reference_refresh(
+                        f"sizes:{slug}", leases[slug], success=success
+                    )
+                total += len(sizes)
+                _log_product_detail(f"Загружены размеры для {slug}: {len(sizes)}.")
+        pending = waiting
+        if pending:
+            if time.monotonic() >= deadline:
+                _log_product_detail(
+                    "Не дождался обновления размеров другим аккаунтом: "
+                    + ", ".join(pending)
+                )
+                break
+            time.sleep(_REFERENCE_REFRESH_POLL_SECONDS)
+    if first_error is not None:
+        raise first_error
     return total
 
 
@@ -591,8 +714,20 @@ def _refresh_brands(
     cookies: list[dict],
     catalog_slug: str = DEFAULT_CATALOG_SLUG,
 ) -> int:
-    brands = _fetch_brands(csrftoken, cookies, catalog_slug=catalog_slug)
     resolved_catalog_slug = resolve_brand_catalog_slug(catalog_slug)
+    scope = f"brands:{resolved_catalog_slug or 'all'}"
+    state, lease_token = _claim_reference_refresh(scope)
+    if state != "acquired":
+        _log_product_detail(
+            f"Бренды для {resolved_catalog_slug} уже обновлены другим аккаунтом."
+        )
+        return 0
+    success = False
+    try:
+        brands = _fetch_brands(csrftoken, cookies, catalog_slug=catalog_slug)
+        success = True
+    finally:
+        _finish_reference_refresh(scope, lease_token, success=success)
     _log_product_detail(f"Загружены бренды для {resolved_catalog_slug}: {len(brands)}.")
     return len(brands)
 
@@ -859,6 +994,7 @@ def _main_impl() -> None:
     product_raw_data = product_data["product_raw_data"]
     parsed_data = product_data.get("parsed_data") or {}
     message_id = product_data["message_id"]
+    started_at = time.monotonic()
     photo_message_ids = get_product_photo_message_ids(product_data)
     product_name = product_raw_data.get("name") or parsed_data.get("name") or "—"
     log("INFO", f"Готовлю товар: «{product_name}».")
@@ -1050,6 +1186,12 @@ def _main_impl() -> None:
                 "WARN",
                 "API отклонил размер. Обновляю размеры и повторяю создание товара...",
             )
+            emit_event(
+                "product_retry",
+                message_id=message_id,
+                channel_id=channel_id,
+                reason="INVALID_SIZE",
+            )
             try:
                 _refresh_sizes(csrftoken, cookies, catalog_slugs=(catalog_slug,))
             except Exception as exc:
@@ -1107,6 +1249,14 @@ def _main_impl() -> None:
             "Товар создан успешно. "
             f"Имя товара: {product_name}. ID: {product_id}. Фото: {len(photo_ids)}.",
         )
+        emit_event(
+            "product_created",
+            message_id=message_id,
+            channel_id=channel_id,
+            product_id=product_id,
+            photos=len(photo_ids),
+            duration_ms=round((time.monotonic() - started_at) * 1000),
+        )
         reset_media_dir(media_dir)
         _log_product_detail("Фото удалены после создания товара.")
     except Exception as exc:
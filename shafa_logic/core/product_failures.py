@@ -2,6 +2,7 @@ from typing import Optional
 
 from controller.data_controller import mark_product_created, register_product_failure
 from data.const import MAX_PRODUCT_CREATE_ATTEMPTS
+from utils.events import emit_event
 from utils.logging import log
 
 
@@ -57,6 +58,17 @@ def handle_retryable_product_failure(
         failure_reason=failure_reason,
         channel_id=channel_id,
     )
+    emit_event(
+        "product_failed",
+        message_id=message_id,
+        channel_id=channel_id,
+        reason=failure_reason,
+        message=detail_message,
+        level=detail_level,
+        retryable=True,
+        attempts=attempts,
+        skipped=skipped,
+    )
     if skipped:
         log(
             "WARN",
@@ -65,6 +77,13 @@ def handle_retryable_product_failure(
         )
         return attempts, True
     retries_left = max(0, MAX_PRODUCT_CREATE_ATTEMPTS - attempts)
+    emit_event(
+        "product_retry",
+        message_id=message_id,
+        channel_id=channel_id,
+        reason=failure_reason,
+        retries_left=retries_left,
+    )
     log(
         "WARN",
         "Повторю этот товар позже. "
@@ -84,6 +103,15 @@ def handle_non_retryable_product_failure(
     created_product_id: Optional[str] = None,
 ) -> None:
     log(detail_level, detail_message)
+    emit_event(
+        "product_failed",
+        message_id=message_id,
+        channel_id=channel_id,
+        reason=failure_reason,
+        message=detail_message,
+        level=detail_level,
+        retryable=False,
+    )
     mark_product_created(
         message_id,
         created_product_id=created_product_id or f"SKIPPED_{failure_reason}",
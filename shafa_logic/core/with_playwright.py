@@ -1,4 +1,5 @@
 import os
+import time
 from pathlib import Path
 
 try:
@@ -40,6 +41,7 @@ from data.const import (
     get_price_markup,
 )
 from data.db import init_db, save_cookies, save_uploaded_product
+from utils.events import emit_event
 from utils.logging import log
 from utils.media import (
     cleanup_prepared_media_uploads,
@@ -82,6 +84,7 @@ def _main_impl() -> None:
     product_raw_data = product_data["product_raw_data"]
     parsed_data = product_data.get("parsed_data") or {}
     message_id = product_data["message_id"]
+    started_at = time.monotonic()
     photo_message_ids = get_product_photo_message_ids(product_data)
     product_name = product_raw_data.get("name") or parsed_data.get("name") or "—"
     log("INFO", f"Товар для создания: {product_name}.")
@@ -292,6 +295,12 @@ def _main_impl() -> None:
                         "API отклонил размер. "
                         "Обновляю размеры и повторяю создание товара...",
                     )
+                    emit_event(
+                        "product_retry",
+                        message_id=message_id,
+                        channel_id=channel_id,
+                        reason="INVALID_SIZE",
+                    )
                     try:
                         sizes = get_sizes(ctx, csrftoken, catalog_slug=catalog_slug)
                         log(
@@ -353,6 +362,14 @@ def _main_impl() -> None:
                     "OK",
                     f"Товар создан успешно. ID: {product_id}. Фото: {len(photo_ids)}.",
                 )
+                emit_event(
+                    "product_created",
+                    message_id=message_id,
+                    channel_id=channel_id,
+                    product_id=product_id,
+                    photos=len(photo_ids),
+                    duration_ms=round((time.monotonic() - started_at) * 1000),
+                )
                 reset_media_dir(media_dir)
                 log("INFO", "Фото удалены после создания товара.")
             except Exception as exc:
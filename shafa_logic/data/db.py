@@ -3,9 +3,10 @@ import os
 import sqlite3
 import time
 import uuid
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Optional
 from urllib.parse import urlparse
 import re
 
@@ -20,6 +21,8 @@ from data.size_mapping import normalize_size_text
 _COOKIE_BASE_DOMAIN = "shafa.ua"
 _DB_INITIALIZED_PATHS: set[Path] = set()
 _CREATION_DB_INITIALIZED_PATHS: set[Path] = set()
+# Per database: the file signature a cookie signature was read at.
+_COOKIE_SIGNATURES: dict[Path, tuple[tuple, tuple]] = {}
 _SIZE_ID_BY_NAME_CACHE: Optional[dict[str, int]] = None
 _SIZE_ID_BY_NAME_CATALOG_CACHE: Optional[dict[tuple[str, str], int]] = None
 _SIZE_IDS_CACHE: Optional[set[int]] = None
@@ -27,6 +30,8 @@ _SIZE_IDS_CATALOG_CACHE: Optional[dict[str, set[int]]] = None
 _SIZE_MAPPING_ROWS_CACHE: Optional[dict[str, list[dict]]] = None
 _BRAND_ID_BY_NAME_CACHE: Optional[dict[str, int]] = None
 _BRAND_NAMES_CACHE: Optional[list[str]] = None
+_REFERENCE_DB_INITIALIZED_PATHS: set[Path] = set()
+_REFERENCE_DB_SIGNATURE: Optional[tuple] = None
 _DEFAULT_SQLITE_TIMEOUT_SECONDS = 60.0
 _DEFAULT_SQLITE_LOCK_RETRIES = 3
 _DEFAULT_SQLITE_LOCK_RETRY_DELAY_SECONDS = 0.25
@@ -234,6 +239,33 @@ def _create_telegram_products_table(conn: sqlite3.Connection) -> None:
     )
 
 
+_CREATION_QUEUE_PRIORITY_DEFINITION = (
+    "INTEGER GENERATED ALWAYS AS (CASE status "
+    f"WHEN '{CREATION_PRODUCT_STATUS_READY}' THEN 0 "
+    f"WHEN '{CREATION_PRODUCT_STATUS_NEW}' THEN 1 "
+    f"WHEN '{CREATION_PRODUCT_STATUS_PROCESSING}' THEN 2 "
+    "ELSE NULL END) VIRTUAL"
+)
+# Claimable rows: ready/new, or processing with an expired lease. The literal
+# ``queue_priority IS NOT NULL`` lets SQLite pick the partial claim index.
+_CREATION_CLAIMABLE_SQL = """
+    account_id = ?
+    AND queue_priority IS NOT NULL
+    AND (queue_priority < 2 OR processing_expires_at <= ?)
+"""
+_CREATION_CLAIM_ORDER_SQL = "queue_priority ASC, updated_at ASC, message_id ASC"
+# Columns a claim changes; ``release_unused_claims`` puts them back.
+_PRE_CLAIM_COLUMNS = (
+    "status",
+    "attempt_count",
+    "last_attempt_at",
+    "processing_started_at",
+    "processing_token",
+    "processing_expires_at",
+    "updated_at",
+)
+
+
 def _create_creation_products_table(conn: sqlite3.Connection) -> None:
     conn.executescript(
         """
@@ -278,6 +310,38 @@ def _create_creation_products_table(conn: sqlite3.Connection) -> None:
             ON creation_products(account_id, status, processing_expires_at, updated_at);
         """
     )
+    _ensure_creation_products_queue_schema(conn)
+
+
+def _ensure_creation_products_queue_schema(conn: sqlite3.Connection) -> None:
+    # queue_priority is derived from status, so every transition (including raw
+    # UPDATEs from tools) keeps it in sync without touching the write paths.
+    columns = {
+        str(row["name"])
+        for row in conn.execute("PRAGMA table_xinfo(creation_products)").fetchall()
+    }
+    if "queue_priority" not in columns:
+        try:
+            conn.execute(
+                "ALTER TABLE creation_products "
+                f"ADD COLUMN queue_priority {_CREATION_QUEUE_PRIORITY_DEFINITION}"
+            )
+        except sqlite3.OperationalError as exc:
+            if "duplicate column name" not in str(exc).casefold():
+                raise
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_creation_products_claim
+            ON creation_products(
+                account_id,
+                queue_priority,
+                updated_at,
+                message_id,
+                processing_expires_at
+            )
+            WHERE queue_priority IS NOT NULL
+        """
+    )
 
 
 def _create_shared_deactivation_tables(conn: sqlite3.Connection) -> None:
@@ -462,119 +526,292 @@ def _connect(db_path: Optional[Path] = None) -> sqlite3.Connection:
     return conn
 
 
+def _migrate_account_db_baseline(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS uploaded_products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id TEXT,
+            name TEXT,
+            brand INTEGER,
+            size INTEGER,
+            price INTEGER,
+            photo_ids TEXT,
+            raw_payload TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        CREATE INDEX IF NOT EXISTS idx_uploaded_products_product_id
+            ON uploaded_products(product_id);
+        CREATE INDEX IF NOT EXISTS idx_uploaded_products_created_at
+            ON uploaded_products(created_at);
+        CREATE TABLE IF NOT EXISTS invalid_uploaded_products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id TEXT,
+            name TEXT,
+            invalid_reason TEXT NOT NULL,
+            raw_payload TEXT,
+            created_at TEXT,
+            detected_at TEXT NOT NULL DEFAULT (datetime('now')),
+            processed INTEGER NOT NULL DEFAULT 0,
+            processed_at TEXT,
+            last_error TEXT,
+            UNIQUE(product_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_invalid_uploaded_products_pending
+            ON invalid_uploaded_products(processed, detected_at DESC);
+
+        CREATE TABLE IF NOT EXISTS telegram_fetch_state (
+            scope TEXT PRIMARY KEY,
+            last_fetch_at REAL,
+            lease_expires_at REAL,
+            lease_token TEXT,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        CREATE INDEX IF NOT EXISTS idx_telegram_fetch_state_updated
+            ON telegram_fetch_state(updated_at);
+
+        CREATE TABLE IF NOT EXISTS size_catalogs (
+            catalog_slug TEXT NOT NULL,
+            size_id INTEGER NOT NULL,
+            primary_size_name TEXT NOT NULL,
+            size_system TEXT,
+            PRIMARY KEY (catalog_slug, size_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_size_catalogs_name
+            ON size_catalogs(catalog_slug, primary_size_name);
+
+        CREATE TABLE IF NOT EXISTS size_catalog_mappings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            catalog_slug TEXT NOT NULL,
+            id_v3 INTEGER,
+            international TEXT,
+            eu TEXT,
+            ua TEXT,
+            id_v5_international INTEGER,
+            id_v5_eu INTEGER,
+            id_v5_ua INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_catalog
+            ON size_catalog_mappings(catalog_slug);
+        CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_international
+            ON size_catalog_mappings(catalog_slug, international);
+        CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_eu
+            ON size_catalog_mappings(catalog_slug, eu);
+        CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_ua
+            ON size_catalog_mappings(catalog_slug, ua);
+
+        CREATE TABLE IF NOT EXISTS brands (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS reference_data_refresh_state (
+            scope TEXT PRIMARY KEY,
+            last_refresh_at REAL,
+            lease_expires_at REAL,
+            lease_token TEXT,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+
+        CREATE TABLE IF NOT EXISTS cookies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            domain TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value TEXT NOT NULL,
+            path TEXT NOT NULL DEFAULT '/',
+            expires REAL,
+            http_only INTEGER NOT NULL DEFAULT 0,
+            secure INTEGER NOT NULL DEFAULT 0,
+            same_site TEXT,
+            last_updated TEXT NOT NULL DEFAULT (datetime('now')),
+            UNIQUE(domain, name, path)
+        );
+        CREATE INDEX IF NOT EXISTS idx_cookies_domain
+            ON cookies(domain);
+        """
+    )
+    _ensure_schema_migrations_table(conn)
+    _create_telegram_products_table(conn)
+    _create_telegram_scan_cursors_table(conn)
+    _create_invalid_uploaded_products_table(conn)
+    _ensure_uploaded_products_schema(conn)
+    _ensure_invalid_uploaded_products_schema(conn)
+    _ensure_telegram_products_schema(conn)
+    _ensure_telegram_fetch_state_schema(conn)
+    _ensure_telegram_scan_cursors_schema(conn)
+    _drop_legacy_telegram_channels_table(conn)
+    _ensure_size_catalogs_schema(conn)
+
+
+# Ordered (version, name, migration) steps for account and shared feed databases.
+# The applied version lives in PRAGMA user_version; append new steps instead of
+# editing applied ones so existing databases pick them up.
+_ACCOUNT_DB_MIGRATIONS: tuple[
+    tuple[int, str, Callable[[sqlite3.Connection], None]], ...
+] = (
+    (1, "account_db_baseline", _migrate_account_db_baseline),
+)
+ACCOUNT_DB_SCHEMA_VERSION = _ACCOUNT_DB_MIGRATIONS[-1][0]
+SCHEMA_MIGRATION_LEASE_SECONDS = 300
+SCHEMA_MIGRATION_POLL_SECONDS = 0.2
+
+
+def _read_account_db_schema_state(conn: sqlite3.Connection) -> tuple[int, bool]:
+    row = conn.execute(
+        """
+        SELECT
+            (SELECT user_version FROM pragma_user_version) AS version,
+            EXISTS (
+                SELECT 1
+                FROM sqlite_master
+                WHERE type = 'table' AND name = 'shared_telegram_products'
+            ) AS has_shared_tables
+        """
+    ).fetchone()
+    return int(row["version"] or 0), bool(row["has_shared_tables"])
+
+
+def _account_db_schema_is_current(
+    conn: sqlite3.Connection,
+    *,
+    with_shared_tables: bool,
+) -> bool:
+    version, has_shared_tables = _read_account_db_schema_state(conn)
+    return version >= ACCOUNT_DB_SCHEMA_VERSION and (
+        has_shared_tables or not with_shared_tables
+    )
+
+
+def _claim_schema_migration_lease(
+    conn: sqlite3.Connection,
+    *,
+    is_current: Callable[[sqlite3.Connection], bool],
+    lease_seconds: int = SCHEMA_MIGRATION_LEASE_SECONDS,
+) -> tuple[str, Optional[str]]:
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if is_current(conn):
+            conn.rollback()
+            return "current", None
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migration_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                lease_token TEXT,
+                lease_expires_at REAL
+            )
+            """
+        )
+        row = conn.execute(
+            """
+            SELECT lease_token, lease_expires_at
+            FROM schema_migration_lease
+            WHERE id = 1
+            """
+        ).fetchone()
+        if (
+            row is not None
+            and row["lease_token"]
+            and float(row["lease_expires_at"] or 0) > now
+        ):
+            conn.rollback()
+            return "in_progress", None
+        token = uuid.uuid4().hex
+        conn.execute(
+            """
+            INSERT INTO schema_migration_lease (id, lease_token, lease_expires_at)
+            VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                lease_token = excluded.lease_token,
+                lease_expires_at = excluded.lease_expires_at
+            """,
+            (token, now + max(int(lease_seconds), 1)),
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return "acquired", token
+
+
+def _release_schema_migration_lease(conn: sqlite3.Connection, lease_token: str) -> None:
+    conn.execute(
+        """
+        UPDATE schema_migration_lease
+        SET lease_token = NULL, lease_expires_at = NULL
+        WHERE id = 1 AND lease_token = ?
+        """,
+        (lease_token,),
+    )
+    conn.commit()
+
+
+def _apply_account_db_migrations(
+    conn: sqlite3.Connection,
+    *,
+    with_shared_tables: bool,
+) -> list[str]:
+    version, _has_shared_tables = _read_account_db_schema_state(conn)
+    applied: list[str] = []
+    for migration_version, name, migrate in _ACCOUNT_DB_MIGRATIONS:
+        if migration_version <= version:
+            continue
+        migrate(conn)
+        _record_schema_migration(conn, name, details={"version": migration_version})
+        conn.execute(f"PRAGMA user_version = {int(migration_version)}")
+        conn.commit()
+        applied.append(name)
+    if with_shared_tables:
+        _create_shared_deactivation_tables(conn)
+        conn.commit()
+    return applied
+
+
+def _migrate_with_lease(
+    conn: sqlite3.Connection,
+    db_path: Path,
+    *,
+    is_current: Callable[[sqlite3.Connection], bool],
+    apply: Callable[[sqlite3.Connection], object],
+) -> None:
+    """Run ``apply`` in one process at a time until ``is_current`` holds."""
+    deadline = time.monotonic() + SCHEMA_MIGRATION_LEASE_SECONDS
+    while True:
+        state, lease_token = _claim_schema_migration_lease(conn, is_current=is_current)
+        if state == "current":
+            return
+        if state == "acquired" and lease_token is not None:
+            try:
+                apply(conn)
+            finally:
+                _release_schema_migration_lease(conn, lease_token)
+            return
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Timed out waiting for schema migration of {db_path}")
+        time.sleep(SCHEMA_MIGRATION_POLL_SECONDS)
+
+
 def init_db(db_path: Optional[Path] = None) -> None:
     global _DB_INITIALIZED_PATHS
     db_path = Path(db_path) if db_path is not None else _account_db_path()
     db_path.parent.mkdir(parents=True, exist_ok=True)
+    with_shared_tables = db_path == _telegram_products_db_path()
     with _connect(db_path) as conn:
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS uploaded_products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id TEXT,
-                name TEXT,
-                brand INTEGER,
-                size INTEGER,
-                price INTEGER,
-                photo_ids TEXT,
-                raw_payload TEXT,
-                created_at TEXT NOT NULL DEFAULT (datetime('now'))
-            );
-            CREATE INDEX IF NOT EXISTS idx_uploaded_products_product_id
-                ON uploaded_products(product_id);
-            CREATE INDEX IF NOT EXISTS idx_uploaded_products_created_at
-                ON uploaded_products(created_at);
-            CREATE TABLE IF NOT EXISTS invalid_uploaded_products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id TEXT,
-                name TEXT,
-                invalid_reason TEXT NOT NULL,
-                raw_payload TEXT,
-                created_at TEXT,
-                detected_at TEXT NOT NULL DEFAULT (datetime('now')),
-                processed INTEGER NOT NULL DEFAULT 0,
-                processed_at TEXT,
-                last_error TEXT,
-                UNIQUE(product_id)
-            );
-            CREATE INDEX IF NOT EXISTS idx_invalid_uploaded_products_pending
-                ON invalid_uploaded_products(processed, detected_at DESC);
-
-            CREATE TABLE IF NOT EXISTS telegram_fetch_state (
-                scope TEXT PRIMARY KEY,
-                last_fetch_at REAL,
-                lease_expires_at REAL,
-                lease_token TEXT,
-                updated_at TEXT NOT NULL DEFAULT (datetime('now'))
-            );
-            CREATE INDEX IF NOT EXISTS idx_telegram_fetch_state_updated
-                ON telegram_fetch_state(updated_at);
-
-            CREATE TABLE IF NOT EXISTS size_catalogs (
-                catalog_slug TEXT NOT NULL,
-                size_id INTEGER NOT NULL,
-                primary_size_name TEXT NOT NULL,
-                size_system TEXT,
-                PRIMARY KEY (catalog_slug, size_id)
-            );
-            CREATE INDEX IF NOT EXISTS idx_size_catalogs_name
-                ON size_catalogs(catalog_slug, primary_size_name);
-
-            CREATE TABLE IF NOT EXISTS size_catalog_mappings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                catalog_slug TEXT NOT NULL,
-                id_v3 INTEGER,
-                international TEXT,
-                eu TEXT,
-                ua TEXT,
-                id_v5_international INTEGER,
-                id_v5_eu INTEGER,
-                id_v5_ua INTEGER
-            );
-            CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_catalog
-                ON size_catalog_mappings(catalog_slug);
-            CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_international
-                ON size_catalog_mappings(catalog_slug, international);
-            CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_eu
-                ON size_catalog_mappings(catalog_slug, eu);
-            CREATE INDEX IF NOT EXISTS idx_size_catalog_mappings_ua
-                ON size_catalog_mappings(catalog_slug, ua);
-
-            CREATE TABLE IF NOT EXISTS brands (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS cookies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                domain TEXT NOT NULL,
-                name TEXT NOT NULL,
-                value TEXT NOT NULL,
-                path TEXT NOT NULL DEFAULT '/',
-                expires REAL,
-                http_only INTEGER NOT NULL DEFAULT 0,
-                secure INTEGER NOT NULL DEFAULT 0,
-                same_site TEXT,
-                last_updated TEXT NOT NULL DEFAULT (datetime('now')),
-                UNIQUE(domain, name, path)
-            );
-            CREATE INDEX IF NOT EXISTS idx_cookies_domain
-                ON cookies(domain);
-            """
-        )
-        _ensure_schema_migrations_table(conn)
-        _create_telegram_products_table(conn)
-        if db_path == _telegram_products_db_path():
-            _create_shared_deactivation_tables(conn)
-        _create_telegram_scan_cursors_table(conn)
-        _create_invalid_uploaded_products_table(conn)
-        _ensure_uploaded_products_schema(conn)
-        _ensure_invalid_uploaded_products_schema(conn)
-        _ensure_telegram_products_schema(conn)
-        _ensure_telegram_fetch_state_schema(conn)
-        _ensure_telegram_scan_cursors_schema(conn)
-        _drop_legacy_telegram_channels_table(conn)
-        _ensure_size_catalogs_schema(conn)
+        # Fast path: one read, no write transaction, for an up-to-date schema.
+        if not _account_db_schema_is_current(
+            conn, with_shared_tables=with_shared_tables
+        ):
+            _migrate_with_lease(
+                conn,
+                db_path,
+                is_current=lambda current: _account_db_schema_is_current(
+                    current, with_shared_tables=with_shared_tables
+                ),
+                apply=lambda current: _apply_account_db_migrations(
+                    current, with_shared_tables=with_shared_tables
+                ),
+            )
     _DB_INITIALIZED_PATHS.add(db_path)
 
 
@@ -606,16 +843,208 @@ def _creation_products_db_path() -> Path:
     return configured
 
 
+# Ordered (version, name, migration) steps for the shared creation queue
+# database, versioned in PRAGMA user_version like _ACCOUNT_DB_MIGRATIONS.
+_CREATION_DB_MIGRATIONS: tuple[
+    tuple[int, str, Callable[[sqlite3.Connection], None]], ...
+] = (
+    (1, "creation_db_baseline", _create_creation_products_table),
+)
+CREATION_DB_SCHEMA_VERSION = _CREATION_DB_MIGRATIONS[-1][0]
+
+
+def _read_user_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT user_version FROM pragma_user_version").fetchone()
+    return int(row[0] or 0)
+
+
+def _creation_db_schema_is_current(conn: sqlite3.Connection) -> bool:
+    return _read_user_version(conn) >= CREATION_DB_SCHEMA_VERSION
+
+
+def _apply_creation_db_migrations(conn: sqlite3.Connection) -> list[str]:
+    version = _read_user_version(conn)
+    applied: list[str] = []
+    for migration_version, name, migrate in _CREATION_DB_MIGRATIONS:
+        if migration_version <= version:
+            continue
+        migrate(conn)
+        _record_schema_migration(conn, name, details={"version": migration_version})
+        conn.execute(f"PRAGMA user_version = {int(migration_version)}")
+        conn.commit()
+        applied.append(name)
+    return applied
+
+
 def _ensure_creation_db_initialized(db_path: Optional[Path] = None) -> None:
     resolved_db_path = Path(db_path) if db_path is not None else _creation_products_db_path()
     if resolved_db_path in _CREATION_DB_INITIALIZED_PATHS:
         return
     resolved_db_path.parent.mkdir(parents=True, exist_ok=True)
     with _connect(resolved_db_path) as conn:
-        _create_creation_products_table(conn)
+        # Fast path: a single user_version read for an up-to-date schema.
+        if not _creation_db_schema_is_current(conn):
+            _migrate_with_lease(
+                conn,
+                resolved_db_path,
+                is_current=_creation_db_schema_is_current,
+                apply=_apply_creation_db_migrations,
+            )
     _CREATION_DB_INITIALIZED_PATHS.add(resolved_db_path)
 
 
+def reference_data_shared() -> bool:
+    return bool(os.getenv("SHAFA_REFERENCE_DATA_DB_PATH", "").strip())
+
+
+def reference_data_db_path() -> Optional[Path]:
+    configured = os.getenv("SHAFA_REFERENCE_DATA_DB_PATH", "").strip()
+    return Path(configured) if configured else None
+
+
+def _reference_data_db_path() -> Path:
+    return reference_data_db_path() or _account_db_path()
+
+
+def _create_reference_data_tables(conn: sqlite3.Connection) -> None:
+    _ensure_size_catalogs_schema(conn)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS brands (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reference_data_refresh_state (
+            scope TEXT PRIMARY KEY,
+            last_refresh_at REAL,
+            lease_expires_at REAL,
+            lease_token TEXT,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """
+    )
+
+
+def _ensure_reference_db_initialized(db_path: Optional[Path] = None) -> Path:
+    resolved_db_path = Path(db_path) if db_path is not None else _reference_data_db_path()
+    if resolved_db_path == _account_db_path():
+        _ensure_db_initialized(resolved_db_path)
+        return resolved_db_path
+    if resolved_db_path in _REFERENCE_DB_INITIALIZED_PATHS:
+        return resolved_db_path
+    resolved_db_path.parent.mkdir(parents=True, exist_ok=True)
+    with _connect(resolved_db_path) as conn:
+        _create_reference_data_tables(conn)
+        conn.commit()
+        _seed_reference_data_from_account_db(conn, _account_db_path())
+    _REFERENCE_DB_INITIALIZED_PATHS.add(resolved_db_path)
+    return resolved_db_path
+
+
+def _seed_reference_data_from_account_db(
+    conn: sqlite3.Connection,
+    account_db_path: Path,
+) -> None:
+    if not account_db_path.exists():
+        return
+    row = conn.execute(
+        """
+        SELECT
+            EXISTS(SELECT 1 FROM brands) AS has_brands,
+            EXISTS(SELECT 1 FROM size_catalogs) AS has_sizes
+        """
+    ).fetchone()
+    if row["has_brands"] and row["has_sizes"]:
+        return
+    seed_tables = []
+    if not row["has_brands"]:
+        seed_tables.append(("brands", "id, name"))
+    if not row["has_sizes"]:
+        seed_tables.append(
+            ("size_catalogs", "catalog_slug, size_id, primary_size_name, size_system")
+        )
+        seed_tables.append(
+            (
+                "size_catalog_mappings",
+                "catalog_slug, id_v3, international, eu, ua, "
+                "id_v5_international, id_v5_eu, id_v5_ua",
+            )
+        )
+    conn.execute("ATTACH DATABASE ? AS account_reference", (str(account_db_path),))
+    try:
+        for table_name, columns in seed_tables:
+            exists = conn.execute(
+                """
+                SELECT 1
+                FROM account_reference.sqlite_master
+                WHERE type = 'table' AND name = ?
+                """,
+                (table_name,),
+            ).fetchone()
+            if not exists:
+                continue
+            account_columns = {
+                str(column["name"])
+                for column in conn.execute(
+                    f"PRAGMA account_reference.table_info({table_name})"
+                ).fetchall()
+            }
+            if not {column.strip() for column in columns.split(",")} <= account_columns:
+                continue
+            conn.execute(
+                f"""
+                INSERT OR IGNORE INTO main.{table_name} ({columns})
+                SELECT {columns} FROM account_reference.{table_name}
+                """
+            )
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE account_reference")
+
+
+def _db_file_signature(db_path: Path) -> tuple:
+    wal_path = db_path.with_name(f"{db_path.name}-wal")
+    signature: list[Optional[tuple[int, int]]] = []
+    for path in (db_path, wal_path):
+        try:
+            stat = path.stat()
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _reset_reference_caches() -> None:
+    global _SIZE_ID_BY_NAME_CACHE, _SIZE_ID_BY_NAME_CATALOG_CACHE
+    global _SIZE_IDS_CACHE, _SIZE_IDS_CATALOG_CACHE
+    global _SIZE_MAPPING_ROWS_CACHE, _BRAND_ID_BY_NAME_CACHE, _BRAND_NAMES_CACHE
+    _SIZE_ID_BY_NAME_CACHE = None
+    _SIZE_ID_BY_NAME_CATALOG_CACHE = None
+    _SIZE_IDS_CACHE = None
+    _SIZE_IDS_CATALOG_CACHE = None
+    _SIZE_MAPPING_ROWS_CACHE = None
+    _BRAND_ID_BY_NAME_CACHE = None
+    _BRAND_NAMES_CACHE = None
+
+
+def _drop_stale_reference_caches() -> None:
+    # Another account process may refresh the shared file; its signature tells
+    # us when the in-process lookups need to be rebuilt.
+    global _REFERENCE_DB_SIGNATURE
+    shared_db_path = reference_data_db_path()
+    if shared_db_path is None:
+        return
+    signature = (shared_db_path, _db_file_signature(shared_db_path))
+    if signature != _REFERENCE_DB_SIGNATURE:
+        _reset_reference_caches()
+        _REFERENCE_DB_SIGNATURE = signature
+
+
 def _normalize_catalog_slug(catalog_slug: Optional[str]) -> Optional[str]:
     if catalog_slug is None:
         return None
@@ -655,6 +1084,7 @@ def _load_sizes_cache() -> tuple[
 ]:
     global _SIZE_ID_BY_NAME_CACHE, _SIZE_ID_BY_NAME_CATALOG_CACHE
     global _SIZE_IDS_CACHE, _SIZE_IDS_CATALOG_CACHE
+    _drop_stale_reference_caches()
     if (
         _SIZE_ID_BY_NAME_CACHE is not None
         and _SIZE_ID_BY_NAME_CATALOG_CACHE is not None
@@ -667,8 +1097,8 @@ def _load_sizes_cache() -> tuple[
             _SIZE_IDS_CACHE,
             _SIZE_IDS_CATALOG_CACHE,
         )
-    _ensure_db_initialized()
-    with _connect() as conn:
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
         rows = conn.execute(
             """
             SELECT catalog_slug, size_id, primary_size_name
@@ -714,10 +1144,11 @@ def _load_sizes_cache() -> tuple[
 
 def _load_size_mapping_rows_cache() -> dict[str, list[dict]]:
     global _SIZE_MAPPING_ROWS_CACHE
+    _drop_stale_reference_caches()
     if _SIZE_MAPPING_ROWS_CACHE is not None:
         return _SIZE_MAPPING_ROWS_CACHE
-    _ensure_db_initialized()
-    with _connect() as conn:
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
         rows = conn.execute(
             """
             SELECT
@@ -755,10 +1186,11 @@ def _load_size_mapping_rows_cache() -> dict[str, list[dict]]:
 
 def _load_brands_cache() -> tuple[dict[str, int], list[str]]:
     global _BRAND_ID_BY_NAME_CACHE, _BRAND_NAMES_CACHE
+    _drop_stale_reference_caches()
     if _BRAND_ID_BY_NAME_CACHE is not None and _BRAND_NAMES_CACHE is not None:
         return _BRAND_ID_BY_NAME_CACHE, _BRAND_NAMES_CACHE
-    _ensure_db_initialized()
-    with _connect() as conn:
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
         rows = conn.execute(
             """
             SELECT id, name
@@ -1852,25 +2284,56 @@ def sync_uploaded_products_from_shafa(products: list[dict]) -> dict[str, int]:
         )
 
     _ensure_db_initialized()
-    inserted = 0
-    updated = 0
-    deactivated = 0
     with _connect() as conn:
-        active_ids = [item["product_id"] for item in normalized_products]
-        if active_ids:
-            placeholders = ",".join(["?"] * len(active_ids))
-            cursor = conn.execute(
-                f"""
-                UPDATE uploaded_products
-                SET is_active = 0
-                WHERE product_id IS NOT NULL
-                  AND TRIM(product_id) != ''
-                  AND product_id NOT IN ({placeholders})
-                  AND COALESCE(is_active, 1) != 0
+        conn.executescript(
+            """
+            DROP TABLE IF EXISTS temp.shafa_sync_remote;
+            DROP TABLE IF EXISTS temp.shafa_sync_existing;
+            CREATE TEMP TABLE shafa_sync_remote (
+                seq INTEGER PRIMARY KEY,
+                product_id TEXT NOT NULL UNIQUE,
+                name,
+                brand,
+                size,
+                price,
+                photo_ids,
+                raw_payload,
+                shafa_created_at,
+                status_title
+            );
+            """
+        )
+        try:
+            conn.executemany(
+                """
+                INSERT INTO temp.shafa_sync_remote (
+                    product_id,
+                    name,
+                    brand,
+                    size,
+                    price,
+                    photo_ids,
+                    raw_payload,
+                    shafa_created_at,
+                    status_title
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                active_ids,
+                (
+                    (
+                        item["product_id"],
+                        item["name"],
+                        item["brand"],
+                        item["size"],
+                        item["price"],
+                        item["photo_ids"],
+                        item["raw_payload"],
+                        item["shafa_created_at"],
+                        item["status_title"],
+                    )
+                    for item in normalized_products
+                ),
             )
-        else:
             cursor = conn.execute(
                 """
                 UPDATE uploaded_products
@@ -1878,92 +2341,111 @@ def sync_uploaded_products_from_shafa(products: list[dict]) -> dict[str, int]:
                 WHERE product_id IS NOT NULL
                   AND TRIM(product_id) != ''
                   AND COALESCE(is_active, 1) != 0
+                  AND product_id NOT IN (
+                      SELECT product_id FROM temp.shafa_sync_remote
+                  )
                 """
             )
-        deactivated = int(cursor.rowcount or 0)
+            deactivated = int(cursor.rowcount or 0)
 
-        for item in normalized_products:
-            existing = conn.execute(
+            # The newest local row per remote product is the one kept in sync;
+            # older duplicates are switched off, as the per-row loop used to do.
+            conn.execute(
                 """
-                SELECT id
-                FROM uploaded_products
-                WHERE product_id = ?
-                ORDER BY id DESC
-                LIMIT 1
-                """,
-                (item["product_id"],),
-            ).fetchone()
-            if existing is None:
+                CREATE TEMP TABLE shafa_sync_existing AS
+                SELECT uploaded.product_id AS product_id, MAX(uploaded.id) AS id
+                FROM uploaded_products AS uploaded
+                JOIN temp.shafa_sync_remote AS remote
+                  ON remote.product_id = uploaded.product_id
+                GROUP BY uploaded.product_id
+                """
+            )
+            updated = int(
                 conn.execute(
-                    """
-                    INSERT INTO uploaded_products (
-                        product_id,
-                        name,
-                        brand,
-                        size,
-                        price,
-                        photo_ids,
-                        raw_payload,
-                        created_at,
-                        shafa_created_at,
-                        status_title,
-                        is_active
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, datetime('now')), ?, ?, 1)
-                    """,
-                    (
-                        item["product_id"],
-                        item["name"],
-                        item["brand"],
-                        item["size"],
-                        item["price"],
-                        item["photo_ids"],
-                        item["raw_payload"],
-                        item["shafa_created_at"],
-                        item["shafa_created_at"],
-                        item["status_title"],
-                    ),
-                )
-                inserted += 1
-                continue
-
+                    "SELECT COUNT(*) FROM temp.shafa_sync_existing"
+                ).fetchone()[0]
+            )
             conn.execute(
                 """
                 UPDATE uploaded_products
-                SET name = ?,
-                    brand = ?,
-                    size = ?,
-                    price = ?,
-                    photo_ids = ?,
-                    raw_payload = ?,
-                    created_at = COALESCE(?, created_at),
-                    shafa_created_at = COALESCE(?, shafa_created_at),
-                    status_title = ?,
-                    is_active = 1
-                WHERE id = ?
-                """,
-                (
-                    item["name"],
-                    item["brand"],
-                    item["size"],
-                    item["price"],
-                    item["photo_ids"],
-                    item["raw_payload"],
-                    item["shafa_created_at"],
-                    item["shafa_created_at"],
-                    item["status_title"],
-                    int(existing["id"]),
-                ),
+                SET (
+                    name,
+                    brand,
+                    size,
+                    price,
+                    photo_ids,
+                    raw_payload,
+                    created_at,
+                    shafa_created_at,
+                    status_title,
+                    is_active
+                ) = (
+                    SELECT
+                        remote.name,
+                        remote.brand,
+                        remote.size,
+                        remote.price,
+                        remote.photo_ids,
+                        remote.raw_payload,
+                        COALESCE(remote.shafa_created_at, uploaded_products.created_at),
+                        COALESCE(
+                            remote.shafa_created_at,
+                            uploaded_products.shafa_created_at
+                        ),
+                        remote.status_title,
+                        1
+                    FROM temp.shafa_sync_remote AS remote
+                    WHERE remote.product_id = uploaded_products.product_id
+                )
+                WHERE id IN (SELECT id FROM temp.shafa_sync_existing)
+                """
             )
             conn.execute(
                 """
                 UPDATE uploaded_products
                 SET is_active = 0
-                WHERE product_id = ? AND id != ?
-                """,
-                (item["product_id"], int(existing["id"])),
+                WHERE product_id IN (SELECT product_id FROM temp.shafa_sync_existing)
+                  AND id NOT IN (SELECT id FROM temp.shafa_sync_existing)
+                """
             )
-            updated += 1
+            cursor = conn.execute(
+                """
+                INSERT INTO uploaded_products (
+                    product_id,
+                    name,
+                    brand,
+                    size,
+                    price,
+                    photo_ids,
+                    raw_payload,
+                    created_at,
+                    shafa_created_at,
+                    status_title,
+                    is_active
+                )
+                SELECT
+                    product_id,
+                    name,
+                    brand,
+                    size,
+                    price,
+                    photo_ids,
+                    raw_payload,
+                    COALESCE(shafa_created_at, datetime('now')),
+                    shafa_created_at,
+                    status_title,
+                    1
+                FROM temp.shafa_sync_remote
+                WHERE product_id NOT IN (
+                    SELECT product_id FROM temp.shafa_sync_existing
+                )
+                ORDER BY seq
+                """
+            )
+            inserted = int(cursor.rowcount or 0)
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.shafa_sync_remote")
+            conn.execute("DROP TABLE IF EXISTS temp.shafa_sync_existing")
 
     return {
         "total": len(normalized_products),
@@ -2100,73 +2582,91 @@ def list_uploaded_product_payloads(limit: Optional[int] = None) -> list[dict]:
     ]
 
 
+def _size_id_key(size_id: object) -> object:
+    try:
+        return int(size_id)
+    except (TypeError, ValueError):
+        return size_id
+
+
 def save_sizes(
     sizes: list[dict],
     catalog_slug: Optional[str] = None,
     replace_catalog: bool = False,
 ) -> None:
-    global _SIZE_ID_BY_NAME_CACHE, _SIZE_ID_BY_NAME_CATALOG_CACHE
-    global _SIZE_IDS_CACHE, _SIZE_IDS_CATALOG_CACHE
-    global _SIZE_MAPPING_ROWS_CACHE
     normalized_catalog_slug = _normalize_catalog_slug(catalog_slug)
     if normalized_catalog_slug is None:
         return
-    rows: list[tuple[str, object, str, Optional[str]]] = []
+    incoming: dict[object, tuple[str, Optional[str]]] = {}
     for size in sizes:
         size_id = size.get("id")
         primary_name = normalize_size_text(size.get("primarySizeName"))
         if size_id is None or not primary_name:
             continue
-        size_system = size.get("sizeSystem")
-        rows.append((normalized_catalog_slug, size_id, primary_name, size_system))
-    _ensure_db_initialized()
-    with _connect() as conn:
-        if replace_catalog:
-            conn.execute(
-                "DELETE FROM size_catalogs WHERE catalog_slug = ?",
+        incoming[_size_id_key(size_id)] = (primary_name, size.get("sizeSystem"))
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
+        existing = {
+            _size_id_key(row["size_id"]): (row["primary_size_name"], row["size_system"])
+            for row in conn.execute(
+                """
+                SELECT size_id, primary_size_name, size_system
+                FROM size_catalogs
+                WHERE catalog_slug = ?
+                """,
                 (normalized_catalog_slug,),
+            ).fetchall()
+        }
+        stale_rows = (
+            [
+                (normalized_catalog_slug, size_id)
+                for size_id in existing
+                if size_id not in incoming
+            ]
+            if replace_catalog
+            else []
+        )
+        changed_rows = [
+            (normalized_catalog_slug, size_id, primary_name, size_system)
+            for size_id, (primary_name, size_system) in incoming.items()
+            if existing.get(size_id) != (primary_name, size_system)
+        ]
+        if stale_rows:
+            conn.executemany(
+                "DELETE FROM size_catalogs WHERE catalog_slug = ? AND size_id = ?",
+                stale_rows,
             )
-        if not rows:
-            _SIZE_ID_BY_NAME_CACHE = None
-            _SIZE_ID_BY_NAME_CATALOG_CACHE = None
-            _SIZE_IDS_CACHE = None
-            _SIZE_IDS_CATALOG_CACHE = None
-            return
-        conn.executemany(
-            """
-            INSERT INTO size_catalogs (
-                catalog_slug,
-                size_id,
-                primary_size_name,
-                size_system
+        if changed_rows:
+            conn.executemany(
+                """
+                INSERT INTO size_catalogs (
+                    catalog_slug,
+                    size_id,
+                    primary_size_name,
+                    size_system
+                )
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(catalog_slug, size_id) DO UPDATE SET
+                    primary_size_name = excluded.primary_size_name,
+                    size_system = excluded.size_system
+                """,
+                changed_rows,
             )
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(catalog_slug, size_id) DO UPDATE SET
-                primary_size_name = excluded.primary_size_name,
-                size_system = excluded.size_system
-            """,
-            rows,
-        )
-    _SIZE_ID_BY_NAME_CACHE = None
-    _SIZE_ID_BY_NAME_CATALOG_CACHE = None
-    _SIZE_IDS_CACHE = None
-    _SIZE_IDS_CATALOG_CACHE = None
-    _SIZE_MAPPING_ROWS_CACHE = None
+    if stale_rows or changed_rows:
+        _reset_reference_caches()
 
 
 def save_size_mappings(
     mappings: list[dict],
     catalog_slug: Optional[str] = None,
 ) -> None:
-    global _SIZE_MAPPING_ROWS_CACHE
     normalized_catalog_slug = _normalize_catalog_slug(catalog_slug)
     if normalized_catalog_slug is None:
         return
-    rows: list[tuple[object, ...]] = []
+    incoming: Counter[tuple[object, ...]] = Counter()
     for mapping in mappings:
-        rows.append(
+        incoming[
             (
-                normalized_catalog_slug,
                 mapping.get("id_v3"),
                 normalize_size_text(mapping.get("international")),
                 normalize_size_text(mapping.get("eu")),
@@ -2175,14 +2675,44 @@ def save_size_mappings(
                 mapping.get("id_v5_eu"),
                 mapping.get("id_v5_ua"),
             )
-        )
-    _ensure_db_initialized()
-    with _connect() as conn:
-        conn.execute(
-            "DELETE FROM size_catalog_mappings WHERE catalog_slug = ?",
+        ] += 1
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
+        existing_ids: dict[tuple[object, ...], list[int]] = {}
+        for row in conn.execute(
+            """
+            SELECT
+                id,
+                id_v3,
+                international,
+                eu,
+                ua,
+                id_v5_international,
+                id_v5_eu,
+                id_v5_ua
+            FROM size_catalog_mappings
+            WHERE catalog_slug = ?
+            ORDER BY id
+            """,
             (normalized_catalog_slug,),
-        )
-        if rows:
+        ).fetchall():
+            key = tuple(row[column] for column in row.keys()[1:])
+            existing_ids.setdefault(key, []).append(int(row["id"]))
+        stale_ids: list[tuple[int]] = []
+        for key, row_ids in existing_ids.items():
+            surplus = len(row_ids) - incoming.get(key, 0)
+            if surplus > 0:
+                stale_ids.extend((row_id,) for row_id in row_ids[-surplus:])
+        new_rows: list[tuple[object, ...]] = []
+        for key, count in incoming.items():
+            missing = count - len(existing_ids.get(key, []))
+            new_rows.extend([(normalized_catalog_slug, *key)] * max(missing, 0))
+        if stale_ids:
+            conn.executemany(
+                "DELETE FROM size_catalog_mappings WHERE id = ?",
+                stale_ids,
+            )
+        if new_rows:
             conn.executemany(
                 """
                 INSERT INTO size_catalog_mappings (
@@ -2197,26 +2727,38 @@ def save_size_mappings(
                 )
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                rows,
+                new_rows,
             )
-    _SIZE_MAPPING_ROWS_CACHE = None
+    if stale_ids or new_rows:
+        _reset_reference_caches()
 
 
 def save_brands(brands: list[dict]) -> None:
     global _BRAND_ID_BY_NAME_CACHE, _BRAND_NAMES_CACHE
     if not brands:
         return
-    rows: list[tuple[object, str]] = []
+    incoming: dict[object, str] = {}
     for brand in brands:
         brand_id = brand.get("id")
         name = brand.get("name")
         if brand_id is None or not name:
             continue
-        rows.append((brand_id, str(name)))
-    if not rows:
+        incoming[_size_id_key(brand_id)] = str(name)
+    if not incoming:
         return
-    _ensure_db_initialized()
-    with _connect() as conn:
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
+        existing = {
+            _size_id_key(row["id"]): row["name"]
+            for row in conn.execute("SELECT id, name FROM brands").fetchall()
+        }
+        rows = [
+            (brand_id, name)
+            for brand_id, name in incoming.items()
+            if existing.get(brand_id) != name
+        ]
+        if not rows:
+            return
         conn.executemany(
             """
             INSERT INTO brands (id, name)
@@ -2240,6 +2782,88 @@ def save_brands(brands: list[dict]) -> None:
         _BRAND_NAMES_CACHE = sorted(names_set)
 
 
+def claim_reference_data_refresh(
+    scope: str,
+    min_interval_seconds: float,
+    lease_seconds: float,
+    *,
+    now_ts: Optional[float] = None,
+) -> tuple[str, Optional[str]]:
+    normalized_scope = str(scope or "").strip().casefold() or "default"
+    interval_seconds = max(float(min_interval_seconds), 0.0)
+    lease_duration_seconds = max(float(lease_seconds), 1.0)
+    current_ts = float(now_ts if now_ts is not None else time.time())
+    lease_token = uuid.uuid4().hex
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
+        conn.execute(
+            """
+            INSERT INTO reference_data_refresh_state (scope, updated_at)
+            VALUES (?, datetime('now'))
+            ON CONFLICT(scope) DO NOTHING
+            """,
+            (normalized_scope,),
+        )
+        cursor = conn.execute(
+            """
+            UPDATE reference_data_refresh_state
+            SET lease_expires_at = ?,
+                lease_token = ?,
+                updated_at = datetime('now')
+            WHERE scope = ?
+              AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+              AND (last_refresh_at IS NULL OR last_refresh_at <= ?)
+            """,
+            (
+                current_ts + lease_duration_seconds,
+                lease_token,
+                normalized_scope,
+                current_ts,
+                current_ts - interval_seconds,
+            ),
+        )
+        if cursor.rowcount == 1:
+            return "acquired", lease_token
+        row = conn.execute(
+            """
+            SELECT lease_expires_at
+            FROM reference_data_refresh_state
+            WHERE scope = ?
+            """,
+            (normalized_scope,),
+        ).fetchone()
+    if row and row["lease_expires_at"] is not None and float(row["lease_expires_at"]) > current_ts:
+        return "in_progress", None
+    return "not_due", None
+
+
+def finish_reference_data_refresh(
+    scope: str,
+    lease_token: str,
+    *,
+    success: bool,
+    finished_at_ts: Optional[float] = None,
+) -> None:
+    normalized_scope = str(scope or "").strip().casefold() or "default"
+    token = str(lease_token or "").strip()
+    if not token:
+        return
+    finished_ts = float(finished_at_ts if finished_at_ts is not None else time.time())
+    reference_db_path = _ensure_reference_db_initialized()
+    with _connect(reference_db_path) as conn:
+        conn.execute(
+            """
+            UPDATE reference_data_refresh_state
+            SET last_refresh_at = CASE WHEN ? THEN ? ELSE last_refresh_at END,
+                lease_expires_at = NULL,
+                lease_token = NULL,
+                updated_at = datetime('now')
+            WHERE scope = ? AND lease_token = ?
+            """,
+            (1 if success else 0, finished_ts, normalized_scope, token),
+        )
+
+
 def get_size_id_by_name(
     primary_size_name: str,
     catalog_slug: Optional[str] = None,
@@ -2585,40 +3209,14 @@ def list_ready_creation_products(
     _ensure_creation_db_initialized()
     with _connect(_creation_products_db_path()) as conn:
         rows = conn.execute(
-            """
+            f"""
             SELECT *
             FROM creation_products
-            WHERE account_id = ?
-              AND (
-                    status IN (?, ?)
-                    OR (
-                        status = ?
-                        AND processing_expires_at IS NOT NULL
-                        AND processing_expires_at <= ?
-                    )
-              )
-            ORDER BY
-                CASE status
-                    WHEN ? THEN 0
-                    WHEN ? THEN 1
-                    WHEN ? THEN 2
-                    ELSE 3
-                END,
-                datetime(updated_at) ASC,
-                message_id ASC
+            WHERE {_CREATION_CLAIMABLE_SQL}
+            ORDER BY {_CREATION_CLAIM_ORDER_SQL}
             LIMIT ?
             """,
-            (
-                normalized_account_id,
-                CREATION_PRODUCT_STATUS_READY,
-                CREATION_PRODUCT_STATUS_NEW,
-                CREATION_PRODUCT_STATUS_PROCESSING,
-                cutoff,
-                CREATION_PRODUCT_STATUS_READY,
-                CREATION_PRODUCT_STATUS_NEW,
-                CREATION_PRODUCT_STATUS_PROCESSING,
-                row_limit,
-            ),
+            (normalized_account_id, cutoff, row_limit),
         ).fetchall()
     return [_serialize_creation_product_row(row) for row in rows]
 
@@ -2628,52 +3226,64 @@ def claim_creation_product_for_creation(
     account_id: Optional[str] = None,
     lease_seconds: int = 900,
 ) -> Optional[dict]:
+    claimed = claim_creation_products_for_creation(
+        account_id=account_id,
+        limit=1,
+        lease_seconds=lease_seconds,
+    )
+    return claimed[0] if claimed else None
+
+
+def claim_creation_products_for_creation(
+    *,
+    account_id: Optional[str] = None,
+    limit: int = 1,
+    lease_seconds: int = 900,
+) -> list[dict]:
+    """Lease up to ``limit`` claimable rows in one write transaction.
+
+    The batch shares one ``processing_token``; rows a worker does not get to go
+    back via ``release_unused_claims`` or are reclaimed once the lease expires.
+    Each returned row carries its state from before the claim under
+    ``pre_claim_state`` so a release can restore it.
+    """
     normalized_account_id = _current_account_id(account_id)
+    row_limit = max(int(limit), 1)
     now = time.time()
     expires_at = now + max(int(lease_seconds), 1)
     token = uuid.uuid4().hex
     _ensure_creation_db_initialized()
     with _connect(_creation_products_db_path()) as conn:
         conn.execute("BEGIN IMMEDIATE")
-        row = conn.execute(
-            """
-            SELECT *
-            FROM creation_products
-            WHERE account_id = ?
-              AND (
-                    status IN (?, ?)
-                    OR (
-                        status = ?
-                        AND processing_expires_at IS NOT NULL
-                        AND processing_expires_at <= ?
-                    )
-              )
-            ORDER BY
-                CASE status
-                    WHEN ? THEN 0
-                    WHEN ? THEN 1
-                    WHEN ? THEN 2
-                    ELSE 3
-                END,
-                datetime(updated_at) ASC,
-                message_id ASC
-            LIMIT 1
-            """,
-            (
-                normalized_account_id,
-                CREATION_PRODUCT_STATUS_READY,
-                CREATION_PRODUCT_STATUS_NEW,
-                CREATION_PRODUCT_STATUS_PROCESSING,
-                now,
-                CREATION_PRODUCT_STATUS_READY,
-                CREATION_PRODUCT_STATUS_NEW,
-                CREATION_PRODUCT_STATUS_PROCESSING,
-            ),
-        ).fetchone()
-        if row is None:
-            return None
+        ids = [
+            int(row["id"])
+            for row in conn.execute(
+                f"""
+                SELECT id
+                FROM creation_products
+                WHERE {_CREATION_CLAIMABLE_SQL}
+                ORDER BY {_CREATION_CLAIM_ORDER_SQL}
+                LIMIT ?
+                """,
+                (normalized_account_id, now, row_limit),
+            ).fetchall()
+        ]
+        if not ids:
+            return []
+        placeholders = ", ".join("?" for _ in ids)
+        pre_claim_states = {
+            int(row["id"]): {column: row[column] for column in _PRE_CLAIM_COLUMNS}
+            for row in conn.execute(
+                f"""
+                SELECT id, {", ".join(_PRE_CLAIM_COLUMNS)}
+                FROM creation_products
+                WHERE id IN ({placeholders})
+                """,
+                ids,
+            ).fetchall()
+        }
         cursor = conn.execute(
-            """
+            f"""
             UPDATE creation_products
             SET status = ?,
                 attempt_count = COALESCE(attempt_count, 0) + 1,
@@ -2682,38 +3292,85 @@ def claim_creation_product_for_creation(
                 processing_token = ?,
                 processing_expires_at = ?,
                 updated_at = datetime('now')
-            WHERE id = ?
-              AND account_id = ?
-              AND (
-                    status IN (?, ?)
-                    OR (
-                        status = ?
-                        AND processing_expires_at IS NOT NULL
-                        AND processing_expires_at <= ?
-                    )
-              )
+            WHERE id IN ({placeholders})
+              AND {_CREATION_CLAIMABLE_SQL}
             """,
             (
                 CREATION_PRODUCT_STATUS_PROCESSING,
                 now,
                 token,
                 expires_at,
-                row["id"],
+                *ids,
                 normalized_account_id,
-                CREATION_PRODUCT_STATUS_READY,
-                CREATION_PRODUCT_STATUS_NEW,
-                CREATION_PRODUCT_STATUS_PROCESSING,
                 now,
             ),
         )
-        if cursor.rowcount != 1:
+        if cursor.rowcount < 1:
             conn.rollback()
-            return None
-        claimed = conn.execute(
-            "SELECT * FROM creation_products WHERE id = ?",
-            (row["id"],),
-        ).fetchone()
-    return _serialize_creation_product_row(claimed) if claimed is not None else None
+            return []
+        rows = conn.execute(
+            f"""
+            SELECT *
+            FROM creation_products
+            WHERE processing_token = ? AND id IN ({placeholders})
+            """,
+            (token, *ids),
+        ).fetchall()
+    order = {row_id: index for index, row_id in enumerate(ids)}
+    rows = sorted(rows, key=lambda row: order[int(row["id"])])
+    claimed = []
+    for row in rows:
+        item = _serialize_creation_product_row(row)
+        item["pre_claim_state"] = pre_claim_states.get(int(row["id"]))
+        claimed.append(item)
+    return claimed
+
+
+def release_unused_claims(
+    claims: Iterable[dict],
+    *,
+    account_id: Optional[str] = None,
+) -> int:
+    """Undo claims on leased rows that were never worked on.
+
+    Each row gets back the status, attempt count and timestamps recorded in
+    its ``pre_claim_state``, so it keeps its place in the queue. Only rows
+    still held under the claim's own token are released, so a lease that
+    already expired and was reclaimed by another worker stays untouched.
+    Claims without a recorded state are left to their lease.
+    """
+    normalized_account_id = _current_account_id(account_id)
+    params = [
+        (
+            *(claim["pre_claim_state"][column] for column in _PRE_CLAIM_COLUMNS),
+            normalized_account_id,
+            int(claim["id"]),
+            str(claim.get("processing_token") or ""),
+            CREATION_PRODUCT_STATUS_PROCESSING,
+        )
+        for claim in claims
+        if claim.get("id") is not None
+        and claim.get("processing_token")
+        and claim.get("pre_claim_state")
+    ]
+    if not params:
+        return 0
+    _ensure_creation_db_initialized()
+    with _connect(_creation_products_db_path()) as conn:
+        before = conn.total_changes
+        conn.executemany(
+            f"""
+            UPDATE creation_products
+            SET {", ".join(f"{column} = ?" for column in _PRE_CLAIM_COLUMNS)}
+            WHERE account_id = ?
+              AND id = ?
+              AND processing_token = ?
+              AND status = ?
+            """,
+            params,
+        )
+        released = conn.total_changes - before
+    return released
 
 
 def mark_creation_product_created(
@@ -6098,7 +6755,7 @@ def save_cookies(cookies: list[dict]) -> None:
                     http_only = excluded.http_only,
                     secure = excluded.secure,
                     same_site = excluded.same_site,
-                    last_updated = datetime('now')
+                    last_updated = strftime('%Y-%m-%d %H:%M:%f', 'now')
                 """,
                 (
                     domain,
@@ -6158,6 +6815,33 @@ def load_cookies(
     return cookies
 
 
+def cookies_db_signature(db_path: Optional[Path] = None) -> tuple:
+    """Return a value that changes when the stored cookies change.
+
+    It is read from the cookie rows, so writes to other tables keep it
+    stable. The rows are only queried after the database files changed.
+    """
+    resolved_db_path = Path(db_path) if db_path is not None else _account_db_path()
+    file_signature = _db_file_signature(resolved_db_path)
+    cached = _COOKIE_SIGNATURES.get(resolved_db_path)
+    if cached is not None and cached[0] == file_signature:
+        return cached[1]
+    if file_signature[0] is None:
+        return (None, None, None)
+    _ensure_db_initialized(resolved_db_path)
+    with _connect(resolved_db_path) as conn:
+        row = conn.execute(
+            """
+            SELECT COUNT(*) AS count, MAX(id) AS max_id,
+                   MAX(last_updated) AS last_updated
+            FROM cookies
+            """
+        ).fetchone()
+    signature = (int(row["count"]), row["max_id"], row["last_updated"])
+    _COOKIE_SIGNATURES[resolved_db_path] = (file_signature, signature)
+    return signature
+
+
 def delete_all_cookies() -> int:
     _ensure_db_initialized()
     with _connect() as conn:
@@ -16,6 +16,7 @@ install_safe_stdio()
 from telegram_subscription import complete_login, send_code, session_status, submit_password, sync_channels_from_runtime_config
 from utils.logging import log
 from utils.pipeline_activity import is_product_pipeline_active
+from utils.shutdown import install_sigterm_exit
 
 _ADD_CHANNEL = object()
 SHAFA_LOGIN_URL = "https://shafa.ua/uk/login"
@@ -1644,6 +1645,11 @@ def main(
             _auto_create_product(shafa=shafa)
         finally:
             stop_event.set()
+            from controller.data_controller import (
+                release_prefetched_creation_claims,
+            )
+
+            release_prefetched_creation_claims()
             scanner_thread.join(timeout=5)
         return
 
@@ -1684,6 +1690,7 @@ def parse_args():
 
 
 if __name__ == "__main__":
+    install_sigterm_exit()
     args = parse_args()
     try:
         main(
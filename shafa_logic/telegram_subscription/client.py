@@ -11,19 +11,33 @@ from pathlib import Path
 from typing import Any
 
 try:
+    from shafa_logic.utils.file_lock import (
+        open_lock_file,
+        release_file_lock,
+        try_acquire_file_lock,
+    )
     from shafa_logic.utils.proxy import (
+        TELEGRAM_PROXY_SCHEMES,
         RuntimeProxyConfig,
         build_telethon_proxy_settings,
         load_runtime_proxy_config,
         record_proxy_request_result,
     )
+    from shafa_logic.utils.proxy_scheduler import get_proxy_scheduler
 except ImportError:  # pragma: no cover - runtime script path fallback
+    from utils.file_lock import (  # type: ignore[no-redef]
+        open_lock_file,
+        release_file_lock,
+        try_acquire_file_lock,
+    )
     from utils.proxy import (  # type: ignore[no-redef]
+        TELEGRAM_PROXY_SCHEMES,
         RuntimeProxyConfig,
         build_telethon_proxy_settings,
         load_runtime_proxy_config,
         record_proxy_request_result,
     )
+    from utils.proxy_scheduler import get_proxy_scheduler  # type: ignore[no-redef]
 
 DEFAULT_SQLITE_TIMEOUT_SECONDS = 30.0
 _SESSION_LOCK_RETRY_INTERVAL_SECONDS = 0.1
@@ -61,6 +75,12 @@ def create_telegram_client(
         sqlite_timeout_seconds=sqlite_timeout_seconds,
     )
     resolved_proxy_config = proxy_config or load_runtime_proxy_config()
+    scheduler = get_proxy_scheduler(proxy_db_path)
+    if resolved_proxy_config is not None and scheduler is not None:
+        resolved_proxy_config = scheduler.select_config(
+            resolved_proxy_config,
+            schemes=TELEGRAM_PROXY_SCHEMES,
+        )
     client_kwargs: dict[str, Any] = {}
     if resolved_proxy_config is not None:
         client_kwargs["proxy"] = build_telethon_proxy_settings(resolved_proxy_config)
@@ -170,48 +190,6 @@ def _local_session_lock(lock_key: str) -> threading.Lock:
         return lock
 
 
-def _try_acquire_file_lock(handle) -> None:
-    if os.name == "nt":
-        import msvcrt
-
-        handle.seek(0)
-        try:
-            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
-        except OSError as exc:
-            raise BlockingIOError from exc
-        return
-
-    import fcntl
-
-    try:
-        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-    except BlockingIOError:
-        raise
-    except OSError as exc:
-        if exc.errno in {11, 13}:
-            raise BlockingIOError from exc
-        raise
-
-
-def _release_file_lock(handle) -> None:
-    if os.name == "nt":
-        import msvcrt
-
-        handle.seek(0)
-        try:
-            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
-        except OSError:
-            return
-        return
-
-    import fcntl
-
-    try:
-        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
-    except OSError:
-        return
-
-
 class SessionUsageLock:
     def __init__(self, session_path: str | Path) -> None:
         self.session_path = Path(session_path).expanduser()
@@ -227,14 +205,9 @@ class SessionUsageLock:
             return False
         self._local_lock_acquired = True
         self.lock_path.parent.mkdir(parents=True, exist_ok=True)
-        handle = open(self.lock_path, "a+b")
-        handle.seek(0, os.SEEK_END)
-        if handle.tell() == 0:
-            handle.write(b"0")
-            handle.flush()
-        handle.seek(0)
+        handle = open_lock_file(self.lock_path)
         try:
-            _try_acquire_file_lock(handle)
+            try_acquire_file_lock(handle)
         except BlockingIOError:
             handle.close()
             self._release_local_lock()
@@ -247,7 +220,7 @@ class SessionUsageLock:
         self._handle = None
         try:
             if handle is not None:
-                _release_file_lock(handle)
+                release_file_lock(handle)
                 handle.close()
         finally:
             self._release_local_lock()
@@ -299,6 +272,19 @@ class LockedTelegramClient:
         finally:
             await self._release_lock()
 
+    async def try_hold_session(self) -> bool:
+        """Take the session lock for an already connected client, if free."""
+        if self._lock_acquired:
+            return True
+        if not self._lock.try_acquire():
+            return False
+        self._lock_acquired = True
+        return True
+
+    async def release_session(self) -> None:
+        """Release the session lock but keep the connection open."""
+        await self._release_lock()
+
     async def __aenter__(self):
         await self._ensure_lock()
         try:
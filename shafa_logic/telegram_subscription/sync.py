@@ -15,6 +15,14 @@ from .telegram_channels import (
     parse_id_bot_response,
 )
 
+from .channel_cache import (
+    CachedChannel,
+    ChannelResolutionCache,
+    FloodWaitLimiter,
+    channel_link_metadata,
+    channel_resolve_concurrency,
+    flood_wait_seconds,
+)
 from .client import create_telegram_client
 
 if TYPE_CHECKING:
@@ -22,6 +30,7 @@ if TYPE_CHECKING:
 
 ID_BOT_USERNAME = "id_bot"
 RUNTIME_CONFIG_ENV = "SHAFA_TELEGRAM_CHANNEL_LINKS_FILE"
+SHARED_TELEGRAM_DB_ENV = "SHAFA_SHARED_TELEGRAM_DB_PATH"
 USERNAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]{3,}$")
 DEFAULT_CHANNEL_ALIAS = "main extra_photos"
 
@@ -206,9 +215,33 @@ async def _resolve_channel_records(links: list[str]) -> list[dict[str, object]]:
             raise RuntimeError(
                 "Сессия Telegram отсутствует или не авторизована. Переподключи аккаунт в интерфейсе."
             )
+        cache = _channel_cache()
+        cached = cache.get_many(links) if cache is not None else {}
+        id_bot_lock = asyncio.Lock()
+        limiter = FloodWaitLimiter(channel_resolve_concurrency())
+        resolved_channels: list[CachedChannel] = []
+        results = await asyncio.gather(
+            *(
+                limiter.run(
+                    lambda link=link: _resolve_single_channel(
+                        client,
+                        link,
+                        cached=cached.get(link),
+                        id_bot_lock=id_bot_lock,
+                        resolved_channels=resolved_channels,
+                    )
+                )
+                for link in links
+            ),
+            return_exceptions=True,
+        )
+        if cache is not None and resolved_channels:
+            cache.put_many(resolved_channels)
         channels: list[dict[str, object]] = []
-        for link in links:
-            resolved = await _resolve_single_channel(client, link)
+        for link, resolved in zip(links, results):
+            if isinstance(resolved, BaseException):
+                _log(f"failed to resolve {link}: {resolved}")
+                continue
             if resolved is None:
                 continue
             source_link = _normalize_source_link(link)
@@ -226,23 +259,57 @@ async def _resolve_channel_records(links: list[str]) -> list[dict[str, object]]:
 async def _resolve_single_channel(
     client: "TelegramClient",
     link: str,
+    *,
+    cached: CachedChannel | None = None,
+    id_bot_lock: asyncio.Lock | None = None,
+    resolved_channels: list[CachedChannel] | None = None,
 ) -> tuple[int, str, str] | None:
     try:
         _log(f"resolving channel: {link}")
+        # The entity lookup also joins the channel for this account, so it
+        # runs even when another account already resolved the link.
         entity = await _resolve_channel_entity(client, link)
         resolved_from_entity = _channel_tuple_from_entity(entity)
         if resolved_from_entity is not None:
             _log(f"resolved {link} directly via entity: id={resolved_from_entity[0]}, title={resolved_from_entity[1]!r}")
+            _remember_channel(resolved_channels, link, resolved_from_entity)
             return resolved_from_entity
-        response_text = await _fetch_id_bot_response(client, link)
+        if cached is not None:
+            _log(f"resolved {link} from the shared cache: id={cached.channel_id}")
+            return (cached.channel_id, cached.title, DEFAULT_CHANNEL_ALIAS)
+        if id_bot_lock is None:
+            response_text = await _fetch_id_bot_response(client, link)
+        else:
+            async with id_bot_lock:
+                response_text = await _fetch_id_bot_response(client, link)
         _log(f"bot response for {link}: {response_text!r}")
         channel_id, title = parse_id_bot_response(response_text)
+        _remember_channel(resolved_channels, link, (channel_id, title))
         return (channel_id, title, DEFAULT_CHANNEL_ALIAS)
     except Exception as exc:
+        if flood_wait_seconds(exc) is not None:
+            raise
         _log(f"failed to resolve {link}: {exc}")
         return None
 
 
+def _remember_channel(
+    resolved_channels: list[CachedChannel] | None,
+    link: str,
+    resolved: tuple,
+) -> None:
+    if resolved_channels is None:
+        return
+    resolved_channels.append(
+        CachedChannel(
+            link=link,
+            channel_id=int(resolved[0]),
+            title=str(resolved[1]),
+            metadata=channel_link_metadata(link, resolver="account_sync"),
+        )
+    )
+
+
 async def _fetch_id_bot_response(client: "TelegramClient", link: str) -> str:
     async with client.conversation(ID_BOT_USERNAME) as conversation:
         await conversation.send_message(link)
@@ -270,6 +337,8 @@ async def _resolve_invite_entity(
     try:
         invite_info = await client(CheckChatInviteRequest(invite_hash))
     except RPCError as exc:
+        if flood_wait_seconds(exc) is not None:
+            raise
         _log(f"invite check failed for {link}: {exc}")
     else:
         entity = getattr(invite_info, "chat", None)
@@ -280,6 +349,8 @@ async def _resolve_invite_entity(
     try:
         result = await client(ImportChatInviteRequest(invite_hash))
     except RPCError as exc:
+        if flood_wait_seconds(exc) is not None:
+            raise
         message = str(exc).upper()
         if "USER_ALREADY_PARTICIPANT" not in message:
             _log(f"invite import failed for {link}: {exc}")
@@ -323,6 +394,8 @@ async def _ensure_channel_membership(client: "TelegramClient", link: str) -> Non
         try:
             result = await client(SearchRequest(q=candidate, limit=10))
         except RPCError as exc:
+            if flood_wait_seconds(exc) is not None:
+                raise
             _log(f"search failed for {link}: {exc}")
             continue
 
@@ -428,6 +501,13 @@ class _connected_client:
         await self.client.disconnect()
 
 
+def _channel_cache() -> ChannelResolutionCache | None:
+    raw = os.getenv(SHARED_TELEGRAM_DB_ENV, "").strip()
+    if not raw:
+        return None
+    return ChannelResolutionCache(Path(raw))
+
+
 def _runtime_channels_path() -> Path:
     from data.const import TELEGRAM_CHANNELS_RUNTIME_PATH
 
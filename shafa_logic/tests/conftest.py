@@ -1,5 +1,12 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+import socket
+import sqlite3
 import sys
+import threading
+import time
+
+import pytest
 
 
 ROOT = Path(__file__).resolve().parents[2]
@@ -9,3 +16,125 @@ for path in (ROOT, SHAFA_LOGIC_DIR):
     text = str(path)
     if text not in sys.path:
         sys.path.insert(0, text)
+
+from shafa_logic.utils import proxy  # noqa: E402
+
+
+class _ForwardProxyHandler(BaseHTTPRequestHandler):
+    """Answer proxied requests with ``ok``, recording how they arrived."""
+
+    delay_seconds = 0.0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    requested: list[tuple[str, str]] = []
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        self._respond(b"ok")
+
+    def do_HEAD(self) -> None:  # noqa: N802 - http.server API
+        self._respond(b"")
+
+    def _respond(self, body: bytes) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.requested.append((self.command, self.path))
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(cls.delay_seconds)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *_args) -> None:
+        return
+
+
+@pytest.fixture
+def forward_proxy():
+    """Run a local HTTP forward proxy; yields its handler class and port."""
+    handler = type(
+        "Handler",
+        (_ForwardProxyHandler,),
+        {"lock": threading.Lock(), "requested": []},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def closed_port():
+    """Return a factory of local ports nothing listens on."""
+
+    def factory() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    return factory
+
+
+@pytest.fixture
+def create_proxy():
+    """Return a factory that inserts a proxy row and returns its config.
+
+    ``total_requests`` starts at ``consecutive_failures``, as if every
+    request so far had failed.
+    """
+
+    def factory(
+        db_path,
+        proxy_id: str,
+        port: int = 8080,
+        *,
+        scheme: str = "http",
+        pool: str = "",
+        enabled: bool = True,
+        consecutive_failures: int = 0,
+        ewma_failure_rate: float | None = None,
+        ewma_latency_ms: float | None = None,
+        last_failure_at: str | None = None,
+    ) -> proxy.RuntimeProxyConfig:
+        proxy.ensure_proxy_database_schema(db_path)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                """
+                INSERT INTO proxies (
+                    id, name, scheme, host, port, pool, enabled,
+                    consecutive_failures, total_requests, ewma_failure_rate,
+                    ewma_latency_ms, last_failure_at, created_at, updated_at
+                )
+                VALUES (?, ?, ?, '127.0.0.1', ?, ?, ?, ?, ?, ?, ?, ?, 'now', 'now')
+                """,
+                (
+                    proxy_id,
+                    proxy_id,
+                    scheme,
+                    port,
+                    pool,
+                    1 if enabled else 0,
+                    consecutive_failures,
+                    consecutive_failures,
+                    ewma_failure_rate,
+                    ewma_latency_ms,
+                    last_failure_at,
+                ),
+            )
+        return proxy.RuntimeProxyConfig(
+            proxy_id=proxy_id,
+            name=proxy_id,
+            scheme=scheme,
+            host="127.0.0.1",
+            port=port,
+            pool=pool,
+        )
+
+    return factory
@@ -0,0 +1,106 @@
+import _test_path  # noqa: F401
+import asyncio
+import time
+
+import pytest
+
+from telegram_subscription.channel_cache import (
+    CachedChannel,
+    ChannelResolutionCache,
+    FloodWaitLimiter,
+    resolve_links_cached,
+)
+
+
+class FloodWaitError(Exception):
+    def __init__(self, seconds: float) -> None:
+        super().__init__(f"A wait of {seconds} seconds is required")
+        self.seconds = seconds
+
+
+def _channel(link: str, channel_id: int) -> CachedChannel:
+    return CachedChannel(
+        link=link,
+        channel_id=channel_id,
+        title=f"Channel {channel_id}",
+    )
+
+
+def test_cache_round_trip_matches_normalized_links(tmp_path) -> None:
+    cache = ChannelResolutionCache(tmp_path / "feed.sqlite3")
+    cache.put_many([_channel("https://t.me/First", -1001)])
+
+    hits = cache.get_many(["t.me/first", "https://t.me/other"])
+
+    assert list(hits) == ["t.me/first"]
+    assert hits["t.me/first"].channel_id == -1001
+    assert hits["t.me/first"].title == "Channel -1001"
+
+
+def test_cache_entries_expire_after_ttl(tmp_path) -> None:
+    ChannelResolutionCache(tmp_path / "feed.sqlite3").put_many(
+        [_channel("https://t.me/first", -1001)]
+    )
+
+    expired = ChannelResolutionCache(tmp_path / "feed.sqlite3", ttl_seconds=0.01)
+    time.sleep(0.05)
+
+    assert expired.get_many(["https://t.me/first"]) == {}
+
+
+def test_limiter_waits_out_flood_wait_and_retries() -> None:
+    calls: list[float] = []
+
+    async def flaky() -> str:
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise FloodWaitError(0.05)
+        return "ok"
+
+    result = asyncio.run(FloodWaitLimiter(2).run(flaky))
+
+    assert result == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.05
+
+
+def test_limiter_reraises_long_flood_waits() -> None:
+    async def flooded() -> str:
+        raise FloodWaitError(3600)
+
+    with pytest.raises(FloodWaitError):
+        asyncio.run(FloodWaitLimiter(2, max_wait_seconds=1).run(flooded))
+
+
+def test_misses_are_resolved_concurrently_and_cached(tmp_path) -> None:
+    cache = ChannelResolutionCache(tmp_path / "feed.sqlite3")
+    cache.put_many([_channel("https://t.me/cached", -1000)])
+    links = ["https://t.me/cached"]
+    links += [f"https://t.me/new_{index}" for index in range(5)]
+    in_flight = 0
+    peak = 0
+
+    async def resolve(link: str) -> CachedChannel | None:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        if link.endswith("_4"):
+            raise RuntimeError("not found")
+        return _channel(link, -2000 - int(link.rsplit("_", 1)[1]))
+
+    results = asyncio.run(
+        resolve_links_cached(links, resolve, cache=cache, limiter=FloodWaitLimiter(8))
+    )
+
+    assert [getattr(item, "channel_id", None) for item in results[:5]] == [
+        -1000,
+        -2000,
+        -2001,
+        -2002,
+        -2003,
+    ]
+    assert isinstance(results[5], RuntimeError)
+    assert peak == 5
+    assert set(cache.get_many(links)) == set(links[:5])
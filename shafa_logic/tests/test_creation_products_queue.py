@@ -239,6 +239,161 @@ class CreationProductsQueueTests(unittest.TestCase):
 
         self.assertEqual(ready, [])
 
+    def _upsert_many(self, message_ids: list[int]) -> None:
+        for message_id in message_ids:
+            db.upsert_creation_product(
+                11,
+                message_id,
+                "",
+                {"name": f"Item {message_id}", "price": "1600", "size": "41"},
+                account_id="acc-1",
+            )
+
+    def test_batch_claim_release_and_expired_lease_reclaim(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.dict("os.environ", self._env(temp_dir), clear=False):
+                self._upsert_many([501, 502, 503, 504])
+                before_claim = {
+                    row["message_id"]: row
+                    for row in db.list_ready_creation_products(account_id="acc-1")
+                }
+
+                batch = db.claim_creation_products_for_creation(
+                    account_id="acc-1", limit=3
+                )
+                rest = db.claim_creation_products_for_creation(
+                    account_id="acc-1", limit=3
+                )
+                released = db.release_unused_claims(batch[1:], account_id="acc-1")
+                released_again = db.release_unused_claims(batch[1:], account_id="acc-1")
+                ready_after_release = db.list_ready_creation_products(account_id="acc-1")
+
+                with sqlite3.connect(Path(temp_dir) / "creation.sqlite3") as conn:
+                    conn.execute(
+                        """
+                        UPDATE creation_products
+                        SET processing_expires_at = 1
+                        WHERE message_id = ?
+                        """,
+                        (batch[0]["message_id"],),
+                    )
+                reclaimed = db.claim_creation_products_for_creation(
+                    account_id="acc-1", limit=10
+                )
+                stale_release = db.release_unused_claims(batch[:1], account_id="acc-1")
+
+        self.assertEqual([row["message_id"] for row in batch], [501, 502, 503])
+        self.assertEqual(len({row["processing_token"] for row in batch}), 1)
+        self.assertEqual([row["message_id"] for row in rest], [504])
+        self.assertEqual((released, released_again), (2, 0))
+        self.assertEqual(
+            [row["message_id"] for row in ready_after_release], [502, 503]
+        )
+        for row in ready_after_release:
+            original = before_claim[row["message_id"]]
+            for column in ("status", "attempt_count", "updated_at"):
+                self.assertEqual(row[column], original[column], column)
+        self.assertEqual(
+            [row["message_id"] for row in reclaimed], [502, 503, 501]
+        )
+        self.assertEqual(stale_release, 0)
+
+    def test_picker_prefetches_claims_and_releases_leftovers(self) -> None:
+        env = {"SHAFA_CREATION_CLAIM_BATCH_SIZE": "3"}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            env.update(self._env(temp_dir))
+            with patch.dict("os.environ", env, clear=False):
+                self._upsert_many([501, 502, 503])
+                dc._PREFETCHED_CREATION_CLAIMS.clear()
+                with patch.object(
+                    dc,
+                    "claim_creation_products_for_creation",
+                    wraps=db.claim_creation_products_for_creation,
+                ) as claim_mock:
+                    first = dc._pick_next_product_for_upload()
+                    second = dc._pick_next_product_for_upload()
+                released = dc.release_prefetched_creation_claims()
+                ready = db.list_ready_creation_products(account_id="acc-1")
+
+        self.assertEqual((first["message_id"], second["message_id"]), (501, 502))
+        self.assertEqual(claim_mock.call_count, 1)
+        self.assertEqual(released, 1)
+        self.assertEqual([row["message_id"] for row in ready], [503])
+
+    def test_claim_uses_partial_priority_index_on_legacy_table(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "creation.sqlite3"
+            with sqlite3.connect(db_path) as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE creation_products (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        account_id TEXT NOT NULL,
+                        telegram_product_key TEXT NOT NULL,
+                        channel_id INTEGER NOT NULL,
+                        message_id INTEGER NOT NULL,
+                        telegram_message_date TEXT,
+                        product_title TEXT,
+                        raw_message TEXT,
+                        parsed_data TEXT,
+                        media_paths TEXT,
+                        status TEXT NOT NULL DEFAULT 'new',
+                        created_product_id TEXT,
+                        attempt_count INTEGER NOT NULL DEFAULT 0,
+                        last_attempt_at TEXT,
+                        last_error TEXT,
+                        skip_reason TEXT,
+                        processing_started_at REAL,
+                        processing_token TEXT,
+                        processing_expires_at REAL,
+                        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                        updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+                        UNIQUE(account_id, telegram_product_key),
+                        UNIQUE(account_id, channel_id, message_id)
+                    )
+                    """
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO creation_products (
+                        account_id, telegram_product_key, channel_id, message_id, status
+                    )
+                    VALUES ('acc-1', ?, 11, ?, ?)
+                    """,
+                    [
+                        ("11:501", 501, db.CREATION_PRODUCT_STATUS_NEW),
+                        ("11:502", 502, db.CREATION_PRODUCT_STATUS_READY),
+                        ("11:503", 503, db.CREATION_PRODUCT_STATUS_CREATED),
+                    ],
+                )
+            db._CREATION_DB_INITIALIZED_PATHS.discard(db_path)
+            with patch.dict("os.environ", self._env(temp_dir), clear=False):
+                ready = db.list_ready_creation_products(account_id="acc-1")
+                with sqlite3.connect(db_path) as conn:
+                    priorities = dict(
+                        conn.execute(
+                            "SELECT message_id, queue_priority FROM creation_products"
+                        ).fetchall()
+                    )
+                    plan = " ".join(
+                        str(row[3])
+                        for row in conn.execute(
+                            f"""
+                            EXPLAIN QUERY PLAN
+                            SELECT * FROM creation_products
+                            WHERE {db._CREATION_CLAIMABLE_SQL}
+                            ORDER BY {db._CREATION_CLAIM_ORDER_SQL}
+                            LIMIT 1
+                            """,
+                            ("acc-1", 0.0),
+                        )
+                    )
+
+        self.assertEqual([row["message_id"] for row in ready], [502, 501])
+        self.assertEqual(priorities, {501: 1, 502: 0, 503: None})
+        self.assertIn("idx_creation_products_claim", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
     def test_success_failure_and_skip_mark_creation_rows(self) -> None:
         with tempfile.TemporaryDirectory() as temp_dir:
             with patch.dict("os.environ", self._env(temp_dir), clear=False):
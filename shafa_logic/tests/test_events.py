@@ -0,0 +1,56 @@
+import _test_path  # noqa: F401
+import json
+import os
+
+import pytest
+
+from utils import events
+from utils.logging import log
+
+
+@pytest.fixture
+def events_pipe(monkeypatch):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setenv(events.EVENTS_FD_ENV, str(write_fd))
+    monkeypatch.setenv("SHAFA_ACCOUNT_ID", "acc-1")
+    monkeypatch.setattr(events, "_stream", None)
+    monkeypatch.setattr(events, "_disabled", False)
+    yield read_fd
+    if events._stream is not None:
+        events._stream.close()
+    events._stream = None
+
+
+def _read_events(read_fd):
+    with os.fdopen(read_fd, "r", encoding="utf-8") as stream:
+        return [json.loads(line) for line in stream]
+
+
+def test_emit_event_writes_hello_then_json_lines(events_pipe, capsys) -> None:
+    events.emit_event("product_created", message_id=5, product_id="p-1")
+    log("ERROR", "Не удалось обработать товар.")
+    events._stream.close()
+    events._stream = None
+
+    received = _read_events(events_pipe)
+
+    assert [item["type"] for item in received] == [
+        "hello",
+        "product_created",
+        "error",
+    ]
+    assert received[0]["version"] == events.EVENTS_PROTOCOL_VERSION
+    assert received[0]["account"] == "acc-1"
+    assert received[1]["product_id"] == "p-1"
+    assert received[2]["message"] == "Не удалось обработать товар."
+    assert "Не удалось обработать товар." in capsys.readouterr().out
+
+
+def test_emit_event_is_a_no_op_without_a_descriptor(monkeypatch) -> None:
+    monkeypatch.delenv(events.EVENTS_FD_ENV, raising=False)
+    monkeypatch.setattr(events, "_stream", None)
+    monkeypatch.setattr(events, "_disabled", False)
+
+    events.emit_event("product_created", message_id=5)
+
+    assert not events.events_enabled()
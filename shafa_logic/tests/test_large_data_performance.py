@@ -1,9 +1,12 @@
 import _test_path  # noqa: F401
 
+import asyncio
+import json
 import os
 import sqlite3
 import tempfile
 import time
+from datetime import datetime
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
@@ -11,7 +14,10 @@ from unittest.mock import patch
 import pytest
 
 import data.db as db
+from shafa_control import LogRecord, LogStore
+from telegram_accounts_api.services.account_service import AccountService
 from telegram_accounts_api.services.dashboard_service import DashboardService
+from telegram_accounts_api.services.proxy_service import ProxyService
 from telegram_accounts_api.utils.account_logging import AccountLogStore
 
 
@@ -337,3 +343,197 @@ def test_shared_planner_selects_due_rows_without_scanning_fresh_large_table() ->
 
     assert result["checked"] == 100
     assert duration_ms < 2_000
+
+
+def _insert_large_creation_products(conn: sqlite3.Connection, row_count: int) -> None:
+    statuses = (
+        db.CREATION_PRODUCT_STATUS_CREATED,
+        db.CREATION_PRODUCT_STATUS_CREATED,
+        db.CREATION_PRODUCT_STATUS_CREATED,
+        db.CREATION_PRODUCT_STATUS_FAILED,
+        db.CREATION_PRODUCT_STATUS_SKIPPED,
+        db.CREATION_PRODUCT_STATUS_READY,
+        db.CREATION_PRODUCT_STATUS_NEW,
+        db.CREATION_PRODUCT_STATUS_PROCESSING,
+    )
+    batch = []
+    for index in range(row_count):
+        status = statuses[index % len(statuses)]
+        expires_at = None
+        if status == db.CREATION_PRODUCT_STATUS_PROCESSING:
+            expires_at = 1.0 if index % 16 == 7 else 4_000_000_000.0
+        batch.append(
+            (
+                f"acc-{index % 4}",
+                f"{index % 17}:{index}",
+                index % 17,
+                index,
+                status,
+                expires_at,
+                f"2026-01-{1 + index % 28:02d} {index % 24:02d}:00:00",
+            )
+        )
+        if len(batch) >= 10_000:
+            _insert_creation_products_batch(conn, batch)
+            batch.clear()
+    if batch:
+        _insert_creation_products_batch(conn, batch)
+
+
+def _insert_creation_products_batch(conn: sqlite3.Connection, batch: list[tuple]) -> None:
+    conn.executemany(
+        """
+        INSERT INTO creation_products (
+            account_id,
+            telegram_product_key,
+            channel_id,
+            message_id,
+            status,
+            processing_expires_at,
+            updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        batch,
+    )
+
+
+def test_creation_claim_latency_stays_flat_on_large_queue() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "creation.sqlite3"
+        db._CREATION_DB_INITIALIZED_PATHS.discard(db_path)
+        with patch.dict(
+            os.environ,
+            {
+                "SHAFA_ACCOUNT_ID": "acc-1",
+                "SHAFA_CREATION_PRODUCTS_DB_PATH": str(db_path),
+            },
+        ):
+            db._ensure_creation_db_initialized(db_path)
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("PRAGMA synchronous=OFF")
+                _insert_large_creation_products(conn, LARGE_ROW_COUNT)
+                conn.commit()
+
+            durations_ms = []
+            claimed_ids = set()
+            for _ in range(200):
+                started_at = time.perf_counter()
+                claimed = db.claim_creation_product_for_creation(account_id="acc-1")
+                durations_ms.append((time.perf_counter() - started_at) * 1000)
+                assert claimed is not None
+                claimed_ids.add(claimed["id"])
+            started_at = time.perf_counter()
+            ready = db.list_ready_creation_products(account_id="acc-1", limit=100)
+            list_ms = (time.perf_counter() - started_at) * 1000
+        first_ms = sum(durations_ms[:20]) / 20
+        last_ms = sum(durations_ms[-20:]) / 20
+        print(
+            "creation_claim "
+            f"rows={LARGE_ROW_COUNT} first_avg_ms={first_ms:.2f} "
+            f"last_avg_ms={last_ms:.2f} max_ms={max(durations_ms):.2f} "
+            f"list_ms={list_ms:.2f}"
+        )
+
+    assert len(claimed_ids) == 200
+    assert len(ready) == 100
+    assert max(durations_ms) < 250
+    assert last_ms < max(first_ms * 3, 20)
+    assert list_ms < 250
+
+
+def test_account_list_snapshot_latency_at_100_accounts() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = Path(temp_dir)
+        accounts_file = base_dir / "accounts_state.json"
+        accounts_dir = base_dir / "accounts"
+        proxy_service = ProxyService(
+            base_dir / "proxies.sqlite3", accounts_file, accounts_dir
+        )
+        proxy_id = proxy_service.create_proxy(
+            SimpleNamespace(
+                name="proxy",
+                scheme="http",
+                host="127.0.0.1",
+                port=8080,
+                username="",
+                password="",
+                max_accounts=100,
+                enabled=True,
+                notes="",
+                pool="",
+            )
+        ).id
+        records = []
+        for index in range(100):
+            account_id = f"acc-{index:03d}"
+            account_dir = accounts_dir / account_id
+            account_dir.mkdir(parents=True)
+            cookie = {"name": "csrftoken", "value": "t", "domain": ".shafa.ua"}
+            (account_dir / "auth.json").write_text(
+                json.dumps({"cookies": [cookie]}),
+                encoding="utf-8",
+            )
+            (account_dir / "telegram.session").write_bytes(b"SQLite format 3\x00")
+            (account_dir / ".env").write_text("API_ID=1\n", encoding="utf-8")
+            records.append(
+                {"id": account_id, "name": account_id, "proxy_id": proxy_id, "path": ""}
+            )
+        accounts_file.write_text(json.dumps(records), encoding="utf-8")
+        service = AccountService(
+            storage=SimpleNamespace(path=accounts_file),
+            accounts_dir=accounts_dir,
+            proxy_service=proxy_service,
+        )
+
+        def timed_list() -> float:
+            started_at = time.perf_counter()
+            accounts = asyncio.run(service.list_accounts())
+            assert len(accounts) == 100
+            return (time.perf_counter() - started_at) * 1000
+
+        cold_ms = timed_list()
+        warm_ms = sorted(timed_list() for _ in range(20))[10]
+        (accounts_dir / "acc-050" / "auth.json").write_text("{}", encoding="utf-8")
+        one_dirty_ms = timed_list()
+        print(
+            "account_list "
+            f"accounts=100 cold_ms={cold_ms:.2f} warm_median_ms={warm_ms:.2f} "
+            f"one_dirty_ms={one_dirty_ms:.2f}"
+        )
+
+    assert warm_ms < cold_ms
+    assert one_dirty_ms < cold_ms
+
+
+def test_log_store_append_stays_cheap_under_sustained_load() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = Path(temp_dir)
+        store = LogStore(base_dir / "runtime" / "logs")
+        line_count = 60_000
+        started_at = time.perf_counter()
+        slowest_ms = 0.0
+        for index in range(line_count):
+            account_id = f"acc-{index % 30}"
+            append_started_at = time.perf_counter()
+            store.append(
+                LogRecord(datetime.now(), f"product {index} saved", "INFO", account_id),
+                account_log_file=base_dir / "accounts" / account_id / "app.log",
+            )
+            append_ms = (time.perf_counter() - append_started_at) * 1000
+            slowest_ms = max(slowest_ms, append_ms)
+        append_seconds = time.perf_counter() - started_at
+        assert store.flush(timeout=60)
+        drained_seconds = time.perf_counter() - started_at
+        kept_records = len(store.records)
+        store.close()
+        print(
+            "log_store "
+            f"lines={line_count} "
+            f"append_lines_per_s={line_count / append_seconds:.0f} "
+            f"drained_s={drained_seconds:.2f} slowest_append_ms={slowest_ms:.2f} "
+            f"kept_records={kept_records} dropped={store.dropped_lines}"
+        )
+
+    assert kept_records == 30 * store.max_records_per_account
+    assert line_count / append_seconds > 1000
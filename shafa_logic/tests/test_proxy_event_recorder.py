@@ -0,0 +1,105 @@
+import _test_path  # noqa: F401
+
+import sqlite3
+import time
+from pathlib import Path
+
+from shafa_logic.utils import proxy
+
+
+def _event(proxy_id: str, success: bool, occurred_at: str) -> proxy.ProxyEvent:
+    return proxy.ProxyEvent(
+        proxy_id=proxy_id,
+        account_id="acc-1",
+        target="shafa_api",
+        success=success,
+        error_type=None if success else "URLError",
+        error_message=None,
+        occurred_at=occurred_at,
+    )
+
+
+def _proxy_row(db_path: Path, proxy_id: str) -> tuple:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            """
+            SELECT total_requests, total_failures, consecutive_failures, status,
+                   last_success_at, last_failure_at
+            FROM proxies
+            WHERE id = ?
+            """,
+            (proxy_id,),
+        ).fetchone()
+
+
+def test_batch_keeps_consecutive_failures_in_event_order(
+    tmp_path: Path, create_proxy
+) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    create_proxy(db_path, "recovering", consecutive_failures=2)
+    create_proxy(db_path, "failing", consecutive_failures=1)
+
+    proxy.write_proxy_events(
+        db_path,
+        [
+            _event("recovering", False, "t1"),
+            _event("failing", False, "t2"),
+            _event("recovering", True, "t3"),
+            _event("recovering", False, "t4"),
+            _event("failing", False, "t5"),
+            _event("unknown-proxy", True, "t6"),
+        ],
+    )
+
+    with sqlite3.connect(db_path) as conn:
+        event_count = conn.execute("SELECT COUNT(*) FROM proxy_events").fetchone()[0]
+    assert event_count == 6
+    assert _proxy_row(db_path, "recovering") == (5, 2, 1, "degraded", "t3", "t4")
+    assert _proxy_row(db_path, "failing") == (3, 2, 3, "failing", None, "t5")
+
+
+def test_recorder_flushes_by_size_and_interval(tmp_path: Path, create_proxy) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    create_proxy(db_path, "proxy-1")
+    recorder = proxy.ProxyEventRecorder(
+        db_path, flush_size=3, flush_interval_seconds=0.05
+    )
+
+    recorder.record(_event("proxy-1", True, "t1"))
+    recorder.record(_event("proxy-1", True, "t2"))
+    assert _proxy_row(db_path, "proxy-1")[0] == 0
+    recorder.record(_event("proxy-1", False, "t3"))
+    deadline = time.monotonic() + 2
+    while recorder.flush_count == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert recorder.flush_count == 1
+    assert _proxy_row(db_path, "proxy-1")[:3] == (3, 1, 1)
+
+    recorder.record(_event("proxy-1", True, "t4"))
+    deadline = time.monotonic() + 2
+    while recorder.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    recorder.close()
+
+    assert _proxy_row(db_path, "proxy-1")[:4] == (4, 1, 0, "healthy")
+
+
+def test_record_proxy_request_result_buffers_until_flush(
+    tmp_path: Path, monkeypatch, create_proxy
+) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    create_proxy(db_path, "proxy-1")
+    monkeypatch.setenv(proxy.PROXY_EVENT_FLUSH_SIZE_ENV, "100")
+    monkeypatch.setenv(proxy.PROXY_EVENT_FLUSH_SECONDS_ENV, "60")
+    monkeypatch.setattr(proxy, "_PROXY_RECORDERS", {})
+
+    for _ in range(10):
+        proxy.record_proxy_request_result(
+            "proxy-1", success=False, db_path=db_path, error_type="URLError"
+        )
+    before_flush = _proxy_row(db_path, "proxy-1")
+    flushed = proxy.flush_proxy_events()
+
+    assert before_flush[0] == 0
+    assert flushed == 10
+    assert _proxy_row(db_path, "proxy-1")[:4] == (10, 10, 10, "failing")
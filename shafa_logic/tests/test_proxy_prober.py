@@ -0,0 +1,162 @@
+import _test_path  # noqa: F401
+
+import socketserver
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from shafa_logic.utils import proxy
+from shafa_logic.utils import proxy_prober
+from shafa_logic.utils import proxy_rollups
+
+
+class _Socks5GreetingHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        greeting = self.request.recv(3)
+        if greeting[:2] == b"\x05\x01":
+            self.request.sendall(b"\x05" + greeting[2:3])
+
+
+@pytest.fixture
+def socks5_port():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Socks5GreetingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def _proxy_state(db_path: Path) -> dict[str, tuple]:
+    with sqlite3.connect(db_path) as conn:
+        return {
+            row[0]: row[1:]
+            for row in conn.execute(
+                """
+                SELECT id, status, consecutive_failures, total_requests,
+                       probe_requests
+                FROM proxies
+                """
+            )
+        }
+
+
+def test_probe_round_updates_status_of_every_enabled_proxy(
+    tmp_path: Path, forward_proxy, socks5_port, create_proxy, closed_port
+) -> None:
+    handler, port = forward_proxy
+    db_path = tmp_path / "proxies.sqlite3"
+    create_proxy(db_path, "http-ok", port, consecutive_failures=2)
+    create_proxy(db_path, "socks-ok", socks5_port, scheme="socks5")
+    create_proxy(db_path, "dead", closed_port(), consecutive_failures=2)
+    create_proxy(db_path, "off", closed_port(), enabled=False)
+
+    events = proxy_prober.probe_proxies(
+        db_path,
+        url="http://probe.invalid/robots.txt",
+        timeout=2,
+        concurrency=2,
+    )
+
+    assert {event.proxy_id: event.success for event in events} == {
+        "dead": False,
+        "http-ok": True,
+        "socks-ok": True,
+    }
+    assert handler.requested == [("HEAD", "http://probe.invalid/robots.txt")]
+    state = _proxy_state(db_path)
+    assert state["http-ok"] == ("healthy", 0, 2, 1)
+    assert state["socks-ok"] == ("healthy", 0, 0, 1)
+    assert state["dead"] == ("failing", 3, 2, 1)
+    assert state["off"] == ("unknown", 0, 0, 0)
+    with sqlite3.connect(db_path) as conn:
+        targets = conn.execute("SELECT DISTINCT target FROM proxy_events").fetchall()
+    assert targets == [(proxy_prober.PROXY_PROBE_TARGET,)]
+
+
+def test_probe_treats_proxy_refusal_as_failure(tmp_path: Path) -> None:
+    class RefusingHandler(BaseHTTPRequestHandler):
+        def do_HEAD(self) -> None:  # noqa: N802 - http.server API
+            self.send_response(502)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *_args) -> None:
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RefusingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        event = proxy_prober.probe_proxy(
+            proxy.RuntimeProxyConfig(
+                proxy_id="p1",
+                name="p1",
+                scheme="http",
+                host="127.0.0.1",
+                port=server.server_address[1],
+            ),
+            url="http://probe.invalid/",
+            timeout=2,
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert event.success is False
+    assert event.error_type == "HTTPError"
+
+
+def test_probe_reports_unexpected_errors_as_failures(monkeypatch) -> None:
+    def broken_opener(_config):
+        raise RuntimeError("opener exploded")
+
+    monkeypatch.setattr(proxy_prober, "get_urllib_opener", broken_opener)
+    event = proxy_prober.probe_proxy(
+        proxy.RuntimeProxyConfig(
+            proxy_id="p1", name="p1", scheme="http", host="127.0.0.1", port=1
+        ),
+        url="http://probe.invalid/",
+        timeout=1,
+    )
+
+    assert event.success is False
+    assert event.error_type == "RuntimeError"
+
+
+def test_probe_traffic_is_left_out_of_window_health(
+    tmp_path: Path, create_proxy
+) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    create_proxy(db_path, "p1")
+    now = proxy._utc_now()
+    proxy.write_proxy_events(
+        db_path,
+        [
+            proxy.ProxyEvent(
+                proxy_id="p1",
+                account_id=None,
+                target=proxy.PROXY_PROBE_TARGET,
+                success=False,
+                error_type="URLError",
+                error_message=None,
+                occurred_at=now,
+            ),
+            proxy.ProxyEvent(
+                proxy_id="p1",
+                account_id="acc-1",
+                target="shafa_api",
+                success=True,
+                error_type=None,
+                error_message=None,
+                occurred_at=now,
+            ),
+        ],
+    )
+    proxy_rollups.rollup_proxy_events(db_path)
+
+    health = proxy_rollups.load_proxy_window_health(db_path, window_seconds=3600)
+
+    assert (health["p1"].requests, health["p1"].failures) == (1, 0)
+    assert health["p1"].error_types == {}
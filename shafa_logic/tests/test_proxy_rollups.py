@@ -0,0 +1,131 @@
+import _test_path  # noqa: F401
+
+import sqlite3
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from shafa_logic.utils import proxy
+from shafa_logic.utils import proxy_rollups
+
+NOW = datetime(2026, 3, 1, 12, 30, 15, tzinfo=UTC)
+
+
+def _insert_events(
+    db_path: Path, events: list[tuple[str, str, bool, str, datetime]]
+) -> None:
+    proxy.ensure_proxy_database_schema(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO proxy_events (
+                proxy_id, target, success, error_type, occurred_at
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (proxy_id, target, 1 if success else 0, error_type, moment.isoformat())
+                for proxy_id, target, success, error_type, moment in events
+            ],
+        )
+
+
+def test_rollup_folds_events_once_per_bucket(tmp_path: Path) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    _insert_events(
+        db_path,
+        [
+            ("p1", "shafa_api", True, "", NOW - timedelta(minutes=1)),
+            ("p1", "shafa_api", False, "URLError", NOW - timedelta(minutes=1)),
+            ("p1", "telegram_connect", False, "TimeoutError", NOW),
+            ("p2", "shafa_api", True, "", NOW - timedelta(hours=5)),
+        ],
+    )
+
+    first = proxy_rollups.rollup_proxy_events(db_path, batch_size=3)
+    second = proxy_rollups.rollup_proxy_events(db_path)
+    _insert_events(db_path, [("p1", "shafa_api", False, "URLError", NOW)])
+    third = proxy_rollups.rollup_proxy_events(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        minute_rows = conn.execute(
+            """
+            SELECT proxy_id, target, bucket_start, requests, failures
+            FROM proxy_event_rollups
+            WHERE bucket_size = 'minute'
+            ORDER BY proxy_id, bucket_start, target
+            """
+        ).fetchall()
+    assert (first, second, third) == (4, 0, 1)
+    assert minute_rows == [
+        ("p1", "shafa_api", "2026-03-01T12:29:00+00:00", 2, 1),
+        ("p1", "shafa_api", "2026-03-01T12:30:00+00:00", 1, 1),
+        ("p1", "telegram_connect", "2026-03-01T12:30:00+00:00", 1, 1),
+        ("p2", "shafa_api", "2026-03-01T07:30:00+00:00", 1, 0),
+    ]
+
+
+def test_window_health_reads_minute_and_hour_rollups(tmp_path: Path) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    _insert_events(
+        db_path,
+        [
+            ("p1", "shafa_api", True, "", NOW - timedelta(minutes=10)),
+            ("p1", "shafa_api", False, "URLError", NOW - timedelta(minutes=5)),
+            ("p1", "shafa_api", False, "URLError", NOW - timedelta(hours=3)),
+            ("p2", "shafa_api", False, "HTTPError", NOW - timedelta(hours=3)),
+        ],
+    )
+    proxy_rollups.rollup_proxy_events(db_path)
+
+    last_hour = proxy_rollups.load_proxy_window_health(
+        db_path, window_seconds=3600, now=NOW
+    )
+    last_day = proxy_rollups.load_proxy_window_health(
+        db_path, window_seconds=24 * 3600, now=NOW
+    )
+    only_p2 = proxy_rollups.load_proxy_window_health(
+        db_path, window_seconds=24 * 3600, proxy_id="p2", now=NOW
+    )
+
+    assert set(last_hour) == {"p1"}
+    assert (last_hour["p1"].requests, last_hour["p1"].failures) == (2, 1)
+    assert last_hour["p1"].bucket_size == "minute"
+    assert last_hour["p1"].failure_rate == 0.5
+    assert (last_day["p1"].requests, last_day["p1"].failures) == (3, 2)
+    assert last_day["p1"].error_types == {"URLError": 2}
+    assert last_day["p1"].bucket_size == "hour"
+    assert list(only_p2) == ["p2"]
+    assert only_p2["p2"].error_types == {"HTTPError": 1}
+
+
+def test_prune_deletes_only_rolled_up_events_in_chunks(tmp_path: Path) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    old = NOW - timedelta(days=5)
+    _insert_events(
+        db_path,
+        [("p1", "shafa_api", True, "", old + timedelta(seconds=i)) for i in range(25)],
+    )
+    proxy_rollups.rollup_proxy_events(db_path)
+    _insert_events(
+        db_path,
+        [("p1", "shafa_api", True, "", old), ("p1", "shafa_api", True, "", NOW)],
+    )
+
+    limited = proxy_rollups.prune_proxy_events(
+        db_path, retention_seconds=3600, chunk_size=10, max_chunks=1, now=NOW
+    )
+    rest = proxy_rollups.prune_proxy_events(
+        db_path, retention_seconds=3600, chunk_size=10, now=NOW
+    )
+
+    with sqlite3.connect(db_path) as conn:
+        remaining = conn.execute("SELECT COUNT(*) FROM proxy_events").fetchone()[0]
+        hour_requests = conn.execute(
+            "SELECT SUM(requests) FROM proxy_event_rollups WHERE bucket_size = 'hour'"
+        ).fetchone()[0]
+        minute_rows = conn.execute(
+            "SELECT COUNT(*) FROM proxy_event_rollups WHERE bucket_size = 'minute'"
+        ).fetchone()[0]
+    assert (limited, rest) == (10, 15)
+    assert remaining == 2
+    assert hour_requests == 25
+    assert minute_rows == 0
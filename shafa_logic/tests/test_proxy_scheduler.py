@@ -0,0 +1,160 @@
+import _test_path  # noqa: F401
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib import request as urllib_request
+
+import pytest
+
+from shafa_logic.utils import proxy
+from shafa_logic.utils import proxy_scheduler
+
+
+def _scheduler(tmp_path: Path, **kwargs) -> proxy_scheduler.ProxyScheduler:
+    return proxy_scheduler.ProxyScheduler(
+        tmp_path / "proxies.sqlite3",
+        lock_dir=tmp_path / "locks",
+        snapshot_ttl_seconds=0,
+        **kwargs,
+    )
+
+
+def test_unhealthy_proxy_fails_over_within_pool_and_is_attributed(
+    tmp_path: Path, forward_proxy, create_proxy, closed_port, monkeypatch
+) -> None:
+    _handler, port = forward_proxy
+    db_path = tmp_path / "proxies.sqlite3"
+    assigned = create_proxy(
+        db_path,
+        "dead",
+        closed_port(),
+        pool="ua",
+        consecutive_failures=5,
+        last_failure_at=proxy._utc_now(),
+    )
+    create_proxy(db_path, "slow", port, pool="ua", ewma_latency_ms=900.0)
+    create_proxy(db_path, "fast", port, pool="ua", ewma_latency_ms=40.0)
+    create_proxy(db_path, "other-pool", port, pool="pl", ewma_latency_ms=1.0)
+    scheduler = _scheduler(tmp_path)
+    monkeypatch.setattr(proxy_scheduler, "get_proxy_scheduler", lambda *_: scheduler)
+    monkeypatch.setattr(proxy, "_PROXY_RECORDERS", {})
+
+    assert [item.proxy_id for item in scheduler.candidates(assigned)] == [
+        "fast",
+        "slow",
+        "dead",
+    ]
+    http_request = urllib_request.Request("http://example.invalid/ping")
+    with proxy.open_url(http_request, config=assigned, timeout=5) as response:
+        assert response.read() == b"ok"
+    proxy.record_proxy_request_result(
+        assigned.proxy_id, success=True, db_path=db_path, target="shafa_api"
+    )
+    proxy.flush_proxy_events(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        events = conn.execute(
+            "SELECT proxy_id, success, latency_ms FROM proxy_events"
+        ).fetchall()
+    assert [(row[0], row[1]) for row in events] == [("fast", 1)]
+    assert events[0][2] is not None and events[0][2] > 0
+    assert scheduler.try_acquire_slot("fast") is not None
+
+
+def test_in_flight_limit_caps_concurrent_requests_per_proxy(
+    tmp_path: Path, forward_proxy, create_proxy
+) -> None:
+    handler, port = forward_proxy
+    handler.delay_seconds = 0.1
+    config = create_proxy(tmp_path / "proxies.sqlite3", "only", port)
+    scheduler = _scheduler(tmp_path, max_in_flight=2, slot_wait_seconds=5)
+    errors: list[BaseException] = []
+
+    def worker() -> None:
+        try:
+            http_request = urllib_request.Request("http://example.invalid/ping")
+            with scheduler.open_url(
+                http_request,
+                config=config,
+                timeout=5,
+                opener=proxy._open_url_direct,
+            ) as response:
+                response.read()
+        except BaseException as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert handler.peak == 2
+
+
+def test_busy_proxy_without_pool_raises_after_wait(
+    tmp_path: Path, create_proxy, closed_port
+) -> None:
+    config = create_proxy(tmp_path / "proxies.sqlite3", "only", closed_port())
+    scheduler = _scheduler(tmp_path, max_in_flight=1, slot_wait_seconds=0.05)
+    _routed, slot = scheduler.acquire(config)
+
+    with pytest.raises(proxy_scheduler.ProxySchedulerBusyError):
+        scheduler.acquire(config)
+    slot.release()
+    _routed, slot = scheduler.acquire(config)
+    slot.release()
+
+
+def test_waiting_request_wakes_when_a_slot_is_released(
+    tmp_path: Path, create_proxy, closed_port
+) -> None:
+    config = create_proxy(tmp_path / "proxies.sqlite3", "only", closed_port())
+    scheduler = _scheduler(tmp_path, max_in_flight=1, slot_wait_seconds=5)
+    _routed, slot = scheduler.acquire(config)
+    releaser = threading.Timer(0.05, slot.release)
+
+    started = time.monotonic()
+    releaser.start()
+    _routed, second = scheduler.acquire(config)
+    waited = time.monotonic() - started
+    second.release()
+    releaser.join()
+
+    assert waited < proxy_scheduler.SLOT_RECHECK_SECONDS
+
+
+def test_write_proxy_events_folds_latency_and_failure_ewma(
+    tmp_path: Path, create_proxy
+) -> None:
+    db_path = tmp_path / "proxies.sqlite3"
+    create_proxy(db_path, "p1", 8080)
+
+    proxy.write_proxy_events(
+        db_path,
+        [
+            proxy.ProxyEvent(
+                proxy_id="p1",
+                account_id=None,
+                target="shafa_api",
+                success=success,
+                error_type=None,
+                error_message=None,
+                occurred_at=f"t{index}",
+                latency_ms=latency_ms,
+            )
+            for index, (success, latency_ms) in enumerate(
+                [(True, 100.0), (False, None), (True, 200.0)]
+            )
+        ],
+    )
+
+    with sqlite3.connect(db_path) as conn:
+        latency, failure_rate = conn.execute(
+            "SELECT ewma_latency_ms, ewma_failure_rate FROM proxies WHERE id = 'p1'"
+        ).fetchone()
+    assert latency == pytest.approx(100.0 * 0.8 + 200.0 * 0.2)
+    assert failure_rate == pytest.approx(0.2 * 0.8)
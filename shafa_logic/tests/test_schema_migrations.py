@@ -0,0 +1,144 @@
+import _test_path  # noqa: F401
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import data.db as db
+
+
+def _init_fresh(db_path: Path) -> None:
+    db._DB_INITIALIZED_PATHS.discard(db_path)
+    db.init_db(db_path)
+
+
+def test_init_db_records_schema_version(tmp_path: Path) -> None:
+    db_path = tmp_path / "account.sqlite3"
+
+    _init_fresh(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        applied = conn.execute("SELECT name FROM schema_migrations").fetchall()
+        tables = {
+            row[0]
+            for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+    assert version == db.ACCOUNT_DB_SCHEMA_VERSION
+    assert ("account_db_baseline",) in applied
+    assert {"uploaded_products", "telegram_products", "cookies"} <= tables
+
+
+def test_migrated_db_is_checked_without_write_transaction(tmp_path: Path) -> None:
+    db_path = tmp_path / "account.sqlite3"
+    _init_fresh(db_path)
+    statements: list[str] = []
+    original_connect = db._connect
+
+    def traced_connect(path=None):
+        conn = original_connect(path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    with sqlite3.connect(db_path) as observer:
+        data_version = observer.execute("PRAGMA data_version").fetchone()[0]
+        with patch.object(db, "_connect", side_effect=traced_connect):
+            _init_fresh(db_path)
+        data_version_after = observer.execute("PRAGMA data_version").fetchone()[0]
+
+    schema_statements = [
+        sql
+        for sql in statements
+        if not sql.lstrip().upper().startswith(("PRAGMA", "--"))
+    ]
+    assert len(schema_statements) == 1
+    assert "pragma_user_version" in schema_statements[0]
+    assert data_version_after == data_version
+
+
+def test_concurrent_processes_run_migrations_once(tmp_path: Path) -> None:
+    db_path = tmp_path / "account.sqlite3"
+    calls: list[int] = []
+    errors: list[BaseException] = []
+
+    def slow_baseline(conn: sqlite3.Connection) -> None:
+        calls.append(1)
+        time.sleep(0.2)
+        db._migrate_account_db_baseline(conn)
+
+    def worker() -> None:
+        try:
+            db.init_db(db_path)
+        except BaseException as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    migrations = ((1, "account_db_baseline", slow_baseline),)
+    with (
+        patch.object(db, "_ACCOUNT_DB_MIGRATIONS", migrations),
+        patch.object(db, "SCHEMA_MIGRATION_POLL_SECONDS", 0.01),
+    ):
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert len(calls) == 1
+
+
+def test_lagging_version_runs_only_pending_migrations(tmp_path: Path) -> None:
+    db_path = tmp_path / "account.sqlite3"
+    _init_fresh(db_path)
+    applied: list[str] = []
+
+    def add_column(conn: sqlite3.Connection) -> None:
+        applied.append("extra")
+        db._add_column_if_missing(conn, "uploaded_products", "extra_note", "TEXT")
+
+    migrations = db._ACCOUNT_DB_MIGRATIONS + ((2, "uploaded_extra_note", add_column),)
+    with (
+        patch.object(db, "_ACCOUNT_DB_MIGRATIONS", migrations),
+        patch.object(db, "ACCOUNT_DB_SCHEMA_VERSION", 2),
+    ):
+        _init_fresh(db_path)
+        _init_fresh(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(uploaded_products)")}
+    assert applied == ["extra"]
+    assert version == 2
+    assert "extra_note" in columns
+
+
+def test_migrated_creation_db_is_checked_with_one_version_read(tmp_path: Path) -> None:
+    db_path = tmp_path / "creation.sqlite3"
+    db._CREATION_DB_INITIALIZED_PATHS.discard(db_path)
+    db._ensure_creation_db_initialized(db_path)
+    statements: list[str] = []
+    original_connect = db._connect
+
+    def traced_connect(path=None):
+        conn = original_connect(path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    db._CREATION_DB_INITIALIZED_PATHS.discard(db_path)
+    with patch.object(db, "_connect", side_effect=traced_connect):
+        db._ensure_creation_db_initialized(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        applied = conn.execute("SELECT name FROM schema_migrations").fetchall()
+    schema_statements = [
+        sql
+        for sql in statements
+        if not sql.lstrip().upper().startswith(("PRAGMA", "--"))
+    ]
+    assert version == db.CREATION_DB_SCHEMA_VERSION
+    assert applied == [("creation_db_baseline",)]
+    assert len(schema_statements) == 1
+    assert "pragma_user_version" in schema_statements[0]
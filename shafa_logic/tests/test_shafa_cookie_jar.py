@@ -0,0 +1,165 @@
+import _test_path  # noqa: F401
+import json
+import os
+from email.message import Message
+from pathlib import Path
+from unittest.mock import patch
+
+import data.db as db
+from core import no_playwright
+from core.cookie_jar import ShafaCookieJar
+
+
+def _write_storage_state(path: Path, cookies: list[dict]) -> None:
+    path.write_text(json.dumps({"cookies": cookies}), encoding="utf-8")
+
+
+def test_jar_rebuilds_only_when_storage_state_changes(tmp_path: Path) -> None:
+    auth_path = tmp_path / "auth.json"
+    _write_storage_state(
+        auth_path,
+        [
+            {"name": "csrftoken", "value": "one", "domain": ".shafa.ua"},
+            {"name": "sessionid", "value": "s1", "domain": "shafa.ua"},
+            {"name": "other", "value": "x", "domain": ".example.com"},
+        ],
+    )
+    persisted: list[list[dict]] = []
+    jar = ShafaCookieJar(
+        auth_path,
+        base_domain="https://shafa.ua",
+        persist_cookies=persisted.append,
+    )
+
+    assert jar.refresh() is True
+    assert jar.refresh() is False
+    assert jar.cookie_header == "csrftoken=one; sessionid=s1"
+    assert jar.csrftoken == "one"
+    assert len(persisted) == 1
+
+    _write_storage_state(
+        auth_path,
+        [{"name": "csrftoken", "value": "two-longer", "domain": ".shafa.ua"}],
+    )
+    assert jar.refresh() is True
+    assert jar.csrftoken == "two-longer"
+    assert jar.rebuild_count == 2
+
+
+def test_jar_falls_back_to_db_cookies_and_tracks_db_signature(tmp_path: Path) -> None:
+    signature = {"value": ("db", 1)}
+    loads: list[int] = []
+
+    def load_fallback() -> list[dict]:
+        loads.append(1)
+        return [{"name": "csrftoken", "value": "db-token", "domain": ".shafa.ua"}]
+
+    jar = ShafaCookieJar(
+        tmp_path / "missing.json",
+        base_domain="https://shafa.ua",
+        load_fallback_cookies=load_fallback,
+        fallback_signature=lambda: signature["value"],
+    )
+
+    jar.refresh()
+    jar.refresh()
+    assert jar.csrftoken == "db-token"
+    assert len(loads) == 1
+
+    signature["value"] = ("db", 2)
+    jar.refresh()
+    assert len(loads) == 2
+
+
+def test_db_signature_follows_cookie_rows_only(tmp_path: Path, monkeypatch) -> None:
+    db_path = tmp_path / "shafa.sqlite3"
+    monkeypatch.setenv("SHAFA_DB_PATH", str(db_path))
+    db.save_cookies([{"name": "csrftoken", "value": "one", "domain": ".shafa.ua"}])
+    first = db.cookies_db_signature()
+
+    with db._connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO uploaded_products (product_id, name) VALUES ('p-1', 'Item')"
+        )
+    assert db.cookies_db_signature() == first
+
+    db.save_cookies([{"name": "csrftoken", "value": "two", "domain": ".shafa.ua"}])
+    second = db.cookies_db_signature()
+    assert second != first
+
+    db.save_cookies([{"name": "sessionid", "value": "s1", "domain": "shafa.ua"}])
+    assert db.cookies_db_signature() not in {first, second}
+
+
+def test_jar_absorbs_set_cookie_updates(tmp_path: Path) -> None:
+    auth_path = tmp_path / "auth.json"
+    _write_storage_state(
+        auth_path,
+        [
+            {"name": "csrftoken", "value": "old", "domain": ".shafa.ua"},
+            {"name": "tracking", "value": "t", "domain": ".shafa.ua"},
+        ],
+    )
+    jar = ShafaCookieJar(auth_path, base_domain="https://shafa.ua")
+    jar.refresh()
+
+    absorbed = jar.absorb_set_cookie_headers(
+        [
+            "csrftoken=new; Path=/; Secure; SameSite=lax",
+            "tracking=; Max-Age=0; Path=/",
+            "foreign=1; Domain=.example.com",
+        ]
+    )
+
+    assert absorbed == 2
+    assert jar.csrftoken == "new"
+    assert jar.cookie_header == "csrftoken=new"
+
+
+def test_request_json_uses_jar_header_and_absorbs_response_cookies(
+    tmp_path: Path,
+) -> None:
+    auth_path = tmp_path / "auth.json"
+    _write_storage_state(
+        auth_path,
+        [{"name": "csrftoken", "value": "old", "domain": ".shafa.ua"}],
+    )
+    sent_headers: list[dict] = []
+
+    class _Response:
+        status = 200
+
+        def __init__(self) -> None:
+            self.headers = Message()
+            self.headers["Content-Type"] = "application/json"
+            self.headers["Set-Cookie"] = "csrftoken=rotated; Path=/"
+
+        def read(self) -> bytes:
+            return b'{"data": {}}'
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info) -> None:
+            return None
+
+    def fake_open_url(req, **_kwargs):
+        sent_headers.append(dict(req.header_items()))
+        return _Response()
+
+    no_playwright._SHAFA_COOKIE_JARS.clear()
+    with (
+        patch.dict(os.environ, {"SHAFA_STORAGE_STATE_PATH": str(auth_path)}),
+        patch("core.no_playwright.save_cookies"),
+        patch("core.no_playwright.load_runtime_proxy_config", return_value=None),
+        patch("core.no_playwright.record_proxy_request_result"),
+        patch("core.no_playwright.open_url", side_effect=fake_open_url),
+    ):
+        cookies = no_playwright._load_shafa_cookies()
+        assert no_playwright._load_shafa_cookies() is cookies
+        no_playwright._request_json("https://shafa.ua/api", b"{}", {}, cookies)
+        rotated = no_playwright._get_csrftoken_from_cookies(cookies)
+    no_playwright._SHAFA_COOKIE_JARS.clear()
+
+    assert sent_headers[0]["Cookie"] == "csrftoken=old"
+    assert rotated == "rotated"
@@ -3,6 +3,7 @@ import _test_path  # noqa: F401
 import sqlite3
 import os
 import tempfile
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import patch
@@ -209,6 +210,72 @@ class ShafaProductSyncTests(unittest.TestCase):
         )
         self.assertEqual(product_111_count, 1)
 
+    def test_sync_uploaded_products_from_shafa_reconciles_50k_products_set_based(
+        self,
+    ) -> None:
+        remote_count = 50_000
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "shafa.sqlite3"
+            with self._patch_local_db(db_path):
+                db.init_db(db_path=db_path)
+                with sqlite3.connect(db_path) as conn:
+                    conn.executemany(
+                        """
+                        INSERT INTO uploaded_products (product_id, name, is_active)
+                        VALUES (?, ?, 1)
+                        """,
+                        [
+                            (str(index), f"Old {index}")
+                            for index in range(0, remote_count + 5_000, 2)
+                        ]
+                        + [("10", "Old duplicate 10")],
+                    )
+                products = [
+                    {
+                        "product_id": str(index),
+                        "name": f"Product {index}",
+                        "price": 1000 + index % 500,
+                        "size": "41",
+                        "status_title": "Активно",
+                        "raw_payload": {"id": index, "brand": {"id": index % 7}},
+                    }
+                    for index in range(remote_count)
+                ]
+
+                started_at = time.perf_counter()
+                result = db.sync_uploaded_products_from_shafa(products)
+                duration = time.perf_counter() - started_at
+
+                with sqlite3.connect(db_path) as conn:
+                    active_count = conn.execute(
+                        "SELECT COUNT(*) FROM uploaded_products WHERE is_active = 1"
+                    ).fetchone()[0]
+                    product_10 = conn.execute(
+                        """
+                        SELECT name, is_active, brand
+                        FROM uploaded_products
+                        WHERE product_id = '10'
+                        ORDER BY id
+                        """
+                    ).fetchall()
+                    temp_tables = conn.execute(
+                        "SELECT COUNT(*) FROM sqlite_temp_master"
+                    ).fetchone()[0]
+
+        self.assertEqual(
+            result,
+            {
+                "total": remote_count,
+                "inserted": remote_count // 2,
+                "updated": remote_count // 2,
+                "deactivated": 2_500,
+            },
+        )
+        self.assertEqual(active_count, remote_count)
+        self.assertEqual(product_10, [("Old 10", 0, None), ("Product 10", 1, 3)])
+        self.assertEqual(temp_tables, 0)
+        self.assertLess(duration, 10)
+
     def test_add_column_if_missing_ignores_duplicate_column_race(self) -> None:
         class _FakeRows:
             def __init__(self, rows: list[dict]) -> None:
@@ -0,0 +1,158 @@
+import _test_path  # noqa: F401
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import data.db as db
+from core import no_playwright
+
+
+@pytest.fixture
+def shared_reference(tmp_path: Path, monkeypatch) -> Path:
+    shared_path = tmp_path / "shared" / "reference.sqlite3"
+    monkeypatch.setenv("SHAFA_DB_PATH", str(tmp_path / "account-a.sqlite3"))
+    monkeypatch.setenv("SHAFA_REFERENCE_DATA_DB_PATH", str(shared_path))
+    monkeypatch.setattr(db, "_REFERENCE_DB_SIGNATURE", None)
+    db._reset_reference_caches()
+    yield shared_path
+    db._reset_reference_caches()
+
+
+def test_sizes_and_brands_are_shared_between_accounts(
+    shared_reference: Path, tmp_path: Path, monkeypatch
+) -> None:
+    db.save_sizes(
+        [{"id": 41, "primarySizeName": "41"}],
+        catalog_slug="obuv/krossovki",
+        replace_catalog=True,
+    )
+    db.save_brands([{"id": 7, "name": "Nike"}])
+
+    monkeypatch.setenv("SHAFA_DB_PATH", str(tmp_path / "account-b.sqlite3"))
+    db._reset_reference_caches()
+
+    assert db.get_size_id_by_name("41", catalog_slug="obuv/krossovki") == 41
+    assert db.get_brand_id_by_name("nike") == 7
+    assert not (tmp_path / "account-b.sqlite3").exists()
+
+
+def test_unchanged_reference_data_is_not_rewritten(shared_reference: Path) -> None:
+    sizes = [
+        {"id": 40, "primarySizeName": "40"},
+        {"id": 41, "primarySizeName": "41"},
+    ]
+    mappings = [{"id_v3": 1, "eu": "40", "id_v5_eu": 40}]
+    db.save_sizes(sizes, catalog_slug="obuv/krossovki", replace_catalog=True)
+    db.save_size_mappings(mappings, catalog_slug="obuv/krossovki")
+    db.save_brands([{"id": 7, "name": "Nike"}])
+
+    with sqlite3.connect(shared_reference) as conn:
+        changes_before = conn.execute("PRAGMA data_version").fetchone()[0]
+        db.save_sizes(sizes, catalog_slug="obuv/krossovki", replace_catalog=True)
+        db.save_size_mappings(mappings, catalog_slug="obuv/krossovki")
+        db.save_brands([{"id": 7, "name": "Nike"}])
+        changes_after = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    assert changes_after == changes_before
+
+
+def test_replace_catalog_writes_only_the_diff(shared_reference: Path) -> None:
+    db.save_sizes(
+        [{"id": 40, "primarySizeName": "40"}, {"id": 41, "primarySizeName": "41"}],
+        catalog_slug="obuv/krossovki",
+        replace_catalog=True,
+    )
+    assert db.size_id_exists(40, catalog_slug="obuv/krossovki")
+
+    db.save_sizes(
+        [{"id": 41, "primarySizeName": "41"}, {"id": 42, "primarySizeName": "42"}],
+        catalog_slug="obuv/krossovki",
+        replace_catalog=True,
+    )
+
+    with sqlite3.connect(shared_reference) as conn:
+        rows = conn.execute(
+            "SELECT size_id FROM size_catalogs ORDER BY size_id"
+        ).fetchall()
+    assert rows == [(41,), (42,)]
+    assert not db.size_id_exists(40, catalog_slug="obuv/krossovki")
+    assert db.size_id_exists(42, catalog_slug="obuv/krossovki")
+
+
+def test_cache_is_rebuilt_when_another_process_updates_shared_file(
+    shared_reference: Path,
+) -> None:
+    db.save_brands([{"id": 7, "name": "Nike"}])
+    assert db.get_brand_id_by_name("adidas") is None
+
+    time.sleep(0.01)
+    with sqlite3.connect(shared_reference) as conn:
+        conn.execute("INSERT INTO brands (id, name) VALUES (8, 'Adidas')")
+
+    assert db.get_brand_id_by_name("adidas") == 8
+
+
+def test_refresh_lease_is_held_by_one_process(shared_reference: Path) -> None:
+    state, token = db.claim_reference_data_refresh("sizes:obuv", 600, 60, now_ts=100)
+    second_state, second_token = db.claim_reference_data_refresh(
+        "sizes:obuv", 600, 60, now_ts=101
+    )
+    db.finish_reference_data_refresh("sizes:obuv", token, success=True, finished_at_ts=102)
+    after_state, _ = db.claim_reference_data_refresh("sizes:obuv", 600, 60, now_ts=103)
+    due_state, _ = db.claim_reference_data_refresh("sizes:obuv", 600, 60, now_ts=800)
+
+    assert (state, second_state, second_token) == ("acquired", "in_progress", None)
+    assert after_state == "not_due"
+    assert due_state == "acquired"
+
+
+def test_shared_reference_db_is_seeded_from_account_db(
+    tmp_path: Path, monkeypatch
+) -> None:
+    account_db = tmp_path / "account.sqlite3"
+    monkeypatch.setenv("SHAFA_DB_PATH", str(account_db))
+    monkeypatch.delenv("SHAFA_REFERENCE_DATA_DB_PATH", raising=False)
+    db._reset_reference_caches()
+    db.save_brands([{"id": 3, "name": "Puma"}])
+    db.save_sizes([{"id": 38, "primarySizeName": "38"}], catalog_slug="obuv/krossovki")
+
+    monkeypatch.setenv("SHAFA_REFERENCE_DATA_DB_PATH", str(tmp_path / "shared.sqlite3"))
+    monkeypatch.setattr(db, "_REFERENCE_DB_SIGNATURE", None)
+    db._reset_reference_caches()
+
+    assert db.get_brand_id_by_name("puma") == 3
+    assert db.get_size_id_by_name("38", catalog_slug="obuv/krossovki") == 38
+
+
+def test_refresh_sizes_fetches_catalogs_concurrently_once(
+    shared_reference: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("SHAFA_REFERENCE_REFRESH_CONCURRENCY", "3")
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    fetched: list[str] = []
+
+    def fake_download(_csrftoken, _cookies, catalog_slug):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            fetched.append(catalog_slug)
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return [{"id": len(catalog_slug), "primarySizeName": "40"}], [], []
+
+    slugs = ("obuv/krossovki", "zhenskaya-obuv/krossovki", "verhnyaya-odezhda/palto")
+    with patch("core.no_playwright._download_size_catalog", side_effect=fake_download):
+        first_total = no_playwright._refresh_sizes("token", [], catalog_slugs=slugs)
+        second_total = no_playwright._refresh_sizes("token", [], catalog_slugs=slugs)
+
+    assert first_total == 3
+    assert second_total == 0
+    assert sorted(fetched) == sorted(slugs)
+    assert active["peak"] > 1
+    assert db.size_id_exists(len("obuv/krossovki"), catalog_slug="obuv/krossovki")
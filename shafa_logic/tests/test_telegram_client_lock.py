@@ -164,3 +164,47 @@ def test_create_telegram_client_waits_for_busy_session_instead_of_failing(
         await second.disconnect()
 
     asyncio.run(_exercise_queue())
+
+
+def test_connected_client_can_release_and_retake_its_session(
+    tmp_path,
+    monkeypatch,
+) -> None:
+    source = tmp_path / "source.session"
+    copied = tmp_path / "copied.session"
+    _write_telegram_session(source, b"auth-key-4")
+    shutil.copy2(source, copied)
+    monkeypatch.setenv("SHAFA_TELEGRAM_LOCK_DIR", str(tmp_path / "locks"))
+    monkeypatch.setenv("SHAFA_TELEGRAM_SESSION_LOCK_TIMEOUT_SECONDS", "0")
+    monkeypatch.setattr(
+        "telegram_subscription.client.BusyTimeoutSQLiteSession",
+        lambda *_args, **_kwargs: "session",
+    )
+    pooled = create_telegram_client(
+        source,
+        777000,
+        "hash",
+        telegram_client_cls=_FakeTelethonClient,
+    )
+    other = create_telegram_client(
+        copied,
+        777000,
+        "hash",
+        telegram_client_cls=_FakeTelethonClient,
+    )
+
+    async def _exercise() -> None:
+        await pooled.connect()
+        await pooled.release_session()
+        assert pooled.connected
+
+        await other.connect()
+        assert not await pooled.try_hold_session()
+        await other.disconnect()
+
+        assert await pooled.try_hold_session()
+        with pytest.raises(TelegramSessionInUseError):
+            await other.connect()
+        await pooled.disconnect()
+
+    asyncio.run(_exercise())
@@ -5,10 +5,13 @@ import unittest
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
+from telegram_subscription.channel_cache import CachedChannel
 from telegram_subscription.sync import (
+    DEFAULT_CHANNEL_ALIAS,
     _channel_tuple_from_entity,
     _extract_search_query,
     _resolve_channel_tuples,
+    _resolve_single_channel,
     get_telegram_channels,
     parse_id_bot_response,
     set_telegram_channels,
@@ -120,6 +123,33 @@ class TelegramSubscriptionTests(unittest.TestCase):
 
         self.assertEqual(result, [(-1007, "Good Channel", "main")])
 
+    def test_cached_resolution_replaces_id_bot_but_still_joins(self) -> None:
+        client = object()
+        cached = CachedChannel(
+            link="https://t.me/good_channel",
+            channel_id=-1007,
+            title="Good Channel",
+        )
+        with (
+            patch(
+                "telegram_subscription.sync._ensure_channel_membership",
+                new=AsyncMock(return_value=None),
+            ) as ensure_membership,
+            patch(
+                "telegram_subscription.sync._fetch_id_bot_response",
+                new=AsyncMock(),
+            ) as fetch_response,
+        ):
+            result = asyncio.run(
+                _resolve_single_channel(
+                    client, "https://t.me/good_channel", cached=cached
+                )
+            )
+
+        self.assertEqual(result, (-1007, "Good Channel", DEFAULT_CHANNEL_ALIAS))
+        ensure_membership.assert_awaited_once_with(client, "https://t.me/good_channel")
+        fetch_response.assert_not_awaited()
+
 
 if __name__ == "__main__":
     unittest.main()
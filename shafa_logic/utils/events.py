@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Optional, TextIO
+
+# File descriptor of the write end of a pipe set up by the accounts API. When
+# it is missing, events are not emitted and only the human log is written.
+EVENTS_FD_ENV = "SHAFA_EVENTS_FD"
+EVENTS_PROTOCOL_VERSION = 1
+
+_LOCK = threading.Lock()
+_stream: Optional[TextIO] = None
+_disabled = False
+
+
+def _events_stream() -> Optional[TextIO]:
+    global _stream, _disabled
+    if _stream is not None or _disabled:
+        return _stream
+    raw_fd = os.getenv(EVENTS_FD_ENV, "").strip()
+    try:
+        fd = int(raw_fd)
+        _stream = os.fdopen(fd, "w", encoding="utf-8", buffering=1)
+    except (ValueError, OSError):
+        _disabled = True
+        return None
+    _disabled = False
+    _write(
+        {
+            "type": "hello",
+            "version": EVENTS_PROTOCOL_VERSION,
+            "pid": os.getpid(),
+            "account": os.getenv("SHAFA_ACCOUNT_ID") or None,
+            "ts": time.time(),
+        }
+    )
+    return _stream
+
+
+def _write(payload: dict) -> None:
+    global _stream, _disabled
+    if _stream is None:
+        return
+    try:
+        _stream.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+    except (OSError, ValueError):
+        _stream = None
+        _disabled = True
+
+
+def events_enabled() -> bool:
+    with _LOCK:
+        return _events_stream() is not None
+
+
+def emit_event(event_type: str, **fields) -> None:
+    """Write one JSON-lines event for the accounts API, if it listens."""
+    with _LOCK:
+        if _events_stream() is None:
+            return
+        _write({"type": event_type, "ts": time.time(), **fields})
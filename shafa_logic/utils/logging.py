@@ -1,6 +1,8 @@
 import os
 import sys
 
+from .events import emit_event
+
 _COLORS = {
     "DEBUG": "\033[90m",
     "INFO": "\033[34m",
@@ -24,3 +26,5 @@ def format_tag(level: str) -> str:
 
 def log(level: str, message: str) -> None:
     print(f"{format_tag(level)} {message}", flush=True)
+    if level == "ERROR":
+        emit_event("error", message=message)
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from .proxy import PROXY_PROBE_TARGET, _ensure_proxy_schema_once
+
+PROXY_EVENTS_RETENTION_HOURS_ENV = "SHAFA_PROXY_EVENTS_RETENTION_HOURS"
+DEFAULT_PROXY_EVENTS_RETENTION_HOURS = 72.0
+ROLLUP_BUCKET_MINUTE = "minute"
+ROLLUP_BUCKET_HOUR = "hour"
+# Minute buckets answer short windows, hour buckets everything longer; either
+# way a window reads a bounded number of rollup rows per proxy and target.
+MINUTE_ROLLUP_MAX_WINDOW_SECONDS = 2 * 3600
+MINUTE_ROLLUP_RETENTION_SECONDS = 2 * 24 * 3600
+HOUR_ROLLUP_RETENTION_SECONDS = 90 * 24 * 3600
+DEFAULT_ROLLUP_BATCH_SIZE = 5000
+DEFAULT_PRUNE_CHUNK_SIZE = 5000
+
+
+@dataclass
+class ProxyWindowHealth:
+    proxy_id: str
+    window_seconds: int
+    bucket_size: str
+    requests: int = 0
+    failures: int = 0
+    error_types: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.requests if self.requests else 0.0
+
+
+def proxy_events_retention_seconds() -> float:
+    raw = os.getenv(PROXY_EVENTS_RETENTION_HOURS_ENV, "").strip()
+    hours = DEFAULT_PROXY_EVENTS_RETENTION_HOURS
+    if raw:
+        try:
+            hours = float(raw)
+        except ValueError:
+            hours = DEFAULT_PROXY_EVENTS_RETENTION_HOURS
+    return min(max(hours, 1.0), 24.0 * 365) * 3600
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+def _parse_occurred_at(value: object) -> datetime | None:
+    try:
+        parsed = datetime.fromisoformat(str(value or ""))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=UTC)
+    return parsed.astimezone(UTC)
+
+
+def _bucket_start(moment: datetime, bucket_size: str) -> str:
+    if bucket_size == ROLLUP_BUCKET_HOUR:
+        moment = moment.replace(minute=0, second=0, microsecond=0)
+    else:
+        moment = moment.replace(second=0, microsecond=0)
+    return moment.isoformat()
+
+
+def rollup_proxy_events(
+    db_path: Path,
+    *,
+    batch_size: int = DEFAULT_ROLLUP_BATCH_SIZE,
+) -> int:
+    """Fold raw ``proxy_events`` past the stored watermark into rollup rows.
+
+    Each batch is aggregated in memory and applied together with the new
+    watermark in one transaction, so a crash never counts an event twice.
+    """
+    _ensure_proxy_schema_once(Path(db_path))
+    limit = max(int(batch_size), 1)
+    folded = 0
+    with _connect(db_path) as conn:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            state = conn.execute(
+                "SELECT last_event_id FROM proxy_rollup_state WHERE id = 1"
+            ).fetchone()
+            watermark = int(state[0]) if state is not None else 0
+            events = conn.execute(
+                """
+                SELECT id, proxy_id, target, success, error_type, occurred_at
+                FROM proxy_events
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (watermark, limit),
+            ).fetchall()
+            if not events:
+                conn.rollback()
+                return folded
+            counters: dict[tuple[str, str, str, str], list[int]] = {}
+            errors: dict[tuple[str, str, str, str, str], int] = {}
+            for _event_id, proxy_id, target, success, error_type, occurred_at in events:
+                moment = _parse_occurred_at(occurred_at)
+                if moment is None:
+                    continue
+                for bucket_size in (ROLLUP_BUCKET_MINUTE, ROLLUP_BUCKET_HOUR):
+                    key = (
+                        str(proxy_id),
+                        str(target or ""),
+                        bucket_size,
+                        _bucket_start(moment, bucket_size),
+                    )
+                    counter = counters.setdefault(key, [0, 0])
+                    counter[0] += 1
+                    if not success:
+                        counter[1] += 1
+                        error_key = (*key, str(error_type or "unknown"))
+                        errors[error_key] = errors.get(error_key, 0) + 1
+            conn.executemany(
+                """
+                INSERT INTO proxy_event_rollups (
+                    proxy_id, target, bucket_size, bucket_start, requests, failures
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(proxy_id, target, bucket_size, bucket_start) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    failures = failures + excluded.failures
+                """,
+                [(*key, *counter) for key, counter in counters.items()],
+            )
+            conn.executemany(
+                """
+                INSERT INTO proxy_event_rollup_errors (
+                    proxy_id, target, bucket_size, bucket_start, error_type, failures
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(proxy_id, target, bucket_size, bucket_start, error_type)
+                DO UPDATE SET failures = failures + excluded.failures
+                """,
+                [(*key, failures) for key, failures in errors.items()],
+            )
+            conn.execute(
+                """
+                INSERT INTO proxy_rollup_state (id, last_event_id, updated_at)
+                VALUES (1, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    last_event_id = excluded.last_event_id,
+                    updated_at = excluded.updated_at
+                """,
+                (int(events[-1][0]), datetime.now(UTC).isoformat()),
+            )
+            conn.commit()
+            folded += len(events)
+            if len(events) < limit:
+                return folded
+
+
+def prune_proxy_events(
+    db_path: Path,
+    *,
+    retention_seconds: float | None = None,
+    chunk_size: int = DEFAULT_PRUNE_CHUNK_SIZE,
+    max_chunks: int | None = None,
+    now: datetime | None = None,
+) -> int:
+    """Delete raw events past retention in short transactions of ``chunk_size``.
+
+    Only events already folded into rollups are removed; stale rollup buckets
+    are trimmed by their own retention at the end.
+    """
+    _ensure_proxy_schema_once(Path(db_path))
+    current = now or datetime.now(UTC)
+    retention = (
+        proxy_events_retention_seconds()
+        if retention_seconds is None
+        else max(float(retention_seconds), 0.0)
+    )
+    cutoff = (current - timedelta(seconds=retention)).isoformat()
+    limit = max(int(chunk_size), 1)
+    deleted = 0
+    chunks = 0
+    with _connect(db_path) as conn:
+        state = conn.execute(
+            "SELECT last_event_id FROM proxy_rollup_state WHERE id = 1"
+        ).fetchone()
+        watermark = int(state[0]) if state is not None else 0
+        while max_chunks is None or chunks < max_chunks:
+            cursor = conn.execute(
+                """
+                DELETE FROM proxy_events
+                WHERE id IN (
+                    SELECT id
+                    FROM proxy_events
+                    WHERE id <= ? AND occurred_at < ?
+                    ORDER BY id
+                    LIMIT ?
+                )
+                """,
+                (watermark, cutoff, limit),
+            )
+            conn.commit()
+            chunks += 1
+            removed = int(cursor.rowcount or 0)
+            deleted += removed
+            if removed < limit:
+                break
+        for bucket_size, bucket_retention in (
+            (ROLLUP_BUCKET_MINUTE, MINUTE_ROLLUP_RETENTION_SECONDS),
+            (ROLLUP_BUCKET_HOUR, HOUR_ROLLUP_RETENTION_SECONDS),
+        ):
+            bucket_cutoff = _bucket_start(
+                current - timedelta(seconds=bucket_retention), bucket_size
+            )
+            for table in ("proxy_event_rollups", "proxy_event_rollup_errors"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE bucket_size = ? AND bucket_start < ?",
+                    (bucket_size, bucket_cutoff),
+                )
+        conn.commit()
+    return deleted
+
+
+def load_proxy_window_health(
+    db_path: Path,
+    *,
+    window_seconds: int = 3600,
+    proxy_id: str | None = None,
+    now: datetime | None = None,
+) -> dict[str, ProxyWindowHealth]:
+    """Return request and failure totals per proxy for the trailing window.
+
+    The window is aligned to whole buckets, so it may include up to one extra
+    bucket at its start. Prober traffic is left out; the window reflects only
+    requests made for accounts.
+    """
+    _ensure_proxy_schema_once(Path(db_path))
+    window = max(int(window_seconds), 60)
+    bucket_size = (
+        ROLLUP_BUCKET_MINUTE
+        if window <= MINUTE_ROLLUP_MAX_WINDOW_SECONDS
+        else ROLLUP_BUCKET_HOUR
+    )
+    current = now or datetime.now(UTC)
+    since = _bucket_start(current - timedelta(seconds=window), bucket_size)
+    proxy_filter = "AND proxy_id = ?" if proxy_id else ""
+    params: tuple = (bucket_size, since, PROXY_PROBE_TARGET)
+    if proxy_id:
+        params = (*params, proxy_id)
+    results: dict[str, ProxyWindowHealth] = {}
+    with _connect(db_path) as conn:
+        for row_proxy_id, requests, failures in conn.execute(
+            f"""
+            SELECT proxy_id, SUM(requests), SUM(failures)
+            FROM proxy_event_rollups
+            WHERE bucket_size = ? AND bucket_start >= ? AND target != ?
+              {proxy_filter}
+            GROUP BY proxy_id
+            """,
+            params,
+        ).fetchall():
+            results[str(row_proxy_id)] = ProxyWindowHealth(
+                proxy_id=str(row_proxy_id),
+                window_seconds=window,
+                bucket_size=bucket_size,
+                requests=int(requests or 0),
+                failures=int(failures or 0),
+            )
+        for row_proxy_id, error_type, failures in conn.execute(
+            f"""
+            SELECT proxy_id, error_type, SUM(failures)
+            FROM proxy_event_rollup_errors
+            WHERE bucket_size = ? AND bucket_start >= ? AND target != ?
+              {proxy_filter}
+            GROUP BY proxy_id, error_type
+            """,
+            params,
+        ).fetchall():
+            health = results.get(str(row_proxy_id))
+            if health is not None:
+                health.error_types[str(error_type)] = int(failures or 0)
+    return results
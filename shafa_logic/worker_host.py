@@ -0,0 +1,271 @@
+"""Pre-warmed host that forks account processes on request.
+
+The accounts API starts one host per project directory with
+``python worker_host.py --socket PATH``. The host imports the heavy,
+account-independent modules once and then forks a child for every
+connection on the Unix socket. Each child applies the account environment,
+runs ``main.py`` like a separate interpreter would and streams its output
+over the connection, so the shared modules stay in copy-on-write pages.
+
+Account configuration (``data.const`` and everything that imports it) is
+read from the environment at import time, so those modules are never
+imported by the host and every child imports them with its own env.
+
+Protocol, one connection per account run:
+
+* request: one JSON line ``{"argv": [...], "cwd": str, "env": {...},
+  "fds": [role, ...]}``; descriptors listed in ``fds`` ride along as
+  ``SCM_RIGHTS`` data. ``events`` replaces ``SHAFA_EVENTS_FD`` in the child
+  env and ``stderr`` becomes the child's stderr;
+* the child writes ``{"pid": ..., "token": ...}`` as the first line, then
+  its stdout (and stderr, unless it has its own descriptor);
+* after the child exits the host writes ``<token> <exit code>``.
+
+Closing the host's stdin stops it from accepting runs; it exits once the
+running children have been reaped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import gc
+import importlib
+import json
+import os
+import runpy
+import secrets
+import select
+import signal
+import socket
+import sys
+import traceback
+from typing import Optional
+
+EVENTS_FD_ENV = "SHAFA_EVENTS_FD"
+_REQUEST_TIMEOUT_SECONDS = 5.0
+_REQUEST_MAX_BYTES = 1024 * 1024
+_REAP_INTERVAL_SECONDS = 0.5
+
+# Imported once by the host and shared by every child. None of them read
+# account configuration at import time.
+SHARED_MODULES = (
+    "asyncio",
+    "sqlite3",
+    "telethon",
+    "telethon.errors",
+    "telethon.tl.functions.messages",
+    "telethon.tl.functions.channels",
+    "requests",
+    "dotenv",
+    "PIL.Image",
+    "Levenshtein",
+    "controller.catalog_filter",
+    "controller.material_filter",
+    "data.size_mapping",
+    "utils.stdio",
+    "utils.logging",
+    "utils.progress",
+)
+
+
+def prewarm() -> list[str]:
+    """Import ``SHARED_MODULES`` once, before any child is forked."""
+    loaded = []
+    for name in SHARED_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue
+        loaded.append(name)
+    if "data.const" in sys.modules:
+        raise RuntimeError("Shared worker host modules must not import data.const")
+    # Keep objects created so far out of the collector, so collections in
+    # the children do not touch (and copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+    return loaded
+
+
+def _read_request(conn: socket.socket) -> tuple[dict, list[int]]:
+    conn.settimeout(_REQUEST_TIMEOUT_SECONDS)
+    data = b""
+    fds: list[int] = []
+    while b"\n" not in data:
+        chunk, received_fds, _flags, _addr = socket.recv_fds(conn, 65536, 4)
+        fds.extend(received_fds)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > _REQUEST_MAX_BYTES:
+            break
+    conn.settimeout(None)
+    try:
+        request = json.loads(data.split(b"\n", 1)[0].decode("utf-8"))
+    except ValueError:
+        request = None
+    if not isinstance(request, dict):
+        for fd in fds:
+            os.close(fd)
+        raise ValueError("invalid worker host request")
+    return request, fds
+
+
+def _run_child(
+    conn: socket.socket,
+    request: dict,
+    fds: list[int],
+    token: str,
+    open_sockets: list[socket.socket],
+) -> None:
+    code = 1
+    try:
+        os.setsid()
+        for other in open_sockets:
+            other.close()
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        roles = dict(zip([str(role) for role in request.get("fds") or []], fds))
+        os.dup2(conn.fileno(), 1)
+        os.dup2(roles.get("stderr", conn.fileno()), 2)
+        conn.close()
+
+        env = {str(key): str(value) for key, value in dict(request["env"]).items()}
+        env.pop(EVENTS_FD_ENV, None)
+        if "events" in roles:
+            env[EVENTS_FD_ENV] = str(roles["events"])
+        os.environ.clear()
+        os.environ.update(env)
+        os.chdir(str(request["cwd"]))
+        sys.stdout = os.fdopen(
+            1, "w", encoding="utf-8", errors="replace", buffering=1, closefd=False
+        )
+        sys.stderr = os.fdopen(
+            2, "w", encoding="utf-8", errors="replace", buffering=1, closefd=False
+        )
+        print(json.dumps({"pid": os.getpid(), "token": token}), flush=True)
+
+        argv = [str(item) for item in request["argv"]]
+        sys.argv = argv
+        runpy.run_path(argv[0], run_name="__main__")
+        code = 0
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            # ``os._exit`` skips atexit, so run the handlers the account run
+            # registered (proxy event flush, creation claim release) here.
+            atexit._run_exitfuncs()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(socket_path: str) -> None:
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    listener.listen()
+    children: dict[int, tuple[socket.socket, str]] = {}
+    print(json.dumps({"ready": True, "modules": prewarm()}), flush=True)
+    accepting = True
+    try:
+        while accepting or children:
+            watched = [listener, sys.stdin] if accepting else []
+            readable, _, _ = select.select(watched, [], [], _REAP_INTERVAL_SECONDS)
+            if sys.stdin in readable and not os.read(sys.stdin.fileno(), 4096):
+                # The accounts API closed our stdin: it retired this host or
+                # exited. Runs already forked still get their exit trailer.
+                accepting = False
+                listener.close()
+                _unlink(socket_path)
+                continue
+            if listener in readable:
+                conn, _addr = listener.accept()
+                _spawn_child(listener, conn, children)
+            _reap_children(children)
+    finally:
+        listener.close()
+        for conn, _token in children.values():
+            conn.close()
+        _unlink(socket_path)
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _spawn_child(
+    listener: socket.socket,
+    conn: socket.socket,
+    children: dict[int, tuple[socket.socket, str]],
+) -> None:
+    try:
+        request, fds = _read_request(conn)
+    except (OSError, ValueError):
+        conn.close()
+        return
+    token = secrets.token_hex(16)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        pid = os.fork()
+    except OSError:
+        conn.close()
+        for fd in fds:
+            os.close(fd)
+        return
+    if pid == 0:
+        open_sockets = [listener, *(item[0] for item in children.values())]
+        _run_child(conn, request, fds, token, open_sockets)
+    for fd in fds:
+        os.close(fd)
+    children[pid] = (conn, token)
+
+
+def _reap_children(children: dict[int, tuple[socket.socket, str]]) -> None:
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        entry = children.pop(pid, None)
+        if entry is None:
+            continue
+        conn, token = entry
+        try:
+            conn.sendall(
+                f"\n{token} {os.waitstatus_to_exitcode(status)}\n".encode("utf-8")
+            )
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+
+def parse_args(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    serve(parse_args().socket)
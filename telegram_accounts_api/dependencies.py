@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from functools import lru_cache
 
-from shafa_control import AccountSessionStore
+from shafa_control import AccountCommandPool, AccountSessionStore
+from shafa_logic.telegram_subscription.channel_cache import ChannelResolutionCache
 
 from telegram_accounts_api.services.account_service import AccountService
 from telegram_accounts_api.services.auth_service import AccountAuthService
@@ -10,20 +11,33 @@ from telegram_accounts_api.services.channel_template_service import ChannelTempl
 from telegram_accounts_api.services.cleanup_service import OutdatedProductCleanupService
 from telegram_accounts_api.services.dashboard_service import DashboardService
 from telegram_accounts_api.services.proxy_service import ProxyService
+from telegram_accounts_api.services.telegram_client_pool import TelegramClientPool
 from telegram_accounts_api.services.telegram_service import TelegramService
 from telegram_accounts_api.services.template_service import TemplateService
 from telegram_accounts_api.utils.account_logging import AccountLogStore, get_account_log_store as get_shared_account_log_store
 from telegram_accounts_api.utils.config import settings
+from telegram_accounts_api.utils.log_index import AccountLogIndex
+from telegram_accounts_api.utils.metrics_store import DailyMetricsStore
+from telegram_accounts_api.utils.sqlite_storage import SqliteAccountStorage
 from telegram_accounts_api.utils.storage import JsonListStorage
 
 
+@lru_cache
+def _get_account_storage_cached() -> JsonListStorage | SqliteAccountStorage:
+    if settings.accounts_store == "sqlite":
+        return SqliteAccountStorage(settings.accounts_db_file, settings.accounts_file)
+    return JsonListStorage(settings.accounts_file)
+
+
 @lru_cache
 def _get_account_service_cached() -> AccountService:
     return AccountService(
-        storage=JsonListStorage(settings.accounts_file),
+        storage=_get_account_storage_cached(),
         accounts_dir=settings.accounts_dir,
         channel_template_service=_get_channel_template_service_cached(),
         proxy_service=_get_proxy_service_cached(),
+        worker_host=settings.account_worker_host,
+        telegram_client_pool=_get_telegram_client_pool_cached(),
     )
 
 
@@ -55,9 +69,10 @@ async def get_channel_template_service() -> ChannelTemplateService:
 @lru_cache
 def _get_base_account_service() -> AccountService:
     return AccountService(
-        storage=JsonListStorage(settings.accounts_file),
+        storage=_get_account_storage_cached(),
         accounts_dir=settings.accounts_dir,
         proxy_service=_get_proxy_service_cached(),
+        telegram_client_pool=_get_telegram_client_pool_cached(),
     )
 
 
@@ -80,6 +95,10 @@ def _get_telegram_service_cached() -> TelegramService:
         account_service=_get_account_service_cached(),
         template_service=_get_template_service_cached(),
         base_dir=settings.base_dir,
+        client_pool=_get_telegram_client_pool_cached(),
+        channel_cache=ChannelResolutionCache(
+            _get_account_service_cached().session_store.shared_telegram_db_file()
+        ),
     )
 
 
@@ -87,6 +106,13 @@ async def get_telegram_service() -> TelegramService:
     return _get_telegram_service_cached()
 
 
+@lru_cache
+def _get_telegram_client_pool_cached() -> TelegramClientPool:
+    return TelegramClientPool(
+        idle_timeout_seconds=settings.telegram_client_idle_timeout_seconds,
+    )
+
+
 @lru_cache
 def _get_auth_service_cached() -> AccountAuthService:
     store = AccountSessionStore(
@@ -97,16 +123,27 @@ def _get_auth_service_cached() -> AccountAuthService:
     return AccountAuthService(
         account_service=_get_account_service_cached(),
         store=store,
+        command_pool=_get_account_command_pool_cached(),
     )
 
 
+@lru_cache
+def _get_account_command_pool_cached() -> AccountCommandPool | None:
+    if not settings.account_command_host:
+        return None
+    return AccountCommandPool(max_uses=settings.account_command_host_max_uses)
+
+
 async def get_auth_service() -> AccountAuthService:
     return _get_auth_service_cached()
 
 
 @lru_cache
 def _get_account_log_store_cached() -> AccountLogStore:
-    return get_shared_account_log_store()
+    store = get_shared_account_log_store()
+    if store.index is None:
+        store.attach_index(AccountLogIndex(settings.account_logs_db_file))
+    return store
 
 
 async def get_account_log_store() -> AccountLogStore:
@@ -115,10 +152,14 @@ async def get_account_log_store() -> AccountLogStore:
 
 @lru_cache
 def _get_dashboard_service_cached() -> DashboardService:
-    return DashboardService(
-        account_service=_get_account_service_cached(),
+    account_service = _get_account_service_cached()
+    service = DashboardService(
+        account_service=account_service,
         log_store=_get_account_log_store_cached(),
+        metrics_store=DailyMetricsStore(settings.metrics_db_file),
     )
+    account_service.process_event_handler = service.record_process_event
+    return service
 
 
 async def get_dashboard_service() -> DashboardService:
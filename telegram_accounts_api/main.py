@@ -14,7 +14,16 @@ from telegram_accounts_api.routers import (
     telegram,
     templates,
 )
-from telegram_accounts_api.dependencies import _get_outdated_product_cleanup_service_cached
+from telegram_accounts_api.dependencies import (
+    _get_account_log_store_cached,
+    _get_account_command_pool_cached,
+    _get_account_service_cached,
+    _get_auth_service_cached,
+    _get_dashboard_service_cached,
+    _get_outdated_product_cleanup_service_cached,
+    _get_proxy_service_cached,
+    _get_telegram_client_pool_cached,
+)
 from telegram_accounts_api.utils.config import settings
 from telegram_accounts_api.utils.exceptions import register_exception_handlers
 from telegram_accounts_api.utils.logging import configure_logging
@@ -48,6 +57,19 @@ app.include_router(telegram.router)
 app.include_router(logs.router)
 
 
+@app.on_event("startup")
+def open_account_log_index() -> None:
+    # Attach the index before any account process starts appending lines.
+    _get_account_log_store_cached()
+
+
+@app.on_event("shutdown")
+def close_account_log_index() -> None:
+    index = _get_account_log_store_cached().index
+    if index is not None:
+        index.close()
+
+
 @app.on_event("startup")
 def start_outdated_product_cleanup() -> None:
     _get_outdated_product_cleanup_service_cached().start()
@@ -56,3 +78,63 @@ def start_outdated_product_cleanup() -> None:
 @app.on_event("shutdown")
 def stop_outdated_product_cleanup() -> None:
     _get_outdated_product_cleanup_service_cached().stop()
+
+
+@app.on_event("startup")
+def start_proxy_event_maintenance() -> None:
+    _get_proxy_service_cached().start_event_maintenance()
+
+
+@app.on_event("shutdown")
+def stop_proxy_event_maintenance() -> None:
+    _get_proxy_service_cached().stop_event_maintenance()
+
+
+@app.on_event("startup")
+def start_proxy_health_probes() -> None:
+    _get_proxy_service_cached().start_health_probes()
+
+
+@app.on_event("shutdown")
+def stop_proxy_health_probes() -> None:
+    _get_proxy_service_cached().stop_health_probes()
+
+
+@app.on_event("startup")
+def start_dashboard_metrics_compaction() -> None:
+    dashboard_service = _get_dashboard_service_cached()
+    dashboard_service.close_stale_event_windows()
+    dashboard_service.start_metrics_compaction()
+
+
+@app.on_event("shutdown")
+def stop_dashboard_metrics_compaction() -> None:
+    _get_dashboard_service_cached().stop_metrics_compaction()
+
+
+@app.on_event("shutdown")
+def stop_dashboard_stats_workers() -> None:
+    _get_dashboard_service_cached().shutdown()
+
+
+@app.on_event("shutdown")
+def close_account_worker_hosts() -> None:
+    _get_account_service_cached().close_worker_hosts()
+
+
+@app.on_event("startup")
+async def warm_account_command_pool() -> None:
+    if _get_account_command_pool_cached() is not None:
+        await _get_auth_service_cached().warm_command_pool()
+
+
+@app.on_event("shutdown")
+def close_account_command_pool() -> None:
+    pool = _get_account_command_pool_cached()
+    if pool is not None:
+        pool.close()
+
+
+@app.on_event("shutdown")
+async def close_telegram_client_pool() -> None:
+    await _get_telegram_client_pool_cached().close()
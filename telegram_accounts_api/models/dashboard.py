@@ -11,6 +11,7 @@ class DashboardSeriesPointRead(BaseModel):
     errors: int = 0
     creation_errors: int = 0
     retry_events: int = 0
+    deactivations: int = 0
 
 
 class DashboardSharedDeactivationAccountRead(BaseModel):
@@ -64,6 +65,7 @@ class DashboardSummaryRead(BaseModel):
     error_events_in_range: int = 0
     creation_errors_in_range: int = 0
     retry_events_in_range: int = 0
+    deactivations_in_range: int = 0
     latest_run_account_name: str | None = None
     latest_run_at: datetime | None = None
     top_error_account_name: str | None = None
@@ -21,8 +21,9 @@ class ProxyBase(BaseModel):
     max_accounts: int = Field(default=DEFAULT_PROXY_MAX_ACCOUNTS, ge=1, le=100)
     enabled: bool = True
     notes: str = Field(default="", max_length=4096)
+    pool: str = Field(default="", max_length=255)
 
-    @field_validator("name", "host", "username", "notes", mode="before")
+    @field_validator("name", "host", "username", "notes", "pool", mode="before")
     @classmethod
     def strip_text(cls, value: Any) -> Any:
         return value.strip() if isinstance(value, str) else value
@@ -57,8 +58,9 @@ class ProxyUpdate(BaseModel):
     max_accounts: int | None = Field(default=None, ge=1, le=100)
     enabled: bool | None = None
     notes: str | None = Field(default=None, max_length=4096)
+    pool: str | None = Field(default=None, max_length=255)
 
-    @field_validator("name", "host", "username", "notes", mode="before")
+    @field_validator("name", "host", "username", "notes", "pool", mode="before")
     @classmethod
     def strip_text(cls, value: Any) -> Any:
         return value.strip() if isinstance(value, str) else value
@@ -100,6 +102,8 @@ class ProxyRead(ProxyBase):
     total_requests: int = 0
     total_failures: int = 0
     consecutive_failures: int = 0
+    ewma_latency_ms: float | None = None
+    ewma_failure_rate: float | None = None
     last_used_at: datetime | None = None
     last_success_at: datetime | None = None
     last_failure_at: datetime | None = None
@@ -108,3 +112,13 @@ class ProxyRead(ProxyBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+
+class ProxyHealthRead(BaseModel):
+    proxy_id: str
+    window_seconds: int
+    bucket_size: Literal["minute", "hour"]
+    requests: int = 0
+    failures: int = 0
+    failure_rate: float = 0.0
+    error_types: dict[str, int] = Field(default_factory=dict)
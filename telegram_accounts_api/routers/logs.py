@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 
@@ -10,15 +13,22 @@ from telegram_accounts_api.models.common import ActionResponse
 from telegram_accounts_api.models.logs import AccountLogEntryRead
 from telegram_accounts_api.services.account_service import AccountService
 from telegram_accounts_api.utils.account_logging import (
+    AccountLogEntry,
+    AccountLogQueue,
     AccountLogStore,
     filter_account_log_entries,
     load_account_log_file_entries,
+    log_level_rank,
     merge_account_log_entries,
 )
 from telegram_accounts_api.utils.exceptions import BadRequestError
 
 router = APIRouter(tags=["logs"])
 
+# Live entries arriving this close together are sent as one frame.
+_WS_BATCH_WINDOW_SECONDS = 0.02
+_WS_BATCH_MAX_ENTRIES = 200
+
 
 @router.get("/accounts/{account_id}/logs", response_model=list[AccountLogEntryRead])
 async def get_account_logs(
@@ -26,39 +36,26 @@ async def get_account_logs(
     limit: int = Query(default=200, ge=1, le=1000),
     level: str | None = Query(default=None),
     since: str | None = Query(default=None),
+    before: int | None = Query(default=None),
+    q: str | None = Query(default=None, max_length=200),
     service: AccountService = Depends(get_account_service),
     store: AccountLogStore = Depends(get_account_log_store),
 ) -> list[AccountLogEntryRead]:
     await service.get_account(account_id)
     since_index, since_timestamp = _parse_since(since)
-    history_tail_limit = min(max(limit * 4, limit), 5000)
-    history_entries = load_account_log_file_entries(
-        account_id,
-        service.account_dir(account_id) / "logs" / "app.log",
-        tail_limit=history_tail_limit,
-    )
-    runtime_entries = store.list_entries(
+    entries = await asyncio.to_thread(
+        _load_account_log_page,
         account_id,
-        limit=store.max_entries_per_account,
-    )
-    entries = filter_account_log_entries(
-        merge_account_log_entries(history_entries, runtime_entries),
+        service,
+        store,
         limit=limit,
         level=level,
         since_index=since_index,
         since_timestamp=since_timestamp,
-        max_entries=store.max_entries_per_account,
+        before_index=before,
+        contains=q,
     )
-    return [
-        AccountLogEntryRead(
-            index=entry.index,
-            account_id=entry.account_id,
-            timestamp=entry.timestamp,
-            level=entry.level,
-            message=entry.message,
-        )
-        for entry in entries
-    ]
+    return [_to_read_model(entry) for entry in entries]
 
 
 @router.post("/logs/clear", response_model=ActionResponse)
@@ -67,6 +64,7 @@ async def clear_logs(
     store: AccountLogStore = Depends(get_account_log_store),
 ) -> ActionResponse:
     removed_files = 0
+    service.log_store.release_files()
     removed_files += _clear_log_directory(service.log_store.root_dir)
 
     accounts = await service.list_accounts()
@@ -75,6 +73,7 @@ async def clear_logs(
 
     service.log_store.replace([])
     store.clear_entries()
+    store.clear_index()
 
     if removed_files == 0:
         return ActionResponse(detail="Логи уже пусты.")
@@ -88,7 +87,20 @@ async def stream_account_logs(
     account_id: str,
     service: AccountService = Depends(get_account_service),
     store: AccountLogStore = Depends(get_account_log_store),
+    since: int | None = None,
 ) -> None:
+    """Stream ``{"type": "logs", "seq", "dropped", "entries"}`` frames.
+
+    Entries that arrive within ``_WS_BATCH_WINDOW_SECONDS`` of each other share
+    a frame. ``seq`` is the index of the last entry sent; a client reconnecting
+    with ``?since=<seq>`` first receives what it missed. ``dropped`` counts
+    entries discarded because the client fell a full subscriber queue behind,
+    or, on the first frame of a resume, entries past the replay limit; it can
+    refetch them with ``GET /accounts/{id}/logs?since=``. Without the log
+    index, a ``since`` older than the in-memory buffer (or from before a
+    restart) cannot be replayed: the stream starts at the current tail with
+    a frame whose ``dropped`` is the number of indexes skipped.
+    """
     try:
         await service.get_account(account_id)
     except Exception:
@@ -96,25 +108,336 @@ async def stream_account_logs(
         return
 
     await websocket.accept()
+    # Subscribe before reading the backlog so nothing appended in between is
+    # lost; entries seen twice are skipped by ``last_sent``.
     subscription_id, queue = store.subscribe(account_id)
+    last_sent = since
     try:
+        if since is not None and store.index is None:
+            first_buffered, next_index = store.buffered_range(account_id)
+            if since + 1 < first_buffered or since >= next_index:
+                # ``since`` from before a restart: every index issued since.
+                skipped = next_index - 1 - since if since < next_index else next_index
+                since = None
+                last_sent = next_index - 1
+                if skipped:
+                    await websocket.send_json(
+                        {**_batch_payload([], dropped=skipped), "seq": last_sent}
+                    )
+        if since is not None:
+            limit = store.max_entries_per_account
+            backlog = await asyncio.to_thread(
+                _load_account_log_page,
+                account_id,
+                service,
+                store,
+                limit=limit,
+                since_index=since,
+            )
+            dropped = 0
+            if store.index is not None and len(backlog) >= limit:
+                dropped = await asyncio.to_thread(
+                    store.count_indexed_entries,
+                    account_id,
+                    since_index=since,
+                    before_index=backlog[0].index,
+                )
+            for start in range(0, len(backlog), _WS_BATCH_MAX_ENTRIES):
+                batch = backlog[start : start + _WS_BATCH_MAX_ENTRIES]
+                await websocket.send_json(
+                    {
+                        **_batch_payload(batch, dropped=dropped),
+                        "seq": batch[-1].index,
+                    }
+                )
+                dropped = 0
+                last_sent = batch[-1].index
         while True:
-            entry = await queue.get()
+            batch = await _next_log_batch(queue)
+            if last_sent is not None:
+                batch = [entry for entry in batch if entry.index > last_sent]
+            dropped = queue.take_dropped()
+            if not batch and not dropped:
+                continue
             await websocket.send_json(
                 {
-                    "index": entry.index,
-                    "account_id": entry.account_id,
-                    "timestamp": entry.timestamp.isoformat(),
-                    "level": entry.level,
-                    "message": entry.message,
+                    **_batch_payload(batch, dropped=dropped),
+                    "seq": batch[-1].index if batch else None,
                 }
             )
+            if batch:
+                last_sent = batch[-1].index
     except WebSocketDisconnect:
         pass
     finally:
         store.unsubscribe(account_id, subscription_id)
 
 
+@router.websocket("/ws/logs")
+async def stream_logs(
+    websocket: WebSocket,
+    service: AccountService = Depends(get_account_service),
+    store: AccountLogStore = Depends(get_account_log_store),
+) -> None:
+    """Stream entries of several accounts over one socket.
+
+    The client sends ``{"type": "subscribe", "account_ids": [...],
+    "min_level": "WARNING", "since": {"<account_id>": <seq>}}`` at any time to
+    replace its subscription; ``since`` replays what an account missed. The
+    server sends ``{"type": "logs", "seqs", "dropped", "entries"}`` frames
+    where ``seqs`` maps each account in the frame to its last sent index. A
+    replay goes out in its own frame; live entries of that account are held
+    back until it has been sent.
+    """
+    await websocket.accept()
+    subscription_id, queue = store.subscribe_accounts()
+    stream = _LogStreamState()
+    tasks = [
+        asyncio.create_task(
+            _receive_log_subscriptions(
+                websocket, service, store, subscription_id, stream
+            )
+        ),
+        asyncio.create_task(_send_log_batches(websocket, queue, stream)),
+    ]
+    try:
+        done, _pending = await asyncio.wait(
+            tasks, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            with suppress(WebSocketDisconnect):
+                task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        store.unsubscribe_accounts(subscription_id)
+
+
+@dataclass
+class _LogStreamState:
+    """What the two tasks of one ``/ws/logs`` socket share."""
+
+    # Last index sent per account.
+    last_sent: dict[str, int] = field(default_factory=dict)
+    # Live entries of accounts whose replay has not been sent yet.
+    held: dict[str, list[AccountLogEntry]] = field(default_factory=dict)
+    send_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+async def _receive_log_subscriptions(
+    websocket: WebSocket,
+    service: AccountService,
+    store: AccountLogStore,
+    subscription_id: str,
+    stream: _LogStreamState,
+) -> None:
+    while True:
+        try:
+            message = await websocket.receive_json()
+        except ValueError:
+            continue
+        if not isinstance(message, dict) or message.get("type") != "subscribe":
+            continue
+        known_ids = {account.id for account in await service.list_accounts()}
+        requested = message.get("account_ids")
+        account_ids = [
+            str(account_id)
+            for account_id in (requested if isinstance(requested, list) else [])
+            if str(account_id) in known_ids
+        ]
+        min_level = message.get("min_level")
+        min_level = str(min_level) if isinstance(min_level, str) else None
+        since = message.get("since")
+        replay_from: dict[str, int] = {}
+        for account_id in account_ids if isinstance(since, dict) else []:
+            since_index = since.get(account_id)
+            if isinstance(since_index, int) and not isinstance(since_index, bool):
+                replay_from[account_id] = since_index
+        # Hold live entries before they can arrive, so none of them is sent
+        # ahead of the replay it follows.
+        for account_id in replay_from:
+            stream.held.setdefault(account_id, [])
+        subscribed = store.update_subscription(
+            subscription_id, account_ids, min_level=min_level
+        )
+        for account_id in list(stream.last_sent):
+            if account_id not in subscribed:
+                stream.last_sent.pop(account_id, None)
+        min_rank = log_level_rank(min_level) if min_level else 0
+        for account_id in sorted(replay_from):
+            try:
+                if account_id in subscribed:
+                    await _send_log_replay(
+                        websocket,
+                        service,
+                        store,
+                        stream,
+                        account_id,
+                        since_index=replay_from[account_id],
+                        min_rank=min_rank,
+                    )
+            finally:
+                stream.held.pop(account_id, None)
+
+
+async def _send_log_replay(
+    websocket: WebSocket,
+    service: AccountService,
+    store: AccountLogStore,
+    stream: _LogStreamState,
+    account_id: str,
+    *,
+    since_index: int,
+    min_rank: int,
+) -> None:
+    replay = await asyncio.to_thread(
+        _load_account_log_page,
+        account_id,
+        service,
+        store,
+        limit=store.max_entries_per_account,
+        since_index=since_index,
+    )
+    async with stream.send_lock:
+        entries_by_index = {
+            entry.index: entry
+            for entry in replay
+            if log_level_rank(entry.level) >= min_rank
+        }
+        for entry in stream.held.pop(account_id, []):
+            entries_by_index.setdefault(entry.index, entry)
+        entries = [
+            entries_by_index[index]
+            for index in sorted(entries_by_index)
+            if index > since_index
+        ]
+        stream.last_sent[account_id] = (
+            entries[-1].index if entries else since_index
+        )
+        for start in range(0, len(entries), _WS_BATCH_MAX_ENTRIES):
+            batch = entries[start : start + _WS_BATCH_MAX_ENTRIES]
+            await websocket.send_json(
+                {
+                    **_batch_payload(batch, dropped=0),
+                    "seqs": {account_id: batch[-1].index},
+                }
+            )
+
+
+async def _send_log_batches(
+    websocket: WebSocket,
+    queue: AccountLogQueue,
+    stream: _LogStreamState,
+) -> None:
+    while True:
+        entries = await _next_log_batch(queue)
+        async with stream.send_lock:
+            batch: list[AccountLogEntry] = []
+            for entry in entries:
+                held = stream.held.get(entry.account_id)
+                if held is not None:
+                    held.append(entry)
+                    continue
+                previous = stream.last_sent.get(entry.account_id)
+                if previous is not None and entry.index <= previous:
+                    continue
+                stream.last_sent[entry.account_id] = entry.index
+                batch.append(entry)
+            dropped = queue.take_dropped()
+            if not batch and not dropped:
+                continue
+            await websocket.send_json(
+                {
+                    **_batch_payload(batch, dropped=dropped),
+                    "seqs": {entry.account_id: entry.index for entry in batch},
+                }
+            )
+
+
+async def _next_log_batch(queue: AccountLogQueue) -> list[AccountLogEntry]:
+    batch = [await queue.get()]
+    await asyncio.sleep(_WS_BATCH_WINDOW_SECONDS)
+    while len(batch) < _WS_BATCH_MAX_ENTRIES and not queue.empty():
+        batch.append(queue.get_nowait())
+    return batch
+
+
+def _load_account_log_page(
+    account_id: str,
+    service: AccountService,
+    store: AccountLogStore,
+    *,
+    limit: int,
+    level: str | None = None,
+    since_index: int | None = None,
+    since_timestamp: datetime | None = None,
+    before_index: int | None = None,
+    contains: str | None = None,
+) -> list[AccountLogEntry]:
+    """Read a page from the index or the log files; call it off the loop."""
+    log_file = service.account_dir(account_id) / "logs" / "app.log"
+    if store.index is not None:
+        return store.page_entries(
+            account_id,
+            log_file,
+            limit=limit,
+            level=level,
+            since_index=since_index,
+            before_index=before_index,
+            since_timestamp=since_timestamp,
+            contains=contains,
+        )
+
+    history_tail_limit = min(max(limit * 4, limit), 5000)
+    history_entries = load_account_log_file_entries(
+        account_id,
+        log_file,
+        tail_limit=history_tail_limit,
+    )
+    runtime_entries = store.list_entries(
+        account_id,
+        limit=store.max_entries_per_account,
+    )
+    return filter_account_log_entries(
+        merge_account_log_entries(history_entries, runtime_entries),
+        limit=limit,
+        level=level,
+        since_index=since_index,
+        since_timestamp=since_timestamp,
+        max_entries=store.max_entries_per_account,
+        before_index=before_index,
+        contains=contains,
+    )
+
+
+def _batch_payload(entries: list[AccountLogEntry], *, dropped: int) -> dict:
+    return {
+        "type": "logs",
+        "dropped": dropped,
+        "entries": [
+            {
+                "index": entry.index,
+                "account_id": entry.account_id,
+                "timestamp": entry.timestamp.isoformat(),
+                "level": entry.level,
+                "message": entry.message,
+            }
+            for entry in entries
+        ],
+    }
+
+
+def _to_read_model(entry: AccountLogEntry) -> AccountLogEntryRead:
+    return AccountLogEntryRead(
+        index=entry.index,
+        account_id=entry.account_id,
+        timestamp=entry.timestamp,
+        level=entry.level,
+        message=entry.message,
+    )
+
+
 def _parse_since(value: str | None) -> tuple[int | None, datetime | None]:
     if value is None or not value.strip():
         return None, None
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 
 from telegram_accounts_api.dependencies import get_proxy_service
 from telegram_accounts_api.models.common import ActionResponse
-from telegram_accounts_api.models.proxy import ProxyCreate, ProxyRead, ProxyUpdate
+from telegram_accounts_api.models.proxy import (
+    ProxyCreate,
+    ProxyHealthRead,
+    ProxyRead,
+    ProxyUpdate,
+)
 from telegram_accounts_api.services.proxy_service import ProxyService
 
 router = APIRouter(prefix="/proxies", tags=["proxies"])
@@ -17,6 +22,23 @@ async def list_proxies(
     return service.list_proxies()
 
 
+@router.get("/health", response_model=list[ProxyHealthRead])
+async def list_proxy_health(
+    window_seconds: int = Query(3600, ge=60, le=90 * 24 * 3600),
+    service: ProxyService = Depends(get_proxy_service),
+) -> list[ProxyHealthRead]:
+    return service.get_proxy_health(window_seconds=window_seconds)
+
+
+@router.get("/{proxy_id}/health", response_model=list[ProxyHealthRead])
+async def get_proxy_health(
+    proxy_id: str,
+    window_seconds: int = Query(3600, ge=60, le=90 * 24 * 3600),
+    service: ProxyService = Depends(get_proxy_service),
+) -> list[ProxyHealthRead]:
+    return service.get_proxy_health(window_seconds=window_seconds, proxy_id=proxy_id)
+
+
 @router.get("/{proxy_id}", response_model=ProxyRead)
 async def get_proxy(
     proxy_id: str,
@@ -4,10 +4,12 @@ import asyncio
 import json
 import logging
 import os
+import re
 import shutil
 import signal
 import subprocess
 import threading
+import time
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
@@ -18,6 +20,7 @@ from shafa_control import (
     Account,
     AccountRuntimeService,
     AccountSessionStore,
+    AccountWorkerHost,
     LogRecord,
     LogStore,
     default_project_dir,
@@ -26,9 +29,13 @@ from shafa_control import (
     preferred_project_dir,
     project_main_path,
     resolve_project_dir,
+    WorkerHostError,
+    WorkerHostProcess,
+    worker_host_supported,
 )
 from telegram_accounts_api.models.account import AccountCreate, AccountRead, AccountUpdate
 from telegram_accounts_api.services.proxy_service import ProxyService
+from telegram_accounts_api.services.telegram_client_pool import TelegramClientPool
 from telegram_accounts_api.utils.account_logging import (
     get_account_log_store,
     is_ignorable_log_message,
@@ -36,9 +43,20 @@ from telegram_accounts_api.utils.account_logging import (
     log,
 )
 from telegram_accounts_api.utils.exceptions import BadRequestError, NotFoundError, StorageError
-from telegram_accounts_api.utils.storage import JsonListStorage, read_json_list_file
+from telegram_accounts_api.utils.sqlite_storage import SqliteAccountStorage
+from telegram_accounts_api.utils.storage import (
+    JsonListStorage,
+    file_signature,
+    read_json_list_file,
+)
 
 LOGGER = logging.getLogger(__name__)
+# Environment variable carrying the write end of the structured events pipe;
+# matches ``EVENTS_FD_ENV`` in ``shafa_logic/utils/events.py``.
+EVENTS_FD_ENV = "SHAFA_EVENTS_FD"
+_EVENT_READER_JOIN_TIMEOUT_SECONDS = 5.0
+# Lines printed by ``log("ERROR", ...)``, which sends its own ``error`` event.
+_LOGGED_ERROR_LINE_PATTERN = re.compile(r"^\s*(?:\x1b\[[0-9;]*m)?\[ERROR\]")
 LEGACY_DEFAULT_PROJECT_PATH = "/Users/eeri/coding/python/projects/scripts/shafa"
 
 ACCOUNT_KNOWN_FIELDS = {
@@ -70,11 +88,13 @@ class ManagedAccountProcess:
 class AccountService:
     def __init__(
         self,
-        storage: JsonListStorage,
+        storage: JsonListStorage | SqliteAccountStorage,
         accounts_dir: Path,
         channel_template_service=None,
         session_store: AccountSessionStore | None = None,
         proxy_service: ProxyService | None = None,
+        worker_host: bool = False,
+        telegram_client_pool: TelegramClientPool | None = None,
     ) -> None:
         self.storage = storage
         self.accounts_dir = accounts_dir
@@ -94,10 +114,98 @@ class AccountService:
         self._process_lock = threading.RLock()
         self._processes: dict[str, ManagedAccountProcess] = {}
         self._expected_stops: set[str] = set()
+        self._payload_snapshot: tuple[tuple[int, int] | None, list[dict]] | None = None
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_entries: dict[str, tuple[tuple, AccountRead]] = {}
+        # Receives ``(account_id, event)`` for every JSON-lines event an account
+        # process writes to its events pipe, plus a final ``closed`` event.
+        self.process_event_handler: Callable[[str, dict], None] | None = None
+        self._event_readers: dict[int, threading.Thread] = {}
+        # Fork account runs from pre-warmed ``worker_host.py`` processes, one
+        # per (python, project directory), instead of one interpreter each.
+        self.worker_host_enabled = worker_host
+        self._worker_hosts: dict[tuple[str, str], AccountWorkerHost] = {}
+        self._worker_hosts_lock = threading.Lock()
+        # The API's pooled Telegram clients; evicted before a worker or an
+        # auth command opens the account's session file.
+        self.telegram_client_pool = telegram_client_pool
 
     async def list_accounts(self) -> list[AccountRead]:
-        payload = await self._read_payload()
-        return [await self._to_model(item, include_channel_templates=False) for item in payload]
+        return self._list_accounts_snapshot()
+
+    def _list_accounts_snapshot(self) -> list[AccountRead]:
+        """Serve the account list from per-account snapshots.
+
+        An entry is rebuilt only when its record or the mtime/size of its
+        session and credential files change. Process status and proxy summary
+        are cheap to look up and are applied to every entry on each call.
+        """
+        payload = self._read_payload_snapshot()
+        proxy_summaries = (
+            self.proxy_service.get_proxy_summaries()
+            if self.proxy_service is not None
+            else {}
+        )
+        models = []
+        with self._snapshot_lock:
+            entries: dict[str, tuple[tuple, AccountRead]] = {}
+            for item in payload:
+                account_id = str(item.get("id") or "")
+                fingerprint = (item, self._account_files_signature(account_id))
+                cached = entries.get(account_id) or self._snapshot_entries.get(
+                    account_id
+                )
+                if cached is None or cached[0] != fingerprint:
+                    model = self._build_model(item, channel_templates=[])
+                    cached = (fingerprint, model)
+                entries[account_id] = cached
+                model = cached[1]
+                models.append(
+                    model.model_copy(
+                        update={
+                            "status": self._process_status(account_id),
+                            "proxy_summary": self._lookup_proxy_summary(
+                                model.proxy_id, proxy_summaries
+                            ),
+                        }
+                    )
+                )
+            self._snapshot_entries = entries
+        return models
+
+    def _read_payload_snapshot(self) -> list[dict]:
+        signature = self._storage_signature()
+        with self._records_lock:
+            snapshot = self._payload_snapshot
+            if signature is not None and snapshot is not None:
+                if snapshot[0] == signature:
+                    return snapshot[1]
+            payload = self._read_payload_sync()
+            self._payload_snapshot = (signature, payload)
+            return payload
+
+    def _storage_signature(self) -> object:
+        if isinstance(self.storage, SqliteAccountStorage):
+            return self.storage.revision()
+        return file_signature(self.storage.path)
+
+    def _account_files_signature(self, account_id: str) -> tuple:
+        if not account_id:
+            return ()
+        session_dir = self.session_store.accounts_dir / account_id
+        return (
+            file_signature(session_dir / "auth.json"),
+            file_signature(session_dir / "telegram.session"),
+            file_signature(self.credentials_file(account_id)),
+        )
+
+    def _lookup_proxy_summary(self, proxy_id: str | None, summaries: dict):
+        if self.proxy_service is None or proxy_id is None:
+            return None
+        summary = summaries.get(proxy_id)
+        if summary is None:
+            return self.proxy_service.get_proxy_summary(proxy_id)
+        return summary
 
     def load_runtime_accounts(self) -> list[Account]:
         return [
@@ -215,6 +323,7 @@ class AccountService:
                 "action=starting_new_process no_process_was_killed=true",
             )
 
+        await self.release_telegram_client(account_id)
         try:
             launch_context = self._build_launch_context(account)
             process = self._spawn_process(account, launch_context)
@@ -230,6 +339,9 @@ class AccountService:
             message = self._format_start_failure(account, exit_code, output)
             self._append_log(account, message)
             self._update_record_sync(account_id, self._mark_process_failed)
+            self._finish_process_events(
+                account, process, exit_code=exit_code, failed=False
+            )
             raise BadRequestError(message)
 
         watcher = threading.Thread(
@@ -283,6 +395,10 @@ class AccountService:
         log(account_id, "INFO", "Account status changed to stopped.")
         return await self._to_model(updated_record)
 
+    async def release_telegram_client(self, account_id: str) -> None:
+        if self.telegram_client_pool is not None:
+            await self.telegram_client_pool.evict(account_id)
+
     async def set_account_phone(self, account_id: str, phone: str) -> AccountRead:
         normalized_phone = str(phone or "").strip()
         updated_record = await self._update_record(
@@ -316,17 +432,30 @@ class AccountService:
         *,
         include_channel_templates: bool = True,
     ) -> AccountRead:
-        phone = str(item.get("phone") or item.get("phone_number") or "").strip()
-        extra = {key: value for key, value in item.items() if key not in ACCOUNT_KNOWN_FIELDS}
         account_id = str(item.get("id") or "")
-        runtime_account = self._record_to_account(item)
-        if self._active_process(account_id) is not None:
-            status = "started"
-        else:
-            status = "stopped"
         channel_templates = []
         if include_channel_templates and self.channel_template_service is not None and account_id:
             channel_templates = await self.channel_template_service.list_template_summaries(account_id)
+        model = self._build_model(item, channel_templates=channel_templates)
+        return model.model_copy(
+            update={
+                "status": self._process_status(account_id),
+                "proxy_summary": (
+                    self.proxy_service.get_proxy_summary(model.proxy_id)
+                    if self.proxy_service is not None
+                    else None
+                ),
+            }
+        )
+
+    def _process_status(self, account_id: str) -> str:
+        return "started" if self._active_process(account_id) is not None else "stopped"
+
+    def _build_model(self, item: dict, *, channel_templates: list) -> AccountRead:
+        phone = str(item.get("phone") or item.get("phone_number") or "").strip()
+        extra = {key: value for key, value in item.items() if key not in ACCOUNT_KNOWN_FIELDS}
+        account_id = str(item.get("id") or "")
+        runtime_account = self._record_to_account(item)
         return AccountRead(
             id=account_id,
             name=runtime_account.name,
@@ -337,7 +466,7 @@ class AccountService:
             markup_amount=runtime_account.markup_amount,
             channel_links=runtime_account.channel_links,
             proxy_id=runtime_account.proxy_id,
-            status=status,
+            status="stopped",
             last_run=item.get("last_run"),
             errors=int(item.get("errors", 0)),
             shafa_session_exists=self.session_store.is_valid_shafa_session(runtime_account),
@@ -346,11 +475,7 @@ class AccountService:
             created_at=self._parse_datetime(item.get("created_at")),
             updated_at=self._parse_datetime(item.get("updated_at")),
             channel_templates=channel_templates,
-            proxy_summary=(
-                self.proxy_service.get_proxy_summary(runtime_account.proxy_id)
-                if self.proxy_service is not None
-                else None
-            ),
+            proxy_summary=None,
             extra=extra,
         )
 
@@ -362,16 +487,21 @@ class AccountService:
 
     def _read_payload_sync(self) -> list[dict]:
         with self._records_lock:
-            return [
-                self._normalize_record(item)
-                for item in read_json_list_file(self.storage.path)
-            ]
+            if isinstance(self.storage, SqliteAccountStorage):
+                raw_payload = self.storage.read_all()
+            else:
+                raw_payload = read_json_list_file(self.storage.path)
+            return [self._normalize_record(item) for item in raw_payload]
 
     def _write_payload_sync(self, payload: list[dict]) -> None:
         with self._records_lock:
+            self._payload_snapshot = None
+            normalized_payload = [self._normalize_record(item) for item in payload]
+            if isinstance(self.storage, SqliteAccountStorage):
+                self.storage.write_all(normalized_payload)
+                return
             try:
                 self.storage.path.parent.mkdir(parents=True, exist_ok=True)
-                normalized_payload = [self._normalize_record(item) for item in payload]
                 self.storage.path.write_text(
                     json.dumps(normalized_payload, ensure_ascii=False, indent=2),
                     encoding="utf-8",
@@ -381,6 +511,10 @@ class AccountService:
 
     def _delete_record_sync(self, account_id: str) -> None:
         with self._records_lock:
+            if isinstance(self.storage, SqliteAccountStorage):
+                if not self.storage.delete_record(account_id):
+                    raise NotFoundError(f"Account '{account_id}' not found.")
+                return
             payload = self._read_payload_sync()
             filtered = [item for item in payload if str(item.get("id")) != account_id]
             if len(filtered) == len(payload):
@@ -388,6 +522,11 @@ class AccountService:
             self._write_payload_sync(filtered)
 
     async def _get_record(self, account_id: str) -> dict:
+        if isinstance(self.storage, SqliteAccountStorage):
+            record = await asyncio.to_thread(self.storage.get_record, account_id)
+            if record is not None:
+                return self._normalize_record(record)
+            raise NotFoundError(f"Account '{account_id}' not found.")
         payload = await self._read_payload()
         for item in payload:
             if str(item.get("id")) == account_id:
@@ -398,6 +537,18 @@ class AccountService:
         return self._update_record_sync(account_id, update_fn)
 
     def _update_record_sync(self, account_id: str, update_fn: Callable[[dict], None]) -> dict:
+        if isinstance(self.storage, SqliteAccountStorage):
+            # One-row read-modify-write; other records are not read or rewritten.
+            def normalize_and_update(item: dict) -> None:
+                normalized = self._normalize_record(item)
+                update_fn(normalized)
+                item.clear()
+                item.update(normalized)
+
+            record = self.storage.update_record(account_id, normalize_and_update)
+            if record is None:
+                raise NotFoundError(f"Account '{account_id}' not found.")
+            return dict(record)
         with self._records_lock:
             payload = self._read_payload_sync()
             for item in payload:
@@ -500,14 +651,59 @@ class AccountService:
 
     def _spawn_process(self, account: Account, launch_context: dict[str, str]) -> subprocess.Popen[str]:
         cwd = launch_context.pop("cwd")
+        python = self.runtime.account_python(account)
+        # Structured events need an inherited pipe descriptor, which
+        # ``pass_fds`` only offers on POSIX. Elsewhere the dashboard keeps
+        # counting from the human log lines.
+        events_read_fd = events_write_fd = None
+        if os.name != "nt" and self.process_event_handler is not None:
+            events_read_fd, events_write_fd = os.pipe()
+            launch_context[EVENTS_FD_ENV] = str(events_write_fd)
+        pass_fds = () if events_write_fd is None else (events_write_fd,)
+        try:
+            process = self._spawn_hosted_process(
+                account, python, cwd, launch_context, pass_fds
+            )
+            if process is None:
+                process = self._popen_account_process(
+                    python, cwd, launch_context, pass_fds
+                )
+        except BadRequestError:
+            if events_read_fd is not None:
+                os.close(events_read_fd)
+            raise
+        finally:
+            if events_write_fd is not None:
+                os.close(events_write_fd)
+        if events_read_fd is not None:
+            reader = threading.Thread(
+                target=self._read_process_events,
+                args=(account, events_read_fd),
+                daemon=True,
+                name=f"account-events-{account.id}",
+            )
+            with self._process_lock:
+                self._event_readers[process.pid] = reader
+            reader.start()
+        return process
+
+    def _popen_account_process(
+        self,
+        python: str,
+        cwd: str,
+        env: dict[str, str],
+        pass_fds: tuple[int, ...],
+    ) -> subprocess.Popen[str]:
         popen_kwargs: dict[str, object] = {}
         if os.name == "nt":
             popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
         else:
             popen_kwargs["start_new_session"] = True
+        if pass_fds:
+            popen_kwargs["pass_fds"] = pass_fds
         try:
             return subprocess.Popen(
-                [self.runtime.account_python(account), "main.py", "--shafa"],
+                [python, "main.py", "--shafa"],
                 cwd=cwd,
                 stdin=subprocess.DEVNULL,
                 stdout=subprocess.PIPE,
@@ -516,12 +712,112 @@ class AccountService:
                 encoding="utf-8",
                 errors="replace",
                 bufsize=1,
-                env=launch_context,
+                env=env,
                 **popen_kwargs,
             )
         except OSError as exc:
             raise BadRequestError(f"Не удалось запустить процесс аккаунта: {exc}") from exc
 
+    def _spawn_hosted_process(
+        self,
+        account: Account,
+        python: str,
+        cwd: str,
+        env: dict[str, str],
+        pass_fds: tuple[int, ...],
+    ) -> WorkerHostProcess | None:
+        """Fork the run from the project's worker host, if that mode is on.
+
+        Returns ``None`` when the account should get its own interpreter:
+        the mode is off, the platform cannot fork, the project has no
+        ``worker_host.py`` or the host failed.
+        """
+        if not self.worker_host_enabled or not worker_host_supported(Path(cwd)):
+            return None
+        key = (python, str(cwd))
+        with self._worker_hosts_lock:
+            host = self._worker_hosts.get(key)
+            if host is None:
+                host = AccountWorkerHost(python, Path(cwd))
+                self._worker_hosts[key] = host
+        try:
+            return host.spawn(
+                ["main.py", "--shafa"],
+                cwd=cwd,
+                env=env,
+                events_fd=pass_fds[0] if pass_fds else None,
+            )
+        except WorkerHostError as exc:
+            LOGGER.warning(
+                "Worker host unavailable for account %s, starting a separate "
+                "process: %s",
+                account.id,
+                exc,
+            )
+            host.close()
+            return None
+
+    def close_worker_hosts(self) -> None:
+        with self._worker_hosts_lock:
+            hosts = list(self._worker_hosts.values())
+            self._worker_hosts.clear()
+        for host in hosts:
+            host.close()
+
+    def _read_process_events(self, account: Account, read_fd: int) -> None:
+        try:
+            with os.fdopen(read_fd, "r", encoding="utf-8", errors="replace") as stream:
+                for raw_line in stream:
+                    try:
+                        event = json.loads(raw_line)
+                    except ValueError:
+                        continue
+                    if isinstance(event, dict) and event.get("type"):
+                        self._dispatch_process_event(account.id, event)
+        except Exception:
+            LOGGER.exception("Failed to read events for account %s", account.id)
+
+    def _finish_process_events(
+        self,
+        account: Account,
+        process: subprocess.Popen[str],
+        *,
+        exit_code: int,
+        failed: bool,
+    ) -> None:
+        """Drain the events pipe, then report that the process is gone.
+
+        ``closed`` is sent after the exit line is appended, so every log line
+        of the run falls inside the run's event window.
+        """
+        with self._process_lock:
+            reader = self._event_readers.pop(process.pid, None)
+        if reader is None:
+            return
+        reader.join(timeout=_EVENT_READER_JOIN_TIMEOUT_SECONDS)
+        self._dispatch_process_event(
+            account.id,
+            {
+                "type": "closed",
+                "ts": time.time(),
+                "exit_code": exit_code,
+                "failed": failed,
+            },
+        )
+
+    def _dispatch_process_event(self, account_id: str, event: dict) -> None:
+        handler = self.process_event_handler
+        if handler is None:
+            return
+        try:
+            handler(account_id, event)
+        except Exception:
+            LOGGER.exception(
+                "Failed to handle %s event for account %s",
+                event.get("type"),
+                account_id,
+            )
+
     def _watch_process(self, account: Account, process: subprocess.Popen[str]) -> None:
         try:
             if process.stdout is not None:
@@ -529,13 +825,40 @@ class AccountService:
                     line = raw_line.rstrip()
                     if not line:
                         continue
-                    self._append_log(account, line)
+                    level = self._append_log(account, line)
+                    if level == "ERROR" and not _LOGGED_ERROR_LINE_PATTERN.match(
+                        line
+                    ):
+                        self._report_output_error(account, process, line)
         except Exception:
             LOGGER.exception("Failed to stream logs for account %s", account.id)
         finally:
             exit_code = process.wait()
             expected_stop = self._cleanup_process(account.id, process)
             self._handle_process_exit_sync(account, exit_code, expected_stop)
+            self._finish_process_events(
+                account,
+                process,
+                exit_code=exit_code,
+                failed=not expected_stop and exit_code != 0,
+            )
+
+    def _report_output_error(
+        self, account: Account, process: subprocess.Popen[str], line: str
+    ) -> None:
+        """Report an error line the run printed without ``log("ERROR")``.
+
+        Tracebacks and other output only reach the human log; while the run
+        reports events the log fold skips that log, so the dashboard would
+        not count them otherwise.
+        """
+        with self._process_lock:
+            if process.pid not in self._event_readers:
+                return
+        self._dispatch_process_event(
+            account.id,
+            {"type": "output_error", "ts": time.time(), "message": line},
+        )
 
     def _cleanup_process(self, account_id: str, process: subprocess.Popen[str]) -> bool:
         with self._process_lock:
@@ -592,10 +915,14 @@ class AccountService:
         except Exception:
             LOGGER.exception("Failed to kill pid %s", process.pid)
 
-    def _append_log(self, account: Account, message: str) -> None:
+    def _append_log(self, account: Account, message: str) -> str | None:
+        """Write one line to the account logs and return its level.
+
+        Returns ``None`` when the line is ignorable and was dropped.
+        """
         normalized_message = normalize_log_message(message)
         if is_ignorable_log_message(normalized_message):
-            return
+            return None
 
         record = LogRecord(
             timestamp=datetime.now(),
@@ -613,7 +940,9 @@ class AccountService:
             level=record.level,
             message=normalized_message,
             timestamp=record.timestamp,
+            normalized=True,
         )
+        return record.level
 
     def _consume_process_output(self, process: subprocess.Popen[str]) -> str:
         if process.stdout is None:
@@ -16,6 +16,7 @@ from fastapi import UploadFile
 
 from shafa_control import (
     Account,
+    AccountCommandPool,
     AccountRuntimeService,
     AccountSessionStore,
     ShafaAuthService,
@@ -113,6 +114,7 @@ class AccountAuthService:
         store: AccountSessionStore,
         runner=None,
         shafa_login_launcher=None,
+        command_pool: AccountCommandPool | None = None,
     ) -> None:
         self.account_service = account_service
         self.store = store
@@ -121,7 +123,11 @@ class AccountAuthService:
         self.telegram_auth = TelegramAuthService(store, self.runner)
         self.shafa_auth = ShafaAuthService(store)
         proxy_db_path = getattr(getattr(account_service, "proxy_service", None), "db_path", None)
-        self.runtime = AccountRuntimeService(store, proxy_db_path=proxy_db_path)
+        self.runtime = AccountRuntimeService(
+            store,
+            proxy_db_path=proxy_db_path,
+            command_pool=command_pool,
+        )
 
 
     async def get_telegram_status(self, account_id: str) -> TelegramAuthStatusResponse:
@@ -169,6 +175,7 @@ class AccountAuthService:
         payload: TelegramPhoneRequest,
     ) -> TelegramAuthStatusResponse:
         account = await self._get_account(account_id)
+        await self.account_service.release_telegram_client(account_id)
         log(account_id, "INFO", "Starting Telegram login: requesting verification code.")
         try:
             if not self._has_telegram_credentials(account):
@@ -213,6 +220,7 @@ class AccountAuthService:
         payload: TelegramCodeRequest,
     ) -> TelegramAuthStatusResponse:
         account = await self._get_account(account_id)
+        await self.account_service.release_telegram_client(account_id)
         log(account_id, "INFO", "Submitting Telegram verification code.")
         try:
             state = self.telegram_auth.load_auth_state(account)
@@ -236,6 +244,7 @@ class AccountAuthService:
         payload: TelegramPasswordRequest,
     ) -> TelegramAuthStatusResponse:
         account = await self._get_account(account_id)
+        await self.account_service.release_telegram_client(account_id)
         log(account_id, "INFO", "Submitting Telegram 2FA password.")
         try:
             result = self.telegram_auth.submit_password(account, payload.password)
@@ -252,6 +261,7 @@ class AccountAuthService:
 
     async def logout_telegram(self, account_id: str) -> TelegramAuthStatusResponse:
         account = await self._get_account(account_id)
+        await self.account_service.release_telegram_client(account_id)
         state = self.telegram_auth.load_auth_state(account)
         phone_number = str(state.get("phone_number") or account.phone_number or "").strip()
         self.store.delete_telegram_session(account)
@@ -281,6 +291,8 @@ class AccountAuthService:
         if source_account_id == account_id:
             raise BadRequestError("Исходный и целевой аккаунты должны отличаться.")
         source = await self._get_account(source_account_id)
+        await self.account_service.release_telegram_client(source_account_id)
+        await self.account_service.release_telegram_client(account_id)
         try:
             self.telegram_auth.copy_session(source, target)
         except RuntimeError as exc:
@@ -339,6 +351,7 @@ class AccountAuthService:
                 log(account_id, "WARNING", "Telegram session import rejected: file is empty.")
                 raise BadRequestError("Файл сессии Telegram пустой.")
 
+            await self.account_service.release_telegram_client(account_id)
             self.telegram_auth.import_session(account, temp_path)
         except RuntimeError as exc:
             log(
@@ -467,8 +480,20 @@ class AccountAuthService:
         log(account_id, "INFO", "Shafa session removed.")
         return status.model_copy(update={"message": "Cookies Shafa удалены."})
 
+    async def warm_command_pool(self) -> None:
+        """Start command hosts for every project an account runs from."""
+        if self.runtime.command_pool is None:
+            return
+        for account in await self.account_service.list_accounts():
+            self.runtime.warm_command_pool(self._to_runtime_account(account))
+
     async def _get_account(self, account_id: str) -> Account:
-        account = await self.account_service.get_account(account_id)
+        return self._to_runtime_account(
+            await self.account_service.get_account(account_id)
+        )
+
+    @staticmethod
+    def _to_runtime_account(account) -> Account:
         return Account(
             id=account.id,
             name=account.name,
@@ -603,6 +628,7 @@ class AccountAuthService:
         except ImportError:
             return ""
 
+        await self.account_service.release_telegram_client(account.id)
         try:
             client = create_telegram_client(
                 self.store.telegram_session_file(account),
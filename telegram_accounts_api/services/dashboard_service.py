@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import math
 import re
 import sqlite3
+import threading
 import time
 from collections import deque
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import UTC, date, datetime, timedelta
 from pathlib import Path
-from typing import Callable, Literal
+from typing import Callable, Iterator, Literal, Sequence
 
 from telegram_accounts_api.models.account import AccountRead
 from telegram_accounts_api.models.dashboard import (
@@ -27,6 +32,7 @@ from telegram_accounts_api.utils.account_logging import (
     normalize_log_message,
     normalize_log_timestamp,
 )
+from telegram_accounts_api.utils.metrics_store import DailyMetricsStore
 
 LOGGER = logging.getLogger(__name__)
 _PRODUCT_SUCCESS_PATTERN = re.compile(r"товар создан успешно", re.IGNORECASE)
@@ -65,7 +71,23 @@ SHARED_ACCOUNT_TASK_SKIPPED_NOT_FOUND = "skipped_not_found"
 TELEGRAM_DEACTIVATION_STATUS_PROCESSING = "processing"
 DEFAULT_DASHBOARD_LOG_HISTORY_LINES = 500
 MAX_DASHBOARD_LOG_HISTORY_LINES = 50_000
-_DAILY_COUNTER_KEYS = ("items", "errors", "creation_errors", "retry_events")
+_DAILY_COUNTER_KEYS = (
+    "items",
+    "errors",
+    "creation_errors",
+    "retry_events",
+    "deactivations",
+)
+# Past this many unread bytes a refresh re-reads the tail instead of parsing
+# everything that was appended since the last refresh.
+_HISTORY_INCREMENTAL_MAX_BYTES = 8 * 1024 * 1024
+_METRICS_FOLD_CHUNK_BYTES = 1024 * 1024
+# A stats job may wait this many per-job timeouts for a free pool worker.
+_STATS_QUEUE_TIMEOUT_FACTOR = 4
+# Today's deactivation counts are rewritten at most this often; a day
+# rollover closes the previous day straight away.
+_DEACTIVATION_COMPACTION_MIN_SECONDS = 60.0
+_HistoryLine = tuple[date, tuple[str, str, str], tuple[int, ...]]
 
 
 @dataclass(frozen=True)
@@ -77,6 +99,23 @@ class _HistoryAggregateCacheEntry:
     scanned_lines: int
 
 
+@dataclass
+class _LogHistoryWindow:
+    """Running aggregate over the last ``line_limit`` lines of one log file.
+
+    ``offset`` is the byte position after the last consumed newline of the
+    file identified by ``file_id`` (device, inode). Each line keeps its
+    counter deltas so it can be subtracted again once it leaves the window.
+    """
+
+    line_limit: int
+    file_id: tuple[int, int] | None = None
+    offset: int = 0
+    lines: deque[_HistoryLine | None] = field(default_factory=deque)
+    daily_totals: dict[date, dict[str, int]] = field(default_factory=dict)
+    date_line_counts: dict[date, int] = field(default_factory=dict)
+
+
 @dataclass(frozen=True)
 class _DashboardSummaryCacheEntry:
     expires_at: float
@@ -100,6 +139,9 @@ class DashboardService:
         history_line_limit: int | None = None,
         summary_cache_ttl_seconds: float | None = None,
         deactivation_cache_ttl_seconds: float | None = None,
+        stats_workers: int | None = None,
+        account_stats_timeout_seconds: float | None = None,
+        metrics_store: DailyMetricsStore | None = None,
     ) -> None:
         self.account_service = account_service
         self.log_store = log_store
@@ -123,6 +165,7 @@ class DashboardService:
             tuple[str, str],
             _HistoryAggregateCacheEntry,
         ] = {}
+        self._history_windows: dict[tuple[str, str], _LogHistoryWindow] = {}
         self._summary_cache: dict[
             tuple[DashboardPeriod, str | None, str | None, int],
             _DashboardSummaryCacheEntry,
@@ -132,6 +175,27 @@ class DashboardService:
             _SharedDeactivationCacheEntry,
         ] = {}
         self._dashboard_indexed_paths: set[str] = set()
+        self.stats_workers = (
+            self._resolve_stats_workers()
+            if stats_workers is None
+            else max(int(stats_workers), 1)
+        )
+        self.account_stats_timeout_seconds = (
+            self._resolve_account_stats_timeout_seconds()
+            if account_stats_timeout_seconds is None
+            else max(float(account_stats_timeout_seconds), 0.1)
+        )
+        self._stats_executor: ThreadPoolExecutor | None = None
+        self._stats_executor_lock = threading.Lock()
+        self._account_stats_locks: dict[str, threading.Lock] = {}
+        self._summary_in_flight: dict[
+            tuple[DashboardPeriod, str | None, str | None, int],
+            asyncio.Future[DashboardSummaryRead],
+        ] = {}
+        self.metrics_store = metrics_store
+        self._metrics_compaction_stop = threading.Event()
+        self._metrics_compaction_thread: threading.Thread | None = None
+        self._deactivations_compacted_at: tuple[date, float] | None = None
 
     async def get_summary(
         self,
@@ -141,8 +205,6 @@ class DashboardService:
         date_to: date | None = None,
         history_line_limit: int | None = None,
     ) -> DashboardSummaryRead:
-        started_at = time.perf_counter()
-        monotonic_started_at = time.monotonic()
         effective_history_line_limit = (
             self.history_line_limit
             if history_line_limit is None
@@ -154,6 +216,42 @@ class DashboardService:
             date_to.isoformat() if date_to is not None else None,
             effective_history_line_limit,
         )
+        in_flight = self._summary_in_flight.get(cache_key)
+        if in_flight is not None and not in_flight.done():
+            # Identical requests share one computation instead of each
+            # queueing their own round of account scans.
+            return await asyncio.shield(in_flight)
+
+        task = asyncio.ensure_future(
+            self._compute_summary(
+                cache_key,
+                period=period,
+                date_from=date_from,
+                date_to=date_to,
+                history_line_limit=effective_history_line_limit,
+            )
+        )
+        self._summary_in_flight[cache_key] = task
+
+        def forget(done: asyncio.Future[DashboardSummaryRead]) -> None:
+            if self._summary_in_flight.get(cache_key) is done:
+                del self._summary_in_flight[cache_key]
+
+        task.add_done_callback(forget)
+        return await asyncio.shield(task)
+
+    async def _compute_summary(
+        self,
+        cache_key: tuple[DashboardPeriod, str | None, str | None, int],
+        *,
+        period: DashboardPeriod,
+        date_from: date | None,
+        date_to: date | None,
+        history_line_limit: int,
+    ) -> DashboardSummaryRead:
+        started_at = time.perf_counter()
+        monotonic_started_at = time.monotonic()
+        effective_history_line_limit = history_line_limit
         cached = self._summary_cache.get(cache_key)
         if (
             cached is not None
@@ -179,23 +277,46 @@ class DashboardService:
         account_names = {account.id: account.name for account in accounts}
         earliest_entry_date: date | None = None
         total_history_lines_scanned = 0
-        account_stats_ms = 0
-
-        for account in accounts:
-            account_started_at = time.perf_counter()
-            runtime_entries = self.log_store.list_entries(
-                account.id,
-                limit=self.log_store.max_entries_per_account,
+        # Labels of stats jobs that failed or timed out; a summary missing
+        # any of them is served but not cached.
+        failed_jobs: list[str] = []
+        account_stats_started_at = time.perf_counter()
+        shared_summary_task = asyncio.ensure_future(
+            self._run_stats_job(
+                "shared deactivation",
+                self._load_shared_deactivation_summary,
+                account_names=account_names,
+                failed_jobs=failed_jobs,
             )
-            account_earliest_date, daily_totals, scanned_lines = self._load_account_daily_totals(
-                account.id,
-                runtime_entries=runtime_entries,
-                local_tz=local_tz,
-                history_line_limit=effective_history_line_limit,
+        )
+        account_results = await asyncio.gather(
+            *(
+                self._run_stats_job(
+                    account.id,
+                    self._load_account_daily_totals_locked,
+                    account.id,
+                    runtime_entries=self.log_store.list_entries(
+                        account.id,
+                        limit=self.log_store.max_entries_per_account,
+                    ),
+                    local_tz=local_tz,
+                    history_line_limit=effective_history_line_limit,
+                    failed_jobs=failed_jobs,
+                )
+                for account in accounts
             )
+        )
+        account_stats_ms = round(
+            (time.perf_counter() - account_stats_started_at) * 1000
+        )
+
+        for account, result in zip(accounts, account_results):
+            if result is None:
+                account_daily_totals[account.id] = {}
+                continue
+            account_earliest_date, daily_totals, scanned_lines = result
             account_daily_totals[account.id] = daily_totals
             total_history_lines_scanned += scanned_lines
-            account_stats_ms += round((time.perf_counter() - account_started_at) * 1000)
 
             if (
                 period == "all"
@@ -207,6 +328,19 @@ class DashboardService:
             ):
                 earliest_entry_date = account_earliest_date
 
+        if self.metrics_store is not None and period == "all":
+            rollup_earliest_date = await self._run_stats_job(
+                "metrics earliest day",
+                self.metrics_store.earliest_day,
+                account_names,
+                failed_jobs=failed_jobs,
+            )
+            if rollup_earliest_date is not None and (
+                earliest_entry_date is None
+                or rollup_earliest_date < earliest_entry_date
+            ):
+                earliest_entry_date = rollup_earliest_date
+
         range_start, range_end = self._resolve_date_range(
             generated_at=generated_at,
             period=period,
@@ -222,6 +356,21 @@ class DashboardService:
             point_date: self._empty_daily_totals()
             for point_date in series_dates
         }
+        if self.metrics_store is not None:
+            rollup = await self._run_stats_job(
+                "metrics range",
+                self.metrics_store.load_range,
+                account_names,
+                date_from=range_start,
+                date_to=range_end,
+                failed_jobs=failed_jobs,
+            )
+            for account_id, rollup_totals in (rollup or {}).items():
+                merged = account_daily_totals.setdefault(account_id, {})
+                for entry_date, totals in rollup_totals.items():
+                    target = merged.setdefault(entry_date, self._empty_daily_totals())
+                    for key in _DAILY_COUNTER_KEYS:
+                        target[key] += totals.get(key, 0)
 
         latest_run_account_name: str | None = None
         latest_run_at: datetime | None = None
@@ -260,15 +409,15 @@ class DashboardService:
                 errors=series_totals[point_date]["errors"],
                 creation_errors=series_totals[point_date]["creation_errors"],
                 retry_events=series_totals[point_date]["retry_events"],
+                deactivations=series_totals[point_date]["deactivations"],
             )
             for point_date in series_dates
         ]
 
-        shared_summary_started_at = time.perf_counter()
-        shared_deactivation_summary = self._load_shared_deactivation_summary(
-            account_names=account_names
-        )
-        shared_stats_ms = round((time.perf_counter() - shared_summary_started_at) * 1000)
+        shared_deactivation_summary = await shared_summary_task
+        if shared_deactivation_summary is None:
+            shared_deactivation_summary = DashboardSharedDeactivationSummaryRead()
+        shared_stats_ms = round((time.perf_counter() - account_stats_started_at) * 1000)
 
         summary = DashboardSummaryRead(
             generated_at=generated_at,
@@ -282,6 +431,7 @@ class DashboardService:
             error_events_in_range=sum(point.errors for point in series),
             creation_errors_in_range=sum(point.creation_errors for point in series),
             retry_events_in_range=sum(point.retry_events for point in series),
+            deactivations_in_range=sum(point.deactivations for point in series),
             latest_run_account_name=latest_run_account_name,
             latest_run_at=latest_run_at,
             top_error_account_name=top_error_account_name,
@@ -289,7 +439,7 @@ class DashboardService:
             series=series,
             shared_deactivation=shared_deactivation_summary,
         )
-        if self.summary_cache_ttl_seconds > 0:
+        if self.summary_cache_ttl_seconds > 0 and not failed_jobs:
             self._summary_cache[cache_key] = _DashboardSummaryCacheEntry(
                 expires_at=monotonic_started_at + self.summary_cache_ttl_seconds,
                 summary=summary,
@@ -297,7 +447,7 @@ class DashboardService:
         LOGGER.info(
             "dashboard summary loaded account_count=%s history_line_limit=%s "
             "history_lines_scanned=%s account_list_ms=%s account_stats_ms=%s "
-            "shared_stats_ms=%s duration_ms=%s",
+            "shared_stats_ms=%s duration_ms=%s failed_jobs=%s",
             len(accounts),
             effective_history_line_limit,
             total_history_lines_scanned,
@@ -305,9 +455,114 @@ class DashboardService:
             account_stats_ms,
             shared_stats_ms,
             round((time.perf_counter() - started_at) * 1000),
+            len(failed_jobs),
         )
         return summary
 
+    async def _run_stats_job(
+        self,
+        label: str,
+        func: Callable,
+        *args,
+        failed_jobs: list[str] | None = None,
+        **kwargs,
+    ):
+        """Run one blocking statistics job in the stats pool.
+
+        Returns ``None`` when the job fails or exceeds the per-account timeout,
+        so a single locked database only blanks its own part of the summary;
+        ``label`` is then appended to ``failed_jobs``. The timeout starts when
+        a pool worker picks the job up; waiting in the queue has its own
+        bound of ``_STATS_QUEUE_TIMEOUT_FACTOR`` timeouts, so workers stuck on
+        other jobs fail this one instead of the whole summary. The worker
+        thread itself is not interrupted and finishes in the background.
+        """
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+
+        def run():
+            loop.call_soon_threadsafe(started.set)
+            return func(*args, **kwargs)
+
+        future = loop.run_in_executor(self._get_stats_executor(), run)
+        started_wait = asyncio.ensure_future(started.wait())
+        queue_timeout = self.account_stats_timeout_seconds * _STATS_QUEUE_TIMEOUT_FACTOR
+        try:
+            done, _pending = await asyncio.wait(
+                {future, started_wait},
+                timeout=queue_timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            started_wait.cancel()
+        if not done:
+            future.cancel()
+            LOGGER.warning(
+                "dashboard stats never started target=%s queue_timeout_seconds=%s",
+                label,
+                queue_timeout,
+            )
+            if failed_jobs is not None:
+                failed_jobs.append(label)
+            return None
+        try:
+            return await asyncio.wait_for(
+                future,
+                timeout=self.account_stats_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            LOGGER.warning(
+                "dashboard stats timed out target=%s timeout_seconds=%s",
+                label,
+                self.account_stats_timeout_seconds,
+            )
+        except Exception:
+            LOGGER.exception("dashboard stats failed target=%s", label)
+        if failed_jobs is not None:
+            failed_jobs.append(label)
+        return None
+
+    def _get_stats_executor(self) -> ThreadPoolExecutor:
+        with self._stats_executor_lock:
+            if self._stats_executor is None:
+                self._stats_executor = ThreadPoolExecutor(
+                    max_workers=self.stats_workers,
+                    thread_name_prefix="dashboard-stats",
+                )
+            return self._stats_executor
+
+    def shutdown(self) -> None:
+        with self._stats_executor_lock:
+            executor, self._stats_executor = self._stats_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_account_daily_totals_locked(
+        self,
+        account_id: str,
+        **kwargs,
+    ) -> tuple[date | None, dict[date, dict[str, int]], int]:
+        # History windows and log cursors are advanced in place, so concurrent
+        # summaries must not refresh the same account at once.
+        with self._account_lock(account_id):
+            return self._load_account_daily_totals(account_id, **kwargs)
+
+    @contextmanager
+    def _account_lock(self, account_id: str) -> Iterator[None]:
+        """Hold the stats lock of one account or raise ``TimeoutError``.
+
+        A job stuck while holding it then fails only that account's stats,
+        instead of tying up every worker that waits for the lock.
+        """
+        with self._stats_executor_lock:
+            lock = self._account_stats_locks.setdefault(account_id, threading.Lock())
+        if not lock.acquire(timeout=self.account_stats_timeout_seconds):
+            raise TimeoutError(f"dashboard stats lock busy account={account_id}")
+        try:
+            yield
+        finally:
+            lock.release()
+
     def _load_shared_deactivation_summary(
         self,
         *,
@@ -883,28 +1138,60 @@ class DashboardService:
         local_tz,
         history_line_limit: int,
     ) -> tuple[date | None, dict[date, dict[str, int]], int]:
-        history = self._load_cached_history_aggregate(
-            account_id,
-            local_tz=local_tz,
-            runtime_entries=runtime_entries,
-            history_line_limit=history_line_limit,
-        )
-        daily_totals = {
-            point_date: totals.copy()
-            for point_date, totals in history.daily_totals.items()
-        }
-        earliest_entry_date = history.earliest_entry_date
-        runtime_keys_matched_in_history = self._find_runtime_keys_in_history(
-            account_id,
-            runtime_entries=runtime_entries,
-            local_tz=local_tz,
-            history_line_limit=history_line_limit,
-        )
+        folded_boundary = None
+        if self.metrics_store is not None:
+            # Logged days come from ``metrics_daily``; only runtime entries
+            # that have not reached app.log yet are added on top. The fold
+            # runs first, so every logged entry is behind the fold boundary
+            # and the history window is not parsed at all.
+            scanned_lines = self._fold_account_log_metrics(
+                account_id,
+                local_tz=local_tz,
+                seed_line_limit=history_line_limit,
+            )
+            daily_totals: dict[date, dict[str, int]] = {}
+            earliest_entry_date = None
+            event_windows = self.metrics_store.get_event_windows(account_id)
+            folded_boundary = self._folded_log_boundary(account_id, local_tz=local_tz)
+            runtime_keys_matched_in_history: set[tuple[str, str, str]] = set()
+        else:
+            history = self._load_cached_history_aggregate(
+                account_id,
+                local_tz=local_tz,
+                runtime_entries=runtime_entries,
+                history_line_limit=history_line_limit,
+            )
+            daily_totals = {
+                point_date: totals.copy()
+                for point_date, totals in history.daily_totals.items()
+            }
+            earliest_entry_date = history.earliest_entry_date
+            event_windows = []
+            scanned_lines = history.scanned_lines
+            runtime_keys_matched_in_history = self._find_runtime_keys_in_history(
+                account_id,
+                runtime_entries=runtime_entries,
+                local_tz=local_tz,
+                history_line_limit=history_line_limit,
+            )
 
         for entry in runtime_entries:
             entry_key = self._build_entry_dedupe_key(entry)
             if entry_key in runtime_keys_matched_in_history:
                 continue
+            if folded_boundary is not None:
+                # The rollup already holds every line up to the fold cursor,
+                # including those that have left the history window.
+                boundary_timestamp, boundary_keys = folded_boundary
+                if entry_key[0] < boundary_timestamp or (
+                    entry_key[0] == boundary_timestamp and entry_key in boundary_keys
+                ):
+                    continue
+            if event_windows and self._in_event_window(
+                event_windows,
+                normalize_log_timestamp(entry.timestamp).timestamp(),
+            ):
+                continue
             entry_date = normalize_log_timestamp(entry.timestamp).astimezone(local_tz).date()
             totals = daily_totals.setdefault(entry_date, self._empty_daily_totals())
             self._accumulate_entry_totals(
@@ -915,7 +1202,428 @@ class DashboardService:
             if earliest_entry_date is None or entry_date < earliest_entry_date:
                 earliest_entry_date = entry_date
 
-        return earliest_entry_date, daily_totals, history.scanned_lines
+        return earliest_entry_date, daily_totals, scanned_lines
+
+    def _fold_account_log_metrics(
+        self,
+        account_id: str,
+        *,
+        local_tz,
+        seed_line_limit: int,
+    ) -> int:
+        """Add every complete log line past the stored cursor to the rollup.
+
+        The first fold seeds the rollup from the same tail the dashboard used
+        to show. After a rename rotation the rest of ``app.log.1`` is folded
+        before the new file, so no line is counted twice or skipped. Lines
+        written during a run that reported structured events are skipped;
+        those counters were added by ``record_process_event``. Returns how
+        many lines were read.
+        """
+        if self.metrics_store is None:
+            return 0
+        log_file = self.account_service.account_dir(account_id) / "logs" / "app.log"
+        try:
+            stat = log_file.stat()
+        except OSError:
+            return 0
+        file_id = (stat.st_dev, stat.st_ino)
+        cursor = self.metrics_store.get_log_cursor(account_id)
+        event_windows = self.metrics_store.get_event_windows(account_id)
+        daily_totals: dict[date, dict[str, int]] = {}
+        scanned_lines = 0
+        if cursor is None:
+            raw_lines, offset = self._read_log_tail(log_file, limit=seed_line_limit)
+            scanned_lines = len(raw_lines)
+            for raw_line in raw_lines:
+                self._add_metrics_line(
+                    daily_totals,
+                    raw_line,
+                    local_tz=local_tz,
+                    event_windows=event_windows,
+                )
+        else:
+            offset = cursor[2]
+            if (cursor[0], cursor[1]) != file_id or stat.st_size < offset:
+                rotated_file = log_file.with_name(f"{log_file.name}.1")
+                try:
+                    rotated_stat = rotated_file.stat()
+                except OSError:
+                    rotated_stat = None
+                if (
+                    rotated_stat is not None
+                    and (rotated_stat.st_dev, rotated_stat.st_ino) == cursor[:2]
+                ):
+                    _rotated_end, rotated_lines = self._fold_log_bytes(
+                        daily_totals,
+                        rotated_file,
+                        offset,
+                        rotated_stat.st_size,
+                        local_tz=local_tz,
+                        event_windows=event_windows,
+                    )
+                    scanned_lines += rotated_lines
+                offset = 0
+            offset, folded_lines = self._fold_log_bytes(
+                daily_totals,
+                log_file,
+                offset,
+                stat.st_size,
+                local_tz=local_tz,
+                event_windows=event_windows,
+            )
+            scanned_lines += folded_lines
+            if offset == cursor[2] and file_id == cursor[:2]:
+                return scanned_lines
+        self.metrics_store.add_log_totals(
+            account_id, daily_totals, cursor=(*file_id, offset)
+        )
+        return scanned_lines
+
+    def _folded_log_boundary(
+        self,
+        account_id: str,
+        *,
+        local_tz,
+    ) -> tuple[str, set[tuple[str, str, str]]] | None:
+        """Return the newest folded second and the folded entry keys in it.
+
+        Runtime entries older than that second, or in it with a folded key,
+        are already part of the rollup.
+        """
+        if self.metrics_store is None:
+            return None
+        cursor = self.metrics_store.get_log_cursor(account_id)
+        if cursor is None or cursor[2] <= 0:
+            return None
+        log_file = self.account_service.account_dir(account_id) / "logs" / "app.log"
+        try:
+            stat = log_file.stat()
+        except OSError:
+            return None
+        if (stat.st_dev, stat.st_ino) != cursor[:2]:
+            return None
+        end = min(cursor[2], stat.st_size)
+        start = max(end - 64 * 1024, 0)
+        with log_file.open("rb") as handle:
+            handle.seek(start)
+            data = handle.read(end - start)
+        if start > 0:
+            data = data[data.find(b"\n") + 1 :]
+        boundary_timestamp = ""
+        boundary_keys: set[tuple[str, str, str]] = set()
+        for raw_line in data.decode("utf-8", errors="replace").splitlines():
+            line = self._parse_history_line(raw_line, local_tz=local_tz)
+            if line is None:
+                continue
+            entry_key = line[1]
+            if entry_key[0] > boundary_timestamp:
+                boundary_timestamp = entry_key[0]
+                boundary_keys = set()
+            if entry_key[0] == boundary_timestamp:
+                boundary_keys.add(entry_key)
+        if not boundary_timestamp:
+            return None
+        return boundary_timestamp, boundary_keys
+
+    def _fold_log_bytes(
+        self,
+        daily_totals: dict[date, dict[str, int]],
+        log_file: Path,
+        start: int,
+        end: int,
+        *,
+        local_tz,
+        event_windows: Sequence[tuple[float, float | None]] = (),
+    ) -> tuple[int, int]:
+        """Fold complete lines in ``[start, end)``.
+
+        Returns the new offset and the number of lines read.
+        """
+        offset = start
+        lines = 0
+        pending = b""
+        with log_file.open("rb") as handle:
+            handle.seek(start)
+            while offset + len(pending) < end:
+                chunk = handle.read(
+                    min(_METRICS_FOLD_CHUNK_BYTES, end - offset - len(pending))
+                )
+                if not chunk:
+                    break
+                data = pending + chunk
+                complete_bytes = data.rfind(b"\n") + 1
+                pending = data[complete_bytes:]
+                if complete_bytes <= 0:
+                    continue
+                text = data[:complete_bytes].decode("utf-8", errors="replace")
+                for raw_line in text.splitlines():
+                    lines += 1
+                    self._add_metrics_line(
+                        daily_totals,
+                        raw_line,
+                        local_tz=local_tz,
+                        event_windows=event_windows,
+                    )
+                offset += complete_bytes
+        return offset, lines
+
+    def _add_metrics_line(
+        self,
+        daily_totals: dict[date, dict[str, int]],
+        raw_line: str,
+        *,
+        local_tz,
+        event_windows: Sequence[tuple[float, float | None]] = (),
+    ) -> None:
+        if event_windows:
+            # Check the timestamp prefix first: a line of an event-reporting
+            # run is skipped without running the full rendered-line parse.
+            timestamp = self._rendered_line_epoch(raw_line)
+            if timestamp is not None and self._in_event_window(
+                event_windows, timestamp
+            ):
+                return
+        line = self._parse_history_line(raw_line, local_tz=local_tz)
+        if line is None:
+            return
+        entry_date, _entry_key, deltas = line
+        totals = daily_totals.setdefault(entry_date, self._empty_daily_totals())
+        for key, delta in zip(_DAILY_COUNTER_KEYS, deltas):
+            totals[key] += delta
+
+    @staticmethod
+    def _rendered_line_epoch(raw_line: str) -> float | None:
+        stripped = raw_line.lstrip()
+        if not stripped.startswith("[") or stripped[20:21] != "]":
+            return None
+        try:
+            return normalize_log_timestamp(
+                datetime.strptime(stripped[1:20], "%Y-%m-%d %H:%M:%S")
+            ).timestamp()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _in_event_window(
+        event_windows: Sequence[tuple[float, float | None]],
+        timestamp: float,
+    ) -> bool:
+        return any(
+            started_at <= timestamp and (ended_at is None or timestamp <= ended_at)
+            for started_at, ended_at in event_windows
+        )
+
+    def record_process_event(self, account_id: str, event: dict) -> None:
+        """Fold one structured account process event into the rollup.
+
+        ``hello`` and ``closed`` bound the run whose log lines the log fold
+        then skips. ``product_failed`` is counted only when its message is a
+        creation error, the same rule the log fold applies, and as an error
+        only when no ``ERROR`` line, which reports its own ``error`` event,
+        was logged. ``output_error`` is an error line the run printed without
+        ``log("ERROR")``, such as a traceback; it counts only while a window
+        is open, since otherwise the log fold counts that line itself.
+        """
+        if self.metrics_store is None:
+            return
+        event_type = str(event.get("type") or "")
+        try:
+            timestamp = float(event.get("ts"))
+        except (TypeError, ValueError):
+            timestamp = time.time()
+        if event_type == "hello":
+            # Rendered log lines carry whole seconds.
+            self.metrics_store.open_event_window(account_id, math.floor(timestamp))
+            return
+        totals = self._empty_daily_totals()
+        if event_type == "closed":
+            window_closed = self.metrics_store.close_event_window(
+                account_id, timestamp
+            )
+            if not (window_closed and event.get("failed")):
+                return
+            totals["errors"] += 1
+        elif event_type == "product_created":
+            totals["items"] += 1
+        elif event_type == "product_failed":
+            if not self._is_product_creation_error(str(event.get("message") or "")):
+                return
+            totals["creation_errors"] += 1
+            if normalize_log_level(str(event.get("level") or "")) != "ERROR":
+                totals["errors"] += 1
+        elif event_type == "product_retry":
+            totals["retry_events"] += 1
+        elif event_type == "error":
+            totals["errors"] += 1
+        elif event_type == "output_error":
+            if not self._in_event_window(
+                self.metrics_store.get_event_windows(account_id),
+                math.floor(timestamp),
+            ):
+                return
+            totals["errors"] += 1
+        else:
+            return
+        local_tz = self.now_provider().astimezone().tzinfo or UTC
+        event_date = datetime.fromtimestamp(timestamp, tz=local_tz).date()
+        self.metrics_store.add_event_totals(account_id, {event_date: totals})
+
+    def _compact_deactivation_metrics(self, *, local_tz, today: date) -> None:
+        """Recount shared deactivations per account and day since the watermark.
+
+        Days before ``today`` are final once compacted, so each run only
+        reads task rows completed since the previous closed day.
+        """
+        if self.metrics_store is None:
+            return
+        db_path = self.account_service.session_store.shared_telegram_db_file()
+        if not db_path.exists():
+            return
+        compacted_through = self.metrics_store.get_deactivations_compacted_through()
+        since = (
+            compacted_through + timedelta(days=1)
+            if compacted_through is not None
+            else date.min
+        )
+        if since > today:
+            return
+        counts: dict[tuple[str, date], int] = {}
+        with sqlite3.connect(db_path, timeout=30.0) as conn:
+            conn.row_factory = sqlite3.Row
+            if not self._shared_deactivation_tables_exist(conn):
+                return
+            # Completion timestamps may be stored in UTC; one extra day of
+            # rows covers any local offset before filtering by local day.
+            rows = conn.execute(
+                """
+                SELECT account_id, completed_at
+                FROM shared_deactivation_task_accounts
+                WHERE status IN (?, ?)
+                  AND completed_at >= ?
+                """,
+                (
+                    SHARED_ACCOUNT_TASK_COMPLETED,
+                    SHARED_ACCOUNT_TASK_SKIPPED_NOT_FOUND,
+                    (
+                        (since - timedelta(days=1)).isoformat()
+                        if since > date.min
+                        else ""
+                    ),
+                ),
+            ).fetchall()
+        for account_id, completed_at in rows:
+            parsed = self._parse_datetime(completed_at)
+            if parsed is None:
+                continue
+            completed_date = parsed.astimezone(local_tz).date()
+            if completed_date < since:
+                continue
+            key = (str(account_id), completed_date)
+            counts[key] = counts.get(key, 0) + 1
+        self.metrics_store.replace_deactivations(
+            counts,
+            since=since,
+            closed_through=today - timedelta(days=1),
+        )
+
+    def compact_metrics(self) -> int:
+        """Fold new log lines of every account directory into the rollup.
+
+        Shared deactivations are recounted too, at most once per
+        ``_DEACTIVATION_COMPACTION_MIN_SECONDS`` unless the day rolled over.
+        Summaries only read the rollup, so this runs on the compaction thread.
+        """
+        if self.metrics_store is None:
+            return 0
+        current_time = self.now_provider().astimezone()
+        local_tz = current_time.tzinfo or UTC
+        accounts_dir = getattr(self.account_service, "accounts_dir", None)
+        if accounts_dir is None or not Path(accounts_dir).is_dir():
+            return 0
+        folded = 0
+        for account_dir in sorted(Path(accounts_dir).iterdir()):
+            if not (account_dir / "logs" / "app.log").is_file():
+                continue
+            try:
+                with self._account_lock(account_dir.name):
+                    self._fold_account_log_metrics(
+                        account_dir.name,
+                        local_tz=local_tz,
+                        seed_line_limit=self.history_line_limit,
+                    )
+            except TimeoutError:
+                LOGGER.warning(
+                    "dashboard metrics compaction skipped busy account=%s",
+                    account_dir.name,
+                )
+                continue
+            folded += 1
+        today = current_time.date()
+        last_run = self._deactivations_compacted_at
+        if (
+            last_run is None
+            or last_run[0] != today
+            or time.monotonic() - last_run[1] >= _DEACTIVATION_COMPACTION_MIN_SECONDS
+        ):
+            self._compact_deactivation_metrics(local_tz=local_tz, today=today)
+            self._deactivations_compacted_at = (today, time.monotonic())
+        return folded
+
+    def close_stale_event_windows(self) -> None:
+        """End event windows of runs this API process no longer hears from.
+
+        Called on startup: a run that was open when the previous process
+        stopped never reports ``closed``, and its window would otherwise
+        keep the log fold from counting anything the account logs later.
+        """
+        if self.metrics_store is None:
+            return
+        closed = self.metrics_store.close_open_event_windows(time.time())
+        if closed:
+            LOGGER.info("closed %s stale dashboard event windows", closed)
+
+    def start_metrics_compaction(self, interval_seconds: float | None = None) -> None:
+        if self.metrics_store is None:
+            return
+        interval = (
+            self._resolve_metrics_compaction_interval_seconds()
+            if interval_seconds is None
+            else float(interval_seconds)
+        )
+        if interval <= 0:
+            return
+        if (
+            self._metrics_compaction_thread is not None
+            and self._metrics_compaction_thread.is_alive()
+        ):
+            return
+        self._metrics_compaction_stop.clear()
+        self._metrics_compaction_thread = threading.Thread(
+            target=self._metrics_compaction_loop,
+            args=(interval,),
+            name="dashboard-metrics-compaction",
+            daemon=True,
+        )
+        self._metrics_compaction_thread.start()
+
+    def stop_metrics_compaction(self) -> None:
+        self._metrics_compaction_stop.set()
+        thread = self._metrics_compaction_thread
+        self._metrics_compaction_thread = None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _metrics_compaction_loop(self, interval_seconds: float) -> None:
+        # The first pass runs right away so a restart does not leave the
+        # rollup behind for a whole interval.
+        while True:
+            try:
+                self.compact_metrics()
+            except Exception:
+                LOGGER.exception("dashboard metrics compaction failed")
+            if self._metrics_compaction_stop.wait(interval_seconds):
+                return
 
     def _load_cached_history_aggregate(
         self,
@@ -933,23 +1641,28 @@ class DashboardService:
             return cached
 
         recent_entry_key_limit = max(self.log_store.max_entries_per_account * 2, 200)
-        (
-            earliest_entry_date,
-            daily_totals,
-            recent_entry_keys,
-            scanned_lines,
-        ) = self._scan_log_history(
+        window = self._refresh_history_window(
             log_file,
+            self._history_windows.get(cache_key),
             local_tz=local_tz,
-            recent_entry_key_limit=recent_entry_key_limit,
             history_line_limit=history_line_limit,
         )
+        self._history_windows[cache_key] = window
+        recent_entry_keys: set[tuple[str, str, str]] = set()
+        for line in reversed(window.lines):
+            if len(recent_entry_keys) >= recent_entry_key_limit:
+                break
+            if line is not None:
+                recent_entry_keys.add(line[1])
         cache_entry = _HistoryAggregateCacheEntry(
             signature=signature,
-            earliest_entry_date=earliest_entry_date,
-            daily_totals=daily_totals,
+            earliest_entry_date=min(window.date_line_counts, default=None),
+            daily_totals={
+                point_date: totals.copy()
+                for point_date, totals in window.daily_totals.items()
+            },
             recent_entry_keys=recent_entry_keys,
-            scanned_lines=scanned_lines,
+            scanned_lines=len(window.lines),
         )
         self._history_cache[cache_key] = cache_entry
         return cache_entry
@@ -977,63 +1690,162 @@ class DashboardService:
                 matched_keys.add(entry_key)
         return matched_keys
 
-    def _scan_log_history(
+    def _refresh_history_window(
         self,
         log_file: Path,
+        window: _LogHistoryWindow | None,
         *,
         local_tz,
-        recent_entry_key_limit: int,
         history_line_limit: int,
-    ) -> tuple[date | None, dict[date, dict[str, int]], set[tuple[str, str, str]], int]:
-        if not log_file.exists() or not log_file.is_file():
-            return None, {}, set(), 0
+    ) -> _LogHistoryWindow:
+        """Bring ``window`` up to date by parsing only bytes appended since.
 
-        earliest_entry_date: date | None = None
-        daily_totals: dict[date, dict[str, int]] = {}
-        recent_entry_keys_queue: deque[tuple[str, str, str]] = deque(
-            maxlen=max(1, recent_entry_key_limit)
-        )
-        scanned_lines = 0
+        After rotation the rest of the previous file is read from its ``.1``
+        backup before the new file is consumed from offset 0. When the old
+        file is gone, or too much was appended, the tail is re-read.
+        """
+        try:
+            stat = log_file.stat()
+        except OSError:
+            return _LogHistoryWindow(line_limit=history_line_limit)
+        file_id = (stat.st_dev, stat.st_ino)
+        if window is None or window.line_limit != history_line_limit:
+            return self._scan_history_tail(log_file, local_tz, history_line_limit)
+
+        try:
+            if window.file_id != file_id or stat.st_size < window.offset:
+                rotated_file = log_file.with_name(f"{log_file.name}.1")
+                try:
+                    rotated_stat = rotated_file.stat()
+                except OSError:
+                    rotated_stat = None
+                if (
+                    rotated_stat is None
+                    or (rotated_stat.st_dev, rotated_stat.st_ino) != window.file_id
+                    or rotated_stat.st_size - window.offset
+                    > _HISTORY_INCREMENTAL_MAX_BYTES
+                ):
+                    return self._scan_history_tail(
+                        log_file, local_tz, history_line_limit
+                    )
+                self._consume_history_file(
+                    window, rotated_file, rotated_stat.st_size, local_tz=local_tz
+                )
+                window.file_id = file_id
+                window.offset = 0
+            if stat.st_size - window.offset > _HISTORY_INCREMENTAL_MAX_BYTES:
+                return self._scan_history_tail(log_file, local_tz, history_line_limit)
+            self._consume_history_file(
+                window, log_file, stat.st_size, local_tz=local_tz
+            )
+        except OSError:
+            return self._scan_history_tail(log_file, local_tz, history_line_limit)
+        return window
 
+    def _scan_history_tail(
+        self,
+        log_file: Path,
+        local_tz,
+        history_line_limit: int,
+    ) -> _LogHistoryWindow:
+        window = _LogHistoryWindow(line_limit=history_line_limit)
         try:
-            raw_lines = self._read_log_tail_lines(
+            stat = log_file.stat()
+            raw_lines, consumed_bytes = self._read_log_tail(
                 log_file,
                 limit=history_line_limit,
             )
         except OSError:
-            return None, {}, set(), 0
-
+            return window
+        window.file_id = (stat.st_dev, stat.st_ino)
+        window.offset = consumed_bytes
         for raw_line in raw_lines:
-            scanned_lines += 1
-            match = _RENDERED_LOG_PATTERN.match(raw_line.strip())
-            if not match:
-                continue
-            try:
-                timestamp = normalize_log_timestamp(
-                    datetime.strptime(
-                        match.group("timestamp"),
-                        "%Y-%m-%d %H:%M:%S",
-                    )
-                )
-            except ValueError:
-                continue
+            self._push_history_line(window, raw_line, local_tz=local_tz)
+        return window
 
-            level = normalize_log_level(match.group("level"))
-            message = normalize_log_message(match.group("message") or "")
-            entry_key = (
-                timestamp.replace(microsecond=0).isoformat(),
-                level,
-                message,
-            )
-            recent_entry_keys_queue.append(entry_key)
+    def _consume_history_file(
+        self,
+        window: _LogHistoryWindow,
+        log_file: Path,
+        size: int,
+        *,
+        local_tz,
+    ) -> None:
+        if size <= window.offset:
+            return
+        with log_file.open("rb") as handle:
+            handle.seek(window.offset)
+            data = handle.read(size - window.offset)
+        # A trailing partial line is left for the next refresh.
+        complete_bytes = data.rfind(b"\n") + 1
+        if complete_bytes <= 0:
+            return
+        text = data[:complete_bytes].decode("utf-8", errors="replace")
+        for raw_line in text.splitlines():
+            self._push_history_line(window, raw_line, local_tz=local_tz)
+        window.offset += complete_bytes
+
+    def _push_history_line(
+        self,
+        window: _LogHistoryWindow,
+        raw_line: str,
+        *,
+        local_tz,
+    ) -> None:
+        line = self._parse_history_line(raw_line, local_tz=local_tz)
+        window.lines.append(line)
+        if line is not None:
+            self._apply_history_line(window, line, sign=1)
+        while len(window.lines) > window.line_limit:
+            evicted = window.lines.popleft()
+            if evicted is not None:
+                self._apply_history_line(window, evicted, sign=-1)
 
-            entry_date = timestamp.astimezone(local_tz).date()
-            if earliest_entry_date is None or entry_date < earliest_entry_date:
-                earliest_entry_date = entry_date
-            totals = daily_totals.setdefault(entry_date, self._empty_daily_totals())
-            self._accumulate_entry_totals(totals, level=level, message=message)
+    @staticmethod
+    def _apply_history_line(
+        window: _LogHistoryWindow,
+        line: _HistoryLine,
+        *,
+        sign: int,
+    ) -> None:
+        entry_date, _entry_key, deltas = line
+        remaining = window.date_line_counts.get(entry_date, 0) + sign
+        if remaining <= 0:
+            window.date_line_counts.pop(entry_date, None)
+            window.daily_totals.pop(entry_date, None)
+            return
+        window.date_line_counts[entry_date] = remaining
+        totals = window.daily_totals.setdefault(
+            entry_date, DashboardService._empty_daily_totals()
+        )
+        for key, delta in zip(_DAILY_COUNTER_KEYS, deltas):
+            totals[key] += sign * delta
 
-        return earliest_entry_date, daily_totals, set(recent_entry_keys_queue), scanned_lines
+    def _parse_history_line(self, raw_line: str, *, local_tz) -> _HistoryLine | None:
+        match = _RENDERED_LOG_PATTERN.match(raw_line.strip())
+        if not match:
+            return None
+        try:
+            timestamp = normalize_log_timestamp(
+                datetime.strptime(
+                    match.group("timestamp"),
+                    "%Y-%m-%d %H:%M:%S",
+                )
+            )
+        except ValueError:
+            return None
+
+        level = normalize_log_level(match.group("level"))
+        message = normalize_log_message(match.group("message") or "")
+        entry_key = (
+            timestamp.replace(microsecond=0).isoformat(),
+            level,
+            message,
+        )
+        totals = self._empty_daily_totals()
+        self._accumulate_entry_totals(totals, level=level, message=message)
+        deltas = tuple(totals[key] for key in _DAILY_COUNTER_KEYS)
+        return timestamp.astimezone(local_tz).date(), entry_key, deltas
 
     @staticmethod
     def _empty_daily_totals() -> dict[str, int]:
@@ -1061,7 +1873,8 @@ class DashboardService:
             totals["errors"] += 1
 
     @staticmethod
-    def _read_log_tail_lines(log_file: Path, *, limit: int) -> list[str]:
+    def _read_log_tail(log_file: Path, *, limit: int) -> tuple[list[str], int]:
+        """Return the last ``limit`` complete lines and the offset after them."""
         bounded_limit = max(1, int(limit))
         chunk_size = 64 * 1024
         buffer = bytearray()
@@ -1069,7 +1882,8 @@ class DashboardService:
 
         with log_file.open("rb") as handle:
             handle.seek(0, 2)
-            position = handle.tell()
+            end_position = handle.tell()
+            position = end_position
 
             while position > 0 and newline_count <= bounded_limit:
                 read_size = min(chunk_size, position)
@@ -1079,7 +1893,10 @@ class DashboardService:
                 buffer[:0] = chunk
                 newline_count = buffer.count(b"\n")
 
-        return buffer.decode("utf-8", errors="replace").splitlines()[-bounded_limit:]
+        complete_bytes = buffer.rfind(b"\n") + 1
+        consumed_offset = end_position - (len(buffer) - complete_bytes)
+        lines = bytes(buffer[:complete_bytes]).decode("utf-8", errors="replace")
+        return lines.splitlines()[-bounded_limit:], consumed_offset
 
     @classmethod
     def _resolve_history_line_limit(cls) -> int:
@@ -1107,6 +1924,39 @@ class DashboardService:
             return 5.0
         return min(max(value, 0.0), 60.0)
 
+    @staticmethod
+    def _resolve_stats_workers() -> int:
+        raw = os.getenv("SHAFA_DASHBOARD_STATS_WORKERS", "").strip()
+        if not raw:
+            return 4
+        try:
+            value = int(raw)
+        except ValueError:
+            return 4
+        return min(max(value, 1), 32)
+
+    @staticmethod
+    def _resolve_account_stats_timeout_seconds() -> float:
+        raw = os.getenv("SHAFA_DASHBOARD_ACCOUNT_TIMEOUT_SECONDS", "").strip()
+        if not raw:
+            return 10.0
+        try:
+            value = float(raw)
+        except ValueError:
+            return 10.0
+        return min(max(value, 0.1), 300.0)
+
+    @staticmethod
+    def _resolve_metrics_compaction_interval_seconds() -> float:
+        raw = os.getenv("SHAFA_DASHBOARD_METRICS_COMPACT_SECONDS", "").strip()
+        if not raw:
+            return 300.0
+        try:
+            value = float(raw)
+        except ValueError:
+            return 300.0
+        return min(max(value, 0.0), 24 * 3600.0)
+
     @staticmethod
     def _resolve_deactivation_cache_ttl_seconds() -> float:
         raw = os.getenv("SHAFA_DASHBOARD_DEACTIVATION_CACHE_SECONDS", "").strip()
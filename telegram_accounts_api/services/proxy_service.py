@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
+import logging
 import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -14,11 +16,27 @@ from shafa_logic.utils.proxy import (
     compute_proxy_status,
     delete_runtime_proxy_config,
     ensure_proxy_database_schema,
+    flush_proxy_events,
     write_runtime_proxy_config,
 )
-from telegram_accounts_api.models.proxy import ProxyCreate, ProxyRead, ProxySummary, ProxyUpdate
+from shafa_logic.utils.proxy_prober import probe_proxies, proxy_probe_interval_seconds
+from shafa_logic.utils.proxy_rollups import (
+    load_proxy_window_health,
+    prune_proxy_events,
+    rollup_proxy_events,
+)
+from telegram_accounts_api.models.proxy import (
+    ProxyCreate,
+    ProxyHealthRead,
+    ProxyRead,
+    ProxySummary,
+    ProxyUpdate,
+)
 from telegram_accounts_api.utils.exceptions import BadRequestError, ConflictError, NotFoundError
-from telegram_accounts_api.utils.storage import read_json_list_file
+from telegram_accounts_api.utils.storage import file_signature, read_json_list_file
+
+logger = logging.getLogger(__name__)
+DEFAULT_PROXY_EVENT_MAINTENANCE_INTERVAL_SECONDS = 60.0
 
 
 class ProxyService:
@@ -26,6 +44,13 @@ class ProxyService:
         self.db_path = db_path
         self.accounts_file = accounts_file
         self.accounts_dir = accounts_dir
+        self._maintenance_stop = threading.Event()
+        self._maintenance_thread: threading.Thread | None = None
+        self._probe_stop = threading.Event()
+        self._probe_thread: threading.Thread | None = None
+        self._summary_lock = threading.Lock()
+        self._summary_cache: tuple[tuple, dict[str, ProxySummary]] | None = None
+        self.generation = 0
         ensure_proxy_database_schema(self.db_path)
 
     def list_proxies(self) -> list[ProxyRead]:
@@ -44,10 +69,13 @@ class ProxyService:
                     max_accounts,
                     enabled,
                     notes,
+                    pool,
                     status,
                     total_requests,
                     total_failures,
                     consecutive_failures,
+                    ewma_latency_ms,
+                    ewma_failure_rate,
                     last_used_at,
                     last_success_at,
                     last_failure_at,
@@ -81,6 +109,50 @@ class ProxyService:
             enabled=bool(row["enabled"]),
         )
 
+    def get_proxy_summaries(self) -> dict[str, ProxySummary]:
+        """Return summaries of all proxies keyed by id.
+
+        The result is cached until this service writes a proxy or the proxy
+        database or accounts file change on disk, which also covers status
+        updates written by account processes.
+        """
+        db_path = Path(self.db_path)
+        fingerprint = (
+            self.generation,
+            file_signature(db_path),
+            file_signature(db_path.with_name(f"{db_path.name}-wal")),
+            file_signature(self.accounts_file),
+        )
+        with self._summary_lock:
+            cached = self._summary_cache
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+        assigned_counts = self._assigned_counts()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, name, scheme, status, max_accounts, enabled FROM proxies"
+            ).fetchall()
+        summaries = {
+            str(row["id"]): ProxySummary(
+                id=str(row["id"]),
+                name=str(row["name"]),
+                scheme=str(row["scheme"]),
+                status=str(row["status"] or PROXY_STATUS_UNKNOWN),
+                assigned_accounts_count=assigned_counts.get(str(row["id"]), 0),
+                max_accounts=int(row["max_accounts"] or DEFAULT_PROXY_MAX_ACCOUNTS),
+                enabled=bool(row["enabled"]),
+            )
+            for row in rows
+        }
+        with self._summary_lock:
+            self._summary_cache = (fingerprint, summaries)
+        return summaries
+
+    def _mark_changed(self) -> None:
+        with self._summary_lock:
+            self.generation += 1
+            self._summary_cache = None
+
     def create_proxy(self, data: ProxyCreate) -> ProxyRead:
         proxy_id = uuid4().hex
         timestamp = self._now_iso()
@@ -103,10 +175,11 @@ class ProxyService:
                     max_accounts,
                     enabled,
                     notes,
+                    pool,
                     status,
                     created_at,
                     updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     proxy_id,
@@ -119,11 +192,13 @@ class ProxyService:
                     data.max_accounts,
                     1 if data.enabled else 0,
                     data.notes,
+                    data.pool,
                     status,
                     timestamp,
                     timestamp,
                 ),
             )
+        self._mark_changed()
         return self.get_proxy(proxy_id)
 
     def update_proxy(self, proxy_id: str, data: ProxyUpdate) -> ProxyRead:
@@ -139,6 +214,7 @@ class ProxyService:
             "max_accounts",
             "enabled",
             "notes",
+            "pool",
         ):
             if field_name in data.model_fields_set:
                 payload[field_name] = getattr(data, field_name)
@@ -166,6 +242,7 @@ class ProxyService:
                     max_accounts = ?,
                     enabled = ?,
                     notes = ?,
+                    pool = ?,
                     status = ?,
                     updated_at = ?
                 WHERE id = ?
@@ -180,11 +257,13 @@ class ProxyService:
                     int(payload["max_accounts"] or DEFAULT_PROXY_MAX_ACCOUNTS),
                     1 if payload["enabled"] else 0,
                     payload["notes"] or "",
+                    payload["pool"] or "",
                     payload["status"],
                     payload["updated_at"],
                     self._normalize_proxy_id(proxy_id),
                 ),
             )
+        self._mark_changed()
         self.sync_proxy_snapshots(self._normalize_proxy_id(proxy_id))
         return self.get_proxy(proxy_id)
 
@@ -197,9 +276,117 @@ class ProxyService:
             )
         with self._connect() as conn:
             cursor = conn.execute("DELETE FROM proxies WHERE id = ?", (normalized_proxy_id,))
+        self._mark_changed()
         if cursor.rowcount == 0:
             raise NotFoundError(f"Proxy '{proxy_id}' not found.")
 
+    def get_proxy_health(
+        self,
+        *,
+        window_seconds: int = 3600,
+        proxy_id: str | None = None,
+    ) -> list[ProxyHealthRead]:
+        """Read window health from the rollup tables only.
+
+        Folding new events into the rollups is left to the maintenance loop,
+        so the figures can trail the raw events by up to one interval.
+        """
+        normalized_proxy_id = self._normalize_proxy_id(proxy_id)
+        if normalized_proxy_id is not None:
+            self._get_row(normalized_proxy_id)
+        health = load_proxy_window_health(
+            self.db_path,
+            window_seconds=window_seconds,
+            proxy_id=normalized_proxy_id,
+        )
+        return [
+            ProxyHealthRead(
+                proxy_id=item.proxy_id,
+                window_seconds=item.window_seconds,
+                bucket_size=item.bucket_size,
+                requests=item.requests,
+                failures=item.failures,
+                failure_rate=round(item.failure_rate, 4),
+                error_types=item.error_types,
+            )
+            for item in sorted(health.values(), key=lambda entry: entry.proxy_id)
+        ]
+
+    def run_event_maintenance(self) -> dict[str, int]:
+        flush_proxy_events(self.db_path)
+        folded = rollup_proxy_events(self.db_path)
+        pruned = prune_proxy_events(self.db_path)
+        return {"rolled_up": folded, "pruned": pruned}
+
+    def start_event_maintenance(
+        self,
+        interval_seconds: float = DEFAULT_PROXY_EVENT_MAINTENANCE_INTERVAL_SECONDS,
+    ) -> None:
+        if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+            return
+        self._maintenance_stop.clear()
+        self._maintenance_thread = threading.Thread(
+            target=self._event_maintenance_loop,
+            args=(max(float(interval_seconds), 1.0),),
+            name="proxy-event-maintenance",
+            daemon=True,
+        )
+        self._maintenance_thread.start()
+
+    def stop_event_maintenance(self) -> None:
+        self._maintenance_stop.set()
+        thread = self._maintenance_thread
+        self._maintenance_thread = None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _event_maintenance_loop(self, interval_seconds: float) -> None:
+        while not self._maintenance_stop.wait(interval_seconds):
+            try:
+                self.run_event_maintenance()
+            except Exception:
+                logger.warning("Proxy event maintenance failed", exc_info=True)
+
+    def run_health_probes(self) -> dict[str, int]:
+        events = probe_proxies(self.db_path)
+        failed = sum(1 for event in events if not event.success)
+        return {"probed": len(events), "failed": failed}
+
+    def start_health_probes(self, interval_seconds: float | None = None) -> None:
+        interval = (
+            proxy_probe_interval_seconds()
+            if interval_seconds is None
+            else float(interval_seconds)
+        )
+        if interval <= 0:
+            return
+        if self._probe_thread is not None and self._probe_thread.is_alive():
+            return
+        self._probe_stop.clear()
+        self._probe_thread = threading.Thread(
+            target=self._health_probe_loop,
+            args=(max(interval, 1.0),),
+            name="proxy-health-probe",
+            daemon=True,
+        )
+        self._probe_thread.start()
+
+    def stop_health_probes(self) -> None:
+        self._probe_stop.set()
+        thread = self._probe_thread
+        self._probe_thread = None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _health_probe_loop(self, interval_seconds: float) -> None:
+        while not self._probe_stop.is_set():
+            try:
+                self.run_health_probes()
+            except Exception:
+                logger.warning("Proxy health probe failed", exc_info=True)
+            if self._probe_stop.wait(interval_seconds):
+                return
+
     def ensure_account_proxy_assignment(
         self,
         proxy_id: str | None,
@@ -248,6 +435,7 @@ class ProxyService:
                 "password": row["password"] or "",
                 "enabled": bool(row["enabled"]),
                 "max_accounts": int(row["max_accounts"] or DEFAULT_PROXY_MAX_ACCOUNTS),
+                "pool": row["pool"] or "",
             }
         )
         write_runtime_proxy_config(snapshot_path, config.to_payload())
@@ -328,10 +516,13 @@ class ProxyService:
                     max_accounts,
                     enabled,
                     notes,
+                    pool,
                     status,
                     total_requests,
                     total_failures,
                     consecutive_failures,
+                    ewma_latency_ms,
+                    ewma_failure_rate,
                     last_used_at,
                     last_success_at,
                     last_failure_at,
@@ -362,11 +553,14 @@ class ProxyService:
             max_accounts=int(row["max_accounts"] or DEFAULT_PROXY_MAX_ACCOUNTS),
             enabled=bool(row["enabled"]),
             notes=str(row["notes"] or ""),
+            pool=str(row["pool"] or ""),
             status=str(row["status"] or PROXY_STATUS_UNKNOWN),
             assigned_accounts_count=assigned_counts.get(str(row["id"]), 0),
             total_requests=int(row["total_requests"] or 0),
             total_failures=int(row["total_failures"] or 0),
             consecutive_failures=int(row["consecutive_failures"] or 0),
+            ewma_latency_ms=row["ewma_latency_ms"],
+            ewma_failure_rate=row["ewma_failure_rate"],
             last_used_at=self._parse_datetime(row["last_used_at"]),
             last_success_at=self._parse_datetime(row["last_success_at"]),
             last_failure_at=self._parse_datetime(row["last_failure_at"]),
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_CLIENT_IDLE_TIMEOUT_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class TelegramClientPoolStats:
+    connects: int
+    reuses: int
+    open_clients: int
+
+
+@dataclass
+class _PooledClient:
+    client: Any
+    key: Hashable
+    loop: asyncio.AbstractEventLoop
+    users: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    expiry: asyncio.TimerHandle | None = None
+
+
+class TelegramClientPool:
+    """Connected Telethon clients kept per account between API calls.
+
+    Requests for the same account share one connected client. The session
+    lock (``SessionUsageLock``) is held only while at least one request is
+    using the client; an idle client keeps its connection without the lock
+    and is disconnected after ``idle_timeout_seconds``. If the account's
+    worker takes the lock while the client is idle, the pooled client is
+    dropped and the next request connects the usual way. Anything else that
+    opens the session file should call ``evict`` first.
+
+    A pooled client is only connected, disconnected or moved between holding
+    and releasing the session under the account's guard lock, on the event
+    loop that created it.
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_timeout_seconds: float = DEFAULT_CLIENT_IDLE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.idle_timeout_seconds = max(float(idle_timeout_seconds), 0.0)
+        self._entries: dict[str, _PooledClient] = {}
+        self._guards: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+        self.connects = 0
+        self.reuses = 0
+
+    def stats(self) -> TelegramClientPoolStats:
+        return TelegramClientPoolStats(
+            connects=self.connects,
+            reuses=self.reuses,
+            open_clients=len(self._entries),
+        )
+
+    @asynccontextmanager
+    async def client(
+        self,
+        account_id: str,
+        key: Hashable,
+        connect: Callable[[], Awaitable[Any]],
+    ) -> AsyncIterator[Any]:
+        """Yield a connected client for ``account_id``.
+
+        ``key`` identifies the session and credentials; a pooled client
+        made for another key is replaced. ``connect`` returns a new
+        connected, authorized client holding the session lock.
+        """
+        entry = await self._checkout(account_id, key, connect)
+        try:
+            yield entry.client
+        finally:
+            await self._checkin(account_id, entry)
+
+    async def evict(self, account_id: str) -> None:
+        """Drop the pooled client of ``account_id`` and disconnect it.
+
+        An idle client is disconnected before this returns, which also gives
+        up its session lock. A client still in use is disconnected by its
+        last user instead of going back to the pool.
+        """
+        entry = self._entries.get(account_id)
+        if entry is None:
+            return
+        if entry.loop is not asyncio.get_running_loop():
+            if entry.loop.is_closed() or not entry.loop.is_running():
+                # Nothing can run on the owning loop any more; its client is
+                # already unusable.
+                if self._entries.get(account_id) is entry:
+                    del self._entries[account_id]
+                return
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(self.evict(account_id), entry.loop)
+            )
+            return
+        async with self._guard(account_id):
+            entry = self._entries.get(account_id)
+            if entry is not None:
+                await self._discard(account_id, entry)
+
+    async def close(self) -> None:
+        for account_id in list(self._entries):
+            await self.evict(account_id)
+        if self.connects or self.reuses:
+            LOGGER.info(
+                "Telegram client pool closed: %s connects, %s reuses",
+                self.connects,
+                self.reuses,
+            )
+
+    async def _checkout(
+        self,
+        account_id: str,
+        key: Hashable,
+        connect: Callable[[], Awaitable[Any]],
+    ) -> _PooledClient:
+        loop = asyncio.get_running_loop()
+        async with self._guard(account_id):
+            entry = self._entries.get(account_id)
+            if entry is not None and not self._reusable(entry, key, loop):
+                await self._discard(account_id, entry)
+                entry = None
+            if entry is not None and entry.users == 0:
+                if not await _try_hold_session(entry.client):
+                    # The worker took the session while the client was idle.
+                    await self._discard(account_id, entry)
+                    entry = None
+            if entry is None:
+                entry = _PooledClient(client=await connect(), key=key, loop=loop)
+                self._entries[account_id] = entry
+                self.connects += 1
+            else:
+                self.reuses += 1
+            if entry.expiry is not None:
+                entry.expiry.cancel()
+                entry.expiry = None
+            entry.users += 1
+            return entry
+
+    async def _checkin(self, account_id: str, entry: _PooledClient) -> None:
+        async with self._guard(account_id):
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            if entry.users > 0:
+                return
+            if (
+                self.idle_timeout_seconds <= 0
+                or self._entries.get(account_id) is not entry
+                or not _is_connected(entry.client)
+            ):
+                if self._entries.get(account_id) is entry:
+                    del self._entries[account_id]
+                await self._disconnect(entry)
+                return
+            await _release_session(entry.client)
+            entry.expiry = entry.loop.call_later(
+                self.idle_timeout_seconds,
+                lambda: asyncio.ensure_future(self._expire(account_id, entry)),
+            )
+
+    async def _expire(self, account_id: str, entry: _PooledClient) -> None:
+        async with self._guard(account_id):
+            if entry.users or self._entries.get(account_id) is not entry:
+                return
+            await self._discard(account_id, entry)
+
+    async def _discard(self, account_id: str, entry: _PooledClient) -> None:
+        """Drop ``entry``; the caller holds the account's guard."""
+        if self._entries.get(account_id) is entry:
+            del self._entries[account_id]
+        if entry.expiry is not None:
+            entry.expiry.cancel()
+            entry.expiry = None
+        # A client in use is disconnected by its last ``_checkin``; one made on
+        # another loop cannot be touched from here.
+        if entry.users == 0 and entry.loop is asyncio.get_running_loop():
+            await self._disconnect(entry)
+
+    @staticmethod
+    def _reusable(
+        entry: _PooledClient,
+        key: Hashable,
+        loop: asyncio.AbstractEventLoop,
+    ) -> bool:
+        return (
+            entry.loop is loop
+            and not loop.is_closed()
+            and entry.key == key
+            and _is_connected(entry.client)
+        )
+
+    @staticmethod
+    async def _disconnect(entry: _PooledClient) -> None:
+        if entry.expiry is not None:
+            entry.expiry.cancel()
+            entry.expiry = None
+        try:
+            await entry.client.disconnect()
+        except Exception:
+            LOGGER.debug("Failed to disconnect pooled Telegram client", exc_info=True)
+
+    def _guard(self, account_id: str) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        guard_loop, guard = self._guards.get(account_id) or (None, None)
+        if guard is None or guard_loop is not loop:
+            guard = asyncio.Lock()
+            self._guards[account_id] = (loop, guard)
+        return guard
+
+
+def _is_connected(client: Any) -> bool:
+    is_connected = getattr(client, "is_connected", None)
+    if is_connected is None:
+        return True
+    try:
+        return bool(is_connected())
+    except Exception:
+        return False
+
+
+async def _try_hold_session(client: Any) -> bool:
+    hold_session = getattr(client, "try_hold_session", None)
+    if hold_session is None:
+        return True
+    return bool(await hold_session())
+
+
+async def _release_session(client: Any) -> None:
+    release_session = getattr(client, "release_session", None)
+    if release_session is not None:
+        await release_session()
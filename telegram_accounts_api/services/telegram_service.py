@@ -3,11 +3,20 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator
 from urllib.parse import urlparse
 
 from telegram_channels import extract_telegram_invite_hash, parse_id_bot_response, sanitize_channel_links
 from shafa_logic.utils.proxy import load_runtime_proxy_config
+from shafa_logic.telegram_subscription.channel_cache import (
+    CachedChannel,
+    ChannelResolutionCache,
+    channel_link_metadata,
+    flood_wait_seconds,
+    resolve_links_cached,
+)
 from shafa_logic.telegram_subscription.client import (
     TelegramSessionInUseError,
     create_telegram_client,
@@ -20,6 +29,7 @@ from telegram_accounts_api.models.telegram import (
 )
 from telegram_accounts_api.models.channel_template import ResolvedTelegramChannel
 from telegram_accounts_api.services.account_service import AccountService
+from telegram_accounts_api.services.telegram_client_pool import TelegramClientPool
 from telegram_accounts_api.services.template_service import TemplateService
 from telegram_accounts_api.utils.exceptions import TelegramOperationError
 
@@ -29,10 +39,19 @@ ID_BOT_RESPONSE_TIMEOUT_SECONDS = 6
 
 
 class TelegramService:
-    def __init__(self, account_service: AccountService, template_service: TemplateService, base_dir: Path) -> None:
+    def __init__(
+        self,
+        account_service: AccountService,
+        template_service: TemplateService,
+        base_dir: Path,
+        client_pool: TelegramClientPool | None = None,
+        channel_cache: ChannelResolutionCache | None = None,
+    ) -> None:
         self.account_service = account_service
         self.template_service = template_service
         self.base_dir = base_dir
+        self.client_pool = client_pool or TelegramClientPool()
+        self.channel_cache = channel_cache
 
     async def send_message(self, account_id: str, request: SendMessageRequest) -> TelegramMessageResponse:
         rendered_text = request.text or await self.template_service.render_template(
@@ -84,21 +103,56 @@ class TelegramService:
         clean_links = sanitize_channel_links(links)
         if not clean_links:
             raise TelegramOperationError("Нужна хотя бы одна ссылка на Telegram-канал.")
-        async with self._client(account_id) as client:
-            resolved: list[ResolvedTelegramChannel] = []
-            for link in clean_links:
-                try:
-                    resolved.append(await self._resolve_single_channel(client, link))
-                except TelegramOperationError:
-                    raise
-                except Exception as exc:
-                    raise TelegramOperationError(
-                        (
-                            f"Канал не найден: {link}. Telegram не смог найти публичный канал "
-                            "по этой ссылке или у аккаунта, через который выполняется проверка, нет доступа к нему."
-                        ),
-                        status_code=400,
-                    ) from exc
+        cached = (
+            self.channel_cache.get_many(clean_links)
+            if self.channel_cache is not None
+            else {}
+        )
+        missing_links = [link for link in clean_links if link not in cached]
+        results: dict[str, CachedChannel | BaseException | None] = dict(cached)
+        if missing_links:
+            async with self._client(account_id) as client:
+                id_bot_lock = asyncio.Lock()
+
+                async def resolve(link: str) -> CachedChannel:
+                    channel = await self._resolve_single_channel(
+                        client, link, id_bot_lock=id_bot_lock
+                    )
+                    return CachedChannel(
+                        link=link,
+                        channel_id=channel.channel_id,
+                        title=channel.title,
+                        metadata=channel_link_metadata(link, resolver="api"),
+                    )
+
+                # The cache was read above; pass no cache so the misses are
+                # not looked up a second time, and store them here instead.
+                resolved_links = await resolve_links_cached(missing_links, resolve)
+            fresh = [item for item in resolved_links if isinstance(item, CachedChannel)]
+            if self.channel_cache is not None and fresh:
+                self.channel_cache.put_many(fresh)
+            results.update(zip(missing_links, resolved_links))
+
+        resolved: list[ResolvedTelegramChannel] = []
+        for link in clean_links:
+            result = results[link]
+            if isinstance(result, TelegramOperationError):
+                raise result
+            if not isinstance(result, CachedChannel):
+                raise TelegramOperationError(
+                    (
+                        f"Канал не найден: {link}. Telegram не смог найти публичный канал "
+                        "по этой ссылке или у аккаунта, через который выполняется проверка, нет доступа к нему."
+                    ),
+                    status_code=400,
+                ) from result
+            resolved.append(
+                ResolvedTelegramChannel(
+                    channel_id=result.channel_id,
+                    title=result.title,
+                    alias="main",
+                )
+            )
         return resolved
 
     async def _resolve_credentials(self, account_id: str) -> tuple[int, str, Path]:
@@ -134,12 +188,21 @@ class TelegramService:
         return api_id, api_hash, session_file
 
     async def _get_client(self, account_id: str):
+        api_id, api_hash, session_file = await self._resolve_credentials(account_id)
+        return await self._connect_client(account_id, api_id, api_hash, session_file)
+
+    async def _connect_client(
+        self,
+        account_id: str,
+        api_id: int,
+        api_hash: str,
+        session_file: Path,
+    ):
         try:
             from telethon import TelegramClient
         except ImportError as exc:
             raise TelegramOperationError("Telethon не установлен.") from exc
 
-        api_id, api_hash, session_file = await self._resolve_credentials(account_id)
         try:
             client = create_telegram_client(
                 session_file,
@@ -167,11 +230,15 @@ class TelegramService:
             )
         return client
 
-    async def _cleanup_client(self, client) -> None:
-        await client.disconnect()
-
-    def _client(self, account_id: str) -> "_TelegramClientContext":
-        return _TelegramClientContext(self, account_id)
+    @asynccontextmanager
+    async def _client(self, account_id: str) -> AsyncIterator[object]:
+        api_id, api_hash, session_file = await self._resolve_credentials(account_id)
+        async with self.client_pool.client(
+            account_id,
+            (str(session_file), api_id, api_hash),
+            lambda: self._connect_client(account_id, api_id, api_hash, session_file),
+        ) as client:
+            yield client
 
     @staticmethod
     def _read_env_file(path: Path) -> dict[str, str]:
@@ -191,12 +258,22 @@ class TelegramService:
                 result[key] = value.strip().strip("\"'")
         return result
 
-    async def _resolve_single_channel(self, client, link: str) -> ResolvedTelegramChannel:
+    async def _resolve_single_channel(
+        self,
+        client,
+        link: str,
+        *,
+        id_bot_lock: asyncio.Lock | None = None,
+    ) -> ResolvedTelegramChannel:
         resolved_from_entity = await self._resolve_channel_from_entity(client, link)
         if resolved_from_entity is not None:
             return resolved_from_entity
 
-        return await self._resolve_channel_via_id_bot(client, link)
+        if id_bot_lock is None:
+            return await self._resolve_channel_via_id_bot(client, link)
+        # Concurrent links share one conversation with id_bot, one at a time.
+        async with id_bot_lock:
+            return await self._resolve_channel_via_id_bot(client, link)
 
     async def _resolve_channel_from_entity(self, client, link: str) -> ResolvedTelegramChannel | None:
         invite_entity = await self._resolve_invite_entity(client, link)
@@ -212,7 +289,9 @@ class TelegramService:
                 client.get_entity(link),
                 timeout=CHANNEL_ENTITY_TIMEOUT_SECONDS,
             )
-        except Exception:
+        except Exception as exc:
+            if flood_wait_seconds(exc) is not None:
+                raise
             return None
         return _resolved_channel_from_entity(entity)
 
@@ -229,7 +308,9 @@ class TelegramService:
                 client(CheckChatInviteRequest(invite_hash)),
                 timeout=CHANNEL_ENTITY_TIMEOUT_SECONDS,
             )
-        except Exception:
+        except Exception as exc:
+            if flood_wait_seconds(exc) is not None:
+                raise
             invite_info = None
         else:
             entity = getattr(invite_info, "chat", None)
@@ -242,6 +323,8 @@ class TelegramService:
                 timeout=CHANNEL_ENTITY_TIMEOUT_SECONDS,
             )
         except RPCError as exc:
+            if flood_wait_seconds(exc) is not None:
+                raise
             if "USER_ALREADY_PARTICIPANT" not in str(exc).upper():
                 return None
             try:
@@ -272,7 +355,9 @@ class TelegramService:
                 client(ResolveUsernameRequest(username)),
                 timeout=CHANNEL_ENTITY_TIMEOUT_SECONDS,
             )
-        except Exception:
+        except Exception as exc:
+            if flood_wait_seconds(exc) is not None:
+                raise
             return None
 
         chats = getattr(result, "chats", None) or []
@@ -351,17 +436,3 @@ def _extract_public_telegram_username(link: str) -> str | None:
         return None
     return username
 
-
-class _TelegramClientContext:
-    def __init__(self, service: TelegramService, account_id: str) -> None:
-        self.service = service
-        self.account_id = account_id
-        self.client = None
-
-    async def __aenter__(self):
-        self.client = await self.service._get_client(self.account_id)
-        return self.client
-
-    async def __aexit__(self, exc_type, exc, tb) -> None:
-        if self.client is not None:
-            await self.service._cleanup_client(self.client)
@@ -7,19 +7,34 @@ import re
 import threading
 import uuid
 from collections import defaultdict, deque
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import UTC, datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
+
+from .log_index import AccountLogIndex
 
 _MAX_LOG_ENTRIES_PER_ACCOUNT = 1000
+_INDEX_IMPORT_TAIL_LINES = 5000
+_SUBSCRIBER_QUEUE_SIZE = 1000
+_LOG_LEVEL_RANKS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
 _DEFAULT_ACCOUNT_LOG_RETENTION_SECONDS = 24 * 60 * 60
 _ACCOUNT_LOGGER_NAME = "telegram_accounts_api.account"
 _HANDLER_NAME = "telegram_accounts_api.account_log_handler"
-_SENSITIVE_VALUE_PATTERNS = (
-    re.compile(r"(?i)\b(password|api_hash|token|sessionid|csrftoken|shafa_sessionid|shafa_csrftoken|authorization|cookie)\b\s*[:=]\s*([^\s,;]+)"),
-    re.compile(r"(?i)\bBearer\s+[A-Za-z0-9._\-]+"),
+# The ``(?=...)`` lookaheads reject most positions on the first character
+# before the ``\b`` and keyword alternation are tried.
+_SENSITIVE_ASSIGNMENT_PATTERN = re.compile(
+    r"(?i)(?=[patsc])\b(password|api_hash|token|sessionid|csrftoken|shafa_sessionid|shafa_csrftoken|authorization|cookie)\b\s*[:=]\s*([^\s,;]+)"
 )
+_BEARER_TOKEN_PATTERN = re.compile(r"(?i)(?=b)\bBearer\s+[A-Za-z0-9._\-]+")
 _ANSI_ESCAPE_PATTERN = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
 _INLINE_LEVEL_PREFIX_PATTERN = re.compile(
     r"^(?:\[(?P<level>DEBUG|INFO|WARN(?:ING)?|ERROR|OK|SUCCESS)\]\s*)+",
@@ -180,11 +195,34 @@ class AccountLogEntry:
     message: str
 
 
+class AccountLogQueue(asyncio.Queue):
+    """Subscriber queue that drops its oldest entry instead of growing.
+
+    Only touched from the subscriber's event loop; ``AccountLogStore.append``
+    hands entries over with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put_dropping_oldest(self, entry: AccountLogEntry) -> None:
+        if self.full():
+            self.get_nowait()
+            self.dropped += 1
+        self.put_nowait(entry)
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
 @dataclass(frozen=True)
 class _Subscriber:
     id: str
     loop: asyncio.AbstractEventLoop
-    queue: asyncio.Queue[AccountLogEntry]
+    queue: AccountLogQueue
+    min_level_rank: int = 0
 
 
 def normalize_log_level(level: str | None) -> str:
@@ -196,6 +234,11 @@ def normalize_log_level(level: str | None) -> str:
     return aliases.get(normalized, normalized or "INFO")
 
 
+def log_level_rank(level: str | None) -> int:
+    """Order levels for ``min_level`` filters; unknown levels rank as INFO."""
+    return _LOG_LEVEL_RANKS.get(normalize_log_level(level), _LOG_LEVEL_RANKS["INFO"])
+
+
 def _join_preview(values: list[Any], *, limit: int = 5) -> str:
     normalized = [str(value).strip() for value in values if str(value).strip()]
 
@@ -208,11 +251,7 @@ def _join_preview(values: list[Any], *, limit: int = 5) -> str:
     return preview
 
 
-def _format_size_log_message(message: str) -> str | None:
-    match = _SIZE_LOG_PATTERN.match(message)
-    if not match:
-        return None
-
+def _format_size_log_match(match: re.Match[str]) -> str | None:
     try:
         payload = ast.literal_eval(match.group("payload"))
     except (SyntaxError, ValueError):
@@ -304,242 +343,145 @@ def _format_graph_response_error_message(message: str) -> str | None:
     return "Shafa API: " + "; ".join(unique_details)
 
 
-def _translate_system_message(message: str) -> str | None:
-    channels_exported_match = _CHANNELS_EXPORTED_PATTERN.match(message)
-    if channels_exported_match:
-        return (
-            f"Ссылки Telegram-каналов экспортированы: "
-            f"{channels_exported_match.group('count')}."
-        )
-
-    if _STOP_REQUESTED_PATTERN.match(message):
-        return "Остановка запрошена из API."
-
-    stop_exited_match = _STOP_EXITED_PATTERN.match(message)
-    if stop_exited_match:
-        return f"Процесс остановлен (код {stop_exited_match.group('code')})."
-
-    error_exited_match = _ERROR_EXITED_PATTERN.match(message)
-    if error_exited_match:
-        return (
-            f"Процесс завершился с ошибкой "
-            f"(код {error_exited_match.group('code')})."
-        )
-
-    session_copied_match = _SESSION_COPIED_PATTERN.match(message)
-    if session_copied_match:
-        return (
-            f"Сессия Telegram скопирована из аккаунта "
-            f"«{session_copied_match.group('account')}»."
-        )
-
-    session_imported_match = _SESSION_IMPORTED_PATTERN.match(message)
-    if session_imported_match:
-        return (
-            f"Сессия Telegram импортирована из файла "
-            f"«{session_imported_match.group('filename')}»."
-        )
-
-    rejected_phone_match = _REJECTED_PHONE_PATTERN.match(message)
-    if rejected_phone_match:
-        return f"Телефон Telegram отклонён: {rejected_phone_match.group('detail')}"
-
-    tg_code_request_failed_match = _TG_CODE_REQUEST_FAILED_PATTERN.match(message)
-    if tg_code_request_failed_match:
-        return (
-            f"Не удалось запросить код Telegram: "
-            f"{tg_code_request_failed_match.group('detail')}"
-        )
-
-    tg_code_request_unexpected_match = _TG_CODE_REQUEST_UNEXPECTED_PATTERN.match(message)
-    if tg_code_request_unexpected_match:
-        return (
-            f"Сбой запроса кода Telegram: "
-            f"{tg_code_request_unexpected_match.group('detail')}"
-        )
-
-    tg_code_submit_failed_match = _TG_CODE_SUBMIT_FAILED_PATTERN.match(message)
-    if tg_code_submit_failed_match:
-        return (
-            f"Не удалось подтвердить код Telegram: "
-            f"{tg_code_submit_failed_match.group('detail')}"
-        )
-
-    tg_code_submit_unexpected_match = _TG_CODE_SUBMIT_UNEXPECTED_PATTERN.match(message)
-    if tg_code_submit_unexpected_match:
-        return (
-            f"Сбой отправки кода Telegram: "
-            f"{tg_code_submit_unexpected_match.group('detail')}"
-        )
-
-    tg_password_submit_failed_match = _TG_PASSWORD_SUBMIT_FAILED_PATTERN.match(message)
-    if tg_password_submit_failed_match:
-        return (
-            f"Не удалось подтвердить пароль Telegram: "
-            f"{tg_password_submit_failed_match.group('detail')}"
-        )
-
-    tg_password_submit_unexpected_match = _TG_PASSWORD_SUBMIT_UNEXPECTED_PATTERN.match(message)
-    if tg_password_submit_unexpected_match:
-        return (
-            f"Сбой отправки пароля Telegram: "
-            f"{tg_password_submit_unexpected_match.group('detail')}"
-        )
-
-    shafa_profile_failed_match = _SHAFA_PROFILE_FAILED_PATTERN.match(message)
-    if shafa_profile_failed_match:
-        return (
-            f"Не удалось получить профиль Shafa: "
-            f"{shafa_profile_failed_match.group('detail')}"
-        )
-
-    shafa_login_failed_match = _SHAFA_LOGIN_FAILED_PATTERN.match(message)
-    if shafa_login_failed_match:
-        return (
-            f"Не удалось запустить вход в Shafa: "
-            f"{shafa_login_failed_match.group('detail')}"
-        )
-
-    shafa_login_unexpected_match = _SHAFA_LOGIN_UNEXPECTED_PATTERN.match(message)
-    if shafa_login_unexpected_match:
-        return (
-            f"Сбой запуска входа в Shafa: "
-            f"{shafa_login_unexpected_match.group('detail')}"
-        )
-
-    shafa_save_unexpected_match = _SHAFA_SAVE_UNEXPECTED_PATTERN.match(message)
-    if shafa_save_unexpected_match:
-        return (
-            f"Сбой сохранения сессии Shafa: "
-            f"{shafa_save_unexpected_match.group('detail')}"
+# Templated messages in the order they used to be tried one pattern at a
+# time. ``_TEMPLATE_PATTERN`` folds them into one alternation, so a line is
+# scanned once and only the branch that matched is re-run for its groups.
+_TEMPLATE_RULES: tuple[
+    tuple[re.Pattern[str], str | Callable[[re.Match[str]], str | None]], ...
+] = (
+    (_SIZE_LOG_PATTERN, _format_size_log_match),
+    (_CHANNELS_EXPORTED_PATTERN, "Ссылки Telegram-каналов экспортированы: {count}."),
+    (_STOP_REQUESTED_PATTERN, "Остановка запрошена из API."),
+    (_STOP_EXITED_PATTERN, "Процесс остановлен (код {code})."),
+    (_ERROR_EXITED_PATTERN, "Процесс завершился с ошибкой (код {code})."),
+    (_SESSION_COPIED_PATTERN, "Сессия Telegram скопирована из аккаунта «{account}»."),
+    (
+        _SESSION_IMPORTED_PATTERN,
+        "Сессия Telegram импортирована из файла «{filename}».",
+    ),
+    (_REJECTED_PHONE_PATTERN, "Телефон Telegram отклонён: {detail}"),
+    (_TG_CODE_REQUEST_FAILED_PATTERN, "Не удалось запросить код Telegram: {detail}"),
+    (_TG_CODE_REQUEST_UNEXPECTED_PATTERN, "Сбой запроса кода Telegram: {detail}"),
+    (_TG_CODE_SUBMIT_FAILED_PATTERN, "Не удалось подтвердить код Telegram: {detail}"),
+    (_TG_CODE_SUBMIT_UNEXPECTED_PATTERN, "Сбой отправки кода Telegram: {detail}"),
+    (
+        _TG_PASSWORD_SUBMIT_FAILED_PATTERN,
+        "Не удалось подтвердить пароль Telegram: {detail}",
+    ),
+    (_TG_PASSWORD_SUBMIT_UNEXPECTED_PATTERN, "Сбой отправки пароля Telegram: {detail}"),
+    (_SHAFA_PROFILE_FAILED_PATTERN, "Не удалось получить профиль Shafa: {detail}"),
+    (_SHAFA_LOGIN_FAILED_PATTERN, "Не удалось запустить вход в Shafa: {detail}"),
+    (_SHAFA_LOGIN_UNEXPECTED_PATTERN, "Сбой запуска входа в Shafa: {detail}"),
+    (_SHAFA_SAVE_UNEXPECTED_PATTERN, "Сбой сохранения сессии Shafa: {detail}"),
+    (_PRODUCT_NAME_PATTERN, "Готовлю товар: «{name}»."),
+    (_PRODUCT_CATALOG_PATTERN, "Каталог: {slug}."),
+    (_PRODUCT_PRICE_PATTERN, "Цена рассчитана: {price} (наценка {markup})."),
+    (_DOWNLOADED_PHOTO_COUNT_PATTERN, "Фото скачаны: {count}."),
+    (_BRANDS_LOADED_PATTERN, "Бренды обновлены для {slug}: {count}."),
+    (_SIZES_LOADED_PATTERN, "Размеры обновлены для {slug}: {count}."),
+    (
+        _PRODUCT_CREATED_NAMED_PATTERN,
+        "Товар создан успешно: «{name}», ID {id}, фото {count}.",
+    ),
+    (_PRODUCT_CREATED_SIMPLE_PATTERN, "Товар создан успешно: ID {id}, фото {count}."),
+)
+_DIRECT_REWRITES = {
+    "Account created.": "Аккаунт создан.",
+    "Account settings updated.": "Настройки аккаунта обновлены.",
+    "Account deleted.": "Аккаунт удалён.",
+    "Account status changed to stopped.": "Статус аккаунта: остановлен.",
+    "Telegram API credentials saved.": "Telegram API-данные сохранены.",
+    "Starting Telegram login: requesting verification code.": "Запрашиваю код Telegram.",
+    "Telegram code request blocked: credentials are missing.": "Запрос кода Telegram заблокирован: нет API-данных.",
+    "Telegram login already has an active pending step.": "Вход в Telegram уже ожидает следующий шаг.",
+    "Telegram verification code requested.": "Код Telegram запрошен.",
+    "Submitting Telegram verification code.": "Отправляю код Telegram.",
+    "Telegram verification code accepted.": "Код Telegram подтверждён.",
+    "Submitting Telegram 2FA password.": "Отправляю пароль 2FA Telegram.",
+    "Telegram login completed successfully.": "Вход в Telegram завершён.",
+    "Telegram session removed.": "Сессия Telegram удалена.",
+    "Telegram phone number resolved from authorized session.": "Номер телефона получен из Telegram-сессии.",
+    "Rejected Telegram credentials: invalid API ID.": "Telegram API ID отклонён: нужен integer.",
+    "Rejected Telegram credentials: API hash missing.": "Telegram API hash не указан.",
+    "Telegram code requested.": "Код Telegram запрошен.",
+    "Telegram password accepted.": "Пароль Telegram подтверждён.",
+    "Telegram session is authorized.": "Сессия Telegram авторизована.",
+    "Telegram login completed.": "Вход в Telegram завершён.",
+    "Saving Shafa authentication state.": "Сохраняю сессию Shafa.",
+    "Rejected Shafa cookies: valid session cookie was not found.": "Cookie Shafa отклонены: не найдена валидная сессия.",
+    "Shafa session saved.": "Сессия Shafa сохранена.",
+    "Starting Shafa browser login flow.": "Запускаю вход в Shafa через браузер.",
+    "Shafa browser login flow started.": "Окно входа Shafa открыто.",
+    "Shafa session removed.": "Сессия Shafa удалена.",
+    "Нет новых товаров для создания.": "Новых товаров нет.",
+    "Бренд не определён. Обновляю список брендов...": "Бренд не определён, обновляю бренды.",
+    "Размер не определён. Обновляю список размеров...": "Размер не определён, обновляю размеры.",
+    "Создаю товар...": "Создаю товар.",
+    "API отклонил размер. Обновляю размеры и повторяю создание товара...": "Размер отклонён API, обновляю размеры и повторяю создание.",
+    "Фото удалены после создания товара.": "Временные фото удалены.",
+    "Нет фото для загрузки после фильтра/сжатия.": "После фильтрации фото не осталось.",
+}
+_NAMED_GROUP_PATTERN = re.compile(r"\(\?P<\w+>")
+_NORMALIZED_MESSAGE_CACHE_SIZE = 4096
+
+
+def _combine_template_patterns(
+    rules: tuple[tuple[re.Pattern[str], Any], ...],
+) -> re.Pattern[str]:
+    branches = []
+    for position, (pattern, _render) in enumerate(rules):
+        source = _NAMED_GROUP_PATTERN.sub("(?:", pattern.pattern)
+        flags = ("i" if pattern.flags & re.IGNORECASE else "") + (
+            "s" if pattern.flags & re.DOTALL else ""
         )
+        if flags:
+            source = f"(?{flags}:{source})"
+        branches.append(f"(?P<rule{position}>{source})")
+    return re.compile("|".join(branches))
 
-    direct_rewrites = {
-        "Account created.": "Аккаунт создан.",
-        "Account settings updated.": "Настройки аккаунта обновлены.",
-        "Account deleted.": "Аккаунт удалён.",
-        "Account status changed to stopped.": "Статус аккаунта: остановлен.",
-        "Telegram API credentials saved.": "Telegram API-данные сохранены.",
-        "Starting Telegram login: requesting verification code.": "Запрашиваю код Telegram.",
-        "Telegram code request blocked: credentials are missing.": "Запрос кода Telegram заблокирован: нет API-данных.",
-        "Telegram login already has an active pending step.": "Вход в Telegram уже ожидает следующий шаг.",
-        "Telegram verification code requested.": "Код Telegram запрошен.",
-        "Submitting Telegram verification code.": "Отправляю код Telegram.",
-        "Telegram verification code accepted.": "Код Telegram подтверждён.",
-        "Submitting Telegram 2FA password.": "Отправляю пароль 2FA Telegram.",
-        "Telegram login completed successfully.": "Вход в Telegram завершён.",
-        "Telegram session removed.": "Сессия Telegram удалена.",
-        "Telegram phone number resolved from authorized session.": "Номер телефона получен из Telegram-сессии.",
-        "Rejected Telegram credentials: invalid API ID.": "Telegram API ID отклонён: нужен integer.",
-        "Rejected Telegram credentials: API hash missing.": "Telegram API hash не указан.",
-        "Telegram code requested.": "Код Telegram запрошен.",
-        "Telegram password accepted.": "Пароль Telegram подтверждён.",
-        "Telegram session is authorized.": "Сессия Telegram авторизована.",
-        "Telegram login completed.": "Вход в Telegram завершён.",
-        "Saving Shafa authentication state.": "Сохраняю сессию Shafa.",
-        "Rejected Shafa cookies: valid session cookie was not found.": "Cookie Shafa отклонены: не найдена валидная сессия.",
-        "Shafa session saved.": "Сессия Shafa сохранена.",
-        "Starting Shafa browser login flow.": "Запускаю вход в Shafa через браузер.",
-        "Shafa browser login flow started.": "Окно входа Shafa открыто.",
-        "Shafa session removed.": "Сессия Shafa удалена.",
-    }
-    return direct_rewrites.get(message)
-
-
-def _translate_business_message(message: str) -> str | None:
-    product_name_match = _PRODUCT_NAME_PATTERN.match(message)
-    if product_name_match:
-        return f"Готовлю товар: «{product_name_match.group('name')}»."
-
-    product_catalog_match = _PRODUCT_CATALOG_PATTERN.match(message)
-    if product_catalog_match:
-        return f"Каталог: {product_catalog_match.group('slug')}."
 
-    product_price_match = _PRODUCT_PRICE_PATTERN.match(message)
-    if product_price_match:
-        return (
-            f"Цена рассчитана: {product_price_match.group('price')} "
-            f"(наценка {product_price_match.group('markup')})."
-        )
+_TEMPLATE_PATTERN = _combine_template_patterns(_TEMPLATE_RULES)
 
-    downloaded_photo_count_match = _DOWNLOADED_PHOTO_COUNT_PATTERN.match(message)
-    if downloaded_photo_count_match:
-        return f"Фото скачаны: {downloaded_photo_count_match.group('count')}."
 
-    brands_loaded_match = _BRANDS_LOADED_PATTERN.match(message)
-    if brands_loaded_match:
-        return (
-            f"Бренды обновлены для {brands_loaded_match.group('slug')}: "
-            f"{brands_loaded_match.group('count')}."
-        )
+def _translate_message(message: str) -> str | None:
+    combined_match = _TEMPLATE_PATTERN.match(message)
+    if combined_match is not None and combined_match.lastgroup:
+        pattern, render = _TEMPLATE_RULES[int(combined_match.lastgroup[4:])]
+        match = pattern.match(message)
+        if match is not None:
+            if isinstance(render, str):
+                return render.format_map(match.groupdict())
+            return render(match)
+    return _DIRECT_REWRITES.get(message)
 
-    sizes_loaded_match = _SIZES_LOADED_PATTERN.match(message)
-    if sizes_loaded_match:
-        return (
-            f"Размеры обновлены для {sizes_loaded_match.group('slug')}: "
-            f"{sizes_loaded_match.group('count')}."
-        )
 
-    product_created_named_match = _PRODUCT_CREATED_NAMED_PATTERN.match(message)
-    if product_created_named_match:
-        return (
-            "Товар создан успешно: "
-            f"«{product_created_named_match.group('name')}», "
-            f"ID {product_created_named_match.group('id')}, "
-            f"фото {product_created_named_match.group('count')}."
-        )
+@lru_cache(maxsize=_NORMALIZED_MESSAGE_CACHE_SIZE)
+def _normalize_log_text(message: str) -> str:
+    normalized = _ANSI_ESCAPE_PATTERN.sub("", message).strip()
 
-    product_created_simple_match = _PRODUCT_CREATED_SIMPLE_PATTERN.match(message)
-    if product_created_simple_match:
-        return (
-            "Товар создан успешно: "
-            f"ID {product_created_simple_match.group('id')}, "
-            f"фото {product_created_simple_match.group('count')}."
+    if ":" in normalized or "=" in normalized:
+        normalized = _SENSITIVE_ASSIGNMENT_PATTERN.sub(
+            r"\g<1>=[REDACTED]", normalized
         )
-
-    direct_rewrites = {
-        "Нет новых товаров для создания.": "Новых товаров нет.",
-        "Бренд не определён. Обновляю список брендов...": "Бренд не определён, обновляю бренды.",
-        "Размер не определён. Обновляю список размеров...": "Размер не определён, обновляю размеры.",
-        "Создаю товар...": "Создаю товар.",
-        "API отклонил размер. Обновляю размеры и повторяю создание товара...": "Размер отклонён API, обновляю размеры и повторяю создание.",
-        "Фото удалены после создания товара.": "Временные фото удалены.",
-        "Нет фото для загрузки после фильтра/сжатия.": "После фильтрации фото не осталось.",
-    }
-    return direct_rewrites.get(message)
-
-
-def normalize_log_message(message: str) -> str:
-    normalized = _ANSI_ESCAPE_PATTERN.sub("", str(message)).strip()
-
-    for pattern in _SENSITIVE_VALUE_PATTERNS:
-        if "Bearer" in pattern.pattern:
-            normalized = pattern.sub("Bearer [REDACTED]", normalized)
-        else:
-            normalized = pattern.sub(
-                lambda match: f"{match.group(1)}=[REDACTED]",
-                normalized,
-            )
+    normalized = _BEARER_TOKEN_PATTERN.sub("Bearer [REDACTED]", normalized)
 
     normalized = _INLINE_LEVEL_PREFIX_PATTERN.sub("", normalized).strip()
 
-    formatted_size_message = _format_size_log_message(normalized)
-    if formatted_size_message:
-        return formatted_size_message
-
     formatted_error_message = _format_graph_response_error_message(normalized)
     if formatted_error_message:
         return formatted_error_message
 
-    translated_system_message = _translate_system_message(normalized)
-    if translated_system_message:
-        return translated_system_message
+    return _translate_message(normalized) or normalized
 
-    translated_business_message = _translate_business_message(normalized)
-    if translated_business_message:
-        return translated_business_message
 
-    return normalized
+def normalize_log_message(message: str) -> str:
+    """Mask, strip and translate one log line.
+
+    Results are memoized because the runner repeats the same templated lines;
+    callers on the append path pass the result along instead of normalizing
+    the same text again.
+    """
+    return _normalize_log_text(str(message))
 
 
 def is_ignorable_log_message(message: str) -> bool:
@@ -568,25 +510,44 @@ class AccountLogStore:
             lambda: deque(maxlen=self.max_entries_per_account)
         )
         self._next_index: dict[str, int] = defaultdict(int)
+        # Highest index pushed out of each account's buffer by its size limit
+        # or the retention cutoff.
+        self._evicted_through: dict[str, int] = {}
         self._subscribers: dict[str, dict[str, _Subscriber]] = defaultdict(dict)
+        # Multiplexed subscriptions: id -> (account ids, subscriber). The
+        # subscriber is also registered under each account in ``_subscribers``.
+        self._streams: dict[str, tuple[frozenset[str], _Subscriber]] = {}
         self._lock = threading.RLock()
+        self.index: AccountLogIndex | None = None
+
+    def attach_index(self, index: AccountLogIndex | None) -> None:
+        """Persist every kept entry to ``index`` and serve pages from it."""
+        self.index = index
 
     def clear(self) -> None:
         with self._lock:
             self._entries.clear()
             self._next_index.clear()
+            self._evicted_through.clear()
             self._subscribers.clear()
+            self._streams.clear()
 
     def clear_entries(self, account_id: str | int | None = None) -> None:
         with self._lock:
             if account_id is None:
                 self._entries.clear()
                 self._next_index.clear()
+                self._evicted_through.clear()
                 return
 
             normalized_account_id = str(account_id)
             self._entries.pop(normalized_account_id, None)
             self._next_index.pop(normalized_account_id, None)
+            self._evicted_through.pop(normalized_account_id, None)
+
+    def clear_index(self, account_id: str | int | None = None) -> None:
+        if self.index is not None:
+            self.index.clear(None if account_id is None else str(account_id))
 
     def append(
         self,
@@ -595,10 +556,14 @@ class AccountLogStore:
         message: str,
         *,
         timestamp: datetime | None = None,
+        normalized: bool = False,
     ) -> AccountLogEntry:
+        """Keep one entry; ``normalized`` marks ``message`` as already normalized."""
         normalized_account_id = str(account_id)
         normalized_level = normalize_log_level(level)
-        normalized_message = normalize_log_message(message)
+        normalized_message = (
+            str(message) if normalized else normalize_log_message(message)
+        )
         is_ignorable = is_ignorable_log_message(normalized_message)
         entry = AccountLogEntry(
             index=self._next_index[normalized_account_id],
@@ -619,16 +584,71 @@ class AccountLogStore:
             ):
                 self._next_index[normalized_account_id] += 1
                 return entry
-            self._entries[normalized_account_id].append(entry)
+            if self.index is not None:
+                # The stored ``seq`` doubles as the entry index so pages read
+                # from the index and live WebSocket entries share one cursor.
+                # The index only queues the row; its writer thread stores it.
+                entry = AccountLogEntry(
+                    index=self.index.append(
+                        normalized_account_id,
+                        timestamp=entry.timestamp,
+                        level=entry.level,
+                        message=entry.message,
+                        retention_cutoff=retention_cutoff,
+                    ),
+                    account_id=entry.account_id,
+                    timestamp=entry.timestamp,
+                    level=entry.level,
+                    message=entry.message,
+                )
+            buffer = self._entries[normalized_account_id]
+            if len(buffer) == buffer.maxlen:
+                self._evicted_through[normalized_account_id] = buffer[0].index
+            buffer.append(entry)
             self._next_index[normalized_account_id] += 1
             subscribers = list(self._subscribers.get(normalized_account_id, {}).values())
+        level_rank = log_level_rank(entry.level) if subscribers else 0
         for subscriber in subscribers:
+            if level_rank < subscriber.min_level_rank:
+                continue
             try:
-                subscriber.loop.call_soon_threadsafe(subscriber.queue.put_nowait, entry)
+                subscriber.loop.call_soon_threadsafe(
+                    subscriber.queue.put_dropping_oldest, entry
+                )
             except RuntimeError:
                 self.unsubscribe(normalized_account_id, subscriber.id)
+                self.unsubscribe_accounts(subscriber.id)
         return entry
 
+    def buffered_range(self, account_id: str | int) -> tuple[int, int]:
+        """Return ``(first, next)`` for the in-memory buffer of an account.
+
+        Every kept entry with ``first <= index < next`` is still buffered;
+        ``next`` is the index the next appended entry gets.
+        """
+        normalized_account_id = str(account_id)
+        with self._lock:
+            self._prune_locked(normalized_account_id, self._retention_cutoff())
+            evicted_through = self._evicted_through.get(normalized_account_id, -1)
+            return evicted_through + 1, self._next_index[normalized_account_id]
+
+    def count_indexed_entries(
+        self,
+        account_id: str | int,
+        *,
+        since_index: int,
+        before_index: int,
+    ) -> int:
+        """Count entries the attached index holds between two indexes."""
+        if self.index is None:
+            raise RuntimeError("Account log index is not attached.")
+        return self.index.count(
+            str(account_id),
+            since_seq=since_index,
+            before_seq=before_index,
+            since_timestamp=self._retention_cutoff(),
+        )
+
     def list_entries(
         self,
         account_id: str | int,
@@ -663,6 +683,67 @@ class AccountLogStore:
         bounded_limit = max(1, min(int(limit), self.max_entries_per_account))
         return entries[-bounded_limit:]
 
+    def page_entries(
+        self,
+        account_id: str | int,
+        log_file: Path,
+        *,
+        limit: int = 100,
+        level: str | None = None,
+        since_index: int | None = None,
+        before_index: int | None = None,
+        since_timestamp: datetime | None = None,
+        contains: str | None = None,
+    ) -> list[AccountLogEntry]:
+        """Read one page of entries from the attached index.
+
+        The account's ``app.log`` tail is imported once, the first time the
+        account is paged, so history written before the index existed stays
+        visible.
+        """
+        if self.index is None:
+            raise RuntimeError("Account log index is not attached.")
+        normalized_account_id = str(account_id)
+        if not self.index.is_imported(normalized_account_id):
+            self.index.import_entries(
+                normalized_account_id,
+                [
+                    (entry.timestamp, entry.level, entry.message)
+                    for entry in load_account_log_file_entries(
+                        normalized_account_id,
+                        log_file,
+                        tail_limit=_INDEX_IMPORT_TAIL_LINES,
+                        retention_seconds=self.retention_seconds,
+                    )
+                ],
+            )
+        retention_cutoff = self._retention_cutoff()
+        if since_timestamp is not None:
+            since_timestamp = normalize_log_timestamp(since_timestamp)
+        if retention_cutoff is not None and (
+            since_timestamp is None or since_timestamp < retention_cutoff
+        ):
+            since_timestamp = retention_cutoff
+        rows = self.index.query(
+            normalized_account_id,
+            limit=max(1, min(int(limit), self.max_entries_per_account)),
+            level=str(level or "").upper() or None,
+            since_seq=since_index,
+            before_seq=before_index,
+            since_timestamp=since_timestamp,
+            contains=contains,
+        )
+        return [
+            AccountLogEntry(
+                index=row.seq,
+                account_id=row.account_id,
+                timestamp=row.timestamp,
+                level=row.level,
+                message=row.message,
+            )
+            for row in rows
+        ]
+
     def _retention_cutoff(self) -> datetime | None:
         if self.retention_seconds is None:
             return None
@@ -679,14 +760,19 @@ class AccountLogStore:
         if not entries:
             return
         while entries and normalize_log_timestamp(entries[0].timestamp) < retention_cutoff:
-            entries.popleft()
+            self._evicted_through[account_id] = entries.popleft().index
 
-    def subscribe(self, account_id: str | int) -> tuple[str, asyncio.Queue[AccountLogEntry]]:
+    def subscribe(
+        self,
+        account_id: str | int,
+        *,
+        max_size: int = _SUBSCRIBER_QUEUE_SIZE,
+    ) -> tuple[str, AccountLogQueue]:
         normalized_account_id = str(account_id)
         subscription = _Subscriber(
             id=uuid.uuid4().hex,
             loop=asyncio.get_running_loop(),
-            queue=asyncio.Queue(),
+            queue=AccountLogQueue(max(1, int(max_size))),
         )
         with self._lock:
             self._subscribers[normalized_account_id][subscription.id] = subscription
@@ -702,6 +788,62 @@ class AccountLogStore:
             if not subscribers:
                 self._subscribers.pop(normalized_account_id, None)
 
+    def subscribe_accounts(
+        self,
+        account_ids: Iterable[str | int] = (),
+        *,
+        min_level: str | None = None,
+        max_size: int = _SUBSCRIBER_QUEUE_SIZE,
+    ) -> tuple[str, AccountLogQueue]:
+        """Feed entries of several accounts into one queue.
+
+        Each appended entry is matched against the account's subscribers once,
+        so one multiplexed subscription costs the same as a single-account one
+        no matter how many accounts it covers.
+        """
+        subscription = _Subscriber(
+            id=uuid.uuid4().hex,
+            loop=asyncio.get_running_loop(),
+            queue=AccountLogQueue(max(1, int(max_size))),
+        )
+        with self._lock:
+            self._streams[subscription.id] = (frozenset(), subscription)
+        self.update_subscription(subscription.id, account_ids, min_level=min_level)
+        return subscription.id, subscription.queue
+
+    def update_subscription(
+        self,
+        subscription_id: str,
+        account_ids: Iterable[str | int],
+        *,
+        min_level: str | None = None,
+    ) -> frozenset[str]:
+        """Replace the accounts and minimum level of a multiplexed subscription."""
+        wanted = frozenset(str(account_id) for account_id in account_ids)
+        with self._lock:
+            stream = self._streams.get(subscription_id)
+            if stream is None:
+                return frozenset()
+            current, subscriber = stream
+            subscriber = replace(
+                subscriber,
+                min_level_rank=log_level_rank(min_level) if min_level else 0,
+            )
+            for account_id in current - wanted:
+                self.unsubscribe(account_id, subscription_id)
+            for account_id in wanted:
+                self._subscribers[account_id][subscription_id] = subscriber
+            self._streams[subscription_id] = (wanted, subscriber)
+        return wanted
+
+    def unsubscribe_accounts(self, subscription_id: str) -> None:
+        with self._lock:
+            current, _subscriber = self._streams.pop(
+                subscription_id, (frozenset(), None)
+            )
+            for account_id in current:
+                self.unsubscribe(account_id, subscription_id)
+
 
 class AccountLogHandler(logging.Handler):
     def emit(self, record: logging.LogRecord) -> None:
@@ -714,6 +856,7 @@ class AccountLogHandler(logging.Handler):
                 level=record.levelname,
                 message=record.getMessage(),
                 timestamp=datetime.fromtimestamp(record.created, tz=UTC),
+                normalized=bool(getattr(record, "account_log_normalized", False)),
             )
         except Exception:
             self.handleError(record)
@@ -887,6 +1030,8 @@ def filter_account_log_entries(
     since_index: int | None = None,
     since_timestamp: datetime | None = None,
     max_entries: int = _MAX_LOG_ENTRIES_PER_ACCOUNT,
+    before_index: int | None = None,
+    contains: str | None = None,
 ) -> list[AccountLogEntry]:
     target_level = str(level or "").upper()
     normalized_since_timestamp = (
@@ -903,12 +1048,17 @@ def filter_account_log_entries(
         filtered = [entry for entry in filtered if entry.level == target_level]
     if since_index is not None:
         filtered = [entry for entry in filtered if entry.index > since_index]
+    if before_index is not None:
+        filtered = [entry for entry in filtered if entry.index < before_index]
     if normalized_since_timestamp is not None:
         filtered = [
             entry
             for entry in filtered
             if normalize_log_timestamp(entry.timestamp) >= normalized_since_timestamp
         ]
+    needle = str(contains or "").strip().casefold()
+    if needle:
+        filtered = [entry for entry in filtered if needle in entry.message.casefold()]
     return filtered[-bounded_limit:]
 
 
@@ -925,5 +1075,5 @@ def log(account_id: str | int, level: str, message: str) -> None:
     logger.log(
         log_level,
         normalized_message,
-        extra={"account_id": str(account_id)},
+        extra={"account_id": str(account_id), "account_log_normalized": True},
     )
@@ -10,11 +10,19 @@ from pathlib import Path
 class AppSettings:
     base_dir: Path
     accounts_file: Path
+    accounts_store: str
+    accounts_db_file: Path
     templates_file: Path
     channel_templates_file: Path
     proxies_db_file: Path
+    metrics_db_file: Path
+    account_logs_db_file: Path
     accounts_dir: Path
     log_level: str
+    account_worker_host: bool = False
+    account_command_host: bool = False
+    account_command_host_max_uses: int = 50
+    telegram_client_idle_timeout_seconds: float = 60.0
     app_name: str = "Telegram Accounts API"
     app_version: str = "1.0.0"
 
@@ -31,9 +39,17 @@ def _default_base_dir() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
 def get_settings() -> AppSettings:
     base_dir = _default_base_dir()
     accounts_file = Path(os.getenv("ACCOUNTS_STATE_FILE", base_dir / "accounts_state.json")).resolve()
+    accounts_store = os.getenv("ACCOUNTS_STORE", "json").strip().lower() or "json"
+    accounts_db_file = Path(
+        os.getenv("ACCOUNTS_DB_FILE", base_dir / "accounts_state.sqlite3")
+    ).resolve()
     templates_file = Path(os.getenv("MESSAGE_TEMPLATES_FILE", base_dir / "message_templates.json")).resolve()
     configured_channel_templates_file = os.getenv("CHANNEL_TEMPLATES_STATE_FILE", "").strip()
     if configured_channel_templates_file:
@@ -47,16 +63,47 @@ def get_settings() -> AppSettings:
     proxies_db_file = Path(
         os.getenv("PROXIES_DB_FILE", base_dir / "proxies.sqlite3")
     ).resolve()
+    metrics_db_file = Path(
+        os.getenv("DASHBOARD_METRICS_DB_FILE", base_dir / "dashboard_metrics.sqlite3")
+    ).resolve()
+    account_logs_db_file = Path(
+        os.getenv("ACCOUNT_LOGS_DB_FILE", base_dir / "account_logs.sqlite3")
+    ).resolve()
     accounts_dir = Path(os.getenv("ACCOUNTS_DIR", base_dir / "accounts")).resolve()
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    account_worker_host = _env_flag("ACCOUNT_WORKER_HOST")
+    account_command_host = _env_flag("ACCOUNT_COMMAND_HOST")
+    try:
+        account_command_host_max_uses = max(
+            int(os.getenv("ACCOUNT_COMMAND_HOST_MAX_USES", "50").strip() or 50), 1
+        )
+    except ValueError:
+        account_command_host_max_uses = 50
+    try:
+        telegram_client_idle_timeout_seconds = max(
+            float(
+                os.getenv("TELEGRAM_CLIENT_IDLE_TIMEOUT_SECONDS", "60").strip() or 60
+            ),
+            0.0,
+        )
+    except ValueError:
+        telegram_client_idle_timeout_seconds = 60.0
     return AppSettings(
         base_dir=base_dir,
         accounts_file=accounts_file,
+        accounts_store=accounts_store,
+        accounts_db_file=accounts_db_file,
         templates_file=templates_file,
         channel_templates_file=channel_templates_file,
         proxies_db_file=proxies_db_file,
+        metrics_db_file=metrics_db_file,
+        account_logs_db_file=account_logs_db_file,
         accounts_dir=accounts_dir,
         log_level=log_level,
+        account_worker_host=account_worker_host,
+        account_command_host=account_command_host,
+        account_command_host_max_uses=account_command_host_max_uses,
+        telegram_client_idle_timeout_seconds=telegram_client_idle_timeout_seconds,
     )
 
 
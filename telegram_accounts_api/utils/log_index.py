@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+LOGGER = logging.getLogger(__name__)
+
+# Rows of one account older than the retention cutoff are deleted after this
+# many appends for that account.
+_PRUNE_EVERY_APPENDS = 500
+# The trigram tokenizer only indexes three-character sequences; shorter
+# substrings are matched with ``instr`` over the account's rows instead.
+_FTS_MIN_QUERY_LENGTH = 3
+# Rows queued for the writer thread before the oldest are dropped.
+_MAX_PENDING_ROWS = 50_000
+
+
+@dataclass(frozen=True)
+class _PendingRow:
+    seq: int
+    account_id: str
+    ts: str
+    level: str
+    message: str
+    retention_cutoff: datetime | None
+
+
+@dataclass(frozen=True)
+class IndexedLogRow:
+    seq: int
+    account_id: str
+    timestamp: datetime
+    level: str
+    message: str
+
+
+class AccountLogIndex:
+    """Normalized account log entries persisted once, at append time.
+
+    Rows live in ``account_logs`` keyed by ``seq`` with ``(account_id, ts,
+    seq)`` and ``(account_id, level, seq)`` indexes, so ``GET /logs`` pages,
+    level filters and ``since`` cursors are index range scans. Substring
+    filters go through an FTS5 trigram table when SQLite provides one.
+
+    ``append`` hands out the ``seq`` straight away and queues the row; a
+    single writer thread inserts queued rows in batches. Reads wait for the
+    rows queued before them to be written.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        max_pending_rows: int = _MAX_PENDING_ROWS,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.max_pending_rows = max(int(max_pending_rows), 1)
+        self.dropped_rows = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._fts_available = False
+        self._appends_since_prune: dict[str, int] = {}
+        self._imported: set[str] = set()
+        self._condition = threading.Condition()
+        self._pending: deque[_PendingRow] = deque()
+        self._next_seq: int | None = None
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    def append(
+        self,
+        account_id: str,
+        *,
+        timestamp: datetime,
+        level: str,
+        message: str,
+        retention_cutoff: datetime | None = None,
+    ) -> int:
+        """Queue one normalized entry and return its ``seq``."""
+        with self._condition:
+            if self._next_seq is None:
+                self._next_seq = self._load_next_seq()
+            seq = self._next_seq
+            self._next_seq += 1
+            if self._closed:
+                return seq
+            if len(self._pending) >= self.max_pending_rows:
+                # The disk is not keeping up; drop the oldest row rather than
+                # growing without bound or blocking the log watchers.
+                self._pending.popleft()
+                self._written += 1
+                self.dropped_rows += 1
+            self._pending.append(
+                _PendingRow(
+                    seq=seq,
+                    account_id=account_id,
+                    ts=_format_ts(timestamp),
+                    level=level,
+                    message=message,
+                    retention_cutoff=retention_cutoff,
+                )
+            )
+            self._queued += 1
+            self._ensure_thread()
+            self._condition.notify_all()
+        return seq
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued row has been written."""
+        with self._condition:
+            target = self._queued
+            return self._condition.wait_for(
+                lambda: self._written >= target or self._thread is None,
+                timeout=timeout,
+            )
+
+    def is_imported(self, account_id: str) -> bool:
+        """Return whether the account's log file has already been imported."""
+        with self._lock:
+            if account_id in self._imported:
+                return True
+            row = self._connection().execute(
+                "SELECT 1 FROM account_log_imports WHERE account_id = ?",
+                (account_id,),
+            ).fetchone()
+            if row is not None:
+                self._imported.add(account_id)
+            return row is not None
+
+    def import_entries(
+        self,
+        account_id: str,
+        entries: list[tuple[datetime, str, str]],
+    ) -> bool:
+        """Seed an account from its log file once; later calls are no-ops."""
+        self.flush()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            imported = conn.execute(
+                "SELECT 1 FROM account_log_imports WHERE account_id = ?",
+                (account_id,),
+            ).fetchone()
+            if imported is not None:
+                conn.rollback()
+                self._imported.add(account_id)
+                return False
+            # File history predates anything appended since start-up, so it
+            # takes sequence numbers below every stored row, the same way
+            # file entries get negative indexes without the index.
+            first_ts = conn.execute(
+                """
+                SELECT ts FROM account_logs
+                WHERE account_id = ?
+                ORDER BY seq ASC
+                LIMIT 1
+                """,
+                (account_id,),
+            ).fetchone()
+            first_ts = first_ts[0] if first_ts is not None else None
+            lowest_seq = conn.execute("SELECT MIN(seq) FROM account_logs").fetchone()[0]
+            rows = [
+                (_format_ts(timestamp), level, message)
+                for timestamp, level, message in entries
+                if first_ts is None or _format_ts(timestamp) < first_ts
+            ]
+            start_seq = min(int(lowest_seq or 1), 1) - len(rows)
+            conn.executemany(
+                """
+                INSERT INTO account_logs (seq, account_id, ts, level, message)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (start_seq + offset, account_id, *row)
+                    for offset, row in enumerate(rows)
+                ],
+            )
+            conn.execute(
+                "INSERT INTO account_log_imports (account_id) VALUES (?)",
+                (account_id,),
+            )
+            conn.commit()
+            self._imported.add(account_id)
+        return True
+
+    def query(
+        self,
+        account_id: str,
+        *,
+        limit: int,
+        level: str | None = None,
+        since_seq: int | None = None,
+        before_seq: int | None = None,
+        since_timestamp: datetime | None = None,
+        contains: str | None = None,
+    ) -> list[IndexedLogRow]:
+        """Return the newest ``limit`` matching rows in ascending order."""
+        clauses = ["account_id = ?"]
+        params: list[object] = [account_id]
+        if level:
+            clauses.append("level = ?")
+            params.append(level)
+        if since_seq is not None:
+            clauses.append("seq > ?")
+            params.append(int(since_seq))
+        if before_seq is not None:
+            clauses.append("seq < ?")
+            params.append(int(before_seq))
+        if since_timestamp is not None:
+            clauses.append("ts >= ?")
+            params.append(_format_ts(since_timestamp))
+        needle = (contains or "").strip()
+        self.flush()
+        with self._lock:
+            conn = self._connection()
+            if needle:
+                if self._fts_available and len(needle) >= _FTS_MIN_QUERY_LENGTH:
+                    clauses.append(
+                        "seq IN (SELECT rowid FROM account_logs_fts "
+                        "WHERE account_logs_fts MATCH ?)"
+                    )
+                    params.append('"' + needle.replace('"', '""') + '"')
+                else:
+                    # SQLite's ``lower`` folds ASCII only.
+                    clauses.append("instr(py_casefold(message), ?) > 0")
+                    params.append(needle.casefold())
+            rows = conn.execute(
+                f"""
+                SELECT seq, account_id, ts, level, message
+                FROM account_logs
+                WHERE {" AND ".join(clauses)}
+                ORDER BY seq DESC
+                LIMIT ?
+                """,
+                (*params, max(int(limit), 1)),
+            ).fetchall()
+        return [
+            IndexedLogRow(
+                seq=int(row[0]),
+                account_id=row[1],
+                timestamp=datetime.fromisoformat(row[2]),
+                level=row[3],
+                message=row[4],
+            )
+            for row in reversed(rows)
+        ]
+
+    def count(
+        self,
+        account_id: str,
+        *,
+        since_seq: int | None = None,
+        before_seq: int | None = None,
+        since_timestamp: datetime | None = None,
+    ) -> int:
+        """Count rows of an account between two ``seq`` cursors."""
+        clauses = ["account_id = ?"]
+        params: list[object] = [account_id]
+        if since_seq is not None:
+            clauses.append("seq > ?")
+            params.append(int(since_seq))
+        if before_seq is not None:
+            clauses.append("seq < ?")
+            params.append(int(before_seq))
+        if since_timestamp is not None:
+            clauses.append("ts >= ?")
+            params.append(_format_ts(since_timestamp))
+        self.flush()
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT COUNT(*) FROM account_logs WHERE {' AND '.join(clauses)}",
+                params,
+            ).fetchone()
+        return int(row[0])
+
+    def clear(self, account_id: str | None = None) -> None:
+        """Drop stored rows; a cleared account is not re-seeded from its file."""
+        self.flush()
+        with self._lock:
+            conn = self._connection()
+            if account_id is None:
+                conn.execute("DELETE FROM account_logs")
+            else:
+                conn.execute(
+                    "DELETE FROM account_logs WHERE account_id = ?", (account_id,)
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO account_log_imports (account_id) "
+                    "VALUES (?)",
+                    (account_id,),
+                )
+            conn.commit()
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Write the queued rows and close the connection."""
+        with self._condition:
+            self._closed = True
+            thread = self._thread
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout=timeout)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _load_next_seq(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            highest = conn.execute("SELECT MAX(seq) FROM account_logs").fetchone()[0]
+            issued = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'account_logs'"
+            ).fetchone()
+        return max(int(highest or 0), int(issued[0] if issued else 0), 0) + 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="account-log-index-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                batch = list(self._pending)
+                self._pending.clear()
+                closed = self._closed
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except sqlite3.Error:
+                    LOGGER.exception(
+                        "Failed to write %s account log rows", len(batch)
+                    )
+            with self._condition:
+                self._written += len(batch)
+                if closed and not self._pending:
+                    self._thread = None
+                self._condition.notify_all()
+                if self._thread is None:
+                    return
+
+    def _write_batch(self, batch: list[_PendingRow]) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                """
+                INSERT INTO account_logs (seq, account_id, ts, level, message)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (row.seq, row.account_id, row.ts, row.level, row.message)
+                    for row in batch
+                ],
+            )
+            cutoffs: dict[str, datetime] = {}
+            for row in batch:
+                appended = self._appends_since_prune.get(row.account_id, 0) + 1
+                if (
+                    row.retention_cutoff is not None
+                    and appended >= _PRUNE_EVERY_APPENDS
+                ):
+                    cutoffs[row.account_id] = row.retention_cutoff
+                    appended = 0
+                self._appends_since_prune[row.account_id] = appended
+            for account_id, retention_cutoff in cutoffs.items():
+                self._prune_locked(conn, account_id, retention_cutoff)
+            conn.commit()
+
+    def _prune_locked(
+        self,
+        conn: sqlite3.Connection,
+        account_id: str,
+        retention_cutoff: datetime,
+    ) -> None:
+        conn.execute(
+            "DELETE FROM account_logs WHERE account_id = ? AND ts < ?",
+            (account_id, _format_ts(retention_cutoff)),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.create_function("py_casefold", 1, _casefold, deterministic=True)
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS account_logs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_id TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                level TEXT NOT NULL,
+                message TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_account_logs_account_ts
+                ON account_logs(account_id, ts, seq);
+            CREATE INDEX IF NOT EXISTS idx_account_logs_account_level
+                ON account_logs(account_id, level, seq);
+            CREATE TABLE IF NOT EXISTS account_log_imports (
+                account_id TEXT PRIMARY KEY
+            );
+            """
+        )
+        try:
+            conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS account_logs_fts USING fts5(
+                    message,
+                    content='account_logs',
+                    content_rowid='seq',
+                    tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS account_logs_fts_insert
+                AFTER INSERT ON account_logs BEGIN
+                    INSERT INTO account_logs_fts (rowid, message)
+                    VALUES (new.seq, new.message);
+                END;
+                CREATE TRIGGER IF NOT EXISTS account_logs_fts_delete
+                AFTER DELETE ON account_logs BEGIN
+                    INSERT INTO account_logs_fts (account_logs_fts, rowid, message)
+                    VALUES ('delete', old.seq, old.message);
+                END;
+                """
+            )
+            self._fts_available = True
+        except sqlite3.OperationalError:
+            self._fts_available = False
+        conn.commit()
+        self._conn = conn
+        return conn
+
+
+def _casefold(value: object) -> str | None:
+    return None if value is None else str(value).casefold()
+
+
+def _format_ts(timestamp: datetime) -> str:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.now().astimezone().tzinfo)
+    return timestamp.astimezone(UTC).isoformat(timespec="microseconds")
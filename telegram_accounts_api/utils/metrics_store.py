@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator
+
+METRIC_COLUMNS = ("items", "errors", "creation_errors", "retry_events", "deactivations")
+# Counters folded from rendered account logs; ``deactivations`` is recomputed
+# from the shared deactivation tables instead.
+LOG_METRIC_COLUMNS = METRIC_COLUMNS[:4]
+
+
+class DailyMetricsStore:
+    """Per-account, per-day dashboard counters kept in SQLite.
+
+    ``metrics_daily`` holds one row per account and local calendar day, so a
+    dashboard range reads at most ``days x accounts`` rows. Log counters are
+    added as new log bytes are folded in, together with the byte cursor that
+    makes the fold resumable; deactivation counts are replaced per day.
+    Runs that report structured events add their counters directly, and
+    ``metrics_event_windows`` records when they ran so their log lines are
+    not folded a second time.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def get_log_cursor(self, account_id: str) -> tuple[int, int, int] | None:
+        """Return ``(st_dev, st_ino, offset)`` of the last folded log byte."""
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT file_dev, file_ino, byte_offset
+                FROM metrics_log_cursors
+                WHERE account_id = ?
+                """,
+                (account_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return int(row[0]), int(row[1]), int(row[2])
+
+    def add_log_totals(
+        self,
+        account_id: str,
+        daily_totals: dict[date, dict[str, int]],
+        *,
+        cursor: tuple[int, int, int],
+    ) -> None:
+        """Add ``daily_totals`` and move the log cursor in one transaction."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._add_totals(conn, account_id, daily_totals)
+            conn.execute(
+                """
+                INSERT INTO metrics_log_cursors (
+                    account_id, file_dev, file_ino, byte_offset
+                ) VALUES (?, ?, ?, ?)
+                ON CONFLICT(account_id) DO UPDATE SET
+                    file_dev = excluded.file_dev,
+                    file_ino = excluded.file_ino,
+                    byte_offset = excluded.byte_offset
+                """,
+                (account_id, *cursor),
+            )
+            conn.commit()
+
+    def add_event_totals(
+        self,
+        account_id: str,
+        daily_totals: dict[date, dict[str, int]],
+    ) -> None:
+        """Add counters reported by structured process events."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._add_totals(conn, account_id, daily_totals)
+            conn.commit()
+
+    def open_event_window(self, account_id: str, started_at: float) -> None:
+        """Start a run whose counters arrive as events instead of log lines.
+
+        A window left open by a run that never reported ``closed`` ends where
+        the new one starts.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                UPDATE metrics_event_windows SET ended_at = ?
+                WHERE account_id = ? AND ended_at IS NULL
+                """,
+                (started_at, account_id),
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO metrics_event_windows (
+                    account_id, started_at, ended_at
+                ) VALUES (?, ?, NULL)
+                """,
+                (account_id, started_at),
+            )
+            conn.commit()
+
+    def close_event_window(self, account_id: str, ended_at: float) -> bool:
+        """End the open window; return whether one was open."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE metrics_event_windows SET ended_at = ?
+                WHERE account_id = ? AND ended_at IS NULL
+                """,
+                (ended_at, account_id),
+            )
+        return cursor.rowcount > 0
+
+    def close_open_event_windows(self, ended_at: float) -> int:
+        """End every open window, e.g. those of runs lost by a restart."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE metrics_event_windows SET ended_at = ?
+                WHERE ended_at IS NULL
+                """,
+                (ended_at,),
+            )
+        return cursor.rowcount
+
+    def get_event_windows(self, account_id: str) -> list[tuple[float, float | None]]:
+        """Return ``(started_at, ended_at)`` epoch pairs, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT started_at, ended_at FROM metrics_event_windows
+                WHERE account_id = ?
+                ORDER BY started_at ASC
+                """,
+                (account_id,),
+            ).fetchall()
+        return [
+            (float(row[0]), None if row[1] is None else float(row[1]))
+            for row in rows
+        ]
+
+    def get_deactivations_compacted_through(self) -> date | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT value FROM metrics_compaction_state
+                WHERE key = 'deactivations_through'
+                """
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return date.fromisoformat(str(row[0]))
+        except ValueError:
+            return None
+
+    def replace_deactivations(
+        self,
+        counts: dict[tuple[str, date], int],
+        *,
+        since: date,
+        closed_through: date,
+    ) -> None:
+        """Overwrite deactivation counts for every day from ``since`` onwards.
+
+        Days up to ``closed_through`` are final and are not recomputed by the
+        next compaction.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE metrics_daily SET deactivations = 0 WHERE day >= ?",
+                (since.isoformat(),),
+            )
+            conn.executemany(
+                """
+                INSERT INTO metrics_daily (account_id, day, deactivations)
+                VALUES (?, ?, ?)
+                ON CONFLICT(account_id, day) DO UPDATE SET
+                    deactivations = excluded.deactivations
+                """,
+                [
+                    (account_id, day.isoformat(), int(count))
+                    for (account_id, day), count in counts.items()
+                ],
+            )
+            conn.execute(
+                """
+                INSERT INTO metrics_compaction_state (key, value)
+                VALUES ('deactivations_through', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (closed_through.isoformat(),),
+            )
+            conn.commit()
+
+    def load_range(
+        self,
+        account_ids: Iterable[str],
+        *,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> dict[str, dict[date, dict[str, int]]]:
+        wanted = set(account_ids)
+        clauses = []
+        params: list[str] = []
+        if date_from is not None:
+            clauses.append("day >= ?")
+            params.append(date_from.isoformat())
+        if date_to is not None:
+            clauses.append("day <= ?")
+            params.append(date_to.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT account_id, day, {", ".join(METRIC_COLUMNS)}
+                FROM metrics_daily
+                {where}
+                """,
+                params,
+            ).fetchall()
+        result: dict[str, dict[date, dict[str, int]]] = {}
+        for row in rows:
+            if row[0] not in wanted:
+                continue
+            result.setdefault(row[0], {})[date.fromisoformat(row[1])] = {
+                key: int(value or 0) for key, value in zip(METRIC_COLUMNS, row[2:])
+            }
+        return result
+
+    def earliest_day(self, account_ids: Iterable[str]) -> date | None:
+        wanted = list(dict.fromkeys(account_ids))
+        if not wanted:
+            return None
+        placeholders = ", ".join("?" for _ in wanted)
+        with self._connect() as conn:
+            row = conn.execute(
+                f"""
+                SELECT MIN(day) FROM metrics_daily
+                WHERE account_id IN ({placeholders})
+                """,
+                wanted,
+            ).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    @staticmethod
+    def _add_totals(
+        conn: sqlite3.Connection,
+        account_id: str,
+        daily_totals: dict[date, dict[str, int]],
+    ) -> None:
+        conn.executemany(
+            """
+            INSERT INTO metrics_daily (
+                account_id, day, items, errors, creation_errors, retry_events
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(account_id, day) DO UPDATE SET
+                items = items + excluded.items,
+                errors = errors + excluded.errors,
+                creation_errors = creation_errors + excluded.creation_errors,
+                retry_events = retry_events + excluded.retry_events
+            """,
+            [
+                (
+                    account_id,
+                    day.isoformat(),
+                    *(int(totals.get(key, 0)) for key in LOG_METRIC_COLUMNS),
+                )
+                for day, totals in daily_totals.items()
+            ],
+        )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self._ensure_ready()
+        conn = self._open()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    def _ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._open()
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS metrics_daily (
+                        account_id TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        items INTEGER NOT NULL DEFAULT 0,
+                        errors INTEGER NOT NULL DEFAULT 0,
+                        creation_errors INTEGER NOT NULL DEFAULT 0,
+                        retry_events INTEGER NOT NULL DEFAULT 0,
+                        deactivations INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (account_id, day)
+                    ) WITHOUT ROWID;
+                    CREATE INDEX IF NOT EXISTS idx_metrics_daily_day
+                        ON metrics_daily(day, account_id);
+                    CREATE TABLE IF NOT EXISTS metrics_log_cursors (
+                        account_id TEXT PRIMARY KEY,
+                        file_dev INTEGER NOT NULL,
+                        file_ino INTEGER NOT NULL,
+                        byte_offset INTEGER NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS metrics_event_windows (
+                        account_id TEXT NOT NULL,
+                        started_at REAL NOT NULL,
+                        ended_at REAL,
+                        PRIMARY KEY (account_id, started_at)
+                    );
+                    CREATE TABLE IF NOT EXISTS metrics_compaction_state (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL
+                    );
+                    """
+                )
+            finally:
+                conn.close()
+            self._ready = True
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import atexit
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .exceptions import StorageError
+from .storage import read_json_list_file
+
+DEFAULT_JSON_MIRROR_DELAY_SECONDS = 2.0
+# Fields that change on every process start/stop get their own columns; the
+# rest of the record lives in the ``extra`` JSON column.
+_COLUMN_FIELDS = ("name", "status", "last_run", "errors", "proxy_id")
+
+
+class SqliteAccountStorage:
+    """Account records stored one row per account in SQLite.
+
+    ``path`` still points at the JSON accounts file, which is kept as a mirror
+    so JSON readers and a rollback to ``JsonListStorage`` see current data.
+    Record-level writes touch one row and refresh the mirror after
+    ``mirror_delay_seconds``; whole-list writes refresh it immediately.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        json_path: Path,
+        *,
+        mirror_delay_seconds: float = DEFAULT_JSON_MIRROR_DELAY_SECONDS,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.path = Path(json_path)
+        self.mirror_delay_seconds = max(float(mirror_delay_seconds), 0.0)
+        self._lock = threading.RLock()
+        self._ready = False
+        self._mirror_timer: threading.Timer | None = None
+        atexit.register(self.flush_mirror)
+
+    def read_all(self) -> list[dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, name, status, last_run, errors, proxy_id, extra
+                FROM accounts
+                ORDER BY position ASC, id ASC
+                """
+            ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def get_record(self, account_id: str) -> dict[str, Any] | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT id, name, status, last_run, errors, proxy_id, extra
+                FROM accounts
+                WHERE id = ?
+                """,
+                (account_id,),
+            ).fetchone()
+        return self._row_to_record(row) if row is not None else None
+
+    def revision(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM account_store_meta WHERE key = 'revision'"
+            ).fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def write_all(self, payload: list[dict[str, Any]]) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._replace_all(conn, payload)
+            self._bump_revision(conn)
+            conn.commit()
+            self._write_mirror(conn)
+
+    def update_record(
+        self,
+        account_id: str,
+        update_fn: Callable[[dict[str, Any]], None],
+    ) -> dict[str, Any] | None:
+        """Apply ``update_fn`` to one record and write back only that row."""
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT id, name, status, last_run, errors, proxy_id, extra
+                FROM accounts
+                WHERE id = ?
+                """,
+                (account_id,),
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            record = self._row_to_record(row)
+            update_fn(record)
+            conn.execute(
+                """
+                UPDATE accounts
+                SET name = ?, status = ?, last_run = ?, errors = ?, proxy_id = ?,
+                    extra = ?
+                WHERE id = ?
+                """,
+                (*self._record_to_columns(record)[1:], account_id),
+            )
+            self._bump_revision(conn)
+            conn.commit()
+        self._schedule_mirror()
+        return record
+
+    def delete_record(self, account_id: str) -> bool:
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            self._bump_revision(conn)
+            conn.commit()
+            self._write_mirror(conn)
+        return True
+
+    def flush_mirror(self) -> None:
+        with self._lock:
+            timer, self._mirror_timer = self._mirror_timer, None
+            if timer is None:
+                return
+            timer.cancel()
+            with self._connect() as conn:
+                self._write_mirror(conn)
+
+    def _schedule_mirror(self) -> None:
+        with self._lock:
+            if self._mirror_timer is not None:
+                return
+            timer = threading.Timer(
+                self.mirror_delay_seconds, self._mirror_timer_fired
+            )
+            timer.daemon = True
+            self._mirror_timer = timer
+            timer.start()
+
+    def _mirror_timer_fired(self) -> None:
+        try:
+            self.flush_mirror()
+        except (StorageError, sqlite3.Error):
+            return
+
+    def _write_mirror(self, conn: sqlite3.Connection) -> None:
+        rows = conn.execute(
+            """
+            SELECT id, name, status, last_run, errors, proxy_id, extra
+            FROM accounts
+            ORDER BY position ASC, id ASC
+            """
+        ).fetchall()
+        payload = [self._row_to_record(row) for row in rows]
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(
+                json.dumps(payload, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+            temp_path.replace(self.path)
+        except OSError as exc:
+            raise StorageError(f"Failed to write JSON file: {self.path}") from exc
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self._ensure_ready()
+        conn = self._open()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    def _ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._open()
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS accounts (
+                        id TEXT PRIMARY KEY,
+                        position INTEGER NOT NULL,
+                        name TEXT NOT NULL DEFAULT '',
+                        status TEXT,
+                        last_run TEXT,
+                        errors INTEGER NOT NULL DEFAULT 0,
+                        proxy_id TEXT,
+                        extra TEXT NOT NULL DEFAULT '{}'
+                    );
+                    CREATE TABLE IF NOT EXISTS account_store_meta (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL
+                    );
+                    """
+                )
+                conn.execute("BEGIN IMMEDIATE")
+                imported = conn.execute(
+                    "SELECT 1 FROM account_store_meta WHERE key = 'json_imported'"
+                ).fetchone()
+                if imported is None:
+                    self._replace_all(conn, read_json_list_file(self.path))
+                    conn.execute(
+                        """
+                        INSERT INTO account_store_meta (key, value)
+                        VALUES ('json_imported', '1')
+                        """
+                    )
+                    self._bump_revision(conn)
+                conn.commit()
+            finally:
+                conn.close()
+            self._ready = True
+
+    def _replace_all(
+        self,
+        conn: sqlite3.Connection,
+        payload: list[dict[str, Any]],
+    ) -> None:
+        rows = []
+        seen: set[str] = set()
+        for position, item in enumerate(payload):
+            columns = self._record_to_columns(item)
+            if not columns[0] or columns[0] in seen:
+                continue
+            seen.add(columns[0])
+            rows.append((columns[0], position, *columns[1:]))
+        conn.execute("DELETE FROM accounts")
+        conn.executemany(
+            """
+            INSERT INTO accounts (
+                id, position, name, status, last_run, errors, proxy_id, extra
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+    @staticmethod
+    def _bump_revision(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """
+            INSERT INTO account_store_meta (key, value) VALUES ('revision', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """
+        )
+
+    @staticmethod
+    def _record_to_columns(record: dict[str, Any]) -> tuple:
+        extra = {
+            key: value
+            for key, value in record.items()
+            if key != "id" and key not in _COLUMN_FIELDS
+        }
+        try:
+            errors = int(record.get("errors") or 0)
+        except (TypeError, ValueError):
+            errors = 0
+        last_run = record.get("last_run")
+        return (
+            str(record.get("id") or "").strip(),
+            str(record.get("name") or ""),
+            record.get("status"),
+            None if last_run is None else str(last_run),
+            errors,
+            record.get("proxy_id"),
+            json.dumps(extra, ensure_ascii=False),
+        )
+
+    @staticmethod
+    def _row_to_record(row: sqlite3.Row) -> dict[str, Any]:
+        try:
+            extra = json.loads(row["extra"] or "{}")
+        except json.JSONDecodeError:
+            extra = {}
+        record: dict[str, Any] = {
+            "id": row["id"],
+            "name": row["name"],
+            "status": row["status"],
+            "last_run": row["last_run"],
+            "errors": int(row["errors"] or 0),
+            "proxy_id": row["proxy_id"],
+        }
+        if isinstance(extra, dict):
+            record.update(extra)
+        return record
@@ -8,6 +8,15 @@ from typing import Any
 from .exceptions import StorageError
 
 
+def file_signature(path: Path) -> tuple[int, int] | None:
+    """Return ``(mtime_ns, size)`` for ``path``, or ``None`` when it is missing."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 def read_json_list_file(path: Path) -> list[dict[str, Any]]:
     if not path.exists():
         return []
@@ -4,17 +4,28 @@ import asyncio
 from contextlib import suppress
 import json
 import tempfile
+import threading
 import unittest
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import WebSocketDisconnect
 
 from shafa_control import AccountSessionStore
 from telegram_accounts_api.dependencies import get_account_log_store, get_account_service, get_auth_service
 from telegram_accounts_api.main import app
-from telegram_accounts_api.routers.logs import stream_account_logs
+from telegram_accounts_api.routers import logs as logs_router
+from telegram_accounts_api.routers.logs import stream_account_logs, stream_logs
 from telegram_accounts_api.services.account_service import AccountService
 from telegram_accounts_api.services.auth_service import AccountAuthService
-from telegram_accounts_api.utils.account_logging import AccountLogStore, log, set_account_log_store
+from telegram_accounts_api.utils.account_logging import (
+    AccountLogStore,
+    log,
+    normalize_log_message,
+    set_account_log_store,
+)
+from telegram_accounts_api.utils.log_index import AccountLogIndex
 from telegram_accounts_api.utils.storage import JsonListStorage
 from tests.asgi_client import SyncASGITestClient, async_dependency
 
@@ -369,6 +380,47 @@ class AccountLogsApiTest(unittest.TestCase):
             ],
         )
 
+    def test_normalize_log_message_matches_templates_in_one_pass(self) -> None:
+        cases = {
+            "\x1b[31m[INFO] [warn] Создаю товар...\x1b[0m": "Создаю товар.",
+            "[stop] stop requested from API": "Остановка запрошена из API.",
+            "Telegram code submission failed: {code} rejected": (
+                "Не удалось подтвердить код Telegram: {code} rejected"
+            ),
+            "Товар создан успешно. ID: 42. Фото: 3.": (
+                "Товар создан успешно: ID 42, фото 3."
+            ),
+            "Размеры товара: {'catalog': 'dress', 'resolved_size': None}": (
+                "Каталог: dress. Размер не сопоставлен автоматически."
+            ),
+            "Размеры товара: {broken": "Размеры товара: {broken",
+            "Bearer token=abc password: secret": (
+                "Bearer [REDACTED]=[REDACTED] password=[REDACTED]"
+            ),
+            "Processing item 7 of 10": "Processing item 7 of 10",
+        }
+
+        for message, expected in cases.items():
+            with self.subTest(message=message):
+                self.assertEqual(normalize_log_message(message), expected)
+
+    def test_append_paths_normalize_each_message_once(self) -> None:
+        with patch(
+            "telegram_accounts_api.utils.account_logging._normalize_log_text",
+            side_effect=lambda message: message.upper(),
+        ) as normalize:
+            log("acc-1", "INFO", "logged once")
+            entry = self.log_store.append(
+                "acc-1", "INFO", "ALREADY NORMALIZED", normalized=True
+            )
+
+        self.assertEqual(normalize.call_count, 1)
+        self.assertEqual(entry.message, "ALREADY NORMALIZED")
+        self.assertEqual(
+            [item.message for item in self.log_store.list_entries("acc-1")],
+            ["LOGGED ONCE", "ALREADY NORMALIZED"],
+        )
+
     def test_get_account_logs_normalizes_noise_and_structured_errors(self) -> None:
         account_log = self.accounts_dir / "acc-1" / "logs" / "app.log"
         account_log.parent.mkdir(parents=True, exist_ok=True)
@@ -455,12 +507,275 @@ class AccountLogsApiTest(unittest.TestCase):
                 await task
             return message
 
-        message = asyncio.run(_exercise_websocket())
+        frame = asyncio.run(_exercise_websocket())
 
+        self.assertEqual(frame["type"], "logs")
+        self.assertEqual(frame["dropped"], 0)
+        [message] = frame["entries"]
+        self.assertEqual(frame["seq"], message["index"])
         self.assertEqual(message["account_id"], "acc-1")
         self.assertEqual(message["level"], "INFO")
         self.assertEqual(message["message"], "Browser login started")
 
+    def test_websocket_batches_entries_and_resumes_from_seq(self) -> None:
+        class _FakeWebSocket:
+            def __init__(self) -> None:
+                self.accepted = asyncio.Event()
+                self.messages: asyncio.Queue[dict] = asyncio.Queue()
+
+            async def accept(self) -> None:
+                self.accepted.set()
+
+            async def send_json(self, payload: dict) -> None:
+                await self.messages.put(payload)
+
+            async def close(self, code: int | None = None) -> None:
+                return None
+
+        async def _stream(since: int | None, burst: list[str]) -> list[dict]:
+            websocket = _FakeWebSocket()
+            task = asyncio.create_task(
+                stream_account_logs(
+                    websocket,
+                    "acc-1",
+                    self.account_service,
+                    self.log_store,
+                    since,
+                )
+            )
+            await websocket.accepted.wait()
+            frames = []
+            if since is not None:
+                # The backlog is read off the loop; send the burst after it.
+                frames.append(
+                    await asyncio.wait_for(websocket.messages.get(), timeout=2)
+                )
+            for message in burst:
+                self.log_store.append("acc-1", "INFO", message)
+            if burst:
+                frames.append(
+                    await asyncio.wait_for(websocket.messages.get(), timeout=2)
+                )
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            return frames
+
+        [burst_frame] = asyncio.run(_stream(None, ["one", "two", "three"]))
+        [backlog_frame, live_frame] = asyncio.run(
+            _stream(burst_frame["entries"][0]["index"], ["four"])
+        )
+
+        self.assertEqual(
+            [item["message"] for item in burst_frame["entries"]],
+            ["one", "two", "three"],
+        )
+        self.assertEqual(
+            [item["message"] for item in backlog_frame["entries"]], ["two", "three"]
+        )
+        self.assertEqual(backlog_frame["seq"], burst_frame["seq"])
+        self.assertEqual([item["message"] for item in live_frame["entries"]], ["four"])
+
+    async def _resume_stream(self, since: int, burst: list[str]) -> list[dict]:
+        class _FakeWebSocket:
+            def __init__(self) -> None:
+                self.accepted = asyncio.Event()
+                self.messages: asyncio.Queue[dict] = asyncio.Queue()
+
+            async def accept(self) -> None:
+                self.accepted.set()
+
+            async def send_json(self, payload: dict) -> None:
+                await self.messages.put(payload)
+
+            async def close(self, code: int | None = None) -> None:
+                return None
+
+        websocket = _FakeWebSocket()
+        task = asyncio.create_task(
+            stream_account_logs(
+                websocket, "acc-1", self.account_service, self.log_store, since
+            )
+        )
+        await websocket.accepted.wait()
+        frames = [await asyncio.wait_for(websocket.messages.get(), timeout=2)]
+        for message in burst:
+            self.log_store.append("acc-1", "INFO", message)
+        frames.append(await asyncio.wait_for(websocket.messages.get(), timeout=2))
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        return frames
+
+    def test_websocket_resume_past_the_buffer_starts_at_the_tail(self) -> None:
+        entries = [
+            self.log_store.append("acc-1", "INFO", f"entry {number}")
+            for number in range(5)
+        ]
+
+        marker, live = asyncio.run(self._resume_stream(entries[0].index, ["live"]))
+
+        self.assertEqual(marker["entries"], [])
+        self.assertEqual(marker["dropped"], 4)
+        self.assertEqual(marker["seq"], entries[-1].index)
+        self.assertEqual([item["message"] for item in live["entries"]], ["live"])
+
+        [stale, live] = asyncio.run(self._resume_stream(500, ["after restart"]))
+        self.assertEqual(stale["dropped"], 6)
+        self.assertEqual(
+            [item["message"] for item in live["entries"]], ["after restart"]
+        )
+
+    def test_multiplexed_websocket_follows_runtime_subscription_changes(self) -> None:
+        class _FakeWebSocket:
+            def __init__(self) -> None:
+                self.accepted = asyncio.Event()
+                self.incoming: asyncio.Queue[dict | None] = asyncio.Queue()
+                self.messages: asyncio.Queue[dict] = asyncio.Queue()
+
+            async def accept(self) -> None:
+                self.accepted.set()
+
+            async def receive_json(self) -> dict:
+                message = await self.incoming.get()
+                if message is None:
+                    raise WebSocketDisconnect()
+                return message
+
+            async def send_json(self, payload: dict) -> None:
+                await self.messages.put(payload)
+
+        async def _subscribe(websocket: _FakeWebSocket, payload: dict) -> None:
+            await websocket.incoming.put(payload)
+            while not websocket.incoming.empty():
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+
+        async def _exercise_websocket() -> list[dict]:
+            websocket = _FakeWebSocket()
+            task = asyncio.create_task(
+                stream_logs(websocket, self.account_service, self.log_store)
+            )
+            await websocket.accepted.wait()
+            await _subscribe(
+                websocket,
+                {
+                    "type": "subscribe",
+                    "account_ids": ["acc-1", "acc-2", "missing"],
+                    "min_level": "WARNING",
+                },
+            )
+            self.log_store.append("acc-1", "INFO", "alpha info")
+            self.log_store.append("acc-1", "ERROR", "alpha error")
+            self.log_store.append("acc-2", "WARN", "beta warning")
+            first = await asyncio.wait_for(websocket.messages.get(), timeout=2)
+
+            await _subscribe(
+                websocket, {"type": "subscribe", "account_ids": ["acc-2"]}
+            )
+            self.log_store.append("acc-1", "ERROR", "alpha ignored")
+            self.log_store.append("acc-2", "INFO", "beta info")
+            second = await asyncio.wait_for(websocket.messages.get(), timeout=2)
+
+            await websocket.incoming.put(None)
+            await asyncio.wait_for(task, timeout=2)
+            return [first, second]
+
+        first, second = asyncio.run(_exercise_websocket())
+
+        self.assertEqual(
+            [(item["account_id"], item["message"]) for item in first["entries"]],
+            [("acc-1", "alpha error"), ("acc-2", "beta warning")],
+        )
+        self.assertEqual(set(first["seqs"]), {"acc-1", "acc-2"})
+        self.assertEqual(
+            [(item["account_id"], item["message"]) for item in second["entries"]],
+            [("acc-2", "beta info")],
+        )
+        self.assertEqual(self.log_store._subscribers, {})
+
+    def test_multiplexed_replay_is_not_overtaken_by_live_entries(self) -> None:
+        class _FakeWebSocket:
+            def __init__(self) -> None:
+                self.accepted = asyncio.Event()
+                self.incoming: asyncio.Queue[dict | None] = asyncio.Queue()
+                self.messages: asyncio.Queue[dict] = asyncio.Queue()
+
+            async def accept(self) -> None:
+                self.accepted.set()
+
+            async def receive_json(self) -> dict:
+                message = await self.incoming.get()
+                if message is None:
+                    raise WebSocketDisconnect()
+                return message
+
+            async def send_json(self, payload: dict) -> None:
+                await self.messages.put(payload)
+
+        missed = [
+            self.log_store.append("acc-1", "INFO", f"missed {number}")
+            for number in range(3)
+        ]
+        load_page = logs_router._load_account_log_page
+
+        def load_page_while_logging(*args, **kwargs):
+            page = load_page(*args, **kwargs)
+            self.log_store.append("acc-1", "INFO", "live")
+            return page
+
+        async def _exercise_websocket() -> list[dict]:
+            websocket = _FakeWebSocket()
+            task = asyncio.create_task(
+                stream_logs(websocket, self.account_service, self.log_store)
+            )
+            await websocket.accepted.wait()
+            await websocket.incoming.put(
+                {
+                    "type": "subscribe",
+                    "account_ids": ["acc-1"],
+                    "since": {"acc-1": missed[0].index},
+                }
+            )
+            frames = [await asyncio.wait_for(websocket.messages.get(), timeout=2)]
+            self.log_store.append("acc-1", "INFO", "later")
+            while frames[-1]["entries"][-1]["message"] != "later":
+                frames.append(
+                    await asyncio.wait_for(websocket.messages.get(), timeout=2)
+                )
+            await websocket.incoming.put(None)
+            await asyncio.wait_for(task, timeout=2)
+            return frames
+
+        with patch.object(
+            logs_router, "_load_account_log_page", load_page_while_logging
+        ):
+            frames = asyncio.run(_exercise_websocket())
+
+        self.assertEqual(
+            [item["message"] for item in frames[0]["entries"][:2]],
+            ["missed 1", "missed 2"],
+        )
+        self.assertEqual(
+            [item["message"] for frame in frames for item in frame["entries"]],
+            ["missed 1", "missed 2", "live", "later"],
+        )
+
+    def test_subscriber_queue_drops_oldest_entries_when_full(self) -> None:
+        async def _overflow() -> tuple[list[str], int, int]:
+            _subscription_id, queue = self.log_store.subscribe("acc-1", max_size=2)
+            for number in range(5):
+                self.log_store.append("acc-1", "INFO", f"entry {number}")
+            await asyncio.sleep(0)
+            messages = [queue.get_nowait().message for _ in range(queue.qsize())]
+            return messages, queue.take_dropped(), queue.take_dropped()
+
+        messages, dropped, dropped_after_take = asyncio.run(_overflow())
+
+        self.assertEqual(messages, ["entry 3", "entry 4"])
+        self.assertEqual(dropped, 3)
+        self.assertEqual(dropped_after_take, 0)
+
     def test_invalid_since_returns_bad_request(self) -> None:
         response = self.client.get("/accounts/acc-1/logs", params={"since": "not-a-timestamp"})
 
@@ -489,5 +804,144 @@ class AccountLogsApiTest(unittest.TestCase):
         self.assertEqual(self.log_store.list_entries("acc-1"), [])
 
 
+class IndexedAccountLogsApiTest(AccountLogsApiTest):
+    """Runs the same API checks against the SQLite-backed log index."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.log_index = AccountLogIndex(self.base_dir / "account_logs.sqlite3")
+        self.addCleanup(self.log_index.close)
+        self.log_store.attach_index(self.log_index)
+
+    def test_get_account_logs_supports_level_limit_and_since_index(self) -> None:
+        log("acc-1", "INFO", "one")
+        log("acc-1", "ERROR", "two")
+        log("acc-1", "ERROR", "three")
+        log("acc-1", "ERROR", "four")
+
+        response = self.client.get(
+            "/accounts/acc-1/logs", params={"level": "ERROR", "limit": 2, "since": "2"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual([item["message"] for item in payload], ["three", "four"])
+        self.assertEqual([item["index"] for item in payload], [3, 4])
+
+    def test_websocket_resume_past_the_buffer_starts_at_the_tail(self) -> None:
+        entries = [
+            self.log_store.append("acc-1", "INFO", f"entry {number}")
+            for number in range(5)
+        ]
+
+        backlog, live = asyncio.run(self._resume_stream(entries[0].index, ["live"]))
+
+        self.assertEqual(
+            [item["message"] for item in backlog["entries"]],
+            ["entry 2", "entry 3", "entry 4"],
+        )
+        self.assertEqual(backlog["dropped"], 1)
+        self.assertEqual(live["dropped"], 0)
+        self.assertEqual([item["message"] for item in live["entries"]], ["live"])
+
+    def test_pages_and_substring_filters_are_served_from_the_index(self) -> None:
+        account_log = self.accounts_dir / "acc-1" / "logs" / "app.log"
+        account_log.parent.mkdir(parents=True, exist_ok=True)
+        account_log.write_text(
+            self._render_log_line(
+                self.now - timedelta(minutes=5), "INFO", "file history"
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        for number in range(5):
+            self.log_store.append("acc-1", "INFO", f"Товар номер {number}")
+        self.log_store.append("acc-1", "ERROR", "Ошибка сети")
+
+        first_page = self.client.get("/accounts/acc-1/logs").json()
+        with patch(
+            "telegram_accounts_api.utils.account_logging.load_account_log_file_entries"
+        ) as load_file:
+            older_page = self.client.get(
+                "/accounts/acc-1/logs", params={"before": first_page[0]["index"]}
+            ).json()
+            oldest_page = self.client.get(
+                "/accounts/acc-1/logs", params={"before": older_page[0]["index"]}
+            ).json()
+            matches = self.client.get(
+                "/accounts/acc-1/logs", params={"q": "ТОВАР НОМЕР 1"}
+            ).json()
+            short_matches = self.client.get(
+                "/accounts/acc-1/logs", params={"q": "4"}
+            ).json()
+            short_cyrillic_matches = self.client.get(
+                "/accounts/acc-1/logs", params={"q": "оШ"}
+            ).json()
+
+        self.assertEqual(
+            [item["message"] for item in first_page],
+            ["Товар номер 3", "Товар номер 4", "Ошибка сети"],
+        )
+        self.assertEqual(
+            [item["message"] for item in older_page],
+            ["Товар номер 0", "Товар номер 1", "Товар номер 2"],
+        )
+        self.assertEqual([item["message"] for item in oldest_page], ["file history"])
+        self.assertLess(oldest_page[0]["index"], older_page[0]["index"])
+        self.assertEqual([item["message"] for item in matches], ["Товар номер 1"])
+        self.assertEqual([item["message"] for item in short_matches], ["Товар номер 4"])
+        self.assertEqual(
+            [item["message"] for item in short_cyrillic_matches], ["Ошибка сети"]
+        )
+        load_file.assert_not_called()
+
+    def test_pages_are_read_off_the_event_loop(self) -> None:
+        self.log_store.append("acc-1", "INFO", "paged")
+        page_threads: list[threading.Thread] = []
+        page_entries = self.log_store.page_entries
+
+        def record_thread(*args, **kwargs):
+            page_threads.append(threading.current_thread())
+            return page_entries(*args, **kwargs)
+
+        with patch.object(self.log_store, "page_entries", side_effect=record_thread):
+            payload = self.client.get("/accounts/acc-1/logs").json()
+
+        self.assertEqual([item["message"] for item in payload], ["paged"])
+        self.assertEqual(len(page_threads), 1)
+        self.assertIsNot(page_threads[0], threading.main_thread())
+
+    def test_appends_queue_rows_while_the_index_is_busy(self) -> None:
+        first = self.log_store.append("acc-1", "INFO", "before")
+
+        # Holding the connection stands in for a slow disk write.
+        with self.log_index._lock:
+            queued = [
+                self.log_store.append("acc-2", "INFO", f"queued {number}")
+                for number in range(3)
+            ]
+
+        self.assertEqual(
+            [entry.index for entry in queued],
+            [first.index + 1, first.index + 2, first.index + 3],
+        )
+        self.assertTrue(self.log_index.flush(timeout=2))
+        self.assertEqual(
+            [row.message for row in self.log_index.query("acc-2", limit=10)],
+            ["queued 0", "queued 1", "queued 2"],
+        )
+
+    def test_clear_logs_empties_the_index_without_reimporting_history(self) -> None:
+        self.log_store.append("acc-1", "INFO", "before clear")
+
+        self.client.post("/logs/clear")
+        self.log_store.append("acc-1", "INFO", "after clear")
+        response = self.client.get("/accounts/acc-1/logs")
+
+        self.assertEqual(
+            [item["message"] for item in response.json()], ["after clear"]
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
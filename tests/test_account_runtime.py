@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from pathlib import Path
 
 from shafa_control import (
@@ -13,6 +14,8 @@ from shafa_control import (
     resolve_project_dir,
 )
 from telegram_accounts_api.services.account_service import AccountService
+from telegram_accounts_api.services.telegram_client_pool import TelegramClientPool
+from telegram_accounts_api.utils.exceptions import BadRequestError
 from telegram_accounts_api.utils.storage import JsonListStorage
 
 
@@ -38,6 +41,9 @@ def test_account_runtime_builds_env_and_paths(tmp_path: Path) -> None:
     assert env["SHAFA_CREATION_PRODUCTS_DB_PATH"].endswith(
         "telegram_shared/creation_products.sqlite3"
     )
+    assert env["SHAFA_REFERENCE_DATA_DB_PATH"].endswith(
+        "telegram_shared/shafa_reference_data.sqlite3"
+    )
     assert env["SHAFA_MEDIA_DIR_PATH"].endswith("accounts/acc-1/media")
     assert env["SHAFA_TELEGRAM_SESSION_PATH"].endswith("accounts/acc-1/telegram.session")
     assert env["SHAFA_TELEGRAM_CHANNELS_PATH"].endswith("accounts/acc-1/shafa_telegram_channels.json")
@@ -226,3 +232,48 @@ def test_account_runtime_prefers_root_venv_when_project_path_is_shafa_logic(
     account = Account(id="acc-win", name="Win", path=str(project_root))
 
     assert runtime.account_python(account) == str(python_exe)
+
+
+def test_start_account_evicts_pooled_telegram_client_before_spawning(
+    tmp_path: Path,
+) -> None:
+    storage_path = tmp_path / "accounts_state.json"
+    storage_path.write_text(
+        '[{"id":"acc-1","name":"Primary","path":"/project"}]', encoding="utf-8"
+    )
+    pool = TelegramClientPool()
+    service = AccountService(
+        storage=JsonListStorage(storage_path),
+        accounts_dir=tmp_path / "accounts",
+        telegram_client_pool=pool,
+    )
+    disconnects: list[str] = []
+    pooled_at_spawn: list[int] = []
+
+    class FakeClient:
+        async def disconnect(self) -> None:
+            disconnects.append("acc-1")
+
+    async def connect() -> FakeClient:
+        return FakeClient()
+
+    def spawn(_account, _context):
+        pooled_at_spawn.append(pool.stats().open_clients)
+        raise BadRequestError("spawn blocked in test")
+
+    service._build_launch_context = lambda _account: {}  # type: ignore[method-assign]
+    service._spawn_process = spawn  # type: ignore[method-assign]
+
+    async def scenario() -> None:
+        async with pool.client("acc-1", "key", connect):
+            pass
+        assert pool.stats().open_clients == 1
+        try:
+            await service.start_account("acc-1")
+        except BadRequestError:
+            pass
+
+    asyncio.run(scenario())
+
+    assert pooled_at_spawn == [0]
+    assert disconnects == ["acc-1"]
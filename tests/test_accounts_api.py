@@ -4,16 +4,27 @@ import asyncio
 import io
 import json
 import os
+import shutil
 import subprocess
+import sys
 import tempfile
 import threading
 import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from telegram_accounts_api.dependencies import get_account_service
+from telegram_accounts_api.dependencies import (
+    get_account_log_store,
+    get_account_service,
+)
 from telegram_accounts_api.main import app
 from telegram_accounts_api.services.account_service import AccountService
+from telegram_accounts_api.utils.account_logging import (
+    AccountLogStore,
+    get_account_log_store as get_shared_account_log_store,
+    set_account_log_store,
+)
+from telegram_accounts_api.utils.log_index import AccountLogIndex
 from telegram_accounts_api.utils.storage import JsonListStorage
 from tests.asgi_client import SyncASGITestClient, async_dependency
 
@@ -69,7 +80,16 @@ class AccountsApiTest(unittest.TestCase):
             storage=JsonListStorage(self.accounts_file),
             accounts_dir=self.accounts_dir,
         )
+        self.log_store = AccountLogStore()
+        log_index = AccountLogIndex(self.base_dir / "account_logs.sqlite3")
+        self.addCleanup(log_index.close)
+        self.log_store.attach_index(log_index)
+        self.addCleanup(set_account_log_store, get_shared_account_log_store())
+        set_account_log_store(self.log_store)
         app.dependency_overrides[get_account_service] = async_dependency(self.service)
+        app.dependency_overrides[get_account_log_store] = async_dependency(
+            self.log_store
+        )
         self.addCleanup(app.dependency_overrides.clear)
         self.client = SyncASGITestClient(app)
 
@@ -225,6 +245,31 @@ class AccountsApiTest(unittest.TestCase):
         self.assertEqual(payload["shafa_session_exists"], True)
         self.assertEqual(payload["telegram_session_exists"], True)
 
+    def test_list_accounts_rebuilds_only_changed_snapshot_entries(self) -> None:
+        accounts = self._read_accounts()
+        accounts.append(dict(accounts[0], id="acc-2", name="Second account"))
+        self._write_accounts(accounts)
+        built: list[str] = []
+        original_build = self.service._build_model
+
+        def tracking_build(item: dict, **kwargs):
+            built.append(str(item["id"]))
+            return original_build(item, **kwargs)
+
+        with patch.object(self.service, "_build_model", side_effect=tracking_build):
+            first = self.client.get("/accounts").json()
+            self.client.get("/accounts")
+            self._write_valid_shafa_session("acc-2")
+            after_session = self.client.get("/accounts").json()
+            self.client.patch("/accounts/acc-1", json={"name": "Renamed"})
+            after_patch = self.client.get("/accounts").json()
+
+        # The PATCH response builds acc-1 once, then the list rebuilds it.
+        self.assertEqual(built, ["acc-1", "acc-2", "acc-2", "acc-1", "acc-1"])
+        self.assertEqual([item["shafa_session_exists"] for item in first], [False, False])
+        self.assertEqual(after_session[1]["shafa_session_exists"], True)
+        self.assertEqual(after_patch[0]["name"], "Renamed")
+
     def test_create_account_uses_base_dir_when_path_is_empty(self) -> None:
         response = self.client.post(
             "/accounts",
@@ -490,6 +535,93 @@ class AccountsApiTest(unittest.TestCase):
         self.assertEqual(stopped.json()["status"], "stopped")
         self.assertEqual(process.returncode, 0)
 
+    @unittest.skipIf(os.name == "nt", "the events pipe relies on pass_fds")
+    def test_spawned_process_reports_events_through_a_pipe(self) -> None:
+        project_dir = self._make_project()
+        (project_dir / "main.py").write_text(
+            "import json, os\n"
+            "fd = int(os.environ['SHAFA_EVENTS_FD'])\n"
+            "with os.fdopen(fd, 'w', encoding='utf-8') as stream:\n"
+            "    stream.write(json.dumps({'type': 'hello', 'ts': 1.0}) + '\\n')\n"
+            "    stream.write('not json\\n')\n"
+            "    stream.write(json.dumps({'type': 'error', 'ts': 2.0}) + '\\n')\n"
+            "print('done')\n",
+            encoding="utf-8",
+        )
+        received: list[tuple[str, str]] = []
+        self.service.process_event_handler = lambda account_id, event: (
+            received.append((account_id, event["type"]))
+        )
+        self.service.runtime.account_python = lambda account: sys.executable
+        account = self.service._record_to_account(self._read_accounts()[0])
+
+        process = self.service._spawn_process(
+            account, {**os.environ, "cwd": str(project_dir)}
+        )
+        output, _ = process.communicate(timeout=10)
+        self.service._finish_process_events(
+            account, process, exit_code=process.returncode, failed=False
+        )
+
+        self.assertEqual(output.strip(), "done")
+        self.assertEqual(
+            received,
+            [("acc-1", "hello"), ("acc-1", "error"), ("acc-1", "closed")],
+        )
+
+    @unittest.skipIf(os.name == "nt", "the events pipe relies on pass_fds")
+    def test_printed_error_lines_are_reported_as_output_errors(self) -> None:
+        project_dir = self._make_project()
+        (project_dir / "main.py").write_text(
+            "import json, os\n"
+            "fd = int(os.environ['SHAFA_EVENTS_FD'])\n"
+            "with os.fdopen(fd, 'w', encoding='utf-8') as stream:\n"
+            "    stream.write(json.dumps({'type': 'hello', 'ts': 1.0}) + '\\n')\n"
+            "print('[ERROR] reported through log')\n"
+            "print('RuntimeError: upload failed')\n",
+            encoding="utf-8",
+        )
+        received: list[dict] = []
+        self.service.process_event_handler = lambda account_id, event: (
+            received.append(event)
+        )
+        self.service.runtime.account_python = lambda account: sys.executable
+        account = self.service._record_to_account(self._read_accounts()[0])
+
+        process = self.service._spawn_process(
+            account, {**os.environ, "cwd": str(project_dir)}
+        )
+        self.service._watch_process(account, process)
+
+        output_errors = [
+            event["message"] for event in received if event["type"] == "output_error"
+        ]
+        self.assertEqual(output_errors, ["RuntimeError: upload failed"])
+
+    @unittest.skipIf(os.name == "nt", "the worker host forks account runs")
+    def test_worker_host_mode_forks_runs_from_one_host(self) -> None:
+        project_dir = self._make_project()
+        shutil.copy(
+            Path(__file__).resolve().parents[1] / "shafa_logic" / "worker_host.py",
+            project_dir,
+        )
+        self.service.worker_host_enabled = True
+        self.addCleanup(self.service.close_worker_hosts)
+        self.service.runtime.account_python = lambda account: sys.executable
+        account = self.service._record_to_account(self._read_accounts()[0])
+
+        processes = [
+            self.service._spawn_process(
+                account, {**os.environ, "cwd": str(project_dir)}
+            )
+            for _ in range(2)
+        ]
+        outputs = [item.stdout.read().strip() for item in processes]
+
+        self.assertEqual(outputs, ["ok", "ok"])
+        self.assertEqual([item.wait(timeout=10) for item in processes], [0, 0])
+        self.assertEqual(len(self.service._worker_hosts), 1)
+
     def test_cors_allows_renderer_origins(self) -> None:
         renderer_origin = self.client.options(
             "/accounts/acc-1",
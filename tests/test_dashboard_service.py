@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import sqlite3
 import tempfile
+import threading
+import time
 import unittest
 from datetime import datetime, timedelta
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
 
+from telegram_accounts_api.models.account import AccountRead
 from telegram_accounts_api.services.dashboard_service import DashboardService
 from telegram_accounts_api.utils.account_logging import AccountLogStore
+from telegram_accounts_api.utils.metrics_store import DailyMetricsStore
 
 
 class DashboardServiceDeactivationTest(unittest.TestCase):
@@ -323,5 +328,591 @@ class DashboardServiceDeactivationTest(unittest.TestCase):
         self.assertEqual(summary.total_done_count, 1)
 
 
+class DashboardServiceHistoryWindowTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.base_dir = Path(self.temp_dir.name)
+        self.local_tz = datetime.now().astimezone().tzinfo
+        self.start = datetime(2026, 4, 1, 12, 0, 0)
+
+    def _service(self, base_dir: Path) -> DashboardService:
+        return DashboardService(
+            account_service=SimpleNamespace(
+                account_dir=lambda account_id: base_dir / account_id
+            ),
+            log_store=AccountLogStore(),
+        )
+
+    def _lines(self, start: int, stop: int) -> str:
+        lines = []
+        for index in range(start, stop):
+            timestamp = (self.start + timedelta(hours=7 * index)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+            if index % 3 == 0:
+                lines.append(f"[{timestamp}] [ERROR] Ошибка запуска #{index}")
+            else:
+                lines.append(
+                    f"[{timestamp}] [SUCCESS] Товар создан успешно. ID: {index}."
+                )
+        return "".join(f"{line}\n" for line in lines)
+
+    def _aggregate(self, service: DashboardService):
+        return service._load_cached_history_aggregate(
+            "acc-1",
+            local_tz=self.local_tz,
+            runtime_entries=[],
+            history_line_limit=20,
+        )
+
+    def _full_scan(self, content: str):
+        base_dir = self.base_dir / "reference"
+        log_file = base_dir / "acc-1" / "logs" / "app.log"
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        log_file.write_text(content, encoding="utf-8")
+        return self._aggregate(self._service(base_dir))
+
+    def _assert_matches_full_scan(self, actual, content: str) -> None:
+        expected = self._full_scan(content)
+        self.assertEqual(actual.daily_totals, expected.daily_totals)
+        self.assertEqual(actual.earliest_entry_date, expected.earliest_entry_date)
+        self.assertEqual(actual.recent_entry_keys, expected.recent_entry_keys)
+        self.assertEqual(actual.scanned_lines, 20)
+
+    def test_appended_lines_are_parsed_without_rescanning_the_tail(self) -> None:
+        log_file = self.base_dir / "acc-1" / "logs" / "app.log"
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        log_file.write_text(self._lines(0, 50), encoding="utf-8")
+        service = self._service(self.base_dir)
+        self._aggregate(service)
+
+        with log_file.open("a", encoding="utf-8") as handle:
+            handle.write(self._lines(50, 55))
+            handle.write("[2026-05-01 10:00:00] [SUCCESS] Товар создан")
+        parsed: list[str] = []
+        original_parse = service._parse_history_line
+
+        def counting_parse(raw_line: str, *, local_tz):
+            parsed.append(raw_line)
+            return original_parse(raw_line, local_tz=local_tz)
+
+        with patch.object(service, "_parse_history_line", counting_parse):
+            aggregate = self._aggregate(service)
+
+        self.assertEqual(len(parsed), 5)
+        self._assert_matches_full_scan(aggregate, self._lines(0, 55))
+
+    def test_rotated_file_is_finished_before_reading_the_new_one(self) -> None:
+        log_file = self.base_dir / "acc-1" / "logs" / "app.log"
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        log_file.write_text(self._lines(0, 30), encoding="utf-8")
+        service = self._service(self.base_dir)
+        self._aggregate(service)
+
+        with log_file.open("a", encoding="utf-8") as handle:
+            handle.write(self._lines(30, 34))
+        log_file.rename(log_file.with_name("app.log.1"))
+        log_file.write_text(self._lines(34, 40), encoding="utf-8")
+
+        aggregate = self._aggregate(service)
+
+        self._assert_matches_full_scan(aggregate, self._lines(0, 40))
+
+    def test_truncated_file_resets_the_window(self) -> None:
+        log_file = self.base_dir / "acc-1" / "logs" / "app.log"
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        log_file.write_text(self._lines(0, 30), encoding="utf-8")
+        service = self._service(self.base_dir)
+        self._aggregate(service)
+
+        log_file.write_text(self._lines(60, 62), encoding="utf-8")
+        aggregate = self._aggregate(service)
+
+        self.assertEqual(aggregate.scanned_lines, 2)
+        self.assertEqual(
+            aggregate.daily_totals,
+            self._full_scan(self._lines(60, 62)).daily_totals,
+        )
+
+
+class DashboardServiceConcurrencyTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.base_dir = Path(self.temp_dir.name)
+        self.list_calls = 0
+        self.accounts = [
+            AccountRead(id=f"acc-{index}", name=f"Account {index}")
+            for index in range(3)
+        ]
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for account in self.accounts:
+            log_file = self.base_dir / account.id / "logs" / "app.log"
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            log_file.write_text(
+                f"[{timestamp}] [SUCCESS] Товар создан успешно. ID: 1.\n",
+                encoding="utf-8",
+            )
+
+    def _service(self, **kwargs) -> DashboardService:
+        async def list_accounts() -> list[AccountRead]:
+            self.list_calls += 1
+            await asyncio.sleep(0.05)
+            return self.accounts
+
+        service = DashboardService(
+            account_service=SimpleNamespace(
+                list_accounts=list_accounts,
+                account_dir=lambda account_id: self.base_dir / account_id,
+                session_store=SimpleNamespace(
+                    shared_telegram_db_file=lambda: self.base_dir / "missing.sqlite3"
+                ),
+            ),
+            log_store=AccountLogStore(),
+            **{"summary_cache_ttl_seconds": 0, **kwargs},
+        )
+        self.addCleanup(service.shutdown)
+        return service
+
+    def test_identical_concurrent_requests_share_one_computation(self) -> None:
+        service = self._service()
+
+        async def run_requests():
+            return await asyncio.gather(
+                service.get_summary(period="week"),
+                service.get_summary(period="week"),
+                service.get_summary(period="month"),
+            )
+
+        week, week_again, month = asyncio.run(run_requests())
+
+        self.assertIs(week, week_again)
+        self.assertEqual(week.item_successes_in_range, 3)
+        self.assertEqual(month.item_successes_in_range, 3)
+        self.assertEqual(self.list_calls, 2)
+        self.assertEqual(service._summary_in_flight, {})
+
+    def test_slow_account_times_out_without_blocking_the_event_loop(self) -> None:
+        service = self._service(account_stats_timeout_seconds=0.2)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        original_load = service._load_account_daily_totals
+
+        def blocking_load(account_id: str, **kwargs):
+            if account_id == "acc-1":
+                release.wait(5)
+            return original_load(account_id, **kwargs)
+
+        service._load_account_daily_totals = blocking_load  # type: ignore[method-assign]
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async def run_summary():
+            ticker_task = asyncio.create_task(ticker())
+            try:
+                return await service.get_summary(period="week")
+            finally:
+                ticker_task.cancel()
+
+        started_at = time.perf_counter()
+        summary = asyncio.run(run_summary())
+        elapsed = time.perf_counter() - started_at
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(summary.total_accounts, 3)
+        self.assertEqual(summary.item_successes_in_range, 2)
+        self.assertGreater(ticks, 10)
+
+    def test_timeout_starts_when_a_queued_job_begins(self) -> None:
+        service = self._service(stats_workers=1, account_stats_timeout_seconds=0.3)
+        original_load = service._load_account_daily_totals
+
+        def slow_load(account_id: str, **kwargs):
+            time.sleep(0.15)
+            return original_load(account_id, **kwargs)
+
+        service._load_account_daily_totals = slow_load  # type: ignore[method-assign]
+
+        summary = asyncio.run(service.get_summary(period="week"))
+
+        self.assertEqual(summary.item_successes_in_range, 3)
+
+    def test_busy_account_lock_fails_only_that_account(self) -> None:
+        service = self._service(account_stats_timeout_seconds=0.2)
+        stuck_lock = service._account_stats_locks.setdefault(
+            "acc-0", threading.Lock()
+        )
+        stuck_lock.acquire()
+        self.addCleanup(stuck_lock.release)
+
+        summary = asyncio.run(service.get_summary(period="week"))
+
+        self.assertEqual(summary.item_successes_in_range, 2)
+
+    def test_jobs_behind_stuck_workers_give_up_waiting_for_the_queue(self) -> None:
+        service = self._service(stats_workers=1, account_stats_timeout_seconds=0.2)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        original_load = service._load_account_daily_totals
+
+        def stuck_load(account_id: str, **kwargs):
+            if account_id == "acc-0":
+                release.wait(10)
+            return original_load(account_id, **kwargs)
+
+        service._load_account_daily_totals = stuck_load  # type: ignore[method-assign]
+
+        started_at = time.monotonic()
+        summary = asyncio.run(service.get_summary(period="week"))
+
+        self.assertLess(time.monotonic() - started_at, 5)
+        self.assertEqual(summary.item_successes_in_range, 0)
+
+    def test_summary_with_a_failed_job_is_not_cached(self) -> None:
+        service = self._service(summary_cache_ttl_seconds=60)
+        original_load = service._load_account_daily_totals
+        failures = ["acc-1"]
+
+        def flaky_load(account_id: str, **kwargs):
+            if account_id in failures:
+                failures.remove(account_id)
+                raise sqlite3.OperationalError("database is locked")
+            return original_load(account_id, **kwargs)
+
+        service._load_account_daily_totals = flaky_load  # type: ignore[method-assign]
+
+        async def run_summaries():
+            first = await service.get_summary(period="week")
+            second = await service.get_summary(period="week")
+            third = await service.get_summary(period="week")
+            return first, second, third
+
+        first, second, third = asyncio.run(run_summaries())
+
+        self.assertEqual(first.item_successes_in_range, 2)
+        self.assertEqual(second.item_successes_in_range, 3)
+        self.assertIs(third, second)
+
+
+class DashboardServiceMetricsRollupTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.base_dir = Path(self.temp_dir.name)
+        self.now = datetime.now().astimezone().replace(
+            hour=12, minute=0, second=0, microsecond=0
+        )
+        self.shared_db = self.base_dir / "telegram.sqlite3"
+        self.metrics_store = DailyMetricsStore(self.base_dir / "metrics.sqlite3")
+        self.log_file = self.base_dir / "acc-1" / "logs" / "app.log"
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+
+    def _service(self) -> DashboardService:
+        async def list_accounts() -> list[AccountRead]:
+            return [AccountRead(id="acc-1", name="Alpha")]
+
+        service = DashboardService(
+            account_service=SimpleNamespace(
+                list_accounts=list_accounts,
+                account_dir=lambda account_id: self.base_dir / account_id,
+                accounts_dir=self.base_dir,
+                session_store=SimpleNamespace(
+                    shared_telegram_db_file=lambda: self.shared_db
+                ),
+            ),
+            log_store=AccountLogStore(),
+            now_provider=lambda: self.now,
+            summary_cache_ttl_seconds=0,
+            history_line_limit=3,
+            metrics_store=self.metrics_store,
+        )
+        self.addCleanup(service.shutdown)
+        return service
+
+    def _append_successes(self, *days_ago: int) -> None:
+        with self.log_file.open("a", encoding="utf-8") as handle:
+            for index, offset in enumerate(days_ago):
+                timestamp = (self.now - timedelta(days=offset)).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                )
+                handle.write(
+                    f"[{timestamp}] [SUCCESS] Товар создан успешно. ID: {index}.\n"
+                )
+
+    def _series(self, service: DashboardService) -> dict[str, int]:
+        summary = asyncio.run(service.get_summary(period="week"))
+        return {point.date.isoformat(): point.items for point in summary.series}
+
+    def test_closed_days_outlive_the_log_tail_and_restarts(self) -> None:
+        self._append_successes(2, 1, 1)
+        self.assertEqual(sum(self._series(self._service()).values()), 3)
+
+        self._append_successes(1, 0, 0, 0)
+        restarted = self._service()
+        series = self._series(restarted)
+
+        def day(offset: int) -> str:
+            return (self.now - timedelta(days=offset)).date().isoformat()
+
+        self.assertEqual(series[day(2)], 1)
+        self.assertEqual(series[day(1)], 3)
+        self.assertEqual(series[day(0)], 3)
+
+        self.log_file.rename(self.log_file.with_name("app.log.1"))
+        self._append_successes(0)
+        self.log_file.with_name("app.log.1").unlink()
+        series = self._series(restarted)
+        self.assertEqual(series[day(1)], 3)
+        self.assertEqual(series[day(0)], 4)
+
+    def test_summaries_read_the_rollup_without_parsing_the_log_tail(self) -> None:
+        self._append_successes(1, 0)
+        service = self._service()
+        service.log_store.append(
+            "acc-1", "SUCCESS", "Товар создан успешно. ID: 9.", timestamp=self.now
+        )
+
+        with patch.object(
+            service, "_load_cached_history_aggregate"
+        ) as load_history:
+            first = asyncio.run(service.get_summary(period="week"))
+            second = asyncio.run(service.get_summary(period="week"))
+
+        load_history.assert_not_called()
+        self.assertEqual(first.item_successes_in_range, 3)
+        self.assertEqual(second.item_successes_in_range, 3)
+
+    def test_range_reads_only_rollup_rows_inside_the_period(self) -> None:
+        self._append_successes(40, 3)
+        service = self._service()
+        service.compact_metrics()
+
+        rows = self.metrics_store.load_range(
+            ["acc-1"],
+            date_from=(self.now - timedelta(days=6)).date(),
+            date_to=self.now.date(),
+        )
+        all_time = asyncio.run(service.get_summary(period="all"))
+
+        self.assertEqual(
+            list(rows["acc-1"]), [(self.now - timedelta(days=3)).date()]
+        )
+        self.assertEqual(all_time.range_start, (self.now - timedelta(days=40)).date())
+        self.assertEqual(all_time.item_successes_in_range, 2)
+
+    def test_deactivations_are_compacted_per_account_and_day(self) -> None:
+        with sqlite3.connect(self.shared_db) as conn:
+            conn.executescript(
+                """
+                CREATE TABLE shared_telegram_products (
+                    telegram_product_key TEXT PRIMARY KEY,
+                    channel_id INTEGER,
+                    message_id INTEGER,
+                    product_title TEXT
+                );
+                CREATE TABLE shared_telegram_product_accounts (
+                    telegram_product_key TEXT,
+                    account_id TEXT,
+                    product_title TEXT
+                );
+                CREATE TABLE shared_deactivation_tasks (
+                    task_id TEXT PRIMARY KEY,
+                    reason TEXT
+                );
+                CREATE TABLE shared_deactivation_task_accounts (
+                    task_id TEXT,
+                    telegram_product_key TEXT,
+                    account_id TEXT,
+                    shafa_product_id TEXT,
+                    status TEXT,
+                    last_error TEXT,
+                    completed_at TEXT,
+                    updated_at TEXT
+                );
+                """
+            )
+            conn.executemany(
+                """
+                INSERT INTO shared_deactivation_task_accounts (
+                    task_id, telegram_product_key, account_id, shafa_product_id,
+                    status, completed_at
+                )
+                VALUES (?, ?, 'acc-1', ?, ?, ?)
+                """,
+                [
+                    (
+                        f"task-{index}",
+                        f"tg:1:{index}",
+                        f"p-{index}",
+                        status,
+                        (self.now - timedelta(days=offset)).isoformat(),
+                    )
+                    for index, (status, offset) in enumerate(
+                        [
+                            ("completed", 1),
+                            ("skipped_not_found", 1),
+                            ("completed", 0),
+                            ("failed", 0),
+                        ]
+                    )
+                ]
+            )
+
+        service = self._service()
+        self.log_file.touch()
+        summary = asyncio.run(service.get_summary(period="week"))
+        self.assertEqual(summary.deactivations_in_range, 0)
+        self.assertIsNone(self.metrics_store.get_deactivations_compacted_through())
+
+        service.compact_metrics()
+        summary = asyncio.run(service.get_summary(period="week"))
+
+        by_day = {point.date: point.deactivations for point in summary.series}
+        self.assertEqual(by_day[(self.now - timedelta(days=1)).date()], 2)
+        self.assertEqual(by_day[self.now.date()], 1)
+        self.assertEqual(summary.deactivations_in_range, 3)
+        self.assertEqual(
+            self.metrics_store.get_deactivations_compacted_through(),
+            (self.now - timedelta(days=1)).date(),
+        )
+
+        with patch.object(
+            service, "_compact_deactivation_metrics"
+        ) as compact_deactivations:
+            service.compact_metrics()
+            compact_deactivations.assert_not_called()
+            self.now += timedelta(days=1)
+            service.compact_metrics()
+            compact_deactivations.assert_called_once()
+
+    def test_process_events_replace_log_counters_for_their_run(self) -> None:
+        service = self._service()
+        self._append_successes(1)
+        run_start = self.now - timedelta(hours=1)
+        in_run = self.now - timedelta(minutes=30)
+        with self.log_file.open("a", encoding="utf-8") as handle:
+            stamp = in_run.strftime("%Y-%m-%d %H:%M:%S")
+            handle.write(f"[{stamp}] [SUCCESS] Товар создан успешно. ID: 7.\n")
+            handle.write(f"[{stamp}] [ERROR] Не удалось обработать товар.\n")
+
+        for event_type, moment, fields in (
+            ("hello", run_start, {}),
+            ("product_created", in_run, {"product_id": "7"}),
+            (
+                "product_failed",
+                in_run,
+                {"level": "ERROR", "message": "Не удалось обработать товар: boom"},
+            ),
+            (
+                "product_failed",
+                in_run,
+                {
+                    "level": "WARN",
+                    "message": "Не удалось скачать ни одной фотографии из Telegram.",
+                },
+            ),
+            ("error", in_run, {}),
+            ("product_retry", in_run, {}),
+            ("closed", self.now - timedelta(minutes=10), {"failed": True}),
+        ):
+            service.record_process_event(
+                "acc-1", {"type": event_type, "ts": moment.timestamp(), **fields}
+            )
+        service.compact_metrics()
+
+        rows = self.metrics_store.load_range(["acc-1"], date_from=self.now.date())
+        self.assertEqual(
+            rows["acc-1"][self.now.date()],
+            {
+                "items": 1,
+                "errors": 2,
+                "creation_errors": 1,
+                "retry_events": 1,
+                "deactivations": 0,
+            },
+        )
+        yesterday = (self.now - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self._series(service)[yesterday], 1)
+
+    def test_output_errors_count_only_inside_an_event_window(self) -> None:
+        service = self._service()
+        run_start = self.now - timedelta(hours=1)
+        for event_type, moment in (
+            ("output_error", run_start - timedelta(minutes=5)),
+            ("hello", run_start),
+            ("output_error", self.now - timedelta(minutes=30)),
+        ):
+            service.record_process_event(
+                "acc-1",
+                {
+                    "type": event_type,
+                    "ts": moment.timestamp(),
+                    "message": "RuntimeError: upload failed",
+                },
+            )
+
+        rows = self.metrics_store.load_range(["acc-1"], date_from=self.now.date())
+        self.assertEqual(rows["acc-1"][self.now.date()]["errors"], 1)
+
+    def test_startup_ends_windows_of_runs_that_never_closed(self) -> None:
+        service = self._service()
+        run_start = self.now - timedelta(hours=2)
+        service.record_process_event(
+            "acc-1", {"type": "hello", "ts": run_start.timestamp()}
+        )
+
+        with patch(
+            "telegram_accounts_api.services.dashboard_service.time.time",
+            return_value=(self.now - timedelta(hours=1)).timestamp(),
+        ):
+            self._service().close_stale_event_windows()
+        self._append_successes(0)
+        service.compact_metrics()
+
+        windows = self.metrics_store.get_event_windows("acc-1")
+        self.assertEqual(len(windows), 1)
+        self.assertIsNotNone(windows[0][1])
+        rows = self.metrics_store.load_range(["acc-1"], date_from=self.now.date())
+        self.assertEqual(rows["acc-1"][self.now.date()]["items"], 1)
+
+    def test_runtime_entries_past_the_history_window_are_not_counted_twice(
+        self,
+    ) -> None:
+        service = self._service()
+        self.log_file.touch()
+        service.compact_metrics()
+        moments = [self.now - timedelta(minutes=30 - index) for index in range(10)]
+        with self.log_file.open("a", encoding="utf-8") as handle:
+            for index, moment in enumerate(moments):
+                stamp = moment.strftime("%Y-%m-%d %H:%M:%S")
+                handle.write(
+                    f"[{stamp}] [SUCCESS] Товар создан успешно. ID: {index}.\n"
+                )
+        for index, moment in enumerate(moments):
+            service.log_store.append(
+                "acc-1",
+                "SUCCESS",
+                f"Товар создан успешно. ID: {index}.",
+                timestamp=moment,
+            )
+
+        today = self.now.date().isoformat()
+        self.assertEqual(self._series(service)[today], 10)
+
+        service.log_store.append(
+            "acc-1",
+            "SUCCESS",
+            "Товар создан успешно. ID: 10.",
+            timestamp=self.now - timedelta(minutes=5),
+        )
+        self.assertEqual(self._series(service)[today], 11)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from datetime import datetime
 from pathlib import Path
 
@@ -18,6 +19,7 @@ def test_log_store_writes_global_and_account_logs(tmp_path: Path) -> None:
     )
 
     store.append(record, account_log_file=account_log)
+    assert store.flush(timeout=5)
 
     rendered = record.render()
     assert rendered in (tmp_path / "runtime" / "logs" / "all.log").read_text(encoding="utf-8")
@@ -42,6 +44,7 @@ def test_log_store_rotates_global_and_account_logs(
         LogRecord(datetime(2026, 4, 13, 12, 1, 0), message, "INFO", "acc-1", "A1"),
         account_log_file=account_log,
     )
+    assert store.flush(timeout=5)
 
     assert (tmp_path / "runtime" / "logs" / "all.log.1").exists()
     assert account_log.with_name("app.log.1").exists()
@@ -60,3 +63,66 @@ def test_log_store_filters_by_account_and_level(tmp_path: Path) -> None:
 
     assert [record.message for record in store.filtered(account_id="a1", level="ALL")] == ["ok"]
     assert [record.message for record in store.filtered(level="ERROR")] == ["bad"]
+
+
+def test_log_store_keeps_bounded_ring_per_account(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SHAFA_LOG_STORE_MAX_RECORDS", "3")
+    store = LogStore(tmp_path / "runtime" / "logs")
+    for index in range(5):
+        store.append(LogRecord(datetime(2026, 4, 13), f"a{index}", "INFO", "a1", "A1"))
+    store.append(LogRecord(datetime(2026, 4, 13), "b0", "INFO", "a2", "A2"))
+    store.flush(timeout=5)
+
+    assert [record.message for record in store.filtered(account_id="a1")] == [
+        "a2",
+        "a3",
+        "a4",
+    ]
+    assert [record.message for record in store.records] == ["a2", "a3", "a4", "b0"]
+    assert (tmp_path / "runtime" / "logs" / "all.log").read_text(
+        encoding="utf-8"
+    ).count("\n") == 6
+
+
+def test_log_store_writer_keeps_handles_open_and_tracks_size(
+    tmp_path: Path,
+    monkeypatch,
+) -> None:
+    monkeypatch.setenv("SHAFA_MAX_LOG_FILE_BYTES", "8192")
+    monkeypatch.setenv("SHAFA_LOG_BACKUP_COUNT", "20")
+    store = LogStore(tmp_path / "runtime" / "logs")
+    account_log = tmp_path / "accounts" / "acc-1" / "logs" / "app.log"
+    opened: list[Path] = []
+    original_open = Path.open
+
+    def tracking_open(self: Path, *args, **kwargs):
+        opened.append(self)
+        return original_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", tracking_open)
+
+    def produce() -> None:
+        for index in range(250):
+            store.append(
+                LogRecord(datetime(2026, 4, 13), f"line {index:04d}", "INFO", "acc-1"),
+                account_log_file=account_log,
+            )
+
+    producers = [threading.Thread(target=produce) for _ in range(4)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    assert store.flush(timeout=5)
+    store.release_files()
+    account_log_opens = opened.count(account_log)
+
+    log_files = sorted(account_log.parent.glob("app.log*"))
+    total_lines = sum(
+        path.read_text(encoding="utf-8").count("\n") for path in log_files
+    )
+    assert total_lines == 1000
+    assert len(log_files) > 2
+    assert all(path.stat().st_size <= 8192 for path in log_files)
+    # One open initially and one after each rotation, not one per line.
+    assert account_log_opens == len(log_files)
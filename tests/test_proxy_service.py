@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from shafa_logic.utils.proxy import record_proxy_request_result
+from telegram_accounts_api.models.proxy import ProxyCreate
+from telegram_accounts_api.services.proxy_service import ProxyService
+
+
+class ProxyHealthTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        base_dir = Path(self.temp_dir.name)
+        self.service = ProxyService(
+            db_path=base_dir / "proxies.sqlite3",
+            accounts_file=base_dir / "accounts_state.json",
+            accounts_dir=base_dir / "accounts",
+        )
+        self.proxy = self.service.create_proxy(
+            ProxyCreate(name="p1", scheme="http", host="127.0.0.1", port=8080)
+        )
+
+    def test_health_reads_rollups_left_by_maintenance(self) -> None:
+        for success in (True, False):
+            record_proxy_request_result(
+                self.proxy.id,
+                account_id="acc-1",
+                target="shafa_api",
+                success=success,
+                db_path=self.service.db_path,
+                error_type=None if success else "URLError",
+            )
+
+        self.assertEqual(self.service.get_proxy_health(), [])
+
+        self.service.run_event_maintenance()
+        health = self.service.get_proxy_health()
+
+        self.assertEqual(
+            [(item.proxy_id, item.requests, item.failures) for item in health],
+            [(self.proxy.id, 2, 1)],
+        )
+        self.assertEqual(health[0].error_types, {"URLError": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from telegram_accounts_api.models.account import AccountUpdate
+from telegram_accounts_api.services.account_service import AccountService
+from telegram_accounts_api.utils.sqlite_storage import SqliteAccountStorage
+from telegram_accounts_api.utils.storage import JsonListStorage, read_json_list_file
+
+
+class SqliteAccountStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.base_dir = Path(self.temp_dir.name)
+        self.accounts_file = self.base_dir / "accounts_state.json"
+        self.db_file = self.base_dir / "accounts_state.sqlite3"
+        self.accounts_file.write_text(
+            json.dumps(
+                [
+                    {
+                        "id": f"acc-{index}",
+                        "name": f"Account {index}",
+                        "phone_number": "+380000000000",
+                        "channel_links": ["https://t.me/example_channel"],
+                        "status": "stopped",
+                        "errors": 0,
+                        "custom_flag": {"nested": index},
+                    }
+                    for index in range(3)
+                ]
+            ),
+            encoding="utf-8",
+        )
+        self.storage = SqliteAccountStorage(
+            self.db_file,
+            self.accounts_file,
+            mirror_delay_seconds=60,
+        )
+        self.addCleanup(self.storage.flush_mirror)
+        self.service = AccountService(
+            storage=self.storage,
+            accounts_dir=self.base_dir / "accounts",
+        )
+
+    def test_json_file_is_imported_once_with_extra_fields(self) -> None:
+        records = self.storage.read_all()
+        self.accounts_file.write_text("[]", encoding="utf-8")
+        reopened = SqliteAccountStorage(self.db_file, self.accounts_file)
+
+        self.assertEqual([item["id"] for item in records], ["acc-0", "acc-1", "acc-2"])
+        self.assertEqual(records[2]["custom_flag"], {"nested": 2})
+        self.assertEqual(records[0]["channel_links"], ["https://t.me/example_channel"])
+        self.assertEqual(len(reopened.read_all()), 3)
+
+    def test_status_update_touches_one_row_and_defers_json_mirror(self) -> None:
+        self.storage.read_all()
+        statements: list[str] = []
+        original_open = self.storage._open
+
+        def traced_open() -> sqlite3.Connection:
+            conn = original_open()
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        self.storage._open = traced_open  # type: ignore[method-assign]
+        mirror_before = self.accounts_file.read_text(encoding="utf-8")
+        self.service._update_record_sync("acc-1", self.service._mark_process_failed)
+        mirror_after_update = self.accounts_file.read_text(encoding="utf-8")
+        self.storage.flush_mirror()
+
+        writes = [
+            sql
+            for sql in statements
+            if sql.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE"))
+        ]
+        self.assertEqual(len([sql for sql in writes if "accounts\n" in sql]), 1)
+        self.assertEqual(mirror_after_update, mirror_before)
+        mirrored = {
+            item["id"]: item for item in read_json_list_file(self.accounts_file)
+        }
+        self.assertEqual(mirrored["acc-1"]["errors"], 1)
+        self.assertEqual(mirrored["acc-1"]["custom_flag"], {"nested": 1})
+        self.assertEqual(mirrored["acc-0"]["errors"], 0)
+
+    def test_concurrent_status_updates_are_not_lost(self) -> None:
+        def worker() -> None:
+            for _ in range(10):
+                self.service._update_record_sync(
+                    "acc-0", self.service._mark_process_failed
+                )
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        record = asyncio.run(self.service.get_account("acc-0"))
+        self.assertEqual(record.errors, 40)
+
+    def test_single_record_reads_run_off_the_event_loop(self) -> None:
+        read_threads: list[threading.Thread] = []
+        original_get_record = self.storage.get_record
+
+        def traced_get_record(account_id: str) -> dict | None:
+            read_threads.append(threading.current_thread())
+            return original_get_record(account_id)
+
+        self.storage.get_record = traced_get_record  # type: ignore[method-assign]
+        record = asyncio.run(self.service.get_account("acc-1"))
+
+        self.assertEqual(record.name, "Account 1")
+        self.assertTrue(read_threads)
+        self.assertNotIn(threading.main_thread(), read_threads)
+
+    def test_structural_writes_mirror_immediately_for_json_rollback(self) -> None:
+        asyncio.run(
+            self.service.update_account("acc-2", AccountUpdate(name="Renamed"))
+        )
+        asyncio.run(self.service.delete_account("acc-0"))
+
+        rollback = AccountService(
+            storage=JsonListStorage(self.accounts_file),
+            accounts_dir=self.base_dir / "accounts",
+        )
+        accounts = asyncio.run(rollback.list_accounts())
+        self.assertEqual([item.id for item in accounts], ["acc-1", "acc-2"])
+        self.assertEqual(accounts[1].name, "Renamed")
+
+
+if __name__ == "__main__":
+    unittest.main()
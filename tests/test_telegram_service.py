@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from shafa_logic.telegram_subscription.channel_cache import ChannelResolutionCache
 from shafa_logic.telegram_subscription.client import TelegramSessionInUseError
 from telegram_accounts_api.utils.exceptions import TelegramOperationError
 from telegram_accounts_api.services.telegram_service import TelegramService, _extract_public_telegram_username
@@ -178,3 +180,134 @@ def test_get_client_returns_conflict_when_session_is_busy() -> None:
 
     assert exc_info.value.status_code == 409
     assert "session is busy" in exc_info.value.message
+
+
+class _PooledFakeClient:
+    def __init__(self) -> None:
+        self.connected = True
+        self.session_held = True
+        self.session_free = True
+        self.get_entity = AsyncMock(return_value=SimpleNamespace(id=1, username="user"))
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def try_hold_session(self) -> bool:
+        self.session_held = self.session_free
+        return self.session_held
+
+    async def release_session(self) -> None:
+        self.session_held = False
+
+    async def disconnect(self) -> None:
+        self.connected = False
+        self.session_held = False
+
+
+def _pooled_service() -> tuple[TelegramService, list[_PooledFakeClient]]:
+    service = _service()
+    clients: list[_PooledFakeClient] = []
+
+    async def connect(*_args):
+        await asyncio.sleep(0)
+        clients.append(_PooledFakeClient())
+        return clients[-1]
+
+    service._resolve_credentials = AsyncMock(return_value=(777000, "hash", Path("telegram.session")))  # type: ignore[method-assign]
+    service._connect_client = connect  # type: ignore[method-assign]
+    return service, clients
+
+
+def test_requests_for_one_account_share_a_pooled_client() -> None:
+    service, clients = _pooled_service()
+
+    async def scenario() -> None:
+        await asyncio.gather(*(service.get_user("acc-1", "user") for _ in range(3)))
+        assert clients[0].session_held is False
+        await service.get_user("acc-1", "user")
+        await service.client_pool.close()
+
+    asyncio.run(scenario())
+
+    assert len(clients) == 1
+    assert clients[0].get_entity.await_count == 4
+    assert clients[0].connected is False
+    stats = service.client_pool.stats()
+    assert (stats.connects, stats.reuses, stats.open_clients) == (1, 3, 0)
+
+
+def test_idle_client_is_replaced_when_the_worker_took_the_session() -> None:
+    service, clients = _pooled_service()
+
+    async def scenario() -> None:
+        await service.get_user("acc-1", "user")
+        clients[0].session_free = False
+        await service.get_user("acc-1", "user")
+
+    asyncio.run(scenario())
+
+    assert len(clients) == 2
+    assert clients[0].connected is False
+    assert clients[1].session_held is False
+    assert service.client_pool.connects == 2
+
+
+def test_idle_pooled_client_is_disconnected_after_timeout() -> None:
+    service, clients = _pooled_service()
+    service.client_pool.idle_timeout_seconds = 0.01
+
+    async def scenario() -> None:
+        await service.get_user("acc-1", "user")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    assert clients[0].connected is False
+    assert service.client_pool.stats().open_clients == 0
+
+
+def test_resolve_channel_links_resolves_misses_concurrently_and_caches(tmp_path) -> None:
+    service, clients = _pooled_service()
+    service.channel_cache = ChannelResolutionCache(tmp_path / "telegram_feed.sqlite3")
+    links = [f"https://t.me/channel_{index}" for index in range(10)]
+
+    async def slow_resolve(_client, link, *, id_bot_lock=None):
+        await asyncio.sleep(0.1)
+        index = int(link.rsplit("_", 1)[1])
+        return SimpleNamespace(channel_id=-1000 - index, title=f"Channel {index}")
+
+    service._resolve_single_channel = slow_resolve  # type: ignore[method-assign]
+    get_many = Mock(wraps=service.channel_cache.get_many)
+    service.channel_cache.get_many = get_many  # type: ignore[method-assign]
+
+    started = time.monotonic()
+    first = asyncio.run(service.resolve_channel_links("acc-1", links))
+    elapsed = time.monotonic() - started
+    second = asyncio.run(service.resolve_channel_links("acc-1", links))
+
+    assert [item.channel_id for item in first] == [-1000 - index for index in range(10)]
+    assert elapsed < 0.5
+    assert second == first
+    assert [call.args[0] for call in get_many.call_args_list] == [links, links]
+    assert len(clients) == 1
+    assert (service.client_pool.connects, service.client_pool.reuses) == (1, 0)
+
+
+def test_evict_disconnects_idle_and_in_use_clients() -> None:
+    service, clients = _pooled_service()
+
+    async def scenario() -> None:
+        await service.get_user("acc-1", "user")
+        await service.client_pool.evict("acc-1")
+        assert clients[0].connected is False
+        assert service.client_pool.stats().open_clients == 0
+
+        async with service._client("acc-1"):
+            await service.client_pool.evict("acc-1")
+            assert clients[1].connected is True
+            assert service.client_pool.stats().open_clients == 0
+        assert clients[1].connected is False
+
+    asyncio.run(scenario())
+
+    assert len(clients) == 2
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from shafa_control import AccountCommandPool, AccountWorkerHost
+
+SHAFA_LOGIC_DIR = Path(__file__).resolve().parents[1] / "shafa_logic"
+
+
+@unittest.skipIf(os.name == "nt", "the worker host forks account runs")
+class AccountWorkerHostTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.project_dir = Path(self.temp_dir.name)
+        shutil.copy(SHAFA_LOGIC_DIR / "worker_host.py", self.project_dir)
+        (self.project_dir / "main.py").write_text(
+            "import os, sys, time\n"
+            "print('account', os.environ['SHAFA_ACCOUNT_ID'], sys.argv[1:])\n"
+            "events_fd = os.environ.get('SHAFA_EVENTS_FD')\n"
+            "if events_fd:\n"
+            "    with os.fdopen(int(events_fd), 'w') as stream:\n"
+            "        stream.write('{\"type\": \"hello\"}\\n')\n"
+            "if os.environ.get('SLEEP'):\n"
+            "    time.sleep(30)\n"
+            "raise SystemExit(int(os.environ.get('EXIT_CODE', '0')))\n",
+            encoding="utf-8",
+        )
+        self.host = AccountWorkerHost(sys.executable, self.project_dir)
+        self.addCleanup(self.host.close)
+
+    def _spawn(self, account_id: str, **env: str):
+        return self.host.spawn(
+            ["main.py", "--shafa"],
+            cwd=str(self.project_dir),
+            env={**os.environ, "SHAFA_ACCOUNT_ID": account_id, **env},
+        )
+
+    def test_runs_get_their_own_env_output_and_exit_code(self) -> None:
+        first = self._spawn("acc-1")
+        second = self._spawn("acc-2", EXIT_CODE="3")
+
+        self.assertEqual(first.stdout.read().strip(), "account acc-1 ['--shafa']")
+        self.assertEqual(second.stdout.read().strip(), "account acc-2 ['--shafa']")
+        self.assertEqual(first.wait(timeout=10), 0)
+        self.assertEqual(second.wait(timeout=10), 3)
+        self.assertNotEqual(first.pid, second.pid)
+        self.assertTrue(self.host.running())
+
+    def test_events_descriptor_is_passed_to_the_run(self) -> None:
+        read_fd, write_fd = os.pipe()
+        try:
+            process = self.host.spawn(
+                ["main.py"],
+                cwd=str(self.project_dir),
+                env={**os.environ, "SHAFA_ACCOUNT_ID": "acc-1"},
+                events_fd=write_fd,
+            )
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd, "r", encoding="utf-8") as stream:
+            events = stream.read()
+
+        self.assertEqual(process.wait(timeout=10), 0)
+        self.assertEqual(events, '{"type": "hello"}\n')
+
+    def test_run_is_stopped_through_its_own_process_group(self) -> None:
+        process = self._spawn("acc-1", SLEEP="1")
+        self.assertIsNone(process.poll())
+
+        os.killpg(process.pid, signal.SIGTERM)
+
+        self.assertEqual(process.wait(timeout=10), -signal.SIGTERM)
+
+    def test_stopped_run_still_runs_its_exit_handlers(self) -> None:
+        (self.project_dir / "utils").mkdir()
+        shutil.copy(
+            SHAFA_LOGIC_DIR / "utils" / "shutdown.py", self.project_dir / "utils"
+        )
+        marker = self.project_dir / "flushed"
+        (self.project_dir / "main.py").write_text(
+            "import atexit, os, time\n"
+            "from utils.shutdown import install_sigterm_exit\n"
+            "install_sigterm_exit()\n"
+            "atexit.register(lambda: open(os.environ['MARKER'], 'w').close())\n"
+            "print('ready', flush=True)\n"
+            "time.sleep(30)\n",
+            encoding="utf-8",
+        )
+        process = self._spawn("acc-1", MARKER=str(marker))
+        self.assertEqual(next(iter(process.stdout)).strip(), "ready")
+
+        os.killpg(process.pid, signal.SIGTERM)
+
+        self.assertEqual(process.wait(timeout=10), 128 + signal.SIGTERM)
+        self.assertTrue(marker.exists())
+
+
+@unittest.skipIf(os.name == "nt", "the worker host forks account runs")
+class AccountCommandPoolTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.project_dir = Path(self.temp_dir.name)
+        shutil.copy(SHAFA_LOGIC_DIR / "worker_host.py", self.project_dir)
+        (self.project_dir / "main.py").write_text(
+            "import os, sys\n"
+            "if '--fail' in sys.argv:\n"
+            "    print('bad code', file=sys.stderr)\n"
+            "    raise SystemExit(1)\n"
+            "print(os.environ['SHAFA_ACCOUNT_ID'], os.getpid())\n",
+            encoding="utf-8",
+        )
+        self.pool = AccountCommandPool(max_uses=2)
+        self.addCleanup(self.pool.close)
+
+    def _run(self, account_id: str, *args: str):
+        return self.pool.run(
+            sys.executable,
+            self.project_dir,
+            ["main.py", *args],
+            env={**os.environ, "SHAFA_ACCOUNT_ID": account_id},
+            timeout=10,
+        )
+
+    def test_commands_capture_stdout_and_stderr_separately(self) -> None:
+        result = self._run("acc-1", "--fail")
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout, "")
+        self.assertEqual(result.stderr.strip(), "bad code")
+
+    def test_each_command_is_its_own_process_and_hosts_are_recycled(self) -> None:
+        outputs = [self._run(account).stdout.split() for account in ("a", "b", "c")]
+
+        self.assertEqual([item[0] for item in outputs], ["a", "b", "c"])
+        self.assertEqual(len({item[1] for item in outputs}), 3)
+        self.assertEqual(self.pool.retired, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()